@@ -0,0 +1,12 @@
+-- Replace the float32 ANN index on embeddings with a half-precision
+-- (float16) one for compact similarity search. The index is built on the
+-- expression vector::halfvec(1536), so no column is added and writers do
+-- not change. Similarity queries scan the half-size index, over-fetch
+-- candidates, and rescore them against the float32 vector column in the
+-- heap; the float32 index from 001 is then unused and is dropped.
+-- Requires pgvector >= 0.7.0 for the halfvec type.
+
+CREATE INDEX IF NOT EXISTS idx_embeddings_vector_half
+    ON embeddings USING ivfflat ((vector::halfvec(1536)) halfvec_cosine_ops) WITH (lists = 100);
+
+DROP INDEX IF EXISTS idx_embeddings_vector;
@@ -0,0 +1,8 @@
+-- Add a content hash to recommendations so the recommendation generator can
+-- reuse activities for indicators whose text has not changed (including the
+-- same indicator text carried into a new version year).
+
+ALTER TABLE recommendations ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+
+CREATE INDEX IF NOT EXISTS idx_recommendations_content_hash
+    ON recommendations(content_hash, age_band, generation_model);
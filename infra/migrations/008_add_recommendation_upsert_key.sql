@@ -0,0 +1,14 @@
+-- Make (indicator_id, audience, generation_model) the natural key of
+-- recommendations so bulk writers can upsert on it. Older duplicates
+-- (same key, regenerated under a different recommendation_id) are removed,
+-- keeping the most recently inserted row.
+
+DELETE FROM recommendations r
+USING recommendations newer
+WHERE r.indicator_id = newer.indicator_id
+  AND r.audience = newer.audience
+  AND r.generation_model = newer.generation_model
+  AND r.id < newer.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_recommendations_indicator_audience_model
+    ON recommendations(indicator_id, audience, generation_model);
@@ -0,0 +1,11 @@
+-- Add content hashes to the hierarchy tables and indicators.
+-- persist_standard only rewrites a row when its hash differs
+-- (ON CONFLICT ... DO UPDATE ... WHERE content_hash IS DISTINCT FROM ...),
+-- so re-persisting an unchanged document creates no dead tuples or WAL.
+-- Existing rows start with NULL hashes and are rewritten once.
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+ALTER TABLE domains ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+ALTER TABLE strands ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+ALTER TABLE sub_strands ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+ALTER TABLE indicators ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
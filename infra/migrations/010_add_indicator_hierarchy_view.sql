@@ -0,0 +1,45 @@
+-- Flattened indicator hierarchy for read paths.
+-- Hierarchy listings otherwise join indicators, domains, documents, strands
+-- and sub_strands on every read. The persistence stage refreshes this view
+-- concurrently at the end of each run that changed rows, so readers are
+-- never blocked; data is as fresh as the last completed run.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS indicator_hierarchy AS
+SELECT
+    i.id AS indicator_id,
+    i.standard_id,
+    i.code AS indicator_code,
+    i.title AS indicator_title,
+    i.description,
+    dom.code AS domain_code,
+    dom.name AS domain_name,
+    dom.description AS domain_description,
+    str.code AS strand_code,
+    str.name AS strand_name,
+    str.description AS strand_description,
+    substr.code AS sub_strand_code,
+    substr.name AS sub_strand_name,
+    substr.description AS sub_strand_description,
+    i.age_band AS indicator_age_band,
+    d.country,
+    d.state,
+    d.age_band,
+    d.version_year,
+    i.source_page
+FROM indicators i
+JOIN domains dom ON i.domain_id = dom.id
+JOIN documents d ON dom.document_id = d.id
+LEFT JOIN strands str ON i.strand_id = str.id
+LEFT JOIN sub_strands substr ON i.sub_strand_id = substr.id;
+
+-- Unique index required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_indicator_hierarchy_standard_id
+    ON indicator_hierarchy (standard_id);
+
+-- Country/state listings, already in standard_id order
+CREATE INDEX IF NOT EXISTS idx_indicator_hierarchy_state_order
+    ON indicator_hierarchy (country, state, standard_id);
+
+-- Domain and strand filtered listings
+CREATE INDEX IF NOT EXISTS idx_indicator_hierarchy_scope
+    ON indicator_hierarchy (country, state, domain_code, strand_code, standard_id);
@@ -0,0 +1,28 @@
+-- Index the foreign keys the hierarchy joins go through.
+-- Listing and similarity queries join indicators to domains/strands/
+-- sub_strands and embeddings to indicators; without these indexes each
+-- join (and every ON DELETE check against the parent) scans the child
+-- table. domains.document_id, strands.domain_id and sub_strands.strand_id
+-- are already covered as the leading column of their UNIQUE constraints.
+--
+-- Indexes are built CONCURRENTLY so writers are not blocked; run this file
+-- with plain psql -f (not --single-transaction).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_indicators_domain_id
+    ON indicators(domain_id);
+
+-- Only indicators under a strand/sub-strand take part in those joins
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_indicators_strand_id
+    ON indicators(strand_id) WHERE strand_id IS NOT NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_indicators_sub_strand_id
+    ON indicators(sub_strand_id) WHERE sub_strand_id IS NOT NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_indicator_id
+    ON embeddings(indicator_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pipeline_stages_run_id
+    ON pipeline_stages(run_id);
+
+-- Duplicates the index behind indicators.standard_id's UNIQUE constraint
+DROP INDEX CONCURRENTLY IF EXISTS idx_indicators_standard_id;
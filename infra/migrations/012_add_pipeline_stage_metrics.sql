@@ -0,0 +1,17 @@
+-- Per-stage resource metrics for pipeline_stages.
+-- The persistence stage writes one row per stage of a run, with the
+-- stage's wall time (duration_ms), CPU time, peak RSS, S3 bytes and record
+-- counts summed over its Lambda invocations. Rows are upserted on
+-- (run_id, stage_name) so a retried write replaces them.
+
+ALTER TABLE pipeline_stages ADD COLUMN IF NOT EXISTS started_at TIMESTAMP;
+ALTER TABLE pipeline_stages ADD COLUMN IF NOT EXISTS cpu_ms INTEGER;
+ALTER TABLE pipeline_stages ADD COLUMN IF NOT EXISTS peak_rss_bytes BIGINT;
+ALTER TABLE pipeline_stages ADD COLUMN IF NOT EXISTS input_bytes BIGINT;
+ALTER TABLE pipeline_stages ADD COLUMN IF NOT EXISTS output_bytes BIGINT;
+ALTER TABLE pipeline_stages ADD COLUMN IF NOT EXISTS records_in INTEGER;
+ALTER TABLE pipeline_stages ADD COLUMN IF NOT EXISTS records_out INTEGER;
+ALTER TABLE pipeline_stages ADD COLUMN IF NOT EXISTS invocations INTEGER;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pipeline_stages_run_stage
+    ON pipeline_stages(run_id, stage_name);
@@ -0,0 +1,17 @@
+-- Bedrock usage of the detection and parsing stages.
+-- pipeline_stages gets each stage's LLM calls, input and output tokens,
+-- latency and retries, summed over its Lambda invocations, and the models
+-- it called. pipeline_runs gets the same totals summed over the stages.
+
+ALTER TABLE pipeline_stages ADD COLUMN IF NOT EXISTS llm_calls INTEGER;
+ALTER TABLE pipeline_stages ADD COLUMN IF NOT EXISTS llm_input_tokens BIGINT;
+ALTER TABLE pipeline_stages ADD COLUMN IF NOT EXISTS llm_output_tokens BIGINT;
+ALTER TABLE pipeline_stages ADD COLUMN IF NOT EXISTS llm_latency_ms BIGINT;
+ALTER TABLE pipeline_stages ADD COLUMN IF NOT EXISTS llm_retries INTEGER;
+ALTER TABLE pipeline_stages ADD COLUMN IF NOT EXISTS llm_model_ids TEXT[];
+
+ALTER TABLE pipeline_runs ADD COLUMN IF NOT EXISTS llm_calls INTEGER;
+ALTER TABLE pipeline_runs ADD COLUMN IF NOT EXISTS llm_input_tokens BIGINT;
+ALTER TABLE pipeline_runs ADD COLUMN IF NOT EXISTS llm_output_tokens BIGINT;
+ALTER TABLE pipeline_runs ADD COLUMN IF NOT EXISTS llm_latency_ms BIGINT;
+ALTER TABLE pipeline_runs ADD COLUMN IF NOT EXISTS llm_retries INTEGER;
@@ -74,6 +74,19 @@ export async function deleteRow(table: string, id: number): Promise<boolean> {
   return (result.rowCount ?? 0) > 0;
 }
 
+/**
+ * Refresh the indicator_hierarchy materialized view after an edit.
+ * CONCURRENTLY keeps readers unblocked. A failed refresh leaves the view
+ * stale until the next one but does not fail the request.
+ */
+export async function refreshIndicatorHierarchy(): Promise<void> {
+  try {
+    await query("REFRESH MATERIALIZED VIEW CONCURRENTLY indicator_hierarchy");
+  } catch (err) {
+    console.error("Failed to refresh indicator_hierarchy view", err);
+  }
+}
+
 // --- Lifecycle ---
 
 export async function closePool(): Promise<void> {
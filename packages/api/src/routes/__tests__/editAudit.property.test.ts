@@ -20,6 +20,7 @@ vi.mock("../../db/client.js", () => ({
   deleteRow: vi.fn(),
   queryOne: vi.fn(),
   query: vi.fn(),
+  refreshIndicatorHierarchy: vi.fn(),
 }));
 
 vi.mock("../../middleware/auth.js", () => {
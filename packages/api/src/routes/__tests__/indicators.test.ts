@@ -7,6 +7,7 @@ vi.mock("../../db/client.js", () => ({
   deleteRow: vi.fn(),
   queryOne: vi.fn(),
   query: vi.fn(),
+  refreshIndicatorHierarchy: vi.fn(),
 }));
 
 // Mock the auth middleware
@@ -28,11 +29,17 @@ vi.mock("../../middleware/auth.js", () => ({
 }));
 
 import indicators from "../indicators.js";
-import { updateRow, deleteRow, queryOne } from "../../db/client.js";
+import {
+  updateRow,
+  deleteRow,
+  queryOne,
+  refreshIndicatorHierarchy,
+} from "../../db/client.js";
 
 const mockedUpdateRow = vi.mocked(updateRow);
 const mockedDeleteRow = vi.mocked(deleteRow);
 const mockedQueryOne = vi.mocked(queryOne);
+const mockedRefresh = vi.mocked(refreshIndicatorHierarchy);
 
 function createApp() {
   const app = new Hono();
@@ -94,6 +101,7 @@ describe("PUT /api/indicators/:id", () => {
       { title: "Updated Indicator", code: "I1-U" },
       { edited_at: "NOW()", edited_by: "editor@test.com" },
     );
+    expect(mockedRefresh).toHaveBeenCalledOnce();
   });
 
   it("maps ageBand, sourcePage, sourceText to snake_case", async () => {
@@ -131,6 +139,7 @@ describe("PUT /api/indicators/:id", () => {
     expect(res.status).toBe(404);
     const body = await res.json();
     expect(body.error.code).toBe("NOT_FOUND");
+    expect(mockedRefresh).not.toHaveBeenCalled();
   });
 
   it("returns 400 for invalid id", async () => {
@@ -195,6 +204,7 @@ describe("DELETE /api/indicators/:id", () => {
     expect(body.success).toBe(true);
 
     expect(mockedDeleteRow).toHaveBeenCalledWith("indicators", 50);
+    expect(mockedRefresh).toHaveBeenCalledOnce();
   });
 
   it("returns 404 when indicator not found", async () => {
@@ -7,6 +7,7 @@ vi.mock("../../db/client.js", () => ({
   deleteRow: vi.fn(),
   queryOne: vi.fn(),
   query: vi.fn(),
+  refreshIndicatorHierarchy: vi.fn(),
 }));
 
 // Mock the auth middleware
@@ -1,5 +1,11 @@
 import { Hono } from "hono";
-import { updateRow, deleteRow, queryOne, query } from "../db/client.js";
+import {
+  updateRow,
+  deleteRow,
+  queryOne,
+  query,
+  refreshIndicatorHierarchy,
+} from "../db/client.js";
 import { UpdateDomainSchema, VerifySchema } from "../schemas/index.js";
 import {
   requireAuth,
@@ -75,6 +81,7 @@ domains.put("/:id", requireAuth, requireEditPermission, async (c) => {
     );
   }
 
+  await refreshIndicatorHierarchy();
   return c.json(mapDomain(row as unknown as Record<string, unknown>));
 });
 
@@ -106,6 +113,7 @@ domains.delete("/:id", requireAuth, requireEditPermission, async (c) => {
   );
   await query(`DELETE FROM strands WHERE domain_id = $1`, [id]);
   await deleteRow("domains", id);
+  await refreshIndicatorHierarchy();
 
   return c.json({ success: true });
 });
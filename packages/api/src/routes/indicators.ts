@@ -1,5 +1,10 @@
 import { Hono } from "hono";
-import { updateRow, deleteRow, queryOne } from "../db/client.js";
+import {
+  updateRow,
+  deleteRow,
+  queryOne,
+  refreshIndicatorHierarchy,
+} from "../db/client.js";
 import { UpdateIndicatorSchema, VerifySchema } from "../schemas/index.js";
 import {
   requireAuth,
@@ -90,6 +95,7 @@ indicators.put("/:id", requireAuth, requireEditPermission, async (c) => {
     );
   }
 
+  await refreshIndicatorHierarchy();
   return c.json(mapIndicator(row as unknown as Record<string, unknown>));
 });
 
@@ -116,6 +122,7 @@ indicators.delete("/:id", requireAuth, requireEditPermission, async (c) => {
   }
 
   await deleteRow("indicators", id);
+  await refreshIndicatorHierarchy();
 
   return c.json({ success: true });
 });
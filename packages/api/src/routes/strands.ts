@@ -1,5 +1,11 @@
 import { Hono } from "hono";
-import { updateRow, deleteRow, queryOne, query } from "../db/client.js";
+import {
+  updateRow,
+  deleteRow,
+  queryOne,
+  query,
+  refreshIndicatorHierarchy,
+} from "../db/client.js";
 import { UpdateStrandSchema, VerifySchema } from "../schemas/index.js";
 import {
   requireAuth,
@@ -75,6 +81,7 @@ strands.put("/:id", requireAuth, requireEditPermission, async (c) => {
     );
   }
 
+  await refreshIndicatorHierarchy();
   return c.json(mapStrand(row as unknown as Record<string, unknown>));
 });
 
@@ -102,6 +109,7 @@ strands.delete("/:id", requireAuth, requireEditPermission, async (c) => {
   await query(`DELETE FROM indicators WHERE strand_id = $1`, [id]);
   await query(`DELETE FROM sub_strands WHERE strand_id = $1`, [id]);
   await deleteRow("strands", id);
+  await refreshIndicatorHierarchy();
 
   return c.json({ success: true });
 });
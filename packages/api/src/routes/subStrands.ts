@@ -1,5 +1,11 @@
 import { Hono } from "hono";
-import { updateRow, deleteRow, queryOne, query } from "../db/client.js";
+import {
+  updateRow,
+  deleteRow,
+  queryOne,
+  query,
+  refreshIndicatorHierarchy,
+} from "../db/client.js";
 import { UpdateSubStrandSchema, VerifySchema } from "../schemas/index.js";
 import {
   requireAuth,
@@ -75,6 +81,7 @@ subStrands.put("/:id", requireAuth, requireEditPermission, async (c) => {
     );
   }
 
+  await refreshIndicatorHierarchy();
   return c.json(mapSubStrand(row as unknown as Record<string, unknown>));
 });
 
@@ -103,6 +110,7 @@ subStrands.delete("/:id", requireAuth, requireEditPermission, async (c) => {
   // Cascade delete: indicators → sub_strand
   await query(`DELETE FROM indicators WHERE sub_strand_id = $1`, [id]);
   await deleteRow("sub_strands", id);
+  await refreshIndicatorHierarchy();
 
   return c.json({ success: true });
 });
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Microbenchmark per-statement latency with and without prepared statements.
+
+Loads the same synthetic corpus as benchmark_queries.py into a scratch
+schema, then runs the hot statements of db.py in a tight loop, once sending
+the full SQL text each time and once through per-connection PREPARE/EXECUTE
+(Config.DB_PREPARED_STATEMENTS). The statements are:
+- the unchanged-row hierarchy upsert behind persist_standard
+- the indicator upsert behind persist_standard
+- the embedding insert
+- the filtered similarity query
+
+Reported per statement: mean and p95 latency in microseconds for each mode,
+and the time saved per call.
+
+Requires PostgreSQL with pgvector; connection settings come from DB_HOST,
+DB_PORT, DB_NAME, DB_USER and DB_PASSWORD.
+
+Usage:
+    python scripts/benchmark_prepared.py
+    python scripts/benchmark_prepared.py --iterations 5000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from unittest.mock import patch
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from benchmark_queries import VECTOR_DIM, apply_migration, base_migrations, load_corpus, routed_connections
+from els_pipeline.db import _execute_prepared, _upsert_if_changed, query_similar_indicators
+
+
+def build_statements(args):
+    """(name, callable(cur, i)) for each hot statement under test."""
+    rng = random.Random(args.seed)
+    vector = [rng.random() - 0.5 for _ in range(VECTOR_DIM)]
+    vector_str = '[' + ','.join(str(v) for v in vector) + ']'
+
+    def document_upsert(cur, i):
+        _upsert_if_changed(
+            cur, 'documents',
+            ['country', 'state', 'version_year', 'title'], ('US', 'S001', 2024, 'Standards 1'),
+            ['source_url', 'age_band', 'publishing_agency'], (None, '3-5', 'Agency 1'),
+        )
+
+    def indicator_upsert(cur, i):
+        _upsert_if_changed(
+            cur, 'indicators',
+            ['standard_id'], (f'US-BENCH-2024-D1-{i % 500}',),
+            ['domain_id', 'strand_id', 'sub_strand_id', 'code', 'title',
+             'description', 'age_band', 'source_page', 'source_text'],
+            (1, None, None, f'D1.{i % 500}', 'Indicator', 'Benchmark indicator', '3-5', 1, 'text'),
+        )
+
+    def embedding_insert(cur, i):
+        _execute_prepared(cur, """
+            INSERT INTO embeddings (
+                indicator_id, country, state, vector,
+                embedding_model, embedding_version, input_text, created_at
+            )
+            VALUES (%s, %s, %s, %s::vector, %s, %s, %s, %s)
+        """, ('US-S001-2024-D1-1', 'US', 'S001', vector_str, 'bench', 'v1', 'text', None))
+
+    def similarity_query(cur, i):
+        query_similar_indicators(vector, top_k=10, filters={'country': 'US', 'state': 'S001'})
+
+    return [
+        ("hierarchy upsert (unchanged)", document_upsert),
+        ("indicator upsert", indicator_upsert),
+        ("embedding insert", embedding_insert),
+        ("similarity query (state filter)", similarity_query),
+    ]
+
+
+def measure(conn, func, iterations):
+    """Per-call latencies in microseconds (first call excluded as warm-up)."""
+    samples = []
+    with conn.cursor() as cur:
+        func(cur, 0)
+        for i in range(1, iterations + 1):
+            start = time.perf_counter()
+            func(cur, i)
+            samples.append((time.perf_counter() - start) * 1e6)
+    conn.rollback()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--schema", default="els_prepared_bench")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    # Corpus shape used by load_corpus
+    args.states, args.domains, args.strands, args.sub_strands = 20, 8, 4, 3
+    args.indicators_per_domain, args.embeddings = 60, 5000
+
+    connect_kwargs = dict(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', '5432')),
+        database=os.getenv('DB_NAME', 'els_pipeline'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', ''),
+        options=f"-c search_path={args.schema},public",
+    )
+    admin = psycopg2.connect(**connect_kwargs)
+    admin.autocommit = True
+
+    try:
+        with admin.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE")
+            cur.execute(f"CREATE SCHEMA {args.schema}")
+        for name in base_migrations():
+            apply_migration(admin, name)
+        load_corpus(admin, args)
+
+        print(f"\n{'statement':<34} {'plain us':>9} {'p95':>7} {'prepared us':>12} {'p95':>7} {'saved us':>9}")
+        for name, func in build_statements(args):
+            results = {}
+            for prepared in (False, True):
+                # A fresh session per mode, so nothing is prepared in advance
+                conn = psycopg2.connect(**connect_kwargs)
+                try:
+                    with patch('els_pipeline.db.Config.DB_PREPARED_STATEMENTS', prepared), \
+                         routed_connections(conn, []):
+                        samples = measure(conn, func, args.iterations)
+                finally:
+                    conn.close()
+                results[prepared] = (
+                    statistics.mean(samples),
+                    statistics.quantiles(samples, n=20)[-1],
+                )
+            (plain, plain_p95), (prep, prep_p95) = results[False], results[True]
+            print(f"{name:<34} {plain:>9.0f} {plain_p95:>7.0f} {prep:>12.0f} {prep_p95:>7.0f} {plain - prep:>9.0f}")
+    finally:
+        with admin.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE")
+        admin.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Benchmark quantized vector index storage: memory saved vs. recall lost.
+
+Builds a synthetic clustered corpus (indicators from many states cluster by
+topic, like real standards do), then compares float32 exact search with
+float16 and int8 quantized search, with and without full-precision rescoring.
+
+Reported per mode:
+- bytes scanned per search (the resident matrix) and ratio vs. float32
+- recall@k against exact float32 results
+- mean query latency for a batch of queries
+
+Usage:
+    python scripts/benchmark_quantization.py
+    python scripts/benchmark_quantization.py --rows 200000 --dim 1536 --queries 200 --top-k 10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from els_pipeline.vector_index import VectorIndex, QUANTIZATION_MODES, DEFAULT_OVERSAMPLE
+
+
+def build_corpus(rows: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Generate clustered vectors so nearest neighbours are meaningful."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    assignment = rng.integers(0, clusters, size=rows)
+    noise = rng.standard_normal((rows, dim)).astype(np.float32) * 0.35
+    return centers[assignment] + noise
+
+
+def recall(expected, actual) -> float:
+    """Mean fraction of exact top-k ids recovered per query."""
+    hits = 0
+    total = 0
+    for exp, act in zip(expected, actual):
+        exp_ids = {r["indicator_id"] for r in exp}
+        hits += len(exp_ids & {r["indicator_id"] for r in act})
+        total += len(exp_ids)
+    return hits / total if total else 1.0
+
+
+def timed_search(index: VectorIndex, queries: np.ndarray, top_k: int, **kwargs):
+    """Run a batched search and return (results, ms per query)."""
+    start = time.perf_counter()
+    results = index.search_batch(queries, top_k=top_k, **kwargs)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return results, elapsed_ms / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--oversample", type=int, default=DEFAULT_OVERSAMPLE)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"Building corpus: {args.rows} x {args.dim} ({args.clusters} clusters)")
+    matrix = build_corpus(args.rows, args.dim, args.clusters, args.seed)
+    ids = np.asarray([f"ID-{i}" for i in range(args.rows)])
+    rng = np.random.default_rng(args.seed + 1)
+    queries = matrix[rng.integers(0, args.rows, size=args.queries)] \
+        + rng.standard_normal((args.queries, args.dim)).astype(np.float32) * 0.1
+
+    exact_index = VectorIndex(ids, matrix, {})
+    exact, exact_ms = timed_search(exact_index, queries, args.top_k)
+    base_bytes = exact_index.nbytes
+
+    print()
+    print(f"{'mode':<22} {'bytes':>14} {'ratio':>7} {'recall@k':>9} {'ms/query':>9}")
+    print(f"{'float32 (exact)':<22} {base_bytes:>14,} {1.0:>7.2f} {1.0:>9.4f} {exact_ms:>9.2f}")
+
+    for mode in QUANTIZATION_MODES:
+        index = VectorIndex(ids, exact_index.vectors, {}, normalized=True).quantize(mode)
+        for rescore in (False, True):
+            results, ms = timed_search(
+                index, queries, args.top_k, oversample=args.oversample, rescore=rescore
+            )
+            label = f"{mode}{' + rescore' if rescore else ''}"
+            print(
+                f"{label:<22} {index.nbytes:>14,} {index.nbytes / base_bytes:>7.2f} "
+                f"{recall(exact, results):>9.4f} {ms:>9.2f}"
+            )
+
+    print()
+    print(
+        "bytes = resident matrix scanned per search. With a memory-mapped saved "
+        "index, rescoring pages in only the over-fetched candidate rows "
+        f"(top_k x oversample = {args.top_k * args.oversample} per query)."
+    )
+
+
+if __name__ == "__main__":
+    main()
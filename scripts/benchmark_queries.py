@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""Benchmark db.py read queries before and after the hierarchy FK indexes.
+
+Creates a scratch schema in a local PostgreSQL (with pgvector), applies
+infra/migrations 001-010, and loads a synthetic corpus: documents per state,
+each with domains, strands, sub-strands, indicators and embeddings. Every
+read query in db.py is then run through the real function. For each query
+the harness reports:
+- the median wall time over --repeat runs
+- the EXPLAIN (ANALYZE, BUFFERS) plan of the SQL the function sent
+
+011_add_hierarchy_fk_indexes.sql is then applied and everything is repeated,
+followed by a before/after summary.
+
+Connection settings come from DB_HOST, DB_PORT, DB_NAME, DB_USER and
+DB_PASSWORD. The scratch schema is dropped afterwards unless --keep is given.
+
+Usage:
+    python scripts/benchmark_queries.py
+    python scripts/benchmark_queries.py --states 100 --indicators-per-domain 80 --repeat 20
+    python scripts/benchmark_queries.py --no-plans
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from els_pipeline.db import (
+    DatabaseConnection,
+    get_indicators_by_country_state,
+    get_indicators_page,
+    encode_page_cursor,
+    query_similar_indicators,
+    query_similar_indicators_batch,
+)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', 'infra', 'migrations')
+INDEX_MIGRATION = '011_add_hierarchy_fk_indexes.sql'
+VECTOR_DIM = 1536
+
+
+def split_sql(text: str):
+    """Split a migration file into statements (no function bodies in ours)."""
+    text = re.sub(r'--[^\n]*', '', text)
+    return [stmt.strip() for stmt in text.split(';') if stmt.strip()]
+
+
+def apply_migration(conn, filename: str) -> None:
+    """Run a migration one statement at a time (CONCURRENTLY needs autocommit)."""
+    with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+        statements = split_sql(f.read())
+    with conn.cursor() as cur:
+        for stmt in statements:
+            cur.execute(stmt)
+
+
+def base_migrations():
+    """Migration files that precede the FK index migration, in order."""
+    return sorted(
+        name for name in os.listdir(MIGRATIONS_DIR)
+        if re.match(r'\d{3}_.*\.sql$', name) and name < INDEX_MIGRATION
+    )
+
+
+def load_corpus(conn, args) -> None:
+    """Generate the synthetic hierarchy server-side with generate_series."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO documents (country, state, title, version_year, age_band, publishing_agency)
+            SELECT 'US', 'S' || lpad(s::text, 3, '0'), 'Standards ' || s, 2024, '3-5', 'Agency ' || s
+            FROM generate_series(1, %s) s
+        """, (args.states,))
+        cur.execute("""
+            INSERT INTO domains (document_id, code, name, description)
+            SELECT d.id, 'D' || n, 'Domain ' || n, 'Domain description ' || n
+            FROM documents d CROSS JOIN generate_series(1, %s) n
+        """, (args.domains,))
+        cur.execute("""
+            INSERT INTO strands (domain_id, code, name, description)
+            SELECT dom.id, dom.code || '.S' || n, 'Strand ' || n, 'Strand description ' || n
+            FROM domains dom CROSS JOIN generate_series(1, %s) n
+        """, (args.strands,))
+        cur.execute("""
+            INSERT INTO sub_strands (strand_id, code, name, description)
+            SELECT str.id, str.code || '.' || n, 'Sub-strand ' || n, 'Sub-strand description ' || n
+            FROM strands str CROSS JOIN generate_series(1, %s) n
+        """, (args.sub_strands,))
+        # Every fifth indicator hangs directly off its domain
+        cur.execute("""
+            INSERT INTO indicators (
+                standard_id, domain_id, strand_id, sub_strand_id, code, title,
+                description, age_band, source_page, source_text
+            )
+            SELECT
+                d.country || '-' || d.state || '-' || d.version_year || '-' || dom.code || '-' || n,
+                dom.id,
+                CASE WHEN n %% 5 = 0 THEN NULL ELSE str.id END,
+                CASE WHEN n %% 5 = 0 THEN NULL ELSE sub.id END,
+                dom.code || '.' || n,
+                'Indicator ' || n,
+                'Child demonstrates skill ' || n || ' in ' || dom.name,
+                '3-5',
+                n,
+                'Source text for indicator ' || n
+            FROM domains dom
+            JOIN documents d ON dom.document_id = d.id
+            CROSS JOIN generate_series(1, %s) n
+            JOIN LATERAL (
+                SELECT id FROM strands
+                WHERE domain_id = dom.id ORDER BY id OFFSET (n %% %s) LIMIT 1
+            ) str ON TRUE
+            JOIN LATERAL (
+                SELECT id FROM sub_strands
+                WHERE strand_id = str.id ORDER BY id OFFSET (n %% %s) LIMIT 1
+            ) sub ON TRUE
+        """, (args.indicators_per_domain, args.strands, args.sub_strands))
+        # The correlated reference to i.id makes random() run per row
+        cur.execute("""
+            INSERT INTO embeddings (
+                indicator_id, country, state, vector, embedding_model,
+                embedding_version, input_text
+            )
+            SELECT
+                i.standard_id, d.country, d.state,
+                (SELECT array_agg(random() - 0.5)
+                 FROM generate_series(1, %s) WHERE i.id IS NOT NULL)::vector,
+                'synthetic', 'v1', i.description
+            FROM indicators i
+            JOIN domains dom ON i.domain_id = dom.id
+            JOIN documents d ON dom.document_id = d.id
+            ORDER BY i.id
+            LIMIT %s
+        """, (VECTOR_DIM, args.embeddings))
+        cur.execute("REFRESH MATERIALIZED VIEW indicator_hierarchy")
+        cur.execute("ANALYZE")
+        cur.execute("SELECT count(*) FROM indicators")
+        indicators = cur.fetchone()[0]
+    print(f"Loaded {args.states} documents, {indicators} indicators, "
+          f"{min(args.embeddings, indicators)} embeddings")
+
+
+class _RecordingCursor:
+    """Cursor proxy that records every statement sent through it."""
+
+    def __init__(self, cursor, log):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_log', log)
+
+    def execute(self, sql, params=None):
+        self._log.append((sql, params))
+        return self._cursor.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+
+class _RecordingConnection:
+    """Connection proxy whose cursors record their statements."""
+
+    def __init__(self, conn, log):
+        self._conn = conn
+        self._log = log
+
+    def cursor(self, *args, **kwargs):
+        return _RecordingCursor(self._conn.cursor(*args, **kwargs), self._log)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+@contextmanager
+def routed_connections(conn, log):
+    """Send db.py's get_connection() to the benchmark connection."""
+    @contextmanager
+    def get_connection():
+        yield _RecordingConnection(conn, log)
+
+    with patch.object(DatabaseConnection, 'get_connection', get_connection):
+        yield
+
+
+def build_queries(args):
+    """(name, callable) for every read query in db.py under test."""
+    rng = random.Random(args.seed)
+    state = f"S{max(1, args.states // 2):03d}"
+    vector = [rng.random() - 0.5 for _ in range(VECTOR_DIM)]
+    vectors = [[rng.random() - 0.5 for _ in range(VECTOR_DIM)] for _ in range(8)]
+    middle = f"US-{state}-2024-D{args.domains // 2 + 1}-"
+    return [
+        ("indicators by state (join)",
+         lambda: get_indicators_by_country_state('US', state)),
+        ("indicators by domain (join)",
+         lambda: get_indicators_by_country_state('US', state, domain_code='D1')),
+        ("indicators by strand (join)",
+         lambda: get_indicators_by_country_state('US', state, strand_code='D1.S1')),
+        ("indicators by state (view)",
+         lambda: get_indicators_by_country_state('US', state, from_view=True)),
+        ("indicators page (keyset, mid-state)",
+         lambda: get_indicators_page('US', state, page_size=100, cursor=encode_page_cursor(middle))),
+        ("similar indicators (state filter)",
+         lambda: query_similar_indicators(vector, top_k=10, filters={'country': 'US', 'state': state})),
+        ("similar indicators batch x8 (state filter)",
+         lambda: query_similar_indicators_batch(vectors, top_k=10, filters={'country': 'US', 'state': state})),
+    ]
+
+
+def run_phase(label, bench_conn, explain_conn, queries, args):
+    """Time each query and print its plan; returns {name: median ms}."""
+    print(f"\n=== {label} ===")
+    timings = {}
+    for name, func in queries:
+        log = []
+        with routed_connections(bench_conn, log):
+            func()  # warm-up, and captures the SQL
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                func()
+                samples.append((time.perf_counter() - start) * 1000)
+        timings[name] = statistics.median(samples)
+        print(f"\n{name}: median {timings[name]:.2f} ms over {args.repeat} runs")
+
+        if args.plans:
+            sql, params = log[0]
+            with explain_conn.cursor() as cur:
+                cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+                for (line,) in cur.fetchall():
+                    print(f"    {line}")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--schema", default="els_query_bench")
+    parser.add_argument("--states", type=int, default=50)
+    parser.add_argument("--domains", type=int, default=8)
+    parser.add_argument("--strands", type=int, default=4)
+    parser.add_argument("--sub-strands", type=int, default=3)
+    parser.add_argument("--indicators-per-domain", type=int, default=60)
+    parser.add_argument("--embeddings", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-plans", dest="plans", action="store_false")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema")
+    args = parser.parse_args()
+
+    connect_kwargs = dict(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', '5432')),
+        database=os.getenv('DB_NAME', 'els_pipeline'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', ''),
+        options=f"-c search_path={args.schema},public",
+    )
+    admin = psycopg2.connect(**connect_kwargs)
+    admin.autocommit = True
+    bench = psycopg2.connect(**connect_kwargs)
+    # An open read transaction would block CREATE INDEX CONCURRENTLY
+    bench.autocommit = True
+
+    try:
+        with admin.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE")
+            cur.execute(f"CREATE SCHEMA {args.schema}")
+        for name in base_migrations():
+            apply_migration(admin, name)
+        load_corpus(admin, args)
+
+        queries = build_queries(args)
+        before = run_phase("Before FK indexes", bench, admin, queries, args)
+
+        apply_migration(admin, INDEX_MIGRATION)
+        with admin.cursor() as cur:
+            cur.execute("ANALYZE")
+        after = run_phase(f"After {INDEX_MIGRATION}", bench, admin, queries, args)
+
+        print(f"\n{'query':<45} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for name, _ in queries:
+            speedup = before[name] / after[name] if after[name] else float('inf')
+            print(f"{name:<45} {before[name]:>10.2f} {after[name]:>10.2f} {speedup:>7.1f}x")
+    finally:
+        bench.close()
+        if not args.keep:
+            with admin.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE")
+        admin.close()
+
+
+if __name__ == "__main__":
+    main()
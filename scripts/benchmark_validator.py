@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Benchmark canonical-record validation throughput (records/sec).
+
+Generates a synthetic batch of canonical JSON records, a fraction of them
+broken in the ways parser output usually goes wrong (missing fields, wrong
+types, bad country codes), and validates the batch two ways:
+- validate_record in a loop, building a Pydantic ValidationResult per record
+- validate_records in one call, returning compact SchemaError tuples
+
+Both paths run the schema compiled once by compile_schema, so the difference
+is the per-record Pydantic construction. Each mode reports the best of
+--repeat runs. Both modes must agree on which records are invalid, or the
+script exits with an error.
+
+Usage:
+    python scripts/benchmark_validator.py
+    python scripts/benchmark_validator.py --records 200000 --invalid-fraction 0.2
+"""
+
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from els_pipeline.validator import validate_record, validate_records
+
+
+def make_record(i: int) -> dict:
+    """A valid canonical record with a distinct standard_id."""
+    domain = f"D{i % 8}"
+    return {
+        "country": "US",
+        "state": f"S{i % 50:02d}",
+        "document": {
+            "title": "Synthetic Early Learning Standards",
+            "version_year": 2024,
+            "source_url": "https://example.com/standards.pdf",
+            "age_band": "3-5",
+            "publishing_agency": "Department of Education",
+        },
+        "standard": {
+            "standard_id": f"US-S{i % 50:02d}-2024-{domain}-{i}",
+            "domain": {"code": domain, "name": f"Domain {domain}", "description": None},
+            "strand": {"code": f"{domain}.A", "name": "Strand A", "description": None},
+            "sub_strand": None if i % 3 else {"code": f"{domain}.A.1", "name": "Sub-strand 1", "description": None},
+            "indicator": {
+                "code": f"{domain}.{i}",
+                "name": None,
+                "description": f"Child demonstrates skill {i}",
+            },
+        },
+        "metadata": {"page_number": i % 200 + 1, "source_text_chunk": f"Skill {i}"},
+    }
+
+
+CORRUPTIONS = [
+    lambda r: r.pop("metadata"),
+    lambda r: r.update(country="usa"),
+    lambda r: r["document"].update(version_year="2024"),
+    lambda r: r["standard"].pop("standard_id"),
+    lambda r: r["standard"].update(domain={"code": ""}),
+    lambda r: r["standard"].update(strand="A"),
+    lambda r: r["standard"]["indicator"].update(description=""),
+]
+
+
+def make_corpus(count: int, invalid_fraction: float, seed: int) -> list:
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        record = make_record(i)
+        if rng.random() < invalid_fraction:
+            record = copy.deepcopy(record)
+            rng.choice(CORRUPTIONS)(record)
+        records.append(record)
+    return records
+
+
+def per_record(records):
+    return [validate_record(record).is_valid for record in records]
+
+
+def batched(records):
+    return [not errors for errors in validate_records(records)]
+
+
+def best_time(func, records, repeat):
+    best, outcome = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outcome = func(records)
+        best = min(best, time.perf_counter() - start)
+    return best, outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--invalid-fraction", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    records = make_corpus(args.records, args.invalid_fraction, args.seed)
+    print(f"Validating {len(records)} records "
+          f"({args.invalid_fraction:.0%} corrupted), best of {args.repeat}")
+
+    results = {}
+    for name, func in (("validate_record loop", per_record), ("validate_records batch", batched)):
+        seconds, outcome = best_time(func, records, args.repeat)
+        results[name] = (seconds, outcome)
+        print(f"{name:<24} {seconds:>8.3f} s {len(records) / seconds:>12,.0f} records/sec "
+              f"({outcome.count(False)} invalid)")
+
+    (loop_s, loop_valid), (batch_s, batch_valid) = results.values()
+    if loop_valid != batch_valid:
+        sys.exit("validate_record and validate_records disagree on record validity")
+    print(f"batch speedup: {loop_s / batch_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
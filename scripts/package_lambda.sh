@@ -168,9 +168,16 @@ update_lambda_functions() {
         "els-ingester-${ENVIRONMENT}"
         "els-text-extractor-${ENVIRONMENT}"
         "els-structure-detector-${ENVIRONMENT}"
+        "els-structure-detector-plan-${ENVIRONMENT}"
+        "els-structure-detector-chunk-${ENVIRONMENT}"
+        "els-structure-detector-reduce-${ENVIRONMENT}"
         "els-hierarchy-parser-${ENVIRONMENT}"
+        "els-hierarchy-parser-plan-${ENVIRONMENT}"
+        "els-hierarchy-parser-chunk-${ENVIRONMENT}"
+        "els-hierarchy-parser-reduce-${ENVIRONMENT}"
         "els-validator-${ENVIRONMENT}"
         "els-persistence-${ENVIRONMENT}"
+        "els-run-recorder-${ENVIRONMENT}"
     )
     
     for func in "${FUNCTIONS[@]}"; do
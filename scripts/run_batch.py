@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Run the pipeline for every document in a manifest with bounded concurrency.
+
+The manifest is a JSON array of documents already uploaded to the raw bucket:
+
+    [
+        {"s3_key": "US/CA/2021/ca_standards.pdf", "country": "US", "state": "CA", "version_year": 2021},
+        {"s3_key": "US/TX/2022/tx_standards.pdf", "country": "US", "state": "TX", "version_year": 2022,
+         "size_bytes": 8123456}
+    ]
+
+size_bytes is optional; documents without it are sized with a HEAD request.
+Set "allow_existing": true to re-ingest a document that was already
+persisted, so validation does not reject its records as duplicates.
+Concurrency is capped by --max-concurrent and by the account quotas in
+Config (TEXTRACT_MAX_CONCURRENT_JOBS, BEDROCK_REQUESTS_PER_MINUTE,
+BEDROCK_REQUESTS_PER_MINUTE_PER_RUN). The final per-document status is
+written as JSON to --output when given.
+
+Usage:
+    python scripts/run_batch.py manifest.json
+    python scripts/run_batch.py manifest.json --max-concurrent 20 --poll-interval 60 --output results.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from els_pipeline.orchestrator import quota_concurrency_limit, run_pipeline_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("manifest", help="Path to the JSON manifest")
+    parser.add_argument("--max-concurrent", type=int)
+    parser.add_argument("--poll-interval", type=float)
+    parser.add_argument("--state-machine-arn")
+    parser.add_argument("--output", help="Write the final per-document status here")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    print(f"{len(manifest)} documents, concurrency limit {quota_concurrency_limit(args.max_concurrent)}")
+
+    progress = run_pipeline_batch(
+        manifest,
+        max_concurrent=args.max_concurrent,
+        state_machine_arn=args.state_machine_arn,
+        poll_interval=args.poll_interval,
+    )
+
+    print(f"\ncompleted={progress.completed} failed={progress.failed} total={progress.total}")
+    for doc in progress.documents:
+        if doc.status == "failed":
+            print(f"  FAILED {doc.s3_key} (run {doc.run_id}, {doc.attempts} attempts): {doc.error}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(progress.model_dump(), f, indent=2)
+    sys.exit(1 if progress.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,12 +10,23 @@ class Config:
     S3_RAW_BUCKET = os.getenv("ELS_RAW_BUCKET", "els-raw-documents")
     S3_PROCESSED_BUCKET = os.getenv("ELS_PROCESSED_BUCKET", "els-processed-json")
     S3_EMBEDDINGS_BUCKET = os.getenv("ELS_EMBEDDINGS_BUCKET", "els-embeddings")
+    # Concurrent PUTs when saving many records at once
+    S3_UPLOAD_MAX_WORKERS = int(os.getenv("S3_UPLOAD_MAX_WORKERS", "16"))
+    # Concurrent GETs when loading many objects at once (e.g. per-chunk results)
+    S3_DOWNLOAD_MAX_WORKERS = int(os.getenv("S3_DOWNLOAD_MAX_WORKERS", "16"))
     
     # Bedrock Model IDs
     # Use cross-region inference profile for Anthropic models
     BEDROCK_DETECTOR_LLM_MODEL_ID = os.getenv("BEDROCK_DETECTOR_LLM_MODEL_ID", "us.anthropic.claude-opus-4-6-v1")
     BEDROCK_PARSER_LLM_MODEL_ID = os.getenv("BEDROCK_PARSER_LLM_MODEL_ID", "us.anthropic.claude-sonnet-4-6")
     BEDROCK_EMBEDDING_MODEL_ID = os.getenv("BEDROCK_EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v1")
+    BEDROCK_RECOMMENDATION_LLM_MODEL_ID = os.getenv("BEDROCK_RECOMMENDATION_LLM_MODEL_ID", "us.anthropic.claude-sonnet-4-6")
+    
+    # Recommendation Generation
+    RECOMMENDATION_BATCH_SIZE = int(os.getenv("RECOMMENDATION_BATCH_SIZE", "20"))
+    RECOMMENDATION_MAX_CONCURRENCY = int(os.getenv("RECOMMENDATION_MAX_CONCURRENCY", "4"))
+    RECOMMENDATION_CALLS_PER_MINUTE = int(os.getenv("RECOMMENDATION_CALLS_PER_MINUTE", "30"))
+    RECOMMENDATION_WRITE_BATCH_SIZE = int(os.getenv("RECOMMENDATION_WRITE_BATCH_SIZE", "500"))
     
     # Confidence Threshold
     CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", "0.7"))
@@ -29,10 +40,45 @@ class Config:
     DB_NAME = os.getenv("DB_NAME", "els_corpus")
     DB_USER = os.getenv("DB_USER", "postgres")
     DB_PASSWORD = os.getenv("DB_PASSWORD", "")
+    DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "10"))
+    # Pooled connections idle longer than this are pinged before reuse
+    DB_HEALTH_CHECK_IDLE_SECONDS = float(os.getenv("DB_HEALTH_CHECK_IDLE_SECONDS", "30"))
+    DB_SECRET_CACHE_TTL_SECONDS = float(os.getenv("DB_SECRET_CACHE_TTL_SECONDS", "300"))
+    # Run hot statements as per-connection server-side prepared statements
+    DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() == "true"
+    # Rows per round trip when streaming through server-side cursors
+    DB_STREAM_ITERSIZE = int(os.getenv("DB_STREAM_ITERSIZE", "2000"))
+    
+    # Persistence Configuration (1 = sequential)
+    PERSIST_MAX_WORKERS = int(os.getenv("PERSIST_MAX_WORKERS", "1"))
+    # "record", "batch" (savepoint per record) or "document" (all-or-nothing)
+    PERSIST_TRANSACTION_MODE = os.getenv("PERSIST_TRANSACTION_MODE", "record")
+    PERSIST_TRANSACTION_BATCH_SIZE = int(os.getenv("PERSIST_TRANSACTION_BATCH_SIZE", "200"))
+    
+    # Validation Configuration
+    # Reject records whose standard key is already stored (needs database access)
+    VALIDATION_CHECK_EXISTING = os.getenv("VALIDATION_CHECK_EXISTING", "false").lower() == "true"
+    # Existing-key count above which a Bloom filter replaces the in-memory set
+    VALIDATION_BLOOM_THRESHOLD = int(os.getenv("VALIDATION_BLOOM_THRESHOLD", "100000"))
+    VALIDATION_BLOOM_ERROR_RATE = float(os.getenv("VALIDATION_BLOOM_ERROR_RATE", "0.001"))
     
     # Step Functions Configuration
     STEP_FUNCTIONS_STATE_MACHINE_ARN = os.getenv(
         "STEP_FUNCTIONS_STATE_MACHINE_ARN",
         "arn:aws:states:us-east-1:123456789012:stateMachine:els-pipeline"
     )
+    
+    # Finished runs whose status get_pipeline_status keeps in memory
+    PIPELINE_STATUS_CACHE_SIZE = int(os.getenv("PIPELINE_STATUS_CACHE_SIZE", "1024"))
+    
+    # Batch Orchestration Configuration
+    BATCH_MAX_CONCURRENT_RUNS = int(os.getenv("BATCH_MAX_CONCURRENT_RUNS", "10"))
+    BATCH_POLL_INTERVAL_SECONDS = float(os.getenv("BATCH_POLL_INTERVAL_SECONDS", "30"))
+    # Starts per document when a run fails on a throttle
+    BATCH_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "3"))
+    # Account quotas that bound concurrent runs; set to the values granted to the account
+    TEXTRACT_MAX_CONCURRENT_JOBS = int(os.getenv("TEXTRACT_MAX_CONCURRENT_JOBS", "100"))
+    BEDROCK_REQUESTS_PER_MINUTE = int(os.getenv("BEDROCK_REQUESTS_PER_MINUTE", "50"))
+    # Peak Bedrock requests per minute a single run issues (detection and parsing are sequential)
+    BEDROCK_REQUESTS_PER_MINUTE_PER_RUN = int(os.getenv("BEDROCK_REQUESTS_PER_MINUTE_PER_RUN", "4"))
 
@@ -1,24 +1,64 @@
 """Data access layer for Aurora PostgreSQL with pgvector."""
 
+import base64
+import binascii
+import hashlib
 import json
 import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
 import psycopg2
+import psycopg2.errors
 from psycopg2.extras import execute_values, RealDictCursor
-from psycopg2.pool import SimpleConnectionPool
-from typing import List, Dict, Any, Optional
+from psycopg2.pool import ThreadedConnectionPool
+from typing import List, Dict, Any, Iterator, Optional, Set, Union
 from contextlib import contextmanager
 import logging
 import boto3
 
-from .models import NormalizedStandard, EmbeddingRecord, Recommendation
+from .config import Config
+from .models import (
+    NormalizedStandard,
+    HierarchyLevel,
+    EmbeddingRecord,
+    Recommendation,
+    BulkWriteResult,
+    IndicatorPage,
+    PipelineStageResult,
+)
+from .validator import BloomFilter
+from .stage_metrics import combine_llm_usage
 
 logger = logging.getLogger(__name__)
 
+# Candidates fetched per requested result when searching the halfvec index
+QUANTIZED_OVERSAMPLE = 4
+
 
 class DatabaseConnection:
-    """Manages database connection pooling."""
+    """
+    Manages database connection pooling.
+    
+    The pool is thread-safe, so connections may be checked out concurrently
+    from worker threads (at most max_connections() at a time). Connections
+    idle longer than Config.DB_HEALTH_CHECK_IDLE_SECONDS are pinged before
+    reuse, and dead ones (e.g. after a Lambda freeze/thaw) are discarded.
     
-    _pool: Optional[SimpleConnectionPool] = None
+    The pool is created lazily by get_connection() and is meant to outlive
+    a single Lambda invocation; warm containers reuse it, and Secrets
+    Manager lookups are cached for Config.DB_SECRET_CACHE_TTL_SECONDS.
+    """
+    
+    _pool: Optional[ThreadedConnectionPool] = None
+    _maxconn: int = 0
+    _last_used: Dict[int, float] = {}
+    _prepared: Dict[int, tuple] = {}
+    _init_lock = threading.Lock()
+    _secrets_client = None
+    _secret_cache: Dict[str, tuple] = {}
     
     @classmethod
     def initialize_pool(
@@ -29,12 +69,28 @@ class DatabaseConnection:
         user: str = None,
         password: str = None,
         minconn: int = 1,
-        maxconn: int = 10
+        maxconn: int = None
     ):
         """Initialize the connection pool."""
-        if cls._pool is not None:
-            logger.warning("Connection pool already initialized")
-            return
+        with cls._init_lock:
+            if cls._pool is not None:
+                logger.warning("Connection pool already initialized")
+                return
+            args = (host, port, database, user, password, minconn,
+                    maxconn or Config.DB_POOL_MAX_CONNECTIONS)
+            try:
+                cls._create_pool(*args)
+            except psycopg2.OperationalError:
+                # Cached credentials may predate a secret rotation
+                secret_arn = os.getenv('DB_SECRET_ARN')
+                if not secret_arn or cls._secret_cache.pop(secret_arn, None) is None:
+                    raise
+                logger.warning("Connection failed with cached credentials, refreshing secret")
+                cls._create_pool(*args)
+    
+    @classmethod
+    def _create_pool(cls, host, port, database, user, password, minconn, maxconn):
+        """Resolve credentials and create the pool (caller holds _init_lock)."""
         
         # Try Secrets Manager first (Lambda environment), then env vars, then defaults
         secret_arn = os.getenv('DB_SECRET_ARN')
@@ -54,7 +110,7 @@ class DatabaseConnection:
         user = user or os.getenv('DB_USER', 'postgres')
         password = password or os.getenv('DB_PASSWORD', '')
         
-        cls._pool = SimpleConnectionPool(
+        cls._pool = ThreadedConnectionPool(
             minconn=minconn,
             maxconn=maxconn,
             host=host,
@@ -65,151 +121,501 @@ class DatabaseConnection:
             connect_timeout=10,
             options='-c statement_timeout=30000'
         )
+        cls._maxconn = maxconn
+        cls._last_used = {}
+        cls._prepared = {}
         logger.info(f"Database connection pool initialized: {host}:{port}/{database}")
 
+    @classmethod
+    def max_connections(cls) -> int:
+        """Number of connections the pool can hand out at once."""
+        return cls._maxconn or Config.DB_POOL_MAX_CONNECTIONS
+
     @classmethod
     def _get_secret(cls, secret_arn: str) -> Optional[Dict[str, str]]:
-        """Retrieve database credentials from Secrets Manager."""
+        """Retrieve database credentials from Secrets Manager (cached with a TTL)."""
+        cached = cls._secret_cache.get(secret_arn)
+        if cached is not None and time.monotonic() - cached[0] < Config.DB_SECRET_CACHE_TTL_SECONDS:
+            return cached[1]
         try:
-            client = boto3.client('secretsmanager')
-            response = client.get_secret_value(SecretId=secret_arn)
-            return json.loads(response['SecretString'])
+            if cls._secrets_client is None:
+                cls._secrets_client = boto3.client('secretsmanager')
+            response = cls._secrets_client.get_secret_value(SecretId=secret_arn)
+            secret = json.loads(response['SecretString'])
+            cls._secret_cache[secret_arn] = (time.monotonic(), secret)
+            return secret
         except Exception as e:
             logger.warning(f"Failed to retrieve secret from Secrets Manager: {e}")
             return None
 
     
+    @classmethod
+    def _is_healthy(cls, conn) -> bool:
+        """Check a pooled connection, pinging it if it has been idle."""
+        if conn.closed:
+            return False
+        last_used = cls._last_used.get(id(conn))
+        if last_used is not None and \
+                time.monotonic() - last_used < Config.DB_HEALTH_CHECK_IDLE_SECONDS:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            logger.warning(f"Discarding stale database connection: {e}")
+            return False
+    
+    @classmethod
+    def prepared_names(cls, conn) -> set:
+        """
+        Names of the statements prepared on a connection's current session.
+        
+        Keyed by backend pid as well as the connection, so a reconnected
+        session starts with an empty set and statements are re-prepared.
+        """
+        backend_pid = conn.get_backend_pid()
+        entry = cls._prepared.get(id(conn))
+        if entry is None or entry[0] != backend_pid:
+            entry = (backend_pid, set())
+            cls._prepared[id(conn)] = entry
+        return entry[1]
+    
+    @classmethod
+    def _discard(cls, pool, conn) -> None:
+        """Close a connection and remove it from the pool."""
+        cls._last_used.pop(id(conn), None)
+        cls._prepared.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+    
     @classmethod
     @contextmanager
     def get_connection(cls):
-        """Get a connection from the pool."""
+        """
+        Get a healthy connection from the pool.
+        
+        Raises:
+            psycopg2.pool.PoolError: If every connection is checked out
+            psycopg2.OperationalError: If no healthy connection can be made
+        """
         if cls._pool is None:
             cls.initialize_pool()
+        pool = cls._pool
+        
+        # Each stale idle connection is replaced; a fresh one is tried last
+        for _ in range(cls.max_connections() + 1):
+            conn = pool.getconn()
+            if cls._is_healthy(conn):
+                break
+            cls._discard(pool, conn)
+        else:
+            raise psycopg2.OperationalError("No healthy database connection available")
         
-        conn = cls._pool.getconn()
         try:
             yield conn
         finally:
-            cls._pool.putconn(conn)
+            if conn.closed:
+                cls._discard(pool, conn)
+            else:
+                cls._last_used[id(conn)] = time.monotonic()
+                pool.putconn(conn)
     
     @classmethod
     def close_pool(cls):
         """Close all connections in the pool."""
-        if cls._pool is not None:
-            cls._pool.closeall()
-            cls._pool = None
-            logger.info("Database connection pool closed")
+        with cls._init_lock:
+            if cls._pool is not None:
+                cls._pool.closeall()
+                cls._pool = None
+                cls._last_used = {}
+                cls._prepared = {}
+                logger.info("Database connection pool closed")
+
+
+def _format_vector(vector: List[float]) -> str:
+    """Convert a vector to pgvector's text input format."""
+    return '[' + ','.join(str(v) for v in vector) + ']'
+
+
+def _execute_prepared(cur, sql: str, params) -> None:
+    """
+    Execute a %s-style statement as a server-side prepared statement.
+    
+    The statement is PREPAREd once per connection session (named after a
+    hash of its text) and then run with EXECUTE, so Postgres skips parsing
+    and, once it settles on a generic plan, planning. Falls back to a plain
+    execute when Config.DB_PREPARED_STATEMENTS is off (e.g. behind a
+    transaction-pooling proxy).
+    
+    Args:
+        cur: Database cursor
+        sql: Statement with %s placeholders
+        params: Parameter values, in placeholder order
+    """
+    if not Config.DB_PREPARED_STATEMENTS:
+        cur.execute(sql, params)
+        return
+    
+    name = "els_" + hashlib.sha1(sql.encode('utf-8')).hexdigest()[:16]
+    prepared = DatabaseConnection.prepared_names(cur.connection)
+    if name not in prepared:
+        positions = iter(range(1, len(params) + 1))
+        cur.execute(f"PREPARE {name} AS " + re.sub(r'%s', lambda _: f"${next(positions)}", sql))
+        prepared.add(name)
+    
+    placeholders = f" ({', '.join(['%s'] * len(params))})" if params else ""
+    try:
+        cur.execute(f"EXECUTE {name}{placeholders}", params)
+    except psycopg2.errors.InvalidSqlStatementName:
+        # Dropped server-side (e.g. DISCARD ALL); re-prepare next transaction
+        prepared.discard(name)
+        raise
+
+
+# Outcomes reported by change-detecting upserts
+UPSERT_INSERTED = "inserted"
+UPSERT_UPDATED = "updated"
+UPSERT_UNCHANGED = "unchanged"
+
+
+def _content_hash(*values: Any) -> str:
+    """Hash the column values an upsert would write."""
+    return hashlib.sha256(
+        json.dumps(values, default=str, separators=(',', ':')).encode('utf-8')
+    ).hexdigest()
+
+
+def _upsert_if_changed(
+    cur,
+    table: str,
+    key_columns: List[str],
+    key_values: tuple,
+    data_columns: List[str],
+    data_values: tuple
+) -> tuple:
+    """
+    Insert a row, or update it only if its content hash differs.
+    
+    The DO UPDATE is guarded by ``content_hash IS DISTINCT FROM``, so an
+    unchanged row is not rewritten; its id is then read back in the same
+    statement. If another transaction inserted the key concurrently, the
+    statement's snapshot cannot see that row and the id is read back by a
+    second statement.
+    
+    Args:
+        cur: Database cursor
+        table: Target table (must have id and content_hash columns)
+        key_columns: Columns of the table's unique constraint
+        key_values: Values for key_columns
+        data_columns: Non-key columns to write
+        data_values: Values for data_columns
+    
+    Returns:
+        Tuple of (row id, outcome) where outcome is one of UPSERT_INSERTED,
+        UPSERT_UPDATED or UPSERT_UNCHANGED
+    """
+    columns = key_columns + data_columns + ['content_hash']
+    placeholders = ', '.join(['%s'] * len(columns))
+    set_clause = ',\n                '.join(
+        f"{col} = EXCLUDED.{col}" for col in data_columns + ['content_hash']
+    )
+    key_match = ' AND '.join(f"{col} = %s" for col in key_columns)
+    content_hash = _content_hash(*key_values, *data_values)
+    
+    _execute_prepared(cur, f"""
+        WITH upserted AS (
+            INSERT INTO {table} ({', '.join(columns)})
+            VALUES ({placeholders})
+            ON CONFLICT ({', '.join(key_columns)}) DO UPDATE
+            SET {set_clause}
+            WHERE {table}.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+            RETURNING id, (xmax = 0) AS inserted
+        )
+        SELECT id, inserted FROM upserted
+        UNION ALL
+        SELECT id, NULL FROM {table}
+        WHERE {key_match} AND NOT EXISTS (SELECT 1 FROM upserted)
+    """, (*key_values, *data_values, content_hash, *key_values))
+    
+    row = cur.fetchone()
+    if row is None:
+        # Lost a race to first-insert the key: ON CONFLICT waited for the
+        # other transaction to commit and skipped the update, but the
+        # fallback SELECT ran on the snapshot taken before that commit.
+        # A new statement takes a new snapshot (READ COMMITTED).
+        cur.execute(f"SELECT id FROM {table} WHERE {key_match}", key_values)
+        return cur.fetchone()[0], UPSERT_UNCHANGED
+    row_id, inserted = row
+    if inserted is None:
+        return row_id, UPSERT_UNCHANGED
+    return row_id, UPSERT_INSERTED if inserted else UPSERT_UPDATED
 
 
-def persist_standard(standard: NormalizedStandard, document_meta: Dict[str, Any]) -> None:
+class HierarchyResolver:
+    """
+    Per-run cache of document/domain/strand/sub_strand row ids.
+    
+    Each distinct hierarchy row is upserted once and its id memoized, so
+    indicators after the first in a document only write their own row.
+    Ids resolved inside a transaction stay pending until commit() and are
+    discarded by rollback(), so a failed transaction never leaves ids of
+    rolled-back rows in the cache. Descriptions and names of a hierarchy
+    row are taken from the first indicator that references it.
+    """
+    
+    def __init__(self):
+        self._documents: Dict[tuple, int] = {}
+        self._domains: Dict[tuple, int] = {}
+        self._strands: Dict[tuple, int] = {}
+        self._sub_strands: Dict[tuple, int] = {}
+        self._pending: List[tuple] = []
+        self.statements_saved = 0
+        self.changes: Dict[str, int] = {
+            UPSERT_INSERTED: 0, UPSERT_UPDATED: 0, UPSERT_UNCHANGED: 0
+        }
+    
+    def _lookup(self, cache: Dict[tuple, int], key: tuple) -> Optional[int]:
+        row_id = cache.get(key)
+        if row_id is not None:
+            self.statements_saved += 1
+        return row_id
+    
+    def _remember(self, cache: Dict[tuple, int], key: tuple, result: tuple) -> int:
+        row_id, outcome = result
+        cache[key] = row_id
+        self._pending.append((cache, key, outcome))
+        return row_id
+    
+    def savepoint(self) -> int:
+        """Mark the pending ids a later rollback_to() should keep."""
+        return len(self._pending)
+    
+    def rollback_to(self, mark: int) -> None:
+        """Forget ids resolved after savepoint() returned ``mark``."""
+        for cache, key, _ in self._pending[mark:]:
+            cache.pop(key, None)
+        del self._pending[mark:]
+    
+    def commit(self) -> None:
+        """Mark ids resolved since the last commit/rollback as durable."""
+        for _, _, outcome in self._pending:
+            self.changes[outcome] += 1
+        self._pending.clear()
+    
+    def rollback(self) -> None:
+        """Forget ids resolved in a transaction that was rolled back."""
+        for cache, key, _ in self._pending:
+            cache.pop(key, None)
+        self._pending.clear()
+    
+    def document_id(self, cur, standard: NormalizedStandard, document_meta: Dict[str, Any]) -> int:
+        """Resolve (upserting on first use) the documents row id."""
+        key = (standard.country, standard.state, standard.version_year, document_meta['title'])
+        row_id = self._lookup(self._documents, key)
+        if row_id is not None:
+            return row_id
+        
+        # age_band comes from the parsed indicator (standard.age_band),
+        # not document_meta.
+        return self._remember(self._documents, key, _upsert_if_changed(
+            cur, 'documents',
+            ['country', 'state', 'version_year', 'title'], key,
+            ['source_url', 'age_band', 'publishing_agency'],
+            (
+                document_meta.get('source_url'),
+                standard.age_band or "PK",
+                document_meta['publishing_agency']
+            )
+        ))
+    
+    def domain_id(self, cur, document_id: int, domain: HierarchyLevel) -> int:
+        """Resolve (upserting on first use) the domains row id."""
+        key = (document_id, domain.code)
+        row_id = self._lookup(self._domains, key)
+        if row_id is not None:
+            return row_id
+        
+        return self._remember(self._domains, key, _upsert_if_changed(
+            cur, 'domains',
+            ['document_id', 'code'], key,
+            ['name', 'description'], (domain.name, domain.description)
+        ))
+    
+    def strand_id(self, cur, domain_id: int, strand: HierarchyLevel) -> int:
+        """Resolve (upserting on first use) the strands row id."""
+        key = (domain_id, strand.code)
+        row_id = self._lookup(self._strands, key)
+        if row_id is not None:
+            return row_id
+        
+        return self._remember(self._strands, key, _upsert_if_changed(
+            cur, 'strands',
+            ['domain_id', 'code'], key,
+            ['name', 'description'], (strand.name, strand.description)
+        ))
+    
+    def sub_strand_id(self, cur, strand_id: int, sub_strand: HierarchyLevel) -> int:
+        """Resolve (upserting on first use) the sub_strands row id."""
+        key = (strand_id, sub_strand.code)
+        row_id = self._lookup(self._sub_strands, key)
+        if row_id is not None:
+            return row_id
+        
+        return self._remember(self._sub_strands, key, _upsert_if_changed(
+            cur, 'sub_strands',
+            ['strand_id', 'code'], key,
+            ['name', 'description'], (sub_strand.name, sub_strand.description)
+        ))
+
+
+def _write_standard(
+    cur,
+    standard: NormalizedStandard,
+    document_meta: Dict[str, Any],
+    resolver: HierarchyResolver
+) -> str:
+    """Upsert a standard's hierarchy and indicator rows without committing."""
+    document_id = resolver.document_id(cur, standard, document_meta)
+    domain_id = resolver.domain_id(cur, document_id, standard.domain)
+
+    strand_id = None
+    if standard.strand:
+        strand_id = resolver.strand_id(cur, domain_id, standard.strand)
+
+    sub_strand_id = None
+    if standard.sub_strand and strand_id:
+        sub_strand_id = resolver.sub_strand_id(cur, strand_id, standard.sub_strand)
+
+    # Upsert indicator (with title, description, and age_band from parsed data)
+    _, outcome = _upsert_if_changed(
+        cur, 'indicators',
+        ['standard_id'], (standard.standard_id,),
+        [
+            'domain_id', 'strand_id', 'sub_strand_id', 'code', 'title',
+            'description', 'age_band', 'source_page', 'source_text'
+        ],
+        (
+            domain_id,
+            strand_id,
+            sub_strand_id,
+            standard.indicator.code,
+            standard.indicator.name or None,
+            standard.indicator.description,
+            standard.age_band,
+            standard.source_page,
+            standard.source_text
+        )
+    )
+    return outcome
+
+
+def persist_standard(
+    standard: NormalizedStandard,
+    document_meta: Dict[str, Any],
+    resolver: Optional[HierarchyResolver] = None
+) -> str:
     """
     Persist a normalized standard to the database.
 
+    Rows whose content is unchanged are left untouched (see _upsert_if_changed).
+
     Args:
         standard: The normalized standard to persist (includes age_band and
                   hierarchy-level descriptions from the parser)
         document_meta: Document metadata including title, source_url, publishing_agency
+        resolver: Optional HierarchyResolver shared across a run so each
+                  document/domain/strand/sub_strand is upserted only once
+
+    Returns:
+        Outcome for the indicator row: "inserted", "updated" or "unchanged"
     """
+    if resolver is None:
+        resolver = HierarchyResolver()
+    
     with DatabaseConnection.get_connection() as conn:
         with conn.cursor() as cur:
             try:
-                # Insert or get document — age_band comes from the parsed
-                # indicator (standard.age_band), not document_meta.
-                cur.execute("""
-                    INSERT INTO documents (country, state, title, version_year, source_url, age_band, publishing_agency)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (country, state, version_year, title) DO UPDATE
-                    SET source_url = EXCLUDED.source_url,
-                        age_band = EXCLUDED.age_band,
-                        publishing_agency = EXCLUDED.publishing_agency
-                    RETURNING id
-                """, (
-                    standard.country,
-                    standard.state,
-                    document_meta['title'],
-                    standard.version_year,
-                    document_meta.get('source_url'),
-                    standard.age_band or "PK",
-                    document_meta['publishing_agency']
-                ))
-                document_id = cur.fetchone()[0]
-
-                # Insert or get domain (with description)
-                cur.execute("""
-                    INSERT INTO domains (document_id, code, name, description)
-                    VALUES (%s, %s, %s, %s)
-                    ON CONFLICT (document_id, code) DO UPDATE
-                    SET name = EXCLUDED.name,
-                        description = EXCLUDED.description
-                    RETURNING id
-                """, (document_id, standard.domain.code, standard.domain.name, standard.domain.description))
-                domain_id = cur.fetchone()[0]
-
-                # Insert strand if present (with description)
-                strand_id = None
-                if standard.strand:
-                    cur.execute("""
-                        INSERT INTO strands (domain_id, code, name, description)
-                        VALUES (%s, %s, %s, %s)
-                        ON CONFLICT (domain_id, code) DO UPDATE
-                        SET name = EXCLUDED.name,
-                            description = EXCLUDED.description
-                        RETURNING id
-                    """, (domain_id, standard.strand.code, standard.strand.name, standard.strand.description))
-                    strand_id = cur.fetchone()[0]
-
-                # Insert sub_strand if present (with description)
-                sub_strand_id = None
-                if standard.sub_strand and strand_id:
-                    cur.execute("""
-                        INSERT INTO sub_strands (strand_id, code, name, description)
-                        VALUES (%s, %s, %s, %s)
-                        ON CONFLICT (strand_id, code) DO UPDATE
-                        SET name = EXCLUDED.name,
-                            description = EXCLUDED.description
-                        RETURNING id
-                    """, (strand_id, standard.sub_strand.code, standard.sub_strand.name, standard.sub_strand.description))
-                    sub_strand_id = cur.fetchone()[0]
-
-                # Insert indicator (with title, description, and age_band from parsed data)
-                cur.execute("""
-                    INSERT INTO indicators (
-                        standard_id, domain_id, strand_id, sub_strand_id,
-                        code, title, description, age_band, source_page, source_text
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (standard_id) DO UPDATE
-                    SET domain_id = EXCLUDED.domain_id,
-                        strand_id = EXCLUDED.strand_id,
-                        sub_strand_id = EXCLUDED.sub_strand_id,
-                        code = EXCLUDED.code,
-                        title = EXCLUDED.title,
-                        description = EXCLUDED.description,
-                        age_band = EXCLUDED.age_band,
-                        source_page = EXCLUDED.source_page,
-                        source_text = EXCLUDED.source_text
-                """, (
-                    standard.standard_id,
-                    domain_id,
-                    strand_id,
-                    sub_strand_id,
-                    standard.indicator.code,
-                    standard.indicator.name or None,
-                    standard.indicator.description,
-                    standard.age_band,
-                    standard.source_page,
-                    standard.source_text
-                ))
+                outcome = _write_standard(cur, standard, document_meta, resolver)
 
                 conn.commit()
-                logger.info(f"Persisted standard: {standard.standard_id}")
+                resolver.commit()
+                logger.info(f"Persisted standard: {standard.standard_id} ({outcome})")
+                return outcome
 
             except Exception as e:
                 conn.rollback()
+                resolver.rollback()
                 logger.error(f"Error persisting standard {standard.standard_id}: {e}")
                 raise
 
 
+def persist_standards(
+    items: List[tuple],
+    resolver: Optional[HierarchyResolver] = None,
+    isolate_failures: bool = True
+) -> List[tuple]:
+    """
+    Persist many normalized standards in a single transaction.
+
+    One commit covers every standard, so a batch costs one WAL flush instead
+    of one per indicator. With isolate_failures, each standard is written
+    under a savepoint: a failing one is rolled back to it and reported while
+    the rest commit together. Without it the batch is all-or-nothing and the
+    first failure rolls back everything.
+
+    Args:
+        items: (standard, document_meta) pairs, as for persist_standard
+        resolver: Optional HierarchyResolver shared across a run
+        isolate_failures: Isolate failing standards with savepoints
+
+    Returns:
+        One (outcome, error) tuple per item, in order; outcome is "inserted",
+        "updated" or "unchanged" when error is None
+
+    Raises:
+        Exception: The first failure when isolate_failures is False, or any
+                   failure of the transaction itself; nothing is committed
+    """
+    if resolver is None:
+        resolver = HierarchyResolver()
+    results: List[tuple] = []
+
+    with DatabaseConnection.get_connection() as conn:
+        with conn.cursor() as cur:
+            try:
+                for standard, document_meta in items:
+                    if not isolate_failures:
+                        results.append((_write_standard(cur, standard, document_meta, resolver), None))
+                        continue
+
+                    cur.execute("SAVEPOINT persist_standard")
+                    mark = resolver.savepoint()
+                    try:
+                        outcome = _write_standard(cur, standard, document_meta, resolver)
+                        cur.execute("RELEASE SAVEPOINT persist_standard")
+                        results.append((outcome, None))
+                    except Exception as e:
+                        cur.execute("ROLLBACK TO SAVEPOINT persist_standard")
+                        resolver.rollback_to(mark)
+                        logger.error(f"Error persisting standard {standard.standard_id}: {e}")
+                        results.append((None, e))
+
+                conn.commit()
+                resolver.commit()
+                logger.info(
+                    f"Persisted {sum(1 for _, error in results if error is None)}"
+                    f"/{len(items)} standards in one transaction"
+                )
+                return results
+
+            except Exception as e:
+                conn.rollback()
+                resolver.rollback()
+                logger.error(f"Rolled back transaction of {len(items)} standards: {e}")
+                raise
+
+
 def persist_embedding(record: EmbeddingRecord) -> None:
     """
     Persist an embedding record to the database.
@@ -221,9 +627,9 @@ def persist_embedding(record: EmbeddingRecord) -> None:
         with conn.cursor() as cur:
             try:
                 # Convert vector list to PostgreSQL array format
-                vector_str = '[' + ','.join(str(v) for v in record.vector) + ']'
+                vector_str = _format_vector(record.vector)
                 
-                cur.execute("""
+                _execute_prepared(cur, """
                     INSERT INTO embeddings (
                         indicator_id, country, state, vector,
                         embedding_model, embedding_version, input_text, created_at
@@ -263,12 +669,13 @@ def persist_recommendation(rec: Recommendation) -> None:
                     INSERT INTO recommendations (
                         recommendation_id, indicator_id, country, state,
                         audience, activity_description, age_band,
-                        generation_model, created_at
+                        generation_model, content_hash, created_at
                     )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                     ON CONFLICT (recommendation_id) DO UPDATE
                     SET activity_description = EXCLUDED.activity_description,
-                        generation_model = EXCLUDED.generation_model
+                        generation_model = EXCLUDED.generation_model,
+                        content_hash = EXCLUDED.content_hash
                 """, (
                     rec.recommendation_id,
                     rec.indicator_id,
@@ -278,6 +685,7 @@ def persist_recommendation(rec: Recommendation) -> None:
                     rec.activity_description,
                     rec.age_band,
                     rec.generation_model,
+                    rec.content_hash,
                     rec.created_at
                 ))
                 
@@ -290,10 +698,175 @@ def persist_recommendation(rec: Recommendation) -> None:
                 raise
 
 
+def persist_recommendations(
+    recs: List[Recommendation],
+    batch_size: Optional[int] = None
+) -> BulkWriteResult:
+    """
+    Bulk-upsert recommendations, one multi-row INSERT and transaction per batch.
+    
+    Rows are upserted on (indicator_id, audience, generation_model), so
+    regenerating an indicator's activities replaces them in place. If the
+    input repeats a key, the last occurrence wins.
+    
+    Args:
+        recs: The recommendations to persist
+        batch_size: Rows per batch (default: Config.RECOMMENDATION_WRITE_BATCH_SIZE)
+    
+    Returns:
+        BulkWriteResult with rows written, batch count, and throughput
+    
+    Raises:
+        Exception: If a batch fails; earlier batches remain committed
+    """
+    batch_size = max(1, batch_size or Config.RECOMMENDATION_WRITE_BATCH_SIZE)
+    
+    # Collapse duplicate keys so no batch updates the same row twice
+    unique = {
+        (rec.indicator_id, rec.audience.value, rec.generation_model): rec
+        for rec in recs
+    }
+    rows = [
+        (
+            rec.recommendation_id,
+            rec.indicator_id,
+            rec.country,
+            rec.state,
+            rec.audience.value,
+            rec.activity_description,
+            rec.age_band,
+            rec.generation_model,
+            rec.content_hash,
+            rec.created_at
+        )
+        for rec in unique.values()
+    ]
+    
+    if not rows:
+        return BulkWriteResult(rows_written=0, batches=0, duration_ms=0, rows_per_second=0.0)
+    
+    start_time = time.time()
+    batches = 0
+    
+    with DatabaseConnection.get_connection() as conn:
+        with conn.cursor() as cur:
+            for offset in range(0, len(rows), batch_size):
+                batch = rows[offset:offset + batch_size]
+                try:
+                    execute_values(cur, """
+                        INSERT INTO recommendations (
+                            recommendation_id, indicator_id, country, state,
+                            audience, activity_description, age_band,
+                            generation_model, content_hash, created_at
+                        )
+                        VALUES %s
+                        ON CONFLICT (indicator_id, audience, generation_model) DO UPDATE
+                        SET recommendation_id = EXCLUDED.recommendation_id,
+                            activity_description = EXCLUDED.activity_description,
+                            age_band = EXCLUDED.age_band,
+                            content_hash = EXCLUDED.content_hash,
+                            created_at = EXCLUDED.created_at
+                    """, batch, page_size=len(batch))
+                    conn.commit()
+                    batches += 1
+                except Exception as e:
+                    conn.rollback()
+                    logger.error(
+                        f"Error persisting recommendation batch {batches + 1} "
+                        f"({len(batch)} rows): {e}"
+                    )
+                    raise
+    
+    duration = time.time() - start_time
+    result = BulkWriteResult(
+        rows_written=len(rows),
+        batches=batches,
+        duration_ms=int(duration * 1000),
+        rows_per_second=round(len(rows) / duration, 1) if duration > 0 else float(len(rows)),
+    )
+    logger.info(
+        f"Persisted {result.rows_written} recommendations in {result.batches} batch(es): "
+        f"{result.duration_ms}ms, {result.rows_per_second} rows/s"
+    )
+    return result
+
+
+def get_cached_recommendations(
+    content_hashes: List[str],
+    age_band: str,
+    generation_model: str
+) -> Dict[tuple, str]:
+    """
+    Look up previously generated activities by indicator content hash.
+    
+    Args:
+        content_hashes: Content hashes of the indicators to look up
+        age_band: Age band the activities were generated for
+        generation_model: Model that generated the activities
+    
+    Returns:
+        Mapping of (content_hash, audience) to activity_description
+    """
+    if not content_hashes:
+        return {}
+    
+    with DatabaseConnection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT DISTINCT ON (content_hash, audience)
+                    content_hash, audience, activity_description
+                FROM recommendations
+                WHERE content_hash = ANY(%s)
+                  AND age_band = %s
+                  AND generation_model = %s
+                ORDER BY content_hash, audience, created_at DESC
+            """, (list(content_hashes), age_band, generation_model))
+            
+            return {(row[0], row[1]): row[2] for row in cur.fetchall()}
+
+
+def _build_similarity_filters(filters: Dict[str, Any]) -> tuple:
+    """
+    Build the WHERE fragment and parameters for similarity search filters.
+
+    Args:
+        filters: Filters (country, state, age_band, domain, version_year)
+
+    Returns:
+        Tuple of (where clause starting with " AND " or empty string, params list)
+    """
+    where_clauses = []
+    params = []
+
+    if 'country' in filters:
+        where_clauses.append("e.country = %s")
+        params.append(filters['country'])
+
+    if 'state' in filters:
+        where_clauses.append("e.state = %s")
+        params.append(filters['state'])
+
+    if 'age_band' in filters:
+        where_clauses.append("d.age_band = %s")
+        params.append(filters['age_band'])
+
+    if 'domain' in filters:
+        where_clauses.append("dom.code = %s")
+        params.append(filters['domain'])
+
+    if 'version_year' in filters:
+        where_clauses.append("d.version_year = %s")
+        params.append(filters['version_year'])
+
+    where_clause = " AND " + " AND ".join(where_clauses) if where_clauses else ""
+    return where_clause, params
+
+
 def query_similar_indicators(
     vector: List[float],
     top_k: int = 10,
-    filters: Optional[Dict[str, Any]] = None
+    filters: Optional[Dict[str, Any]] = None,
+    quantized: bool = False
 ) -> List[Dict[str, Any]]:
     """
     Query for similar indicators using vector similarity search.
@@ -302,6 +875,10 @@ def query_similar_indicators(
         vector: The query vector
         top_k: Number of results to return
         filters: Optional filters (country, state, age_band, domain, version_year)
+        quantized: Search the half-precision ``vector::halfvec(1536)`` index,
+                   over-fetching QUANTIZED_OVERSAMPLE candidates per result and
+                   rescoring them against the full-precision vector (requires
+                   migration 006; without it, unquantized searches scan exactly)
     
     Returns:
         List of indicator records with similarity scores
@@ -311,33 +888,53 @@ def query_similar_indicators(
     with DatabaseConnection.get_connection() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             # Build the WHERE clause based on filters
-            where_clauses = []
-            params = []
-            
-            if 'country' in filters:
-                where_clauses.append("e.country = %s")
-                params.append(filters['country'])
-            
-            if 'state' in filters:
-                where_clauses.append("e.state = %s")
-                params.append(filters['state'])
-            
-            if 'age_band' in filters:
-                where_clauses.append("d.age_band = %s")
-                params.append(filters['age_band'])
-            
-            if 'domain' in filters:
-                where_clauses.append("dom.code = %s")
-                params.append(filters['domain'])
-            
-            if 'version_year' in filters:
-                where_clauses.append("d.version_year = %s")
-                params.append(filters['version_year'])
-            
-            where_clause = " AND " + " AND ".join(where_clauses) if where_clauses else ""
+            where_clause, params = _build_similarity_filters(filters)
             
             # Convert vector to PostgreSQL array format
-            vector_str = '[' + ','.join(str(v) for v in vector) + ']'
+            vector_str = _format_vector(vector)
+            
+            if quantized:
+                query = f"""
+                    SELECT
+                        c.standard_id,
+                        c.code,
+                        c.description,
+                        c.domain_code,
+                        c.domain_name,
+                        c.country,
+                        c.state,
+                        c.age_band,
+                        c.version_year,
+                        1 - (c.vector <=> %s::vector) as similarity
+                    FROM (
+                        SELECT
+                            i.standard_id,
+                            i.code,
+                            i.description,
+                            dom.code as domain_code,
+                            dom.name as domain_name,
+                            d.country,
+                            d.state,
+                            d.age_band,
+                            d.version_year,
+                            e.vector
+                        FROM embeddings e
+                        JOIN indicators i ON e.indicator_id = i.standard_id
+                        JOIN domains dom ON i.domain_id = dom.id
+                        JOIN documents d ON dom.document_id = d.id
+                        WHERE TRUE{where_clause}
+                        ORDER BY e.vector::halfvec(1536) <=> %s::halfvec(1536)
+                        LIMIT %s
+                    ) c
+                    ORDER BY c.vector <=> %s::vector
+                    LIMIT %s
+                """
+                params = (
+                    [vector_str] + params
+                    + [vector_str, top_k * QUANTIZED_OVERSAMPLE, vector_str, top_k]
+                )
+                _execute_prepared(cur, query, params)
+                return [dict(row) for row in cur.fetchall()]
             
             query = f"""
                 SELECT 
@@ -360,76 +957,631 @@ def query_similar_indicators(
                 LIMIT %s
             """
             
-            params = [vector_str, vector_str] + params + [top_k]
-            cur.execute(query, params)
+            params = [vector_str] + params + [vector_str, top_k]
+            _execute_prepared(cur, query, params)
             
             results = cur.fetchall()
             return [dict(row) for row in results]
 
 
+def query_similar_indicators_batch(
+    vectors: List[List[float]],
+    top_k: int = 10,
+    filters: Optional[Dict[str, Any]] = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    Run many vector similarity searches in a single round trip.
+
+    The query vectors are sent as one array and unnested server-side; each
+    one drives a LATERAL k-NN subquery, so aligning a whole state against
+    another costs one statement instead of one per indicator.
+
+    Args:
+        vectors: The query vectors
+        top_k: Number of results to return per query vector
+        filters: Optional filters applied to every query
+                 (country, state, age_band, domain, version_year)
+
+    Returns:
+        One list of indicator records (with similarity scores, ordered by
+        decreasing similarity) per input vector, in input order
+    """
+    if not vectors:
+        return []
+
+    filters = filters or {}
+    grouped: List[List[Dict[str, Any]]] = [[] for _ in vectors]
+
+    with DatabaseConnection.get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            where_clause, filter_params = _build_similarity_filters(filters)
+
+            query = f"""
+                WITH q AS (
+                    SELECT (t.ord - 1)::int AS query_index, t.v::vector AS qvec
+                    FROM unnest(%s::text[]) WITH ORDINALITY AS t(v, ord)
+                )
+                SELECT
+                    q.query_index,
+                    r.*
+                FROM q
+                CROSS JOIN LATERAL (
+                    SELECT
+                        i.standard_id,
+                        i.code,
+                        i.description,
+                        dom.code as domain_code,
+                        dom.name as domain_name,
+                        d.country,
+                        d.state,
+                        d.age_band,
+                        d.version_year,
+                        1 - (e.vector <=> q.qvec) as similarity
+                    FROM embeddings e
+                    JOIN indicators i ON e.indicator_id = i.standard_id
+                    JOIN domains dom ON i.domain_id = dom.id
+                    JOIN documents d ON dom.document_id = d.id
+                    WHERE TRUE{where_clause}
+                    ORDER BY e.vector <=> q.qvec
+                    LIMIT %s
+                ) r
+                ORDER BY q.query_index, r.similarity DESC
+            """
+
+            params = [[_format_vector(v) for v in vectors]] + filter_params + [top_k]
+            cur.execute(query, params)
+
+            for row in cur.fetchall():
+                record = dict(row)
+                query_index = record.pop('query_index')
+                grouped[query_index].append(record)
+
+    return grouped
+
+
+# Columns returned by the indicator listing queries, in SELECT order,
+# mapped to their expression over the joined base tables
+_INDICATOR_COLUMN_SQL = {
+    'standard_id': 'i.standard_id',
+    'indicator_code': 'i.code',
+    'indicator_title': 'i.title',
+    'description': 'i.description',
+    'domain_code': 'dom.code',
+    'domain_name': 'dom.name',
+    'domain_description': 'dom.description',
+    'strand_code': 'str.code',
+    'strand_name': 'str.name',
+    'strand_description': 'str.description',
+    'sub_strand_code': 'substr.code',
+    'sub_strand_name': 'substr.name',
+    'sub_strand_description': 'substr.description',
+    'indicator_age_band': 'i.age_band',
+    'country': 'd.country',
+    'state': 'd.state',
+    'age_band': 'd.age_band',
+    'version_year': 'd.version_year',
+    'source_page': 'i.source_page',
+}
+INDICATOR_COLUMNS = tuple(_INDICATOR_COLUMN_SQL)
+
+# Materialized, flattened hierarchy (migration 010)
+INDICATOR_HIERARCHY_VIEW = 'indicator_hierarchy'
+
+
+def _indicators_query(
+    country: str,
+    state: str,
+    domain_code: Optional[str],
+    strand_code: Optional[str],
+    from_view: bool = False,
+    columns: tuple = INDICATOR_COLUMNS,
+    after: Optional[str] = None,
+    limit: Optional[int] = None
+) -> tuple:
+    """
+    Build the indicator listing query; returns (sql, params).
+    
+    Rows are ordered by standard_id. ``after`` seeks past a standard_id
+    (keyset pagination) and ``limit`` caps the page size.
+    """
+    if from_view:
+        column = {name: name for name in INDICATOR_COLUMNS}
+        source = INDICATOR_HIERARCHY_VIEW
+        select = ', '.join(columns)
+    else:
+        column = _INDICATOR_COLUMN_SQL
+        source = """indicators i
+            JOIN domains dom ON i.domain_id = dom.id
+            JOIN documents d ON dom.document_id = d.id
+            LEFT JOIN strands str ON i.strand_id = str.id
+            LEFT JOIN sub_strands substr ON i.sub_strand_id = substr.id"""
+        select = ',\n                '.join(f"{column[name]} AS {name}" for name in columns)
+    
+    where_clauses = [f"{column['country']} = %s", f"{column['state']} = %s"]
+    params: List[Any] = [country, state]
+    
+    if domain_code:
+        where_clauses.append(f"{column['domain_code']} = %s")
+        params.append(domain_code)
+    
+    if strand_code:
+        where_clauses.append(f"{column['strand_code']} = %s")
+        params.append(strand_code)
+    
+    if after is not None:
+        where_clauses.append(f"{column['standard_id']} > %s")
+        params.append(after)
+    
+    where_clause = " AND ".join(where_clauses)
+    
+    query = f"""
+        SELECT
+                {select}
+        FROM {source}
+        WHERE {where_clause}
+        ORDER BY {column['standard_id']}
+    """
+    if limit is not None:
+        query += "LIMIT %s"
+        params.append(limit)
+    return query, params
+
+
 def get_indicators_by_country_state(
     country: str,
     state: str,
     domain_code: Optional[str] = None,
-    strand_code: Optional[str] = None
+    strand_code: Optional[str] = None,
+    from_view: bool = False
 ) -> List[Dict[str, Any]]:
     """
     Get all indicators for a specific country and state, optionally filtered by domain/strand.
     
+    Loads the full result into memory; use iter_indicators_by_country_state
+    for large result sets.
+    
     Args:
         country: Two-letter country code
         state: State code
         domain_code: Optional domain code filter
         strand_code: Optional strand code filter
+        from_view: Read the indicator_hierarchy materialized view (an index
+                   range scan, as fresh as the last persistence run)
+                   instead of joining the base tables
     
     Returns:
         List of indicator records
     """
     with DatabaseConnection.get_connection() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            where_clauses = ["d.country = %s", "d.state = %s"]
-            params = [country, state]
-            
-            if domain_code:
-                where_clauses.append("dom.code = %s")
-                params.append(domain_code)
-            
-            if strand_code:
-                where_clauses.append("str.code = %s")
-                params.append(strand_code)
-            
-            where_clause = " AND ".join(where_clauses)
-            
-            query = f"""
-                SELECT 
-                    i.standard_id,
-                    i.code as indicator_code,
-                    i.title as indicator_title,
-                    i.description,
-                    dom.code as domain_code,
-                    dom.name as domain_name,
-                    dom.description as domain_description,
-                    str.code as strand_code,
-                    str.name as strand_name,
-                    str.description as strand_description,
-                    substr.code as sub_strand_code,
-                    substr.name as sub_strand_name,
-                    substr.description as sub_strand_description,
-                    i.age_band as indicator_age_band,
-                    d.country,
-                    d.state,
-                    d.age_band,
-                    d.version_year,
-                    i.source_page
-                FROM indicators i
-                JOIN domains dom ON i.domain_id = dom.id
-                JOIN documents d ON dom.document_id = d.id
-                LEFT JOIN strands str ON i.strand_id = str.id
-                LEFT JOIN sub_strands substr ON i.sub_strand_id = substr.id
-                WHERE {where_clause}
-                ORDER BY i.standard_id
-            """
-            
+            query, params = _indicators_query(
+                country, state, domain_code, strand_code, from_view
+            )
             cur.execute(query, params)
             results = cur.fetchall()
             return [dict(row) for row in results]
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_page_cursor(standard_id: str) -> str:
+    """Encode the last standard_id of a page as an opaque cursor token."""
+    payload = json.dumps({'after': standard_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_page_cursor(cursor: str) -> str:
+    """
+    Decode a cursor token produced by encode_page_cursor.
+    
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        after = payload['after']
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from e
+    if not isinstance(after, str):
+        raise ValueError(f"Invalid page cursor: {cursor!r}")
+    return after
+
+
+def get_indicators_page(
+    country: str,
+    state: str,
+    domain_code: Optional[str] = None,
+    strand_code: Optional[str] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    from_view: bool = False
+) -> IndicatorPage:
+    """
+    Get one page of indicators using keyset pagination on standard_id.
+    
+    Each page seeks past the previous page's last standard_id instead of
+    using OFFSET, so every page costs the same regardless of depth.
+    
+    Args:
+        country: Two-letter country code
+        state: State code
+        domain_code: Optional domain code filter
+        strand_code: Optional strand code filter
+        page_size: Rows per page (1 to MAX_PAGE_SIZE)
+        cursor: next_cursor from the previous page, or None for the first page
+        columns: Subset of INDICATOR_COLUMNS to return (standard_id is always
+                 included); defaults to all columns
+        from_view: Read the indicator_hierarchy materialized view
+    
+    Returns:
+        IndicatorPage with the rows and the cursor for the next page
+    
+    Raises:
+        ValueError: If page_size, cursor or columns are invalid
+    """
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+    
+    if columns is None:
+        projection = INDICATOR_COLUMNS
+    else:
+        unknown = set(columns) - set(INDICATOR_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown indicator columns: {sorted(unknown)}")
+        projection = ('standard_id',) + tuple(
+            c for c in INDICATOR_COLUMNS if c in columns and c != 'standard_id'
+        )
+    
+    after = decode_page_cursor(cursor) if cursor else None
+    # One extra row tells us whether another page follows
+    query, params = _indicators_query(
+        country, state, domain_code, strand_code, from_view,
+        columns=projection, after=after, limit=page_size + 1
+    )
+    
+    with DatabaseConnection.get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(query, params)
+            rows = [dict(row) for row in cur.fetchall()]
+    
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_page_cursor(rows[-1]['standard_id'])
+    return IndicatorPage(items=rows, next_cursor=next_cursor)
+
+
+def iter_indicators_by_country_state(
+    country: str,
+    state: str,
+    domain_code: Optional[str] = None,
+    strand_code: Optional[str] = None,
+    itersize: Optional[int] = None,
+    as_tuples: bool = False,
+    from_view: bool = False
+) -> Iterator[Any]:
+    """
+    Stream indicators for a country and state through a server-side cursor.
+    
+    Rows are fetched from a named cursor ``itersize`` at a time, so memory
+    stays flat regardless of result size. The pooled connection is held
+    until the generator is exhausted or closed.
+    
+    Args:
+        country: Two-letter country code
+        state: State code
+        domain_code: Optional domain code filter
+        strand_code: Optional strand code filter
+        itersize: Rows per network round trip (default Config.DB_STREAM_ITERSIZE)
+        as_tuples: Yield raw tuples in INDICATOR_COLUMNS order instead of dicts
+        from_view: Read the indicator_hierarchy materialized view
+    
+    Yields:
+        Indicator records, as dicts keyed by INDICATOR_COLUMNS or as tuples
+    """
+    query, params = _indicators_query(
+        country, state, domain_code, strand_code, from_view
+    )
+    
+    with DatabaseConnection.get_connection() as conn:
+        try:
+            with conn.cursor(name=f"indicators_{uuid.uuid4().hex}") as cur:
+                cur.itersize = itersize or Config.DB_STREAM_ITERSIZE
+                cur.execute(query, params)
+                for row in cur:
+                    yield row if as_tuples else dict(zip(INDICATOR_COLUMNS, row))
+        finally:
+            # Ends the read transaction the named cursor ran in
+            conn.rollback()
+
+
+def load_existing_standard_keys(
+    country: str,
+    state: str,
+    version_year: int,
+    bloom_threshold: Optional[int] = None,
+    error_rate: Optional[float] = None
+) -> Union[Set[tuple], BloomFilter]:
+    """
+    Load the standard keys already stored for a document in one query.
+    
+    Keys are (country, state, version_year, standard_id) tuples, streamed
+    through a server-side cursor. When more than ``bloom_threshold`` keys
+    exist they go into a BloomFilter instead of a set, so memory stays
+    bounded; its rare false positives should be confirmed with
+    filter_existing_standard_keys.
+    
+    Args:
+        country: Two-letter country code
+        state: State code
+        version_year: Document version year
+        bloom_threshold: Key count above which a BloomFilter is used
+            (default Config.VALIDATION_BLOOM_THRESHOLD)
+        error_rate: BloomFilter false-positive rate
+            (default Config.VALIDATION_BLOOM_ERROR_RATE)
+    
+    Returns:
+        Set of key tuples, or a BloomFilter over them
+    """
+    if bloom_threshold is None:
+        bloom_threshold = Config.VALIDATION_BLOOM_THRESHOLD
+    if error_rate is None:
+        error_rate = Config.VALIDATION_BLOOM_ERROR_RATE
+    
+    # The window count sizes the filter from the first row
+    query = """
+        SELECT i.standard_id, count(*) OVER ()
+        FROM indicators i
+        JOIN domains dom ON i.domain_id = dom.id
+        JOIN documents d ON dom.document_id = d.id
+        WHERE d.country = %s AND d.state = %s AND d.version_year = %s
+    """
+    
+    keys: Union[Set[tuple], BloomFilter, None] = None
+    with DatabaseConnection.get_connection() as conn:
+        try:
+            with conn.cursor(name=f"standard_keys_{uuid.uuid4().hex}") as cur:
+                cur.itersize = Config.DB_STREAM_ITERSIZE
+                cur.execute(query, (country, state, version_year))
+                for standard_id, total in cur:
+                    if keys is None:
+                        keys = BloomFilter(total, error_rate) if total > bloom_threshold else set()
+                    keys.add((country, state, version_year, standard_id))
+        finally:
+            # Ends the read transaction the named cursor ran in
+            conn.rollback()
+    
+    return keys if keys is not None else set()
+
+
+def filter_existing_standard_keys(keys: List[tuple]) -> Set[tuple]:
+    """
+    Return the subset of standard keys that exist in the database.
+    
+    Args:
+        keys: (country, state, version_year, standard_id) tuples to check
+    
+    Returns:
+        The keys that are stored
+    """
+    if not keys:
+        return set()
+    
+    query = """
+        SELECT d.country, d.state, d.version_year, i.standard_id
+        FROM indicators i
+        JOIN domains dom ON i.domain_id = dom.id
+        JOIN documents d ON dom.document_id = d.id
+        WHERE i.standard_id = ANY(%s)
+    """
+    
+    with DatabaseConnection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, (list({key[3] for key in keys}),))
+            stored = {tuple(row) for row in cur.fetchall()}
+    
+    return stored.intersection(keys)
+
+
+def get_pipeline_run(run_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Fetch the pipeline_runs row of a run.
+    
+    Args:
+        run_id: Pipeline run ID
+    
+    Returns:
+        The row as a dict (status, totals, started_at, completed_at, ...),
+        or None if the run has no row yet
+    """
+    query = """
+        SELECT run_id, document_s3_key, country, state, version_year, status,
+               total_indicators, total_validated, total_embedded,
+               total_recommendations, started_at, completed_at,
+               llm_calls, llm_input_tokens, llm_output_tokens, llm_latency_ms,
+               llm_retries
+        FROM pipeline_runs
+        WHERE run_id = %s
+    """
+    
+    with DatabaseConnection.get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(query, (run_id,))
+            row = cur.fetchone()
+    
+    return dict(row) if row else None
+
+
+def persist_pipeline_stages(run_id: str, stages: List[PipelineStageResult]) -> int:
+    """
+    Write the pipeline_stages rows of a run in one statement.
+    
+    Rows are keyed by (run_id, stage_name), so a retried write replaces a
+    stage's row instead of adding another. The LLM usage of the stages is
+    summed onto the run's pipeline_runs row in the same transaction, so
+    that row must already exist.
+    
+    Args:
+        run_id: Pipeline run ID
+        stages: Stage results, with their metrics where measured
+    
+    Returns:
+        Number of rows written
+    
+    Raises:
+        Exception: If the write fails; no row is written
+    """
+    rows = []
+    for stage in stages:
+        metrics = stage.metrics
+        if metrics:
+            started_at = datetime.fromisoformat(metrics.started_at)
+            completed_at = started_at + timedelta(milliseconds=metrics.wall_ms)
+        else:
+            started_at, completed_at = None, datetime.now(timezone.utc)
+        rows.append((
+            run_id,
+            stage.stage_name,
+            stage.status,
+            stage.duration_ms,
+            stage.output_artifact,
+            stage.error,
+            started_at,
+            completed_at,
+            metrics.cpu_ms if metrics else None,
+            metrics.peak_rss_bytes if metrics else None,
+            metrics.input_bytes if metrics else None,
+            metrics.output_bytes if metrics else None,
+            metrics.records_in if metrics else None,
+            metrics.records_out if metrics else None,
+            metrics.invocations if metrics else None,
+            metrics.llm.calls if metrics else None,
+            metrics.llm.input_tokens if metrics else None,
+            metrics.llm.output_tokens if metrics else None,
+            metrics.llm.latency_ms if metrics else None,
+            metrics.llm.retries if metrics else None,
+            metrics.llm.model_ids if metrics else None,
+        ))
+    
+    if not rows:
+        return 0
+    
+    run_llm = combine_llm_usage([stage.metrics.llm for stage in stages if stage.metrics])
+    
+    with DatabaseConnection.get_connection() as conn:
+        with conn.cursor() as cur:
+            try:
+                execute_values(cur, """
+                    INSERT INTO pipeline_stages (
+                        run_id, stage_name, status, duration_ms, output_artifact, error,
+                        started_at, completed_at, cpu_ms, peak_rss_bytes, input_bytes,
+                        output_bytes, records_in, records_out, invocations, llm_calls,
+                        llm_input_tokens, llm_output_tokens, llm_latency_ms, llm_retries,
+                        llm_model_ids
+                    )
+                    VALUES %s
+                    ON CONFLICT (run_id, stage_name) DO UPDATE
+                    SET status = EXCLUDED.status,
+                        duration_ms = EXCLUDED.duration_ms,
+                        output_artifact = EXCLUDED.output_artifact,
+                        error = EXCLUDED.error,
+                        started_at = EXCLUDED.started_at,
+                        completed_at = EXCLUDED.completed_at,
+                        cpu_ms = EXCLUDED.cpu_ms,
+                        peak_rss_bytes = EXCLUDED.peak_rss_bytes,
+                        input_bytes = EXCLUDED.input_bytes,
+                        output_bytes = EXCLUDED.output_bytes,
+                        records_in = EXCLUDED.records_in,
+                        records_out = EXCLUDED.records_out,
+                        invocations = EXCLUDED.invocations,
+                        llm_calls = EXCLUDED.llm_calls,
+                        llm_input_tokens = EXCLUDED.llm_input_tokens,
+                        llm_output_tokens = EXCLUDED.llm_output_tokens,
+                        llm_latency_ms = EXCLUDED.llm_latency_ms,
+                        llm_retries = EXCLUDED.llm_retries,
+                        llm_model_ids = EXCLUDED.llm_model_ids
+                """, rows, page_size=len(rows))
+                cur.execute("""
+                    UPDATE pipeline_runs
+                    SET llm_calls = %s, llm_input_tokens = %s, llm_output_tokens = %s,
+                        llm_latency_ms = %s, llm_retries = %s
+                    WHERE run_id = %s
+                """, (run_llm.calls, run_llm.input_tokens, run_llm.output_tokens,
+                      run_llm.latency_ms, run_llm.retries, run_id))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    
+    return len(rows)
+
+
+def record_failed_pipeline_run(
+    run_id: str,
+    document_s3_key: str,
+    country: str,
+    state: str,
+    version_year: int,
+) -> None:
+    """
+    Mark a run as failed, creating its pipeline_runs row if it has none.
+
+    Only the persistence stage writes a run's row, so a run that fails
+    earlier has none yet; its pipeline_stages rows need one to reference.
+
+    Args:
+        run_id: Pipeline run ID
+        document_s3_key: S3 key of the run's source document
+        country: Two-letter country code
+        state: State code
+        version_year: Version year of the document
+
+    Raises:
+        Exception: If the write fails
+    """
+    with DatabaseConnection.get_connection() as conn:
+        with conn.cursor() as cur:
+            try:
+                cur.execute("""
+                    INSERT INTO pipeline_runs (
+                        run_id, document_s3_key, country, state, version_year,
+                        status, completed_at
+                    ) VALUES (%s, %s, %s, %s, %s, 'failed', NOW())
+                    ON CONFLICT (run_id) DO UPDATE
+                    SET status = 'failed',
+                        completed_at = NOW()
+                """, (run_id, document_s3_key, country, state, version_year))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+
+def refresh_indicator_hierarchy() -> None:
+    """
+    Refresh the indicator_hierarchy materialized view.
+    
+    Uses REFRESH ... CONCURRENTLY so readers of the view are not blocked
+    while it is rebuilt.
+    """
+    with DatabaseConnection.get_connection() as conn:
+        with conn.cursor() as cur:
+            try:
+                start = time.time()
+                # A full rebuild can outlast the pool's 30s statement timeout
+                cur.execute("SET LOCAL statement_timeout = '5min'")
+                cur.execute(
+                    f"REFRESH MATERIALIZED VIEW CONCURRENTLY {INDICATOR_HIERARCHY_VIEW}"
+                )
+                conn.commit()
+                logger.info(
+                    f"Refreshed {INDICATOR_HIERARCHY_VIEW} in "
+                    f"{(time.time() - start) * 1000:.0f} ms"
+                )
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error refreshing {INDICATOR_HIERARCHY_VIEW}: {e}")
+                raise
@@ -1,12 +1,16 @@
 """Structure detection module for ELS pipeline."""
 
+import hashlib
 import json
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, Set
 import boto3
 from botocore.config import Config as BotocoreConfig
 from botocore.exceptions import ClientError
 
+from . import stage_metrics
+from .s3_helpers import is_missing_object_error
 from .models import TextBlock, DetectedElement, DetectionResult, HierarchyLevelEnum
 from .config import Config
 
@@ -460,6 +464,7 @@ def call_bedrock_llm(prompt: str, max_retries: int = MAX_BEDROCK_RETRIES) -> str
     logger.info(f"Calling Bedrock with model: {Config.BEDROCK_DETECTOR_LLM_MODEL_ID}")
     logger.debug(f"Prompt length: {len(prompt)} characters, ~{estimate_tokens(prompt)} tokens")
     
+    start = time.perf_counter()
     for attempt in range(max_retries + 1):
         try:
             response = bedrock.invoke_model(
@@ -468,9 +473,18 @@ def call_bedrock_llm(prompt: str, max_retries: int = MAX_BEDROCK_RETRIES) -> str
             )
             
             response_body = json.loads(response['body'].read())
+            input_tokens, output_tokens = stage_metrics.bedrock_token_counts(response, response_body)
+            latency_ms = int((time.perf_counter() - start) * 1000)
+            stage_metrics.record_llm_call(
+                Config.BEDROCK_DETECTOR_LLM_MODEL_ID, input_tokens, output_tokens, latency_ms, attempt
+            )
             response_text = _extract_text_from_bedrock_response(response_body)
             
-            logger.info(f"Bedrock response received: {len(response_text)} characters")
+            logger.info(
+                f"Bedrock response received: {len(response_text)} characters, "
+                f"{input_tokens} input / {output_tokens} output tokens, "
+                f"{latency_ms} ms, {attempt} retries"
+            )
             logger.debug(f"Response preview: {response_text[:500]}...")
             
             return response_text
@@ -485,6 +499,10 @@ def call_bedrock_llm(prompt: str, max_retries: int = MAX_BEDROCK_RETRIES) -> str
                 logger.error(
                     f"Bedrock API call failed after {max_retries + 1} attempts: {e}"
                 )
+                stage_metrics.record_llm_call(
+                    Config.BEDROCK_DETECTOR_LLM_MODEL_ID, 0, 0,
+                    int((time.perf_counter() - start) * 1000), attempt
+                )
                 raise
         except ValueError as e:
             logger.error(f"Invalid Bedrock response format: {e}")
@@ -497,7 +515,7 @@ def _process_chunk(
     chunk: List[TextBlock], 
     chunk_idx: int, 
     total_chunks: int
-) -> List[DetectedElement]:
+) -> Optional[List[DetectedElement]]:
     """
     Process a single chunk of text blocks through the LLM.
     
@@ -509,7 +527,8 @@ def _process_chunk(
         total_chunks: Total number of chunks (for logging)
         
     Returns:
-        List of detected elements from this chunk
+        List of detected elements from this chunk, or None if the LLM
+        response could not be parsed after all retries
     """
     logger.info(
         f"Processing chunk {chunk_idx + 1}/{total_chunks} "
@@ -519,42 +538,258 @@ def _process_chunk(
     # Build prompt for this chunk
     prompt = build_detection_prompt(chunk)
     
-    # Try to parse LLM response with retries
-    for parse_attempt in range(MAX_PARSE_RETRIES + 1):
-        try:
-            # Call Bedrock
-            response_text = call_bedrock_llm(prompt)
+    with stage_metrics.track_llm_usage() as llm_usage:
+        # Try to parse LLM response with retries
+        for parse_attempt in range(MAX_PARSE_RETRIES + 1):
+            try:
+                # Call Bedrock
+                response_text = call_bedrock_llm(prompt)
             
-            # Parse response
-            elements = parse_llm_response(response_text, chunk)
+                # Parse response
+                elements = parse_llm_response(response_text, chunk)
             
-            logger.info(
-                f"Chunk {chunk_idx + 1}/{total_chunks}: Successfully detected "
-                f"{len(elements)} elements"
-            )
+                logger.info(
+                    f"Chunk {chunk_idx + 1}/{total_chunks}: Successfully detected "
+                    f"{len(elements)} elements "
+                    f"({llm_usage.input_tokens} input / {llm_usage.output_tokens} output tokens "
+                    f"over {llm_usage.calls} LLM calls)"
+                )
             
-            return elements
+                return elements
             
-        except (json.JSONDecodeError, ValueError) as e:
-            if parse_attempt < MAX_PARSE_RETRIES:
-                logger.warning(
-                    f"Chunk {chunk_idx + 1}/{total_chunks}: Failed to parse LLM response "
-                    f"(attempt {parse_attempt + 1}/{MAX_PARSE_RETRIES + 1}): {e}"
-                )
-                # Retry with the same prompt
-                continue
-            else:
-                logger.error(
-                    f"Chunk {chunk_idx + 1}/{total_chunks}: Failed to parse LLM response "
-                    f"after {MAX_PARSE_RETRIES + 1} attempts: {e}"
-                )
-                # Return empty list rather than failing entire detection
-                return []
-    
-    return []
+            except (json.JSONDecodeError, ValueError) as e:
+                if parse_attempt < MAX_PARSE_RETRIES:
+                    logger.warning(
+                        f"Chunk {chunk_idx + 1}/{total_chunks}: Failed to parse LLM response "
+                        f"(attempt {parse_attempt + 1}/{MAX_PARSE_RETRIES + 1}): {e}"
+                    )
+                    # Retry with the same prompt
+                    continue
+                else:
+                    logger.error(
+                        f"Chunk {chunk_idx + 1}/{total_chunks}: Failed to parse LLM response "
+                        f"after {MAX_PARSE_RETRIES + 1} attempts: {e}"
+                    )
+                    # Return None rather than failing entire detection
+                    return None
+
+    return None
+
+
+def chunk_checkpoint_hash(chunk: List[TextBlock]) -> str:
+    """
+    Hash the content of a chunk for use as its checkpoint name.
+
+    The hash covers the detector model ID and the full prompt (text and page
+    markers), so a checkpoint is only reused for the same model seeing the
+    same input; a changed prompt template or model invalidates it.
+
+    Args:
+        chunk: Text blocks of the chunk
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256(Config.BEDROCK_DETECTOR_LLM_MODEL_ID.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(build_detection_prompt(chunk).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _list_chunk_checkpoints(s3_client: Any, bucket: str, prefix: str) -> Set[str]:
+    """
+    List the chunk hashes that already have a checkpoint under a prefix.
+
+    Args:
+        s3_client: S3 client
+        bucket: Checkpoint bucket
+        prefix: Checkpoint prefix for the run
+
+    Returns:
+        Set of chunk hashes (empty if the listing fails)
+    """
+    hashes = set()
+    try:
+        paginator = s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                name = obj["Key"][len(prefix):]
+                if name.endswith(".json"):
+                    hashes.add(name[:-len(".json")])
+    except ClientError as e:
+        logger.warning(f"Could not list detection checkpoints under s3://{bucket}/{prefix}: {e}")
+    return hashes
+
+
+def _load_chunk_checkpoint(s3_client: Any, bucket: str, key: str) -> Optional[List[DetectedElement]]:
+    """
+    Load a chunk's detected elements from its checkpoint.
+
+    Args:
+        s3_client: S3 client
+        bucket: Checkpoint bucket
+        key: Checkpoint key
+
+    Returns:
+        Detected elements, or None if the checkpoint is missing or unreadable
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+        data = json.loads(response["Body"].read())
+        return [DetectedElement(**elem) for elem in data["elements"]]
+    except ClientError as e:
+        if not is_missing_object_error(e):
+            logger.warning(f"Ignoring unreadable detection checkpoint s3://{bucket}/{key}: {e}")
+        return None
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable detection checkpoint s3://{bucket}/{key}: {e}")
+        return None
+
+
+def _save_chunk_checkpoint(
+    s3_client: Any,
+    bucket: str,
+    key: str,
+    chunk_idx: int,
+    elements: List[DetectedElement]
+) -> None:
+    """
+    Save a chunk's detected elements as a checkpoint.
+
+    Args:
+        s3_client: S3 client
+        bucket: Checkpoint bucket
+        key: Checkpoint key
+        chunk_idx: Index of the chunk in this run (informational)
+        elements: Elements detected in the chunk
+
+    Raises:
+        ClientError: If the write fails
+    """
+    body = json.dumps({
+        "chunk_index": chunk_idx,
+        "model_id": Config.BEDROCK_DETECTOR_LLM_MODEL_ID,
+        "elements": [elem.model_dump(mode="json") for elem in elements],
+    })
+    s3_client.put_object(Bucket=bucket, Key=key, Body=body, ContentType="application/json")
+
+
+def detect_chunk(
+    chunk: List[TextBlock],
+    chunk_idx: int,
+    total_chunks: int,
+    checkpoint_key: str
+) -> tuple[Optional[List[DetectedElement]], bool]:
+    """
+    Detect the elements of one chunk and store them at its checkpoint key.
+
+    The per-chunk unit of work behind the detection Map state. If the chunk
+    already has a checkpoint (a retried or redriven item) it is returned
+    without calling Bedrock.
+
+    Args:
+        chunk: Text blocks of the chunk
+        chunk_idx: Index of the chunk in the document
+        total_chunks: Number of chunks in the document (for logging)
+        checkpoint_key: Key in Config.S3_PROCESSED_BUCKET for the chunk's
+            elements, normally {checkpoint_prefix}{chunk_checkpoint_hash(chunk)}.json
+
+    Returns:
+        Tuple of (elements, restored). elements is None if the LLM response
+        could not be parsed; nothing is stored in that case.
+
+    Raises:
+        ClientError: If Bedrock fails after retries or the result cannot be stored
+    """
+    s3_client = boto3.client('s3', region_name=Config.AWS_REGION)
+    elements = _load_chunk_checkpoint(s3_client, Config.S3_PROCESSED_BUCKET, checkpoint_key)
+    if elements is not None:
+        logger.info(
+            f"Chunk {chunk_idx + 1}/{total_chunks}: restored {len(elements)} elements "
+            f"from checkpoint"
+        )
+        return elements, True
+
+    elements = _process_chunk(chunk, chunk_idx, total_chunks)
+    if elements is not None:
+        _save_chunk_checkpoint(
+            s3_client, Config.S3_PROCESSED_BUCKET, checkpoint_key, chunk_idx, elements
+        )
+    return elements, False
+
+
+def _element_key(element: DetectedElement) -> tuple:
+    """Identity of an element for de-duplicating chunk overlaps."""
+    return (
+        element.level,
+        element.code.strip().lower(),
+        " ".join(element.title.split()).lower(),
+        element.source_page,
+    )
 
 
-def detect_structure(blocks: List[TextBlock], document_s3_key: str = "") -> DetectionResult:
+def merge_detection_results(
+    chunk_results: List[List[DetectedElement]],
+    document_s3_key: str = ""
+) -> DetectionResult:
+    """
+    Merge per-chunk elements into one DetectionResult.
+
+    Chunks overlap by DEFAULT_OVERLAP_TOKENS, so an element near a chunk
+    boundary is usually detected twice. Elements with the same level, code,
+    title and source page are collapsed into one, kept at the position of
+    the first occurrence with the highest confidence seen.
+
+    Args:
+        chunk_results: Detected elements of each chunk, in document order
+        document_s3_key: S3 key of the source document (for tracking)
+
+    Returns:
+        DetectionResult with status "success"
+    """
+    merged: Dict[tuple, DetectedElement] = {}
+    total = 0
+    for elements in chunk_results:
+        for element in elements:
+            total += 1
+            key = _element_key(element)
+            kept = merged.get(key)
+            if kept is None:
+                merged[key] = element
+            elif element.confidence > kept.confidence:
+                merged[key] = element
+
+    all_elements = list(merged.values())
+    review_count = sum(1 for elem in all_elements if elem.needs_review)
+
+    level_counts = {}
+    for elem in all_elements:
+        level_counts[elem.level.value] = level_counts.get(elem.level.value, 0) + 1
+
+    logger.info(
+        f"Detection complete: {len(all_elements)} total elements detected "
+        f"({total - len(all_elements)} chunk-overlap duplicates dropped)"
+    )
+    logger.info(f"Elements by level: {level_counts}")
+    logger.info(
+        f"Review needed: {review_count} elements "
+        f"(confidence < {Config.CONFIDENCE_THRESHOLD})"
+    )
+
+    return DetectionResult(
+        document_s3_key=document_s3_key,
+        elements=all_elements,
+        review_count=review_count,
+        status="success",
+        error=None
+    )
+
+
+def detect_structure(
+    blocks: List[TextBlock],
+    document_s3_key: str = "",
+    checkpoint_prefix: Optional[str] = None
+) -> DetectionResult:
     """
     Detect hierarchical structure in extracted text blocks using Claude Sonnet 4.5.
     
@@ -563,16 +798,27 @@ def detect_structure(blocks: List[TextBlock], document_s3_key: str = "") -> Dete
     2. Sends each chunk to Claude Sonnet 4.5 for structure detection
     3. Parses and validates the LLM responses
     4. Flags low-confidence elements for review
-    5. Aggregates results across all chunks
+    5. Aggregates results across all chunks (see merge_detection_results)
     
     The function is resilient to:
     - Malformed LLM responses (with retry)
     - Missing or invalid fields
     - Bedrock API failures (with retry)
+    - Timeouts part-way through a large document (with checkpoint_prefix)
+    
+    With checkpoint_prefix, each chunk's elements are saved to the processed
+    bucket as {checkpoint_prefix}{chunk_hash}.json as soon as the chunk
+    completes. A later call with the same prefix loads those chunks instead
+    of sending them to Bedrock again, so a re-invoked detection only
+    processes the chunks that had not finished. Chunks whose response could
+    not be parsed are not checkpointed, so they are retried.
     
     Args:
         blocks: List of text blocks from text extraction
         document_s3_key: S3 key of the source document (for tracking)
+        checkpoint_prefix: S3 prefix for per-chunk checkpoints in
+            Config.S3_PROCESSED_BUCKET (see construct_checkpoint_prefix);
+            no checkpointing if omitted
         
     Returns:
         DetectionResult with detected elements, review count, and status
@@ -599,41 +845,64 @@ def detect_structure(blocks: List[TextBlock], document_s3_key: str = "") -> Dete
         )
         
         all_elements = []
+        chunk_results: List[List[DetectedElement]] = []
+        
+        s3_client = None
+        completed_hashes: Set[str] = set()
+        restored_chunks = 0
+        if checkpoint_prefix:
+            s3_client = boto3.client('s3', region_name=Config.AWS_REGION)
+            completed_hashes = _list_chunk_checkpoints(
+                s3_client, Config.S3_PROCESSED_BUCKET, checkpoint_prefix
+            )
+            logger.info(
+                f"Found {len(completed_hashes)} detection checkpoints under "
+                f"s3://{Config.S3_PROCESSED_BUCKET}/{checkpoint_prefix}"
+            )
         
         # Process each chunk
         for chunk_idx, chunk in enumerate(chunks):
-            chunk_elements = _process_chunk(chunk, chunk_idx, len(chunks))
-            all_elements.extend(chunk_elements)
+            chunk_elements = None
+            checkpoint_key = None
+            if checkpoint_prefix:
+                chunk_hash = chunk_checkpoint_hash(chunk)
+                checkpoint_key = f"{checkpoint_prefix}{chunk_hash}.json"
+                if chunk_hash in completed_hashes:
+                    chunk_elements = _load_chunk_checkpoint(
+                        s3_client, Config.S3_PROCESSED_BUCKET, checkpoint_key
+                    )
+                    if chunk_elements is not None:
+                        restored_chunks += 1
+                        logger.info(
+                            f"Chunk {chunk_idx + 1}/{len(chunks)}: restored "
+                            f"{len(chunk_elements)} elements from checkpoint"
+                        )
+            
+            if chunk_elements is None:
+                chunk_elements = _process_chunk(chunk, chunk_idx, len(chunks))
+                if chunk_elements is not None and checkpoint_key:
+                    try:
+                        _save_chunk_checkpoint(
+                            s3_client, Config.S3_PROCESSED_BUCKET, checkpoint_key,
+                            chunk_idx, chunk_elements
+                        )
+                    except ClientError as e:
+                        # Only costs a repeat of this chunk if detection is re-run
+                        logger.warning(
+                            f"Failed to save detection checkpoint "
+                            f"s3://{Config.S3_PROCESSED_BUCKET}/{checkpoint_key}: {e}"
+                        )
+            
+            chunk_results.append(chunk_elements or [])
+            all_elements.extend(chunk_elements or [])
             
             logger.info(
                 f"Progress: {chunk_idx + 1}/{len(chunks)} chunks processed, "
                 f"{len(all_elements)} total elements detected so far"
             )
         
-        # Count elements needing review
-        review_count = sum(1 for elem in all_elements if elem.needs_review)
-        
-        # Log summary by level
-        level_counts = {}
-        for elem in all_elements:
-            level_counts[elem.level.value] = level_counts.get(elem.level.value, 0) + 1
-        
-        logger.info(
-            f"Detection complete: {len(all_elements)} total elements detected"
-        )
-        logger.info(f"Elements by level: {level_counts}")
-        logger.info(
-            f"Review needed: {review_count} elements "
-            f"(confidence < {Config.CONFIDENCE_THRESHOLD})"
-        )
-        
-        return DetectionResult(
-            document_s3_key=document_s3_key,
-            elements=all_elements,
-            review_count=review_count,
-            status="success",
-            error=None
-        )
+        logger.info(f"{restored_chunks}/{len(chunks)} chunks restored from checkpoints")
+        return merge_detection_results(chunk_results, document_s3_key)
         
     except Exception as e:
         logger.error(f"Structure detection failed: {e}", exc_info=True)
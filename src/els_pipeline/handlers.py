@@ -2,25 +2,57 @@
 Lambda handler entry points for the ELS normalization pipeline.
 
 Each handler wraps a pipeline stage function and provides consistent
-error handling and logging for AWS Lambda execution.
+error handling and logging for AWS Lambda execution. Every payload also
+carries the invocation's resource metrics (see _with_stage_metrics).
 """
 
+import functools
 import json
 import logging
+import os
 import traceback
 from datetime import datetime, timezone
-from typing import Dict, Any
+from typing import Dict, Any, Callable, List
 
 from botocore.exceptions import ClientError
 
 from .ingester import ingest_document
 from .extractor import extract_text
-from .detector import detect_structure
-from .parser import parse_hierarchy
-from .validator import validate_record, serialize_record
-from .models import IngestionRequest
+from .detector import (
+    chunk_checkpoint_hash,
+    chunk_text_blocks,
+    detect_chunk,
+    detect_structure,
+    merge_detection_results,
+)
+from .parser import (
+    merge_parse_results,
+    parse_chunk_hash,
+    parse_element_chunk,
+    parse_hierarchy,
+    plan_parse_chunks,
+)
+from . import stage_metrics
+from .validator import BloomFilter, validate_records, serialize_record
+from .models import (
+    DetectedElement,
+    IngestionRequest,
+    NormalizedStandard,
+    PipelineStageResult,
+    StageMetrics,
+    TextBlock,
+)
 from .config import Config
-from .s3_helpers import save_json_to_s3, load_json_from_s3, construct_intermediate_key
+from .s3_helpers import (
+    save_json_to_s3,
+    save_json_objects_to_s3,
+    load_json_from_s3,
+    load_json_objects_from_s3,
+    is_missing_object_error,
+    construct_intermediate_key,
+    construct_checkpoint_prefix,
+    construct_chunk_prefix,
+)
 
 # Configure logging
 logger = logging.getLogger()
@@ -57,6 +89,93 @@ def _handle_error(stage_name: str, error: Exception, event: Dict[str, Any]) -> D
     }
 
 
+def _chunk_metrics_key(chunk: Dict[str, Any]) -> str:
+    """S3 key of a Map chunk invocation's metrics, beside the chunk input."""
+    return f"{os.path.splitext(chunk['chunk_key'])[0]}.metrics.json"
+
+
+def _chunk_failure_key(chunk: Dict[str, Any]) -> str:
+    """S3 key recording that a Map chunk produced no result, beside the chunk input."""
+    return f"{os.path.splitext(chunk['chunk_key'])[0]}.failed.json"
+
+
+def _save_chunk_failure(chunk: Dict[str, Any], error: str) -> None:
+    """Record why a Map chunk stored no result, for the stage's reduce step."""
+    save_json_to_s3(
+        {"chunk_index": chunk["chunk_index"], "error": error},
+        Config.S3_PROCESSED_BUCKET,
+        _chunk_failure_key(chunk),
+    )
+
+
+def _stage_result(stage_name: str, payload: Dict[str, Any]) -> PipelineStageResult:
+    """Convert a handler payload into a PipelineStageResult, with its metrics."""
+    metrics = StageMetrics(**payload["metrics"]) if payload.get("metrics") else None
+    return PipelineStageResult(
+        stage_name=stage_name,
+        status=payload.get("status", "success"),
+        duration_ms=metrics.wall_ms if metrics else 0,
+        output_artifact=payload.get("output_artifact", ""),
+        error=payload.get("error"),
+        metrics=metrics,
+    )
+
+
+def _record_pipeline_stages(event: Dict[str, Any], response: Dict[str, Any]) -> None:
+    """
+    Write the run's pipeline_stages rows in one statement.
+
+    The earlier stages' payloads arrive in event["stage_results"], keyed by
+    stage name; the current stage's row comes from its own response. A
+    failure is logged rather than raised, since the stage's work is done.
+    """
+    try:
+        from .db import persist_pipeline_stages
+
+        payloads = {**event.get("stage_results", {}), response["stage_name"]: response}
+        stages = [_stage_result(name, payload) for name, payload in payloads.items()]
+        persist_pipeline_stages(event["run_id"], stages)
+        logger.info(f"Recorded {len(stages)} pipeline stages for run {event['run_id']}")
+    except Exception as e:
+        logger.warning(f"Failed to record pipeline stages for run {event.get('run_id')}: {e}")
+
+
+def _with_stage_metrics(record_stages: bool = False) -> Callable:
+    """
+    Measure each invocation of a handler and add it to the payload as "metrics".
+
+    Measures wall time, CPU time, peak RSS, S3 bytes (counted by the S3
+    helpers) and the record counts the handler sets with
+    stage_metrics.set_record_counts. A Map chunk invocation (an event with
+    a "chunk") also saves its metrics beside the chunk input, where the
+    stage's reduce step collects them; a failed save is only logged.
+
+    Args:
+        record_stages: Also write the run's pipeline_stages rows once this
+            invocation is measured (see _record_pipeline_stages)
+    """
+    def decorator(handler: Callable) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+            with stage_metrics.measure_stage() as meter:
+                response = handler(event, context)
+            response["metrics"] = meter.metrics.model_dump()
+
+            if isinstance(event.get("chunk"), dict):
+                try:
+                    save_json_to_s3(
+                        response["metrics"], Config.S3_PROCESSED_BUCKET, _chunk_metrics_key(event["chunk"])
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to save chunk metrics: {e}")
+            if record_stages:
+                _record_pipeline_stages(event, response)
+            return response
+        return wrapper
+    return decorator
+
+
+@_with_stage_metrics()
 def ingestion_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for document ingestion stage.
@@ -106,6 +225,7 @@ def ingestion_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return _handle_error("ingestion", Exception(result.error), event)
         
         logger.info(f"Ingestion completed: s3_key={result.s3_key}")
+        stage_metrics.set_record_counts(records_in=1, records_out=1)
         
         return {
             "status": "success",
@@ -122,6 +242,7 @@ def ingestion_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         return _handle_error("ingestion", e, event)
 
 
+@_with_stage_metrics()
 def extraction_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for text extraction stage.
@@ -160,6 +281,8 @@ def extraction_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if result.status == "error":
             return _handle_error("text_extraction", Exception(result.error), event)
         
+        stage_metrics.set_record_counts(records_in=result.total_pages, records_out=len(result.blocks))
+
         # Prepare extraction output JSON
         extraction_output = {
             "blocks": [block.model_dump() for block in result.blocks],
@@ -208,6 +331,7 @@ def extraction_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         return _handle_error("text_extraction", e, event)
 
 
+@_with_stage_metrics()
 def detection_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for structure detection stage.
@@ -248,6 +372,7 @@ def detection_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             from els_pipeline.models import TextBlock
             blocks = [TextBlock(**block_dict) for block_dict in blocks_data]
             logger.info(f"Converted {len(blocks)} blocks to TextBlock instances")
+            stage_metrics.set_record_counts(records_in=len(blocks))
         except ClientError as e:
             error_msg = f"Failed to load extraction output from S3: {extraction_key}"
             logger.error(f"{error_msg} - {str(e)}")
@@ -257,53 +382,77 @@ def detection_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             logger.error(error_msg)
             return _handle_error("structure_detection", Exception(error_msg), event)
 
-        # Detect structure
-        result = detect_structure(blocks)
-
-        if result.status == "error":
-            return _handle_error("structure_detection", Exception(result.error), event)
-
-        # Prepare detection output JSON
-        detection_output = {
-            "elements": [elem.model_dump() for elem in result.elements],  # Serialize Pydantic models to dicts
-            "review_count": result.review_count,
-            "detection_timestamp": datetime.now(timezone.utc).isoformat(),
-            "source_extraction_key": extraction_key
-        }
-
-        # Save detection output to S3
-        output_key = construct_intermediate_key(
+        # Detect structure, checkpointing each chunk so a retried or re-run
+        # invocation for the same run_id resumes after the last finished chunk
+        checkpoint_prefix = construct_checkpoint_prefix(
             event["country"],
             event["state"],
             event["version_year"],
             "detection",
             event["run_id"]
         )
+        result = detect_structure(blocks, checkpoint_prefix=checkpoint_prefix)
 
-        try:
-            save_json_to_s3(detection_output, Config.S3_PROCESSED_BUCKET, output_key)
-            logger.info(f"Saved detection output to S3: {output_key}")
-        except ClientError as e:
-            logger.error(f"Failed to save detection output to S3: {output_key} - {str(e)}")
-            return _handle_error("structure_detection", e, event)
-
-        logger.info(f"Structure detection completed: review_count={result.review_count}")
+        if result.status == "error":
+            return _handle_error("structure_detection", Exception(result.error), event)
 
-        return {
-            "status": "success",
-            "stage_name": "structure_detection",
-            "output_artifact": output_key,
-            "review_count": result.review_count,
-            "country": event["country"],
-            "state": event["state"],
-            "version_year": event["version_year"],
-            "run_id": event.get("run_id")
-        }
+        return _save_detection_output(result, event, extraction_key)
 
     except Exception as e:
         return _handle_error("structure_detection", e, event)
 
 
+def _save_detection_output(result: Any, event: Dict[str, Any], extraction_key: str) -> Dict[str, Any]:
+    """
+    Save a DetectionResult as the stage's intermediate output.
+
+    Shared by detection_handler and detection_reduce_handler so both write
+    the same artifact and return the same payload.
+
+    Returns:
+        The structure_detection success payload, or an error payload if the
+        output cannot be saved
+    """
+    # Prepare detection output JSON
+    detection_output = {
+        "elements": [elem.model_dump() for elem in result.elements],  # Serialize Pydantic models to dicts
+        "review_count": result.review_count,
+        "detection_timestamp": datetime.now(timezone.utc).isoformat(),
+        "source_extraction_key": extraction_key
+    }
+
+    # Save detection output to S3
+    output_key = construct_intermediate_key(
+        event["country"],
+        event["state"],
+        event["version_year"],
+        "detection",
+        event["run_id"]
+    )
+
+    try:
+        save_json_to_s3(detection_output, Config.S3_PROCESSED_BUCKET, output_key)
+        logger.info(f"Saved detection output to S3: {output_key}")
+    except ClientError as e:
+        logger.error(f"Failed to save detection output to S3: {output_key} - {str(e)}")
+        return _handle_error("structure_detection", e, event)
+
+    logger.info(f"Structure detection completed: review_count={result.review_count}")
+    stage_metrics.set_record_counts(records_out=len(result.elements))
+
+    return {
+        "status": "success",
+        "stage_name": "structure_detection",
+        "output_artifact": output_key,
+        "review_count": result.review_count,
+        "country": event["country"],
+        "state": event["state"],
+        "version_year": event["version_year"],
+        "run_id": event.get("run_id")
+    }
+
+
+@_with_stage_metrics()
 def parsing_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for hierarchy parsing stage.
@@ -351,6 +500,7 @@ def parsing_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             from els_pipeline.models import DetectedElement
             elements = [DetectedElement(**elem_dict) for elem_dict in elements_data]
             logger.info(f"Converted {len(elements)} elements to DetectedElement instances")
+            stage_metrics.set_record_counts(records_in=len(elements))
         except ClientError as e:
             error_msg = f"Failed to load detection output from S3: {detection_key}"
             logger.error(f"{error_msg} - {str(e)}")
@@ -372,48 +522,554 @@ def parsing_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if result.status == "error":
             return _handle_error("hierarchy_parsing", Exception(result.error), event)
 
-        # Prepare parsing output JSON
-        parsing_output = {
-            "indicators": result.indicators,  # Already serialized in ParseResult
-            "total_indicators": len(result.indicators),
-            "parsing_timestamp": datetime.now(timezone.utc).isoformat(),
-            "source_detection_key": detection_key
+        return _save_parsing_output(result, event, detection_key)
+
+    except Exception as e:
+        return _handle_error("hierarchy_parsing", e, event)
+
+
+def _save_parsing_output(result: Any, event: Dict[str, Any], detection_key: str) -> Dict[str, Any]:
+    """
+    Save a ParseResult as the stage's intermediate output.
+
+    Shared by parsing_handler and parsing_reduce_handler so both write the
+    same artifact and return the same payload.
+
+    Returns:
+        The hierarchy_parsing success payload, or an error payload if the
+        output cannot be saved
+    """
+    # Prepare parsing output JSON
+    parsing_output = {
+        "indicators": result.indicators,  # Already serialized in ParseResult
+        "total_indicators": len(result.indicators),
+        "parsing_timestamp": datetime.now(timezone.utc).isoformat(),
+        "source_detection_key": detection_key
+    }
+
+    # Save parsing output to S3
+    output_key = construct_intermediate_key(
+        event["country"],
+        event["state"],
+        event["version_year"],
+        "parsing",
+        event["run_id"]
+    )
+
+    try:
+        save_json_to_s3(parsing_output, Config.S3_PROCESSED_BUCKET, output_key)
+        logger.info(f"Saved parsing output to S3: {output_key}")
+    except ClientError as e:
+        logger.error(f"Failed to save parsing output to S3: {output_key} - {str(e)}")
+        return _handle_error("hierarchy_parsing", e, event)
+
+    stage_metrics.set_record_counts(records_out=len(result.indicators))
+    logger.info(
+        f"Hierarchy parsing completed: "
+        f"total_indicators={len(result.standards)}, "
+        f"orphaned={len(result.orphaned_elements)}"
+    )
+
+    return {
+        "status": "success",
+        "stage_name": "hierarchy_parsing",
+        "output_artifact": output_key,
+        "total_indicators": len(result.standards),
+        "orphaned_count": len(result.orphaned_elements),
+        "country": event["country"],
+        "state": event["state"],
+        "version_year": event["version_year"],
+        "run_id": event.get("run_id")
+    }
+
+
+def _save_chunk_plan(
+    chunk_docs: List[Dict[str, Any]],
+    result_keys: List[str],
+    chunk_prefix: str
+) -> str:
+    """
+    Save the chunk inputs of a plan step and the manifest listing them.
+
+    The manifest is a JSON array, one entry per chunk, read by the state
+    machine's distributed Map (ItemReader) to fan out one item per chunk.
+
+    Args:
+        chunk_docs: JSON body of each chunk's input, in order
+        result_keys: Where each chunk's result is to be stored
+        chunk_prefix: Prefix for the chunk inputs and manifest (see construct_chunk_prefix)
+
+    Returns:
+        S3 key of the manifest
+
+    Raises:
+        ClientError: If any chunk input or the manifest cannot be saved
+    """
+    chunk_keys = [f"{chunk_prefix}{idx:05d}.json" for idx in range(len(chunk_docs))]
+    failures = save_json_objects_to_s3(
+        list(zip(chunk_docs, chunk_keys)), Config.S3_PROCESSED_BUCKET
+    )
+    if failures:
+        raise next(iter(failures.values()))
+
+    manifest = [
+        {
+            "chunk_index": idx,
+            "total_chunks": len(chunk_docs),
+            "chunk_key": chunk_key,
+            "result_key": result_key,
         }
+        for idx, (chunk_key, result_key) in enumerate(zip(chunk_keys, result_keys))
+    ]
+    manifest_key = f"{chunk_prefix}manifest.json"
+    save_json_to_s3(manifest, Config.S3_PROCESSED_BUCKET, manifest_key)
+    return manifest_key
 
-        # Save parsing output to S3
-        output_key = construct_intermediate_key(
-            event["country"],
-            event["state"],
-            event["version_year"],
-            "parsing",
-            event["run_id"]
-        )
 
+def _load_chunk_results(
+    manifest: List[Dict[str, Any]], event: Dict[str, Any]
+) -> tuple:
+    """
+    Load the chunk results of a fanned-out stage for its reduce step.
+
+    Every chunk of a finished Map either stored a result or recorded why
+    it could not (_save_chunk_failure). Also loads each chunk invocation's
+    metrics and folds them, after the plan step's (event["plan_metrics"],
+    if given), into the reduce invocation's metrics, so the stage reports
+    all of its invocations.
+
+    Returns:
+        Tuple of ({result_key: data} for every chunk that stored a result,
+        {result_key: error} for every chunk that recorded a failure)
+
+    Raises:
+        ValueError: If a chunk has neither a result nor a recorded failure
+        ClientError: If a result cannot be loaded for a reason other than a missing key
+    """
+    metrics_keys = [_chunk_metrics_key(entry) for entry in manifest]
+    loaded = load_json_objects_from_s3(
+        [entry["result_key"] for entry in manifest] + metrics_keys, Config.S3_PROCESSED_BUCKET
+    )
+
+    parts = [StageMetrics(**event["plan_metrics"])] if event.get("plan_metrics") else []
+    parts += [StageMetrics(**loaded[key]) for key in metrics_keys if key in loaded]
+    stage_metrics.include_metrics(parts)
+
+    results = {entry["result_key"]: loaded[entry["result_key"]]
+               for entry in manifest if entry["result_key"] in loaded}
+    missing = [entry for entry in manifest if entry["result_key"] not in results]
+    recorded = load_json_objects_from_s3(
+        [_chunk_failure_key(entry) for entry in missing], Config.S3_PROCESSED_BUCKET
+    )
+    failures = {}
+    for entry in missing:
+        failure = recorded.get(_chunk_failure_key(entry))
+        if failure is None:
+            raise ValueError(
+                f"Chunk {entry['chunk_index'] + 1} has neither a result nor a recorded "
+                f"failure: {entry['result_key']}"
+            )
+        failures[entry["result_key"]] = failure["error"]
+
+    stage_metrics.set_record_counts(records_in=len(results))
+    return results, failures
+
+
+@_with_stage_metrics()
+def detection_plan_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Lambda handler that plans a fanned-out structure detection.
+
+    Splits the extracted text into detection chunks and saves each chunk's
+    blocks plus a manifest under intermediate/detection/chunks/{run_id}/.
+    The state machine's distributed Map runs detection_chunk_handler once
+    per manifest entry, then detection_reduce_handler merges the results,
+    so document size is bounded by the Map rather than by one Lambda's
+    timeout and memory.
+
+    Each chunk's result key is its detection checkpoint key, so chunks that
+    finished in an earlier attempt of the same run are not re-detected.
+
+    Expected event structure:
+    {
+        "run_id": str,
+        "output_artifact": str (S3 key with extracted text),
+        "country": str,
+        "state": str,
+        "version_year": int
+    }
+
+    Returns:
+        {
+            "status": "success" | "error",
+            "stage_name": "structure_detection_plan",
+            "manifest_key": str (S3 key of the chunk manifest),
+            "total_chunks": int,
+            "country": str,
+            "state": str,
+            "version_year": int,
+            "error": str (optional)
+        }
+    """
+    try:
+        logger.info(f"Planning structure detection: run_id={event.get('run_id')}, country={event.get('country')}")
+
+        extraction_key = event["output_artifact"]
         try:
-            save_json_to_s3(parsing_output, Config.S3_PROCESSED_BUCKET, output_key)
-            logger.info(f"Saved parsing output to S3: {output_key}")
+            extraction_output = load_json_from_s3(Config.S3_PROCESSED_BUCKET, extraction_key)
+            blocks = [TextBlock(**block_dict) for block_dict in extraction_output["blocks"]]
         except ClientError as e:
-            logger.error(f"Failed to save parsing output to S3: {output_key} - {str(e)}")
-            return _handle_error("hierarchy_parsing", e, event)
+            error_msg = f"Failed to load extraction output from S3: {extraction_key}"
+            logger.error(f"{error_msg} - {str(e)}")
+            return _handle_error("structure_detection_plan", Exception(error_msg), event)
+
+        if not blocks:
+            return _handle_error("structure_detection_plan", Exception("No text blocks provided"), event)
 
+        chunks = chunk_text_blocks(blocks)
+        checkpoint_prefix = construct_checkpoint_prefix(
+            event["country"], event["state"], event["version_year"], "detection", event["run_id"]
+        )
+        manifest_key = _save_chunk_plan(
+            [
+                {"chunk_index": idx, "blocks": [block.model_dump() for block in chunk]}
+                for idx, chunk in enumerate(chunks)
+            ],
+            [f"{checkpoint_prefix}{chunk_checkpoint_hash(chunk)}.json" for chunk in chunks],
+            construct_chunk_prefix(
+                event["country"], event["state"], event["version_year"], "detection", event["run_id"]
+            ),
+        )
         logger.info(
-            f"Hierarchy parsing completed: "
-            f"total_indicators={len(result.standards)}, "
-            f"orphaned={len(result.orphaned_elements)}"
+            f"Planned {len(chunks)} detection chunks from {len(blocks)} blocks: {manifest_key}"
         )
+        stage_metrics.set_record_counts(records_in=len(blocks), records_out=len(chunks))
 
         return {
             "status": "success",
-            "stage_name": "hierarchy_parsing",
-            "output_artifact": output_key,
-            "total_indicators": len(result.standards),
-            "orphaned_count": len(result.orphaned_elements),
+            "stage_name": "structure_detection_plan",
+            "manifest_key": manifest_key,
+            "total_chunks": len(chunks),
+            "country": event["country"],
+            "state": event["state"],
+            "version_year": event["version_year"],
+            "run_id": event.get("run_id")
+        }
+
+    except Exception as e:
+        return _handle_error("structure_detection_plan", e, event)
+
+
+@_with_stage_metrics()
+def detection_chunk_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Lambda handler that detects the structure of one planned chunk.
+
+    Runs once per item of the detection Map. Stores the chunk's elements at
+    its result key; an unparseable LLM response stores a failure record
+    instead and reports "partial", matching detect_structure, which skips
+    such chunks.
+
+    Expected event structure:
+    {
+        "run_id": str,
+        "country": str,
+        "state": str,
+        "version_year": int,
+        "chunk": {"chunk_index": int, "total_chunks": int, "chunk_key": str, "result_key": str}
+    }
+
+    Returns:
+        {
+            "status": "success" | "partial" | "error",
+            "stage_name": "structure_detection_chunk",
+            "chunk_index": int,
+            "element_count": int,
+            "restored": bool (result came from an earlier attempt),
+            "error": str (optional)
+        }
+    """
+    try:
+        chunk = event["chunk"]
+        chunk_data = load_json_from_s3(Config.S3_PROCESSED_BUCKET, chunk["chunk_key"])
+        blocks = [TextBlock(**block_dict) for block_dict in chunk_data["blocks"]]
+
+        elements, restored = detect_chunk(
+            blocks, chunk["chunk_index"], chunk["total_chunks"], chunk["result_key"]
+        )
+        stage_metrics.set_record_counts(records_in=len(blocks), records_out=len(elements or []))
+
+        response = {
+            "status": "success" if elements is not None else "partial",
+            "stage_name": "structure_detection_chunk",
+            "chunk_index": chunk["chunk_index"],
+            "element_count": len(elements or []),
+            "restored": restored,
+            "run_id": event.get("run_id")
+        }
+        if elements is None:
+            response["error"] = f"Chunk {chunk['chunk_index'] + 1} returned no parseable response"
+            _save_chunk_failure(chunk, response["error"])
+        return response
+
+    except Exception as e:
+        return _handle_error("structure_detection_chunk", e, event)
+
+
+@_with_stage_metrics()
+def detection_reduce_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Lambda handler that merges the per-chunk results of a fanned-out detection.
+
+    Loads every chunk result listed in the manifest, drops chunk-overlap
+    duplicates (merge_detection_results) and saves the same output artifact
+    as detection_handler. A chunk that recorded a failure (no parseable
+    response) contributes no elements; a chunk with neither a result nor a
+    recorded failure makes the stage fail.
+
+    Expected event structure:
+    {
+        "run_id": str,
+        "manifest_key": str (from detection_plan_handler),
+        "plan_metrics": dict (optional, the plan step's metrics),
+        "output_artifact": str (S3 key with extracted text),
+        "country": str,
+        "state": str,
+        "version_year": int
+    }
+
+    Returns:
+        Same as detection_handler
+    """
+    try:
+        manifest = load_json_from_s3(Config.S3_PROCESSED_BUCKET, event["manifest_key"])
+        results, failures = _load_chunk_results(manifest, event)
+
+        chunk_results = []
+        for entry in manifest:
+            data = results.get(entry["result_key"])
+            if data is None:
+                logger.warning(f"Skipping detection chunk {entry['chunk_index'] + 1}: "
+                               f"{failures[entry['result_key']]}")
+                chunk_results.append([])
+                continue
+            chunk_results.append([DetectedElement(**elem) for elem in data["elements"]])
+
+        logger.info(f"Merging {len(results)}/{len(manifest)} detection chunk results")
+        result = merge_detection_results(chunk_results)
+        return _save_detection_output(result, event, event["output_artifact"])
+
+    except Exception as e:
+        return _handle_error("structure_detection", e, event)
+
+
+@_with_stage_metrics()
+def parsing_plan_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Lambda handler that plans a fanned-out hierarchy parsing.
+
+    Splits the detected elements into the same per-domain chunks as
+    parse_hierarchy and saves each chunk plus a manifest under
+    intermediate/parsing/chunks/{run_id}/ for the parsing Map.
+
+    Expected event structure:
+        Same as parsing_handler
+
+    Returns:
+        {
+            "status": "success" | "error",
+            "stage_name": "hierarchy_parsing_plan",
+            "manifest_key": str (S3 key of the chunk manifest),
+            "total_chunks": int,
+            "country": str,
+            "state": str,
+            "version_year": int,
+            "error": str (optional)
+        }
+    """
+    try:
+        logger.info(f"Planning hierarchy parsing: run_id={event.get('run_id')}, country={event.get('country')}")
+
+        required_fields = ["output_artifact", "country", "state", "version_year", "age_band", "run_id"]
+        missing = [f for f in required_fields if f not in event]
+        if missing:
+            raise ValueError(f"Missing required field(s) in event: {', '.join(missing)}")
+
+        detection_key = event["output_artifact"]
+        try:
+            detection_output = load_json_from_s3(Config.S3_PROCESSED_BUCKET, detection_key)
+            elements = [DetectedElement(**elem_dict) for elem_dict in detection_output["elements"]]
+        except ClientError as e:
+            error_msg = f"Failed to load detection output from S3: {detection_key}"
+            logger.error(f"{error_msg} - {str(e)}")
+            return _handle_error("hierarchy_parsing_plan", Exception(error_msg), event)
+
+        chunks = plan_parse_chunks(elements)
+        if not chunks:
+            return _handle_error(
+                "hierarchy_parsing_plan",
+                Exception("No valid elements to parse (all flagged for review or empty input)"),
+                event,
+            )
+
+        scope = (event["country"], event["state"], event["version_year"])
+        checkpoint_prefix = construct_checkpoint_prefix(*scope, "parsing", event["run_id"])
+        manifest_key = _save_chunk_plan(
+            [
+                {"chunk_index": idx, "elements": [elem.model_dump() for elem in chunk]}
+                for idx, chunk in enumerate(chunks)
+            ],
+            [
+                f"{checkpoint_prefix}{parse_chunk_hash(chunk, *scope, event['age_band'])}.json"
+                for chunk in chunks
+            ],
+            construct_chunk_prefix(*scope, "parsing", event["run_id"]),
+        )
+        logger.info(f"Planned {len(chunks)} parsing chunks from {len(elements)} elements: {manifest_key}")
+        stage_metrics.set_record_counts(records_in=len(elements), records_out=len(chunks))
+
+        return {
+            "status": "success",
+            "stage_name": "hierarchy_parsing_plan",
+            "manifest_key": manifest_key,
+            "total_chunks": len(chunks),
             "country": event["country"],
             "state": event["state"],
             "version_year": event["version_year"],
             "run_id": event.get("run_id")
         }
 
+    except Exception as e:
+        return _handle_error("hierarchy_parsing_plan", e, event)
+
+
+@_with_stage_metrics()
+def parsing_chunk_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Lambda handler that parses the hierarchy of one planned domain chunk.
+
+    Runs once per item of the parsing Map. A result stored by an earlier
+    attempt is reused. An unparseable LLM response stores a failure record
+    and reports "partial"; the reduce step records the chunk as failed, as
+    parse_hierarchy does.
+
+    Expected event structure:
+    {
+        "run_id": str,
+        "country": str,
+        "state": str,
+        "version_year": int,
+        "age_band": str,
+        "chunk": {"chunk_index": int, "total_chunks": int, "chunk_key": str, "result_key": str}
+    }
+
+    Returns:
+        {
+            "status": "success" | "partial" | "error",
+            "stage_name": "hierarchy_parsing_chunk",
+            "chunk_index": int,
+            "standard_count": int,
+            "restored": bool (result came from an earlier attempt),
+            "error": str (optional)
+        }
+    """
+    try:
+        chunk = event["chunk"]
+        response = {
+            "status": "success",
+            "stage_name": "hierarchy_parsing_chunk",
+            "chunk_index": chunk["chunk_index"],
+            "restored": False,
+            "run_id": event.get("run_id")
+        }
+
+        try:
+            stored = load_json_from_s3(Config.S3_PROCESSED_BUCKET, chunk["result_key"])
+            logger.info(f"Parsing chunk {chunk['chunk_index'] + 1} already has a result: {chunk['result_key']}")
+            stage_metrics.set_record_counts(records_out=len(stored["standards"]))
+            return {**response, "standard_count": len(stored["standards"]), "restored": True}
+        except ClientError as e:
+            if not is_missing_object_error(e):
+                raise
+
+        chunk_data = load_json_from_s3(Config.S3_PROCESSED_BUCKET, chunk["chunk_key"])
+        elements = [DetectedElement(**elem_dict) for elem_dict in chunk_data["elements"]]
+        stage_metrics.set_record_counts(records_in=len(elements))
+        try:
+            standards = parse_element_chunk(
+                elements,
+                country=event["country"],
+                state=event["state"],
+                version_year=event["version_year"],
+                age_band=event["age_band"],
+                chunk_idx=chunk["chunk_index"],
+                total_chunks=chunk["total_chunks"],
+            )
+        except ValueError as e:
+            _save_chunk_failure(chunk, str(e))
+            return {**response, "status": "partial", "standard_count": 0, "error": str(e)}
+
+        save_json_to_s3(
+            {
+                "chunk_index": chunk["chunk_index"],
+                "model_id": Config.BEDROCK_PARSER_LLM_MODEL_ID,
+                "standards": [standard.model_dump(mode="json") for standard in standards],
+            },
+            Config.S3_PROCESSED_BUCKET,
+            chunk["result_key"],
+        )
+        stage_metrics.set_record_counts(records_out=len(standards))
+        return {**response, "standard_count": len(standards)}
+
+    except Exception as e:
+        return _handle_error("hierarchy_parsing_chunk", e, event)
+
+
+@_with_stage_metrics()
+def parsing_reduce_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Lambda handler that merges the per-chunk results of a fanned-out parsing.
+
+    Loads every chunk result listed in the manifest, merges them with
+    merge_parse_results and saves the same output artifact as
+    parsing_handler. Chunks that recorded a failure are reported as chunk
+    errors, so the outcome is "partial", or "error" if no chunk produced a
+    result; a chunk with neither a result nor a recorded failure makes the
+    stage fail.
+
+    Expected event structure:
+    {
+        "run_id": str,
+        "manifest_key": str (from parsing_plan_handler),
+        "plan_metrics": dict (optional, the plan step's metrics),
+        "output_artifact": str (S3 key with detected elements),
+        "country": str,
+        "state": str,
+        "version_year": int
+    }
+
+    Returns:
+        Same as parsing_handler
+    """
+    try:
+        manifest = load_json_from_s3(Config.S3_PROCESSED_BUCKET, event["manifest_key"])
+        results, failures = _load_chunk_results(manifest, event)
+
+        chunk_standards = []
+        chunk_errors = []
+        for entry in manifest:
+            data = results.get(entry["result_key"])
+            if data is None:
+                chunk_errors.append(failures[entry["result_key"]])
+                continue
+            chunk_standards.append([NormalizedStandard(**std) for std in data["standards"]])
+
+        logger.info(f"Merging {len(results)}/{len(manifest)} parsing chunk results")
+        result = merge_parse_results(chunk_standards, chunk_errors)
+        if result.status == "error":
+            return _handle_error("hierarchy_parsing", Exception(result.error), event)
+        return _save_parsing_output(result, event, event["output_artifact"])
+
     except Exception as e:
         return _handle_error("hierarchy_parsing", e, event)
 
@@ -468,10 +1124,42 @@ def _indicator_to_canonical(indicator: Dict[str, Any], event: Dict[str, Any]) ->
     }
 
 
+def _existing_standard_keys(event: Dict[str, Any]) -> tuple:
+    """
+    Load the standard keys already stored for the event's document.
+
+    Returns:
+        (existing_ids, confirm_existing) for validate_records; (None, None) when
+        the check is disabled, skipped by the event, or the database is unavailable
+    """
+    if not Config.VALIDATION_CHECK_EXISTING or event.get("allow_existing"):
+        return None, None
+
+    from .db import load_existing_standard_keys, filter_existing_standard_keys
+
+    try:
+        existing_ids = load_existing_standard_keys(
+            event["country"], event["state"], event["version_year"]
+        )
+    except Exception as e:
+        logger.warning(f"Skipping stored-key uniqueness check: {e}")
+        return None, None
+
+    logger.info(f"Loaded {len(existing_ids)} existing standard keys for uniqueness check")
+    if isinstance(existing_ids, BloomFilter):
+        return existing_ids, filter_existing_standard_keys
+    return existing_ids, None
+
+
+@_with_stage_metrics()
 def validation_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for validation stage.
 
+    Records already stored for the document (see VALIDATION_CHECK_EXISTING)
+    are rejected as duplicates: the stage is "partial" when some are, and an
+    error when nothing else validated.
+
     Expected event structure:
     {
         "run_id": str,
@@ -483,12 +1171,14 @@ def validation_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         "source_url": str (optional, document metadata),
         "publishing_agency": str (optional, document metadata),
         "document_title": str (optional, document metadata),
-        "age_band": str (optional, document metadata)
+        "age_band": str (optional, document metadata),
+        "allow_existing": bool (optional, skip the stored-key uniqueness check
+                                when deliberately re-ingesting a document)
     }
 
     Returns:
         {
-            "status": "success" | "error",
+            "status": "success" | "partial" | "error",
             "stage_name": "validation",
             "output_artifact": str (S3 key with validation summary),
             "total_indicators": int,
@@ -514,17 +1204,21 @@ def validation_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             logger.error(f"{error_msg} - {str(e)}")
             return _handle_error("validation", Exception(error_msg), event)
 
-        # Validate each indicator and save to S3
+        # Validate every indicator first, then upload the passing records in parallel
         validated_records = []
         validation_errors = []
+        pending_uploads = []  # (record_key, standard_id, canonical) in input order
+
+        # Transform flat NormalizedStandard dicts into canonical JSON format
+        # The parser outputs flat dicts; the validator expects canonical structure
+        canonicals = [_indicator_to_canonical(indicator, event) for indicator in indicators]
+        existing_ids, confirm_existing = _existing_standard_keys(event)
+        schema_errors = validate_records(
+            canonicals, existing_ids=existing_ids, confirm_existing=confirm_existing
+        )
 
-        for indicator in indicators:
-            # Transform flat NormalizedStandard dict into canonical JSON format
-            # The parser outputs flat dicts; the validator expects canonical structure
-            canonical = _indicator_to_canonical(indicator, event)
-            result = validate_record(canonical)
-
-            if result.is_valid:
+        for indicator, canonical, errors in zip(indicators, canonicals, schema_errors):
+            if not errors:
                 # Extract standard_id from the canonical record
                 standard_id = canonical.get("standard", {}).get("standard_id")
 
@@ -536,33 +1230,45 @@ def validation_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     })
                     continue
 
-                # Save individual canonical record
+                # Individual canonical record key
                 record_key = f"{event['country']}/{event['state']}/{event['version_year']}/{standard_id}.json"
-
-                try:
-                    save_json_to_s3(canonical, Config.S3_PROCESSED_BUCKET, record_key)
-                    validated_records.append(record_key)
-                    logger.info(f"Saved canonical record to S3: {record_key}")
-                except ClientError as e:
-                    logger.error(f"Failed to save canonical record {standard_id}: {e}")
-                    validation_errors.append({
-                        "standard_id": standard_id,
-                        "error": str(e)
-                    })
+                pending_uploads.append((record_key, standard_id, canonical))
             else:
                 # Collect validation errors
                 validation_errors.append({
                     "indicator": indicator,
                     "errors": [{"field": err.field_path, "message": err.message, "type": err.error_type}
-                              for err in result.errors]
+                              for err in errors]
+                })
+                logger.warning(f"Validation failed for indicator: {errors}")
+
+        # Duplicate standard_ids were rejected above, so every key is distinct
+        upload_failures = save_json_objects_to_s3(
+            [(canonical, record_key) for record_key, _, canonical in pending_uploads],
+            Config.S3_PROCESSED_BUCKET,
+        )
+
+        for record_key, standard_id, _ in pending_uploads:
+            error = upload_failures.get(record_key)
+            if error is None:
+                validated_records.append(record_key)
+            else:
+                logger.error(f"Failed to save canonical record {standard_id}: {error}")
+                validation_errors.append({
+                    "standard_id": standard_id,
+                    "error": str(error)
                 })
-                logger.warning(f"Validation failed for indicator: {result.errors}")
+
+        total_duplicates = sum(
+            any(err.error_type == "uniqueness" for err in errors) for errors in schema_errors
+        )
 
         # Prepare validation summary
         validation_summary = {
             "validated_records": validated_records,
             "total_validated": len(validated_records),
             "validation_errors": validation_errors,
+            "total_duplicates": total_duplicates,
             "validation_timestamp": datetime.now(timezone.utc).isoformat(),
             "source_parsing_key": parsing_key
         }
@@ -583,15 +1289,26 @@ def validation_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             logger.error(f"Failed to save validation summary: {e}")
             return _handle_error("validation", e, event)
 
+        stage_metrics.set_record_counts(records_in=len(indicators), records_out=len(validated_records))
         logger.info(
             f"Validation completed: "
             f"total={len(indicators)}, "
             f"validated={len(validated_records)}, "
+            f"duplicates={total_duplicates}, "
             f"errors={len(validation_errors)}"
         )
 
+        # Records rejected as already stored would otherwise vanish from a
+        # run that still reports success
+        if total_duplicates and not validated_records:
+            return _handle_error("validation", ValueError(
+                f"All {total_duplicates} valid records are already stored for "
+                f"{event['country']}/{event['state']}/{event['version_year']}; "
+                f"start the run with allow_existing to re-ingest the document"
+            ), event)
+
         return {
-            "status": "success",
+            "status": "partial" if total_duplicates else "success",
             "stage_name": "validation",
             "output_artifact": output_key,
             "total_indicators": len(indicators),
@@ -607,6 +1324,7 @@ def validation_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
 
 
+@_with_stage_metrics()
 def embedding_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for embedding generation stage.
@@ -643,6 +1361,7 @@ def embedding_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         output_key = f"{event['output_artifact']}.embeddings.json"
         
+        stage_metrics.set_record_counts(records_in=event.get("total_validated", 0), records_out=total_embedded)
         logger.info(f"Embedding generation completed: total_embedded={total_embedded}")
         
         return {
@@ -661,10 +1380,14 @@ def embedding_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         return _handle_error("embedding_generation", e, event)
 
 
+@_with_stage_metrics()
 def recommendation_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for recommendation generation stage.
     
+    Generates parent and teacher recommendations for the document's
+    persisted indicators and writes them to the database.
+    
     Expected event structure:
     {
         "run_id": str,
@@ -672,16 +1395,18 @@ def recommendation_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any
         "total_embedded": int,
         "country": str,
         "state": str,
-        "version_year": int
+        "version_year": int,
+        "age_band": str (optional, default "PK")
     }
     
     Returns:
         {
-            "status": "success" | "error",
+            "status": "success" | "partial" | "error",
             "stage_name": "recommendation_generation",
             "output_artifact": str (S3 key with recommendations),
             "total_embedded": int,
             "total_recommendations": int,
+            "missing_indicator_ids": list (indicators left without recommendations),
             "country": str,
             "state": str,
             "version_year": int,
@@ -691,31 +1416,77 @@ def recommendation_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any
     try:
         logger.info(f"Starting recommendation generation: run_id={event.get('run_id')}, country={event.get('country')}")
         
-        # In production, read validated standards and generate recommendations
-        # This is a placeholder - assume 2 recommendations per indicator (parent + teacher)
-        total_recommendations = event.get("total_embedded", 0) * 2
+        from .recommender import generate_recommendations
+        from .db import persist_recommendations
+        from .models import RecommendationRequest
+        
+        request = RecommendationRequest(
+            country=event["country"],
+            state=event["state"],
+            age_band=event.get("age_band", "PK"),
+        )
+        result = generate_recommendations(request, version_year=event["version_year"])
         
-        output_key = f"{event['output_artifact']}.recommendations.json"
+        if result.status == "error":
+            return _handle_error("recommendation_generation", Exception(result.error), event)
         
-        logger.info(f"Recommendation generation completed: total_recommendations={total_recommendations}")
+        write_result = persist_recommendations(result.recommendations)
+        total_recommendations = write_result.rows_written
+        stage_metrics.set_record_counts(records_out=total_recommendations)
         
-        return {
-            "status": "success",
+        # Save recommendation summary to S3
+        output_key = construct_intermediate_key(
+            event["country"],
+            event["state"],
+            event["version_year"],
+            "recommendation",
+            event["run_id"]
+        )
+        recommendation_output = {
+            "recommendation_ids": [rec.recommendation_id for rec in result.recommendations],
+            "total_recommendations": total_recommendations,
+            "cache_hits": result.cache_hits,
+            "llm_batches": result.llm_batches,
+            "missing_indicator_ids": result.missing_indicator_ids,
+            "write_metrics": write_result.model_dump(),
+            "error": result.error,
+            "recommendation_timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+        
+        try:
+            save_json_to_s3(recommendation_output, Config.S3_PROCESSED_BUCKET, output_key)
+            logger.info(f"Saved recommendation summary to S3: {output_key}")
+        except ClientError as e:
+            logger.error(f"Failed to save recommendation summary to S3: {output_key} - {str(e)}")
+            return _handle_error("recommendation_generation", e, event)
+        
+        logger.info(
+            f"Recommendation generation completed: total_recommendations={total_recommendations}, "
+            f"cache_hits={result.cache_hits}, llm_batches={result.llm_batches}"
+        )
+        
+        response = {
+            "status": result.status,
             "stage_name": "recommendation_generation",
             "output_artifact": output_key,
             "total_embedded": event.get("total_embedded", 0),
             "total_recommendations": total_recommendations,
+            "missing_indicator_ids": result.missing_indicator_ids,
             "country": event["country"],
             "state": event["state"],
             "version_year": event["version_year"],
             "run_id": event.get("run_id")
         }
+        if result.error:
+            response["error"] = result.error
+        return response
         
     except Exception as e:
         return _handle_error("recommendation_generation", e, event)
 
 
 
+@_with_stage_metrics(record_stages=True)
 def persistence_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for data persistence stage.
@@ -729,14 +1500,21 @@ def persistence_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         "output_artifact": str (S3 key with validation summary),
         "country": str,
         "state": str,
-        "version_year": int
+        "version_year": int,
+        "stage_results": dict (optional, earlier stage payloads by stage name)
     }
 
+    After persisting, writes a pipeline_stages row for each of
+    stage_results and for this stage, with their metrics.
+
     Returns:
         {
             "status": "success" | "error",
             "stage_name": "data_persistence",
             "records_persisted": int,
+            "records_inserted": int,
+            "records_updated": int,
+            "records_unchanged": int,
             "errors": int,
             "country": str,
             "state": str,
@@ -750,12 +1528,18 @@ def persistence_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
         from .persister import persist_records
 
-        records_persisted, persist_errors = persist_records(event)
+        records_persisted, persist_errors, change_counts = persist_records(event)
+        stage_metrics.set_record_counts(
+            records_in=records_persisted + len(persist_errors), records_out=records_persisted
+        )
 
         return {
             "status": "success",
             "stage_name": "data_persistence",
             "records_persisted": records_persisted,
+            "records_inserted": change_counts["inserted"],
+            "records_updated": change_counts["updated"],
+            "records_unchanged": change_counts["unchanged"],
             "errors": len(persist_errors),
             "country": event["country"],
             "state": event["state"],
@@ -766,3 +1550,95 @@ def persistence_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     except Exception as e:
         return _handle_error("data_persistence", e, event)
 
+
+
+# Stage names in pipeline order, with the state machine ResultPath key of
+# each stage's Lambda result (see infra/template.yaml)
+_STAGE_RESULT_KEYS = (
+    ("ingestion", "ingestion_result"),
+    ("text_extraction", "extraction_result"),
+    ("structure_detection", "detection_result"),
+    ("hierarchy_parsing", "parsing_result"),
+    ("validation", "validation_result"),
+    ("data_persistence", "persistence_result"),
+)
+
+
+def failed_run_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Lambda handler recording a failed run, on the state machine's failure branch.
+
+    Creates the run's pipeline_runs row if it has none (marking it failed)
+    and writes a pipeline_stages row for every stage that returned a
+    payload, plus an error row for the stage that failed without one. A
+    detection or parsing result that is only its plan step's payload means
+    the stage's Map or reduce state failed.
+
+    Expected event structure (the execution state at the failure):
+    {
+        "run_id": str,
+        "file_path": str,
+        "country": str,
+        "state": str,
+        "version_year": int,
+        "<stage>_result": {"Payload": dict} (one per finished stage),
+        "error_info": dict ({"stage", "error", "error_type"} when a stage
+            returned an error, {"Error", "Cause"} when a state failed)
+    }
+
+    A failed write is logged rather than raised, so the failure
+    notification still goes out.
+
+    Returns:
+        {
+            "status": "success" | "error",
+            "run_id": str,
+            "stages_recorded": int
+        }
+    """
+    try:
+        from .db import persist_pipeline_stages, record_failed_pipeline_run
+
+        error_info = event.get("error_info") or {}
+        error = error_info.get("error") or error_info.get("Cause") or "Pipeline run failed"
+
+        stages = []
+        for stage_name, result_key in _STAGE_RESULT_KEYS:
+            payload = (event.get(result_key) or {}).get("Payload") or {}
+            # A fanned-out stage's plan step writes the same ResultPath as its
+            # reduce step; a successful plan alone means the Map or reduce failed
+            planned_only = (payload.get("stage_name", "").endswith("_plan")
+                            and payload.get("status") != "error")
+            if payload and not planned_only:
+                stages.append(_stage_result(stage_name, payload))
+                if payload.get("status") == "error":
+                    break
+                continue
+            # A state that failed outright has no result; it is the first
+            # unfinished stage (keeping the plan step's metrics, if any)
+            stages.append(_stage_result(stage_name, {**payload, "status": "error", "error": error}))
+            break
+
+        record_failed_pipeline_run(
+            event["run_id"],
+            event.get("file_path", ""),
+            event["country"],
+            event["state"],
+            event["version_year"],
+        )
+        persist_pipeline_stages(event["run_id"], stages)
+        logger.info(f"Recorded failed run {event['run_id']} with {len(stages)} pipeline stages")
+
+        return {
+            "status": "success",
+            "run_id": event["run_id"],
+            "stages_recorded": len(stages),
+        }
+
+    except Exception as e:
+        logger.warning(f"Failed to record failed run {event.get('run_id')}: {e}")
+        return {
+            "status": "error",
+            "run_id": event.get("run_id", "unknown"),
+            "stages_recorded": 0,
+        }
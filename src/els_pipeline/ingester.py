@@ -7,6 +7,7 @@ from typing import Optional
 import boto3
 from botocore.exceptions import ClientError
 
+from . import stage_metrics
 from .models import IngestionRequest, IngestionResult
 from .config import Config
 
@@ -152,6 +153,7 @@ def ingest_document(request: IngestionRequest) -> IngestionResult:
             Body=file_content,
             Metadata=metadata
         )
+        stage_metrics.add_output_bytes(len(file_content))
         
         # Get version ID (will be None if versioning is not enabled)
         version_id = response.get("VersionId", "")
@@ -0,0 +1,271 @@
+"""
+In-process pipeline runner for local development.
+
+Chains ingestion → extraction → detection → parsing → validation →
+persistence in one Python process, handing each stage's result object
+directly to the next instead of round-tripping it through S3 and Step
+Functions. Ingestion and extraction still use S3 and Textract, since
+Textract reads documents from S3.
+
+Stage results can be checkpointed as JSON files in a local directory. A
+later run with the same run_id restores finished stages from their
+checkpoints, so e.g. parsing can be re-run without repeating extraction
+and detection. The per-stage durations give an S3-free baseline to
+compare with Step Functions executions.
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import Config
+from .detector import detect_structure
+from .extractor import extract_text
+from .handlers import _existing_standard_keys, _indicator_to_canonical
+from .ingester import ingest_document
+from .models import (
+    DetectionResult,
+    ExtractionResult,
+    IngestionRequest,
+    IngestionResult,
+    ParseResult,
+    PipelineRunResult,
+    PipelineStageResult,
+)
+from .parser import parse_hierarchy
+from .validator import validate_records
+
+logger = logging.getLogger(__name__)
+
+
+class _StageFailed(Exception):
+    """Raised when a stage returns an error result."""
+
+
+def _write_checkpoint(path: str, data: Dict[str, Any]) -> None:
+    """Write a checkpoint atomically so an interrupted run never leaves a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _run_stage(
+    stage_name: str,
+    stages: List[PipelineStageResult],
+    run_dir: Optional[str],
+    compute: Callable[[], Any],
+    restore: Callable[[Dict[str, Any]], Any],
+    dump: Callable[[Any], Dict[str, Any]],
+) -> Any:
+    """
+    Run one stage, or restore it from its checkpoint, and record its timing.
+
+    Args:
+        stage_name: Stage name, also the checkpoint file name
+        stages: Stage results collected so far (appended to)
+        run_dir: Checkpoint directory for this run, or None
+        compute: Runs the stage and returns its result
+        restore: Rebuilds the result from checkpoint JSON
+        dump: Converts the result to checkpoint JSON
+
+    Returns:
+        The stage result
+
+    Raises:
+        _StageFailed: If the stage result has status "error"
+    """
+    path = os.path.join(run_dir, f"{stage_name}.json") if run_dir else None
+
+    start = time.perf_counter()
+    if path and os.path.exists(path):
+        with open(path) as f:
+            result = restore(json.load(f))
+        logger.info(f"Restored {stage_name} from checkpoint {path}")
+    else:
+        result = compute()
+    duration_ms = int((time.perf_counter() - start) * 1000)
+
+    error = getattr(result, "error", None) if getattr(result, "status", None) == "error" else None
+    stages.append(PipelineStageResult(
+        stage_name=stage_name,
+        status="error" if error else "success",
+        duration_ms=duration_ms,
+        output_artifact=path or "",
+        error=error,
+    ))
+    if error:
+        raise _StageFailed(f"{stage_name} failed: {error}")
+
+    if path and not os.path.exists(path):
+        _write_checkpoint(path, dump(result))
+    logger.info(f"Stage {stage_name} finished in {duration_ms} ms")
+    return result
+
+
+def run_pipeline_locally(
+    request: IngestionRequest,
+    age_band: str = "PK",
+    document_title: Optional[str] = None,
+    run_id: Optional[str] = None,
+    checkpoint_dir: Optional[str] = None,
+    persist: bool = True,
+) -> PipelineRunResult:
+    """
+    Run the core pipeline for one document in this process.
+
+    Validation applies the same canonical transform and uniqueness checks
+    as validation_handler. Persistence writes every valid record in one
+    transaction, rolling back only failing records unless
+    Config.PERSIST_TRANSACTION_MODE is "document". Persistence is never
+    checkpointed: its upserts are idempotent, so resumed runs repeat it.
+
+    Args:
+        request: Document to ingest, as for ingestion_handler
+        age_band: Default age band passed to the parser
+        document_title: Document title for canonical records (defaults to
+            "{state} Early Learning Standards")
+        run_id: Run identifier; reuse one to resume from its checkpoints
+        checkpoint_dir: Directory for per-stage checkpoints (none if omitted)
+        persist: Write validated records to the database
+
+    Returns:
+        PipelineRunResult with per-stage durations; status is "completed",
+        "partial" (some records failed validation or persistence) or
+        "failed" (a stage failed, see its error)
+    """
+    run_id = run_id or (
+        f"local-{request.country}-{request.state}-{request.version_year}-{uuid.uuid4().hex[:8]}"
+    )
+    run_dir = None
+    if checkpoint_dir:
+        run_dir = os.path.join(checkpoint_dir, run_id)
+        os.makedirs(run_dir, exist_ok=True)
+
+    event = {
+        "run_id": run_id,
+        "country": request.country,
+        "state": request.state,
+        "version_year": request.version_year,
+        "source_url": request.source_url,
+        "publishing_agency": request.publishing_agency,
+        "age_band": age_band,
+    }
+    if document_title:
+        event["document_title"] = document_title
+
+    stages: List[PipelineStageResult] = []
+    document_s3_key = ""
+    total_indicators = 0
+    total_validated = 0
+    has_errors = False
+
+    logger.info(f"Starting local pipeline run: run_id={run_id}, checkpoints={run_dir}")
+
+    try:
+        ingestion = _run_stage(
+            "ingestion", stages, run_dir,
+            lambda: ingest_document(request),
+            lambda data: IngestionResult(**data),
+            lambda result: result.model_dump(mode="json"),
+        )
+        document_s3_key = ingestion.s3_key
+
+        extraction = _run_stage(
+            "text_extraction", stages, run_dir,
+            lambda: extract_text(ingestion.s3_key, ingestion.s3_version_id),
+            lambda data: ExtractionResult(**data),
+            lambda result: result.model_dump(mode="json"),
+        )
+
+        detection = _run_stage(
+            "structure_detection", stages, run_dir,
+            lambda: detect_structure(extraction.blocks, document_s3_key=ingestion.s3_key),
+            lambda data: DetectionResult(**data),
+            lambda result: result.model_dump(mode="json"),
+        )
+
+        parsing = _run_stage(
+            "hierarchy_parsing", stages, run_dir,
+            lambda: parse_hierarchy(
+                elements=detection.elements,
+                country=request.country,
+                state=request.state,
+                version_year=request.version_year,
+                age_band=age_band,
+            ),
+            lambda data: ParseResult(**data),
+            lambda result: result.model_dump(mode="json"),
+        )
+        total_indicators = len(parsing.indicators)
+
+        def validate() -> Dict[str, Any]:
+            canonicals = [_indicator_to_canonical(indicator, event) for indicator in parsing.indicators]
+            existing_ids, confirm_existing = _existing_standard_keys(event)
+            results = validate_records(
+                canonicals, existing_ids=existing_ids, confirm_existing=confirm_existing
+            )
+            return {
+                "validated_records": [c for c, errors in zip(canonicals, results) if not errors],
+                "validation_errors": [
+                    {
+                        "standard_id": c.get("standard", {}).get("standard_id"),
+                        "errors": [{"field": e.field_path, "message": e.message, "type": e.error_type}
+                                   for e in errors],
+                    }
+                    for c, errors in zip(canonicals, results) if errors
+                ],
+            }
+
+        validation = _run_stage(
+            "validation", stages, run_dir, validate, lambda data: data, lambda result: result,
+        )
+        total_validated = len(validation["validated_records"])
+        has_errors = bool(validation["validation_errors"])
+
+        if persist:
+            from .persister import persist_canonical_records
+
+            persisted = _run_stage(
+                "data_persistence", stages, None,
+                lambda: persist_canonical_records(
+                    validation["validated_records"],
+                    isolate_failures=Config.PERSIST_TRANSACTION_MODE != "document",
+                ),
+                None, None,
+            )
+            records_persisted, persist_errors, change_counts = persisted
+            has_errors = has_errors or bool(persist_errors)
+            logger.info(
+                f"Persisted {records_persisted} records locally: {change_counts}, "
+                f"errors={len(persist_errors)}"
+            )
+
+        status = "partial" if has_errors else "completed"
+
+    except _StageFailed as e:
+        logger.error(f"Local pipeline run {run_id} stopped: {e}")
+        status = "failed"
+
+    result = PipelineRunResult(
+        run_id=run_id,
+        document_s3_key=document_s3_key,
+        country=request.country,
+        state=request.state,
+        version_year=request.version_year,
+        stages=stages,
+        total_indicators=total_indicators,
+        total_validated=total_validated,
+        total_embedded=0,
+        total_recommendations=0,
+        status=status,
+    )
+    logger.info(
+        "Local pipeline run finished: "
+        + ", ".join(f"{s.stage_name}={s.duration_ms}ms" for s in stages)
+        + f", status={status}"
+    )
+    return result
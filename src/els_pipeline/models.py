@@ -233,6 +233,7 @@ class Recommendation(BaseModel):
     age_band: str
     generation_model: str
     created_at: str
+    content_hash: Optional[str] = None
     
     @field_validator('country')
     @classmethod
@@ -266,10 +267,53 @@ class RecommendationResult(BaseModel):
     recommendations: List[Recommendation]
     status: str
     error: Optional[str] = None
+    missing_indicator_ids: List[str] = Field(default_factory=list)  # left unanswered by the model
+    cache_hits: int = Field(default=0, ge=0)  # indicators served from cache, not recommendations
+    llm_batches: int = Field(default=0, ge=0)
+
+
+# Persistence Models
+
+class BulkWriteResult(BaseModel):
+    """Throughput metrics for a batched database write."""
+    rows_written: int = Field(ge=0)
+    batches: int = Field(ge=0)
+    duration_ms: int = Field(ge=0)
+    rows_per_second: float = Field(ge=0.0)
+
+
+class IndicatorPage(BaseModel):
+    """One keyset-paginated page of indicator records."""
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None  # None on the last page
 
 
 # Pipeline Orchestration Models
 
+class LLMUsage(BaseModel):
+    """Bedrock usage summed over LLM calls."""
+    calls: int = Field(default=0, ge=0)
+    input_tokens: int = Field(default=0, ge=0)
+    output_tokens: int = Field(default=0, ge=0)
+    latency_ms: int = Field(default=0, ge=0)  # including retried attempts
+    retries: int = Field(default=0, ge=0)
+    model_ids: List[str] = Field(default_factory=list)  # distinct, in first-use order
+
+
+class StageMetrics(BaseModel):
+    """Resource usage of a pipeline stage, over all of its Lambda invocations."""
+    started_at: str  # ISO-8601 UTC start of the first invocation
+    wall_ms: int = Field(ge=0)  # first invocation start to last invocation end
+    cpu_ms: int = Field(ge=0)  # summed over invocations
+    peak_rss_bytes: int = Field(ge=0)  # highest of any invocation
+    input_bytes: int = Field(ge=0)  # read from S3
+    output_bytes: int = Field(ge=0)  # written to S3
+    records_in: int = Field(ge=0)
+    records_out: int = Field(ge=0)
+    invocations: int = Field(default=1, ge=1)
+    llm: LLMUsage = Field(default_factory=LLMUsage)
+
+
 class PipelineStageResult(BaseModel):
     """Result of a single pipeline stage."""
     stage_name: str
@@ -277,6 +321,38 @@ class PipelineStageResult(BaseModel):
     duration_ms: int = Field(ge=0)
     output_artifact: str
     error: Optional[str] = None
+    metrics: Optional[StageMetrics] = None
+
+
+class BatchManifestEntry(BaseModel):
+    """One document in a batch manifest."""
+    s3_key: str = Field(min_length=1)
+    country: str = Field(min_length=2, max_length=2, pattern="^[A-Z]{2}$")
+    state: str = Field(min_length=1)
+    version_year: int = Field(ge=2000, le=2100)  # the range start_pipeline accepts
+    size_bytes: Optional[int] = Field(default=None, ge=0)  # looked up in S3 when omitted
+    allow_existing: bool = False  # re-ingest a document that was already persisted
+
+
+class BatchDocumentStatus(BaseModel):
+    """Progress of one document within a batch run."""
+    s3_key: str
+    size_bytes: int = Field(ge=0)
+    status: str  # "pending", "running", "completed" or "failed"
+    run_id: Optional[str] = None
+    attempts: int = Field(default=0, ge=0)
+    error: Optional[str] = None
+
+
+class BatchProgress(BaseModel):
+    """Aggregate progress of a batch run."""
+    total: int = Field(ge=0)
+    pending: int = Field(ge=0)
+    running: int = Field(ge=0)
+    completed: int = Field(ge=0)
+    failed: int = Field(ge=0)
+    concurrency_limit: int = Field(ge=1)
+    documents: List[BatchDocumentStatus]
 
 
 class PipelineRunResult(BaseModel):
@@ -292,6 +368,7 @@ class PipelineRunResult(BaseModel):
     total_embedded: int = Field(ge=0)
     total_recommendations: int = Field(ge=0)
     status: str
+    llm: LLMUsage = Field(default_factory=LLMUsage)  # summed over the stages
     
     @field_validator('total_validated')
     @classmethod
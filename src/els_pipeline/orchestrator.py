@@ -10,17 +10,71 @@ import json
 import logging
 import time
 import uuid
+from collections import OrderedDict, deque
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, List, Union
 
 import boto3
 from botocore.exceptions import ClientError
 
-from .models import PipelineStageResult, PipelineRunResult
+from .models import (
+    PipelineStageResult,
+    PipelineRunResult,
+    BatchManifestEntry,
+    BatchDocumentStatus,
+    BatchProgress,
+    LLMUsage,
+)
 from .config import Config
+from .stage_metrics import combine_llm_usage
 
 logger = logging.getLogger(__name__)
 
+# Step Functions execution statuses that end a run
+_TERMINAL_EXECUTION_STATUSES = {"SUCCEEDED", "FAILED", "TIMED_OUT", "ABORTED"}
+
+# Error codes/causes of a call or run that hit a service quota
+_THROTTLE_MARKERS = (
+    "Throttling",
+    "TooManyRequests",
+    "ProvisionedThroughputExceeded",
+    "LimitExceeded",
+    "ServiceQuotaExceeded",
+)
+
+# Pipeline stages in order, with the ResultPath key holding each stage's Lambda result
+_STAGE_ORDER = (
+    ("ingestion", "ingestion_result"),
+    ("text_extraction", "extraction_result"),
+    ("structure_detection", "detection_result"),
+    ("hierarchy_parsing", "parsing_result"),
+    ("validation", "validation_result"),
+    ("data_persistence", "persistence_result"),
+)
+
+# State machine states that belong to each stage (see infra/template.yaml)
+_STATE_STAGES = {
+    state: stage
+    for stage, states in zip(_STAGE_ORDER, (
+        ("Ingestion",),
+        ("TextExtraction",),
+        ("StructureDetectionPlan", "StructureDetectionChunks", "StructureDetection"),
+        ("HierarchyParsingPlan", "HierarchyParsingChunks", "HierarchyParsing"),
+        ("Validation",),
+        ("DataPersistence",),
+    ))
+    for state in states
+}
+
+# PipelineRunResult totals, as named in stage payloads and pipeline_runs
+_RUN_TOTALS = ("total_indicators", "total_validated", "total_embedded", "total_recommendations")
+
+# LLMUsage fields stored as llm_<field> columns of pipeline_runs
+_RUN_LLM_FIELDS = ("calls", "input_tokens", "output_tokens", "latency_ms", "retries")
+
+# Status of runs that can no longer change (run_id -> PipelineRunResult), least recently used first
+_terminal_status_cache: "OrderedDict[str, PipelineRunResult]" = OrderedDict()
+
 # Lazy-initialized AWS clients (initialized on first use to avoid import-time boto3 calls)
 _stepfunctions_client = None
 _s3_client = None
@@ -47,7 +101,8 @@ def start_pipeline(
     country: str,
     state: str,
     version_year: int,
-    state_machine_arn: Optional[str] = None
+    state_machine_arn: Optional[str] = None,
+    allow_existing: bool = False
 ) -> str:
     """
     Start a new pipeline execution.
@@ -58,6 +113,9 @@ def start_pipeline(
         state: State/province/region code
         version_year: Version year of the standards document
         state_machine_arn: ARN of the Step Functions state machine (optional, uses config if not provided)
+        allow_existing: Skip validation's stored-key uniqueness check, to
+            re-ingest a document that was already persisted (e.g. after a
+            parser fix) so its changed records are updated
     
     Returns:
         run_id: Unique identifier for this pipeline run
@@ -94,6 +152,7 @@ def start_pipeline(
         "source_url": "",  # Optional: can be provided by caller in future
         "publishing_agency": "",  # Optional: can be provided by caller in future
         "filename": filename,
+        "allow_existing": allow_existing,
         "started_at": datetime.now(timezone.utc).isoformat()
     }
     
@@ -122,6 +181,207 @@ def start_pipeline(
         raise
 
 
+def quota_concurrency_limit(max_concurrent: Optional[int] = None) -> int:
+    """
+    Largest number of concurrent runs the account quotas allow.
+    
+    Each run holds at most one Textract job and issues Bedrock calls one
+    at a time, so concurrency is bounded by the Textract concurrent-job
+    quota and by the Bedrock requests-per-minute quota divided by the
+    per-run request rate (see the Config quota settings).
+    
+    Args:
+        max_concurrent: Caller's cap (defaults to Config.BATCH_MAX_CONCURRENT_RUNS)
+    
+    Returns:
+        Concurrency limit, at least 1
+    """
+    bedrock_limit = Config.BEDROCK_REQUESTS_PER_MINUTE // max(1, Config.BEDROCK_REQUESTS_PER_MINUTE_PER_RUN)
+    return max(1, min(
+        max_concurrent or Config.BATCH_MAX_CONCURRENT_RUNS,
+        Config.TEXTRACT_MAX_CONCURRENT_JOBS,
+        bedrock_limit,
+    ))
+
+
+def _is_throttle(text: str) -> bool:
+    return any(marker in text for marker in _THROTTLE_MARKERS)
+
+
+def _execution_arn(run_id: str, state_machine_arn: str) -> str:
+    """Execution ARN of a run (start_pipeline names executions after the run_id)."""
+    return f"{state_machine_arn.replace(':stateMachine:', ':execution:', 1)}:{run_id}"
+
+
+def _document_size(entry: BatchManifestEntry) -> int:
+    """Size of a manifest document in bytes, from the manifest or S3."""
+    if entry.size_bytes is not None:
+        return entry.size_bytes
+    try:
+        response = _get_s3_client().head_object(Bucket=Config.S3_RAW_BUCKET, Key=entry.s3_key)
+        return response["ContentLength"]
+    except ClientError as e:
+        logger.warning(f"Could not size {entry.s3_key}, scheduling it last: {e}")
+        return 0
+
+
+def _batch_progress(documents: List[BatchDocumentStatus], concurrency_limit: int) -> BatchProgress:
+    counts = {"pending": 0, "running": 0, "completed": 0, "failed": 0}
+    for doc in documents:
+        counts[doc.status] += 1
+    return BatchProgress(
+        total=len(documents),
+        concurrency_limit=concurrency_limit,
+        documents=[doc.model_copy() for doc in documents],
+        **counts,
+    )
+
+
+def run_pipeline_batch(
+    manifest: List[Union[BatchManifestEntry, Dict[str, Any]]],
+    max_concurrent: Optional[int] = None,
+    state_machine_arn: Optional[str] = None,
+    poll_interval: Optional[float] = None,
+    max_attempts: Optional[int] = None,
+    on_progress: Optional[Callable[[BatchProgress], None]] = None
+) -> BatchProgress:
+    """
+    Run the pipeline for every document in a manifest, a bounded number at a time.
+    
+    Documents start largest first, so the longest runs overlap the most and
+    the batch finishes soonest. At most quota_concurrency_limit(max_concurrent)
+    executions run at once. When a start or a run fails on a throttle, the
+    limit is halved and the document requeued (up to max_attempts starts).
+    After a full limit's worth of clean completions the limit grows back by
+    one, up to the quota limit; only runs started since the last back-off
+    count towards it.
+    
+    Blocks until every document has completed or failed, polling execution
+    status every poll_interval seconds.
+    
+    Args:
+        manifest: Documents to process, as BatchManifestEntry objects or dicts
+        max_concurrent: Concurrency cap (defaults to Config.BATCH_MAX_CONCURRENT_RUNS)
+        state_machine_arn: ARN of the Step Functions state machine (optional, uses config if not provided)
+        poll_interval: Seconds between status polls (defaults to Config.BATCH_POLL_INTERVAL_SECONDS)
+        max_attempts: Starts per document when runs fail on throttles (defaults to Config.BATCH_MAX_ATTEMPTS)
+        on_progress: Called with a BatchProgress snapshot after every poll
+    
+    Returns:
+        Final BatchProgress
+    
+    Raises:
+        ValueError: If a manifest entry is invalid
+    """
+    entries = [e if isinstance(e, BatchManifestEntry) else BatchManifestEntry(**e) for e in manifest]
+    state_machine_arn = state_machine_arn or Config.STEP_FUNCTIONS_STATE_MACHINE_ARN
+    poll_interval = Config.BATCH_POLL_INTERVAL_SECONDS if poll_interval is None else poll_interval
+    max_attempts = max_attempts or Config.BATCH_MAX_ATTEMPTS
+    ceiling = quota_concurrency_limit(max_concurrent)
+    limit = ceiling
+    
+    sized = [(entry, _document_size(entry)) for entry in entries]
+    sized.sort(key=lambda item: item[1], reverse=True)
+    documents = [
+        BatchDocumentStatus(s3_key=entry.s3_key, size_bytes=size, status="pending")
+        for entry, size in sized
+    ]
+    queue = deque(zip((entry for entry, _ in sized), documents))
+    running: Dict[str, tuple] = {}  # run_id -> (entry, doc, back-off epoch at start)
+    clean_completions = 0
+    epoch = 0
+    
+    logger.info(f"Starting batch of {len(documents)} documents, concurrency limit {limit}")
+    
+    def back_off(reason: str) -> None:
+        nonlocal limit, clean_completions, epoch
+        limit = max(1, limit // 2)
+        clean_completions = 0
+        epoch += 1
+        logger.warning(f"Throttled ({reason}); concurrency limit now {limit}")
+    
+    def requeue_or_fail(entry, doc, error: str) -> None:
+        if doc.attempts < max_attempts:
+            doc.status = "pending"
+            queue.appendleft((entry, doc))
+        else:
+            doc.status = "failed"
+            doc.error = error
+    
+    while queue or running:
+        while queue and len(running) < limit:
+            entry, doc = queue.popleft()
+            doc.attempts += 1
+            try:
+                run_id = start_pipeline(
+                    entry.s3_key, entry.country, entry.state, entry.version_year,
+                    state_machine_arn=state_machine_arn, allow_existing=entry.allow_existing
+                )
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code", "")
+                if _is_throttle(code):
+                    requeue_or_fail(entry, doc, str(e))
+                    back_off(code)
+                    break
+                doc.status = "failed"
+                doc.error = str(e)
+                continue
+            except ValueError as e:
+                # Rejected before starting; retrying cannot help
+                doc.status = "failed"
+                doc.error = str(e)
+                continue
+            doc.status = "running"
+            doc.run_id = run_id
+            doc.error = None
+            running[run_id] = (entry, doc, epoch)
+        
+        if running or queue:
+            time.sleep(poll_interval)
+        
+        for run_id, (entry, doc, started_epoch) in list(running.items()):
+            try:
+                execution = _get_stepfunctions_client().describe_execution(
+                    executionArn=_execution_arn(run_id, state_machine_arn)
+                )
+            except ClientError as e:
+                logger.warning(f"Could not poll {run_id}: {e}")
+                continue
+            status = execution["status"]
+            if status not in _TERMINAL_EXECUTION_STATUSES:
+                continue
+            
+            del running[run_id]
+            if status == "SUCCEEDED":
+                doc.status = "completed"
+                # Only runs started under the current limit show it is safe
+                if started_epoch == epoch:
+                    clean_completions += 1
+                if clean_completions >= limit and limit < ceiling:
+                    limit += 1
+                    clean_completions = 0
+                continue
+            
+            cause = f"{execution.get('error', '')}: {execution.get('cause', '')}".strip(": ") or status
+            if _is_throttle(cause):
+                requeue_or_fail(entry, doc, cause)
+                back_off(cause[:100])
+            else:
+                doc.status = "failed"
+                doc.error = cause
+        
+        progress = _batch_progress(documents, limit)
+        logger.info(
+            f"Batch progress: {progress.completed + progress.failed}/{progress.total} done "
+            f"(completed={progress.completed}, failed={progress.failed}, "
+            f"running={progress.running}, limit={limit})"
+        )
+        if on_progress:
+            on_progress(progress)
+    
+    return _batch_progress(documents, limit)
+
+
 def rerun_stage(
     run_id: str,
     stage_name: str,
@@ -243,167 +503,271 @@ def rerun_stage(
         raise
 
 
-def get_pipeline_status(run_id: str) -> PipelineRunResult:
+def _parse_run_id(run_id: str) -> tuple:
+    """
+    Split a start_pipeline run_id into (country, state, version_year).
+    
+    Raises:
+        ValueError: If run_id is not of the form pipeline-{country}-{state}-{year}-{suffix}
+    """
+    parts = run_id.split('-')
+    if len(parts) < 5 or parts[0] != 'pipeline':
+        raise ValueError(f"Invalid run_id format: {run_id}")
+    try:
+        return parts[1], parts[2], int(parts[3])
+    except ValueError:
+        raise ValueError(f"Invalid run_id format: {run_id}")
+
+
+def _cache_terminal_status(result: PipelineRunResult) -> None:
+    """Remember a finished run's status, evicting the least recently used beyond the cache size."""
+    _terminal_status_cache[result.run_id] = result
+    _terminal_status_cache.move_to_end(result.run_id)
+    while len(_terminal_status_cache) > Config.PIPELINE_STATUS_CACHE_SIZE:
+        _terminal_status_cache.popitem(last=False)
+
+
+def _pipeline_run_row(run_id: str) -> tuple:
+    """
+    Look up the run's pipeline_runs row.
+    
+    Returns:
+        Tuple of (row or None, lookup succeeded). A database failure is
+        logged and reported as an unsuccessful lookup rather than raised,
+        so status polling still works without database access.
+    """
+    try:
+        from .db import get_pipeline_run
+        return get_pipeline_run(run_id), True
+    except Exception as e:
+        logger.warning(f"Could not read pipeline_runs totals for {run_id}: {e}")
+        return None, False
+
+
+def _status_from_pipeline_run(
+    run_id: str,
+    country: str,
+    state: str,
+    version_year: int
+) -> PipelineRunResult:
+    """
+    Build the status of a run whose execution no longer exists.
+    
+    Step Functions drops executions some time after they close; the
+    pipeline_runs row written by the persistence stage (or by the failure
+    branch's recorder) still has the run's outcome, totals and LLM usage,
+    though not its per-stage results.
+    
+    Raises:
+        ValueError: If the run has no pipeline_runs row either
+    """
+    row, _ = _pipeline_run_row(run_id)
+    if not row:
+        raise ValueError(f"No pipeline execution found for run_id: {run_id}")
+    
+    result = PipelineRunResult(
+        run_id=run_id,
+        document_s3_key=row.get('document_s3_key') or '',
+        country=row.get('country') or country,
+        state=row.get('state') or state,
+        version_year=row.get('version_year') or version_year,
+        stages=[],
+        status=row.get('status') if row.get('status') in ('partial', 'failed') else 'completed',
+        **{key: row.get(key) or 0 for key in _RUN_TOTALS},
+        llm=LLMUsage(**{field: row.get(f'llm_{field}') or 0 for field in _RUN_LLM_FIELDS}),
+    )
+    _cache_terminal_status(result)
+    return result.model_copy(deep=True)
+
+
+def get_pipeline_status(
+    run_id: str,
+    state_machine_arn: Optional[str] = None
+) -> PipelineRunResult:
     """
     Get the current status of a pipeline run.
     
-    This function queries the Step Functions execution history and constructs
-    a PipelineRunResult with all stage results and totals.
+    The execution ARN is built from the state machine ARN and the run_id
+    (start_pipeline names executions after their run_id), so no execution
+    listing is needed. Stage results come from the full, paginated
+    execution history. Totals from the run's pipeline_runs row, written
+    by the persistence stage, take precedence over those reported in the
+    history. LLM usage is summed over the stages reported so far.
+    
+    Once the execution has succeeded its status cannot change, so the
+    result is cached in-process (up to Config.PIPELINE_STATUS_CACHE_SIZE
+    runs) and repeated polls make no AWS or database calls. A result is
+    only cached if the database lookup succeeded. Failed, timed-out and
+    aborted executions are not cached, since a redrive can resume them. Runs whose execution
+    Step Functions no longer has are reported from pipeline_runs alone,
+    without per-stage results.
     
     Args:
         run_id: Unique identifier of the pipeline run
+        state_machine_arn: ARN of the Step Functions state machine (optional, uses config if not provided)
     
     Returns:
-        PipelineRunResult: Current status of the pipeline run
+        PipelineRunResult: Current status of the pipeline run; status is
+        "running", "completed", "partial" or "failed"
     
     Raises:
-        ValueError: If run_id is invalid
+        ValueError: If run_id is invalid or the run has neither an execution
+            nor a pipeline_runs row
         ClientError: If execution status cannot be retrieved
     """
     if not run_id:
         raise ValueError("run_id is required")
     
+    country, state, version_year = _parse_run_id(run_id)
+    
+    cached = _terminal_status_cache.get(run_id)
+    if cached is not None:
+        _terminal_status_cache.move_to_end(run_id)
+        return cached.model_copy(deep=True)
+    
+    state_machine_arn = state_machine_arn or Config.STEP_FUNCTIONS_STATE_MACHINE_ARN
+    execution_arn = _execution_arn(run_id, state_machine_arn)
+    logger.info(f"Getting pipeline status for run_id={run_id}")
+    
     try:
-        # Parse country, state, and year from run_id
-        # Format: pipeline-{country}-{state}-{year}-{uuid}
-        parts = run_id.split('-')
-        if len(parts) < 5 or parts[0] != 'pipeline':
-            raise ValueError(f"Invalid run_id format: {run_id}")
-        
-        country = parts[1]
-        state = parts[2]
-        version_year = int(parts[3])
-        
-        # In a real implementation, we would:
-        # 1. Query Step Functions for execution status
-        # 2. Parse the execution history to extract stage results
-        # 3. Query the database for totals (indicators, validated, embedded, recommendations)
-        
-        # For now, return a placeholder result
-        # This would be replaced with actual Step Functions API calls
-        logger.info(f"Getting pipeline status for run_id={run_id}")
-        
-        # Placeholder: In production, query Step Functions and database
-        return PipelineRunResult(
-            run_id=run_id,
-            document_s3_key=f"{country}/{state}/{version_year}/placeholder.pdf",
-            country=country,
-            state=state,
-            version_year=version_year,
-            stages=[],
-            total_indicators=0,
-            total_validated=0,
-            total_embedded=0,
-            total_recommendations=0,
-            status="running"
-        )
-        
-    except (ValueError, IndexError) as e:
-        logger.error(f"Failed to parse run_id {run_id}: {e}")
-        raise ValueError(f"Invalid run_id format: {run_id}")
+        execution = _get_stepfunctions_client().describe_execution(executionArn=execution_arn)
     except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'ExecutionDoesNotExist':
+            return _status_from_pipeline_run(run_id, country, state, version_year)
         logger.error(f"Failed to get pipeline status for run {run_id}: {e}")
         raise
-
-
-def _get_execution_arn(run_id: str, state_machine_arn: str) -> Optional[str]:
-    """
-    Helper function to get the execution ARN for a given run_id.
     
-    Args:
-        run_id: Unique identifier of the pipeline run
-        state_machine_arn: ARN of the Step Functions state machine
+    execution_status = execution['status']
+    execution_input = json.loads(execution.get('input') or '{}')
+    history = _parse_execution_history(execution_arn, execution)
+    row, db_ok = _pipeline_run_row(run_id)
     
-    Returns:
-        Execution ARN if found, None otherwise
-    """
-    try:
-        # List executions for the state machine
-        response = _get_stepfunctions_client().list_executions(
-            stateMachineArn=state_machine_arn,
-            maxResults=100
-        )
-        
-        # Find the execution with matching name (run_id)
-        for execution in response.get('executions', []):
-            if execution['name'] == run_id:
-                return execution['executionArn']
-        
-        return None
-        
-    except ClientError as e:
-        logger.error(f"Failed to list executions: {e}")
-        return None
+    totals = {key: history[key] for key in _RUN_TOTALS}
+    if row:
+        totals.update({key: row[key] for key in _RUN_TOTALS if row.get(key) is not None})
+    
+    if execution_status == 'RUNNING':
+        status = 'running'
+    elif execution_status != 'SUCCEEDED':
+        status = 'failed'
+    elif (row and row.get('status') == 'partial') or any(
+        stage.status == 'partial' for stage in history['stages']
+    ):
+        status = 'partial'
+    else:
+        status = 'completed'
+    
+    result = PipelineRunResult(
+        run_id=run_id,
+        document_s3_key=execution_input.get('file_path', ''),
+        country=execution_input.get('country', country),
+        state=execution_input.get('state', state),
+        version_year=execution_input.get('version_year', version_year),
+        stages=history['stages'],
+        status=status,
+        llm=combine_llm_usage([stage.metrics.llm for stage in history['stages'] if stage.metrics]),
+        **totals,
+    )
+    
+    if execution_status == 'SUCCEEDED' and db_ok:
+        _cache_terminal_status(result)
+        return result.model_copy(deep=True)
+    return result
+
 
+def _history_events(execution_arn: str):
+    """Yield every event of an execution's history, following pagination."""
+    paginator = _get_stepfunctions_client().get_paginator('get_execution_history')
+    for page in paginator.paginate(executionArn=execution_arn, reverseOrder=False):
+        yield from page.get('events', [])
 
-def _parse_execution_history(execution_arn: str) -> Dict[str, Any]:
+
+def _parse_execution_history(execution_arn: str, execution: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Helper function to parse Step Functions execution history.
+    Build per-stage results and totals from an execution's full history.
+    
+    A stage spans all of its states (e.g. the plan, Map and reduce states
+    of structure detection): its duration runs from the first of them being
+    entered to the last being exited, and its result (with the resource
+    metrics the handler measured) is the Lambda payload stored at the
+    stage's ResultPath. A state that exited through a Catch carries the
+    error in $.error_info, which marks the stage failed even when its
+    ResultPath still holds the plan step's payload. A stage whose latest
+    state has not exited (e.g. its Map is still running after the plan
+    step) is "running", or "error" if the execution has ended.
     
     Args:
         execution_arn: ARN of the Step Functions execution
+        execution: describe_execution response for the same execution
     
     Returns:
-        Dictionary containing parsed stage results and totals
+        Dictionary with "stages" (PipelineStageResult list, in pipeline
+        order) and the run totals reported by the stages
+    
+    Raises:
+        ClientError: If the history cannot be read
     """
-    try:
-        # Get execution history
-        response = _get_stepfunctions_client().get_execution_history(
-            executionArn=execution_arn,
-            maxResults=1000,
-            reverseOrder=False
-        )
-        
-        stages = []
-        totals = {
-            'total_indicators': 0,
-            'total_validated': 0,
-            'total_embedded': 0,
-            'total_recommendations': 0
-        }
+    entered: Dict[str, datetime] = {}
+    exited: Dict[str, datetime] = {}
+    outputs: Dict[str, Dict[str, Any]] = {}
+    
+    for event in _history_events(execution_arn):
+        event_type = event.get('type', '')
+        if event_type.endswith('StateEntered'):
+            name = event.get('stateEnteredEventDetails', {}).get('name')
+            stage = _STATE_STAGES.get(name)
+            if stage:
+                entered.setdefault(stage[0], event['timestamp'])
+                # The stage is unfinished again until this state exits
+                exited.pop(stage[0], None)
+        elif event_type.endswith('StateExited'):
+            details = event.get('stateExitedEventDetails', {})
+            stage = _STATE_STAGES.get(details.get('name'))
+            if stage:
+                exited[stage[0]] = event['timestamp']
+                outputs[stage[0]] = json.loads(details.get('output') or '{}')
+    
+    finished = execution['status'] != 'RUNNING'
+    end_time = execution.get('stopDate')
+    stages = []
+    totals = {key: 0 for key in _RUN_TOTALS}
+    
+    for stage_name, result_key in _STAGE_ORDER:
+        if stage_name not in entered:
+            continue
+        output = outputs.get(stage_name, {})
+        payload = (output.get(result_key) or {}).get('Payload') or {}
+        error = payload.get('error')
         
-        # Parse events to extract stage results
-        # This is a simplified version - real implementation would be more complex
-        for event in response.get('events', []):
-            event_type = event.get('type')
-            
-            # Look for task state completed events
-            if event_type == 'TaskStateExited':
-                details = event.get('stateExitedEventDetails', {})
-                stage_name = details.get('name', 'unknown')
-                output = json.loads(details.get('output', '{}'))
-                
-                # Extract stage result
-                stage_result = PipelineStageResult(
-                    stage_name=stage_name,
-                    status=output.get('status', 'success'),
-                    duration_ms=output.get('duration_ms', 0),
-                    output_artifact=output.get('output_artifact', ''),
-                    error=output.get('error')
-                )
-                stages.append(stage_result)
-                
-                # Update totals if present in output
-                if 'total_indicators' in output:
-                    totals['total_indicators'] = output['total_indicators']
-                if 'total_validated' in output:
-                    totals['total_validated'] = output['total_validated']
-                if 'total_embedded' in output:
-                    totals['total_embedded'] = output['total_embedded']
-                if 'total_recommendations' in output:
-                    totals['total_recommendations'] = output['total_recommendations']
+        if stage_name not in exited:
+            status = 'error' if finished else 'running'
+            if finished:
+                error = execution.get('cause') or execution.get('error') or f"Execution {execution['status']}"
+            stop = end_time or datetime.now(timezone.utc)
+        elif 'error_info' in output:
+            # Exited through a Catch; a fanned-out stage's output may still
+            # carry its plan step's successful payload
+            status = 'error'
+            error_info = output['error_info']
+            error = error_info.get('Cause') or error_info.get('Error') or json.dumps(error_info)
+            stop = exited[stage_name]
+        else:
+            status = payload.get('status', 'success')
+            stop = exited[stage_name]
         
-        return {
-            'stages': stages,
-            **totals
-        }
+        stages.append(PipelineStageResult(
+            stage_name=stage_name,
+            status=status,
+            duration_ms=max(0, int((stop - entered[stage_name]).total_seconds() * 1000)),
+            output_artifact=payload.get('output_artifact', ''),
+            error=error,
+            metrics=payload.get('metrics'),
+        ))
         
-    except ClientError as e:
-        logger.error(f"Failed to get execution history: {e}")
-        return {
-            'stages': [],
-            'total_indicators': 0,
-            'total_validated': 0,
-            'total_embedded': 0,
-            'total_recommendations': 0
-        }
+        for key in _RUN_TOTALS:
+            if key in payload:
+                totals[key] = payload[key]
+        if 'records_persisted' in payload:
+            totals['total_validated'] = payload['records_persisted']
+    
+    return {'stages': stages, **totals}
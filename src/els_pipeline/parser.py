@@ -5,15 +5,18 @@ DetectedElement objects and produce NormalizedStandard objects. Replaces the
 previous rule-based prefix-matching and document-order strategies.
 """
 
+import hashlib
 import json
 import logging
 import re
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Sequence
 
 import boto3
 from botocore.config import Config as BotocoreConfig
 from botocore.exceptions import ClientError
 
+from . import stage_metrics
 from .models import (
     DetectedElement,
     HierarchyLevelEnum,
@@ -158,6 +161,7 @@ def call_bedrock_llm(prompt: str, max_retries: int = MAX_BEDROCK_RETRIES) -> str
 
     logger.info(f"Calling Bedrock with model: {Config.BEDROCK_PARSER_LLM_MODEL_ID}")
 
+    start = time.perf_counter()
     for attempt in range(max_retries + 1):
         try:
             response = bedrock.invoke_model(
@@ -165,12 +169,21 @@ def call_bedrock_llm(prompt: str, max_retries: int = MAX_BEDROCK_RETRIES) -> str
                 body=json.dumps(request_body),
             )
             response_body = json.loads(response["body"].read())
+            input_tokens, output_tokens = stage_metrics.bedrock_token_counts(response, response_body)
+            latency_ms = int((time.perf_counter() - start) * 1000)
+            stage_metrics.record_llm_call(
+                Config.BEDROCK_PARSER_LLM_MODEL_ID, input_tokens, output_tokens, latency_ms, attempt
+            )
 
             if "content" not in response_body or len(response_body["content"]) == 0:
                 raise ValueError("Unexpected response format from Bedrock: missing content")
 
             response_text = response_body["content"][0]["text"]
-            logger.info(f"Bedrock response received: {len(response_text)} characters")
+            logger.info(
+                f"Bedrock response received: {len(response_text)} characters, "
+                f"{input_tokens} input / {output_tokens} output tokens, "
+                f"{latency_ms} ms, {attempt} retries"
+            )
             return response_text
 
         except ClientError as e:
@@ -183,6 +196,10 @@ def call_bedrock_llm(prompt: str, max_retries: int = MAX_BEDROCK_RETRIES) -> str
                 logger.error(
                     f"Bedrock API call failed after {max_retries + 1} attempts: {e}"
                 )
+                stage_metrics.record_llm_call(
+                    Config.BEDROCK_PARSER_LLM_MODEL_ID, 0, 0,
+                    int((time.perf_counter() - start) * 1000), attempt
+                )
                 raise
 
     raise RuntimeError("Failed to get response from Bedrock after all retries")
@@ -342,6 +359,165 @@ def chunk_elements_by_domain(
     return chunks
 
 
+def plan_parse_chunks(elements: List[DetectedElement]) -> List[List[DetectedElement]]:
+    """
+    Split the parseable elements into the per-domain chunks sent to the LLM.
+
+    Elements flagged for review are left out.
+
+    Args:
+        elements: List of DetectedElement objects from the detector
+
+    Returns:
+        List of element groups, one per domain (empty if nothing is parseable)
+    """
+    return chunk_elements_by_domain([e for e in elements if not e.needs_review])
+
+
+def parse_chunk_hash(
+    chunk: List[DetectedElement],
+    country: str,
+    state: str,
+    version_year: int,
+    age_band: str,
+) -> str:
+    """
+    Hash a parse chunk for use as the name of its stored result.
+
+    Covers the parser model ID and the full prompt, so a stored result is
+    only reused for the same model seeing the same elements.
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256(Config.BEDROCK_PARSER_LLM_MODEL_ID.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(
+        build_parsing_prompt(chunk, country, state, version_year, age_band).encode("utf-8")
+    )
+    return digest.hexdigest()
+
+
+def parse_element_chunk(
+    chunk: List[DetectedElement],
+    country: str,
+    state: str,
+    version_year: int,
+    age_band: str,
+    chunk_idx: int = 0,
+    total_chunks: int = 1,
+) -> List[NormalizedStandard]:
+    """
+    Resolve the hierarchy of one domain chunk with a single LLM call.
+
+    Retries the call up to MAX_PARSE_RETRIES times when the response cannot
+    be parsed.
+
+    Args:
+        chunk: Elements of one domain (see plan_parse_chunks)
+        country: Two-letter country code
+        state: State abbreviation
+        version_year: Version year of the standards document
+        age_band: Default age band
+        chunk_idx: Index of the chunk (for logging)
+        total_chunks: Number of chunks (for logging)
+
+    Returns:
+        NormalizedStandard objects for the chunk's indicators
+
+    Raises:
+        ValueError: If no response could be parsed after all retries
+        ClientError: If Bedrock fails after retries
+    """
+    prompt = build_parsing_prompt(chunk, country, state, version_year, age_band)
+
+    with stage_metrics.track_llm_usage() as llm_usage:
+        for parse_attempt in range(MAX_PARSE_RETRIES + 1):
+            try:
+                response_text = call_bedrock_llm(prompt)
+                standards = parse_llm_response(
+                    response_text, country, state, version_year, age_band
+                )
+                logger.info(
+                    f"Chunk {chunk_idx + 1}/{total_chunks}: "
+                    f"parsed {len(standards)} standards "
+                    f"({llm_usage.input_tokens} input / {llm_usage.output_tokens} output tokens "
+                    f"over {llm_usage.calls} LLM calls)"
+                )
+                return standards
+            except (ValueError, json.JSONDecodeError) as e:
+                if parse_attempt < MAX_PARSE_RETRIES:
+                    logger.warning(
+                        f"Chunk {chunk_idx + 1} JSON parse failed "
+                        f"(attempt {parse_attempt + 1}/{MAX_PARSE_RETRIES + 1}): {e}"
+                    )
+                    continue
+                msg = (
+                    f"Chunk {chunk_idx + 1} failed after "
+                    f"{MAX_PARSE_RETRIES + 1} attempts: {e}"
+                )
+                logger.error(msg)
+                raise ValueError(msg) from e
+
+    raise ValueError(f"Chunk {chunk_idx + 1} produced no parseable response")
+
+
+def merge_parse_results(
+    chunk_standards: List[List[NormalizedStandard]],
+    chunk_errors: List[str],
+    elements: Sequence[DetectedElement] = (),
+) -> ParseResult:
+    """
+    Merge per-chunk standards into one ParseResult.
+
+    A domain split across non-adjacent sections of a document yields two
+    chunks that can return the same indicator; exact duplicates are kept
+    once. Standards that share a standard_id but differ are all kept, so
+    validation reports them.
+
+    Args:
+        chunk_standards: Standards parsed from each successful chunk, in order
+        chunk_errors: Error messages of the chunks that failed
+        elements: The detector's elements, reported as orphaned on error
+
+    Returns:
+        ParseResult: "error" if every chunk failed, "partial" if some did,
+        otherwise "success"
+    """
+    all_standards: List[NormalizedStandard] = []
+    seen = set()
+    for standards in chunk_standards:
+        for standard in standards:
+            key = json.dumps(standard.model_dump(mode="json"), sort_keys=True)
+            if key in seen:
+                continue
+            seen.add(key)
+            all_standards.append(standard)
+
+    if not all_standards and chunk_errors:
+        return ParseResult(
+            standards=[],
+            indicators=[],
+            orphaned_elements=list(elements),
+            status=StatusEnum.ERROR.value,
+            error="; ".join(chunk_errors),
+        )
+
+    status = StatusEnum.SUCCESS.value
+    error = None
+    if chunk_errors:
+        status = StatusEnum.PARTIAL.value
+        error = "; ".join(chunk_errors)
+
+    return ParseResult(
+        standards=all_standards,
+        indicators=[s.model_dump() for s in all_standards],
+        orphaned_elements=[],
+        status=status,
+        error=error,
+    )
+
+
 def parse_hierarchy(
     elements: List[DetectedElement],
     country: str,
@@ -367,10 +543,10 @@ def parse_hierarchy(
         ParseResult with standards, indicators, orphaned elements, and status
     """
     try:
-        # Filter out elements flagged for review
-        valid_elements = [e for e in elements if not e.needs_review]
+        # Split into per-domain chunks so each LLM call is small enough
+        chunks = plan_parse_chunks(elements)
 
-        if not valid_elements:
+        if not chunks:
             return ParseResult(
                 standards=[],
                 indicators=[],
@@ -379,72 +555,23 @@ def parse_hierarchy(
                 error="No valid elements to parse (all flagged for review or empty input)",
             )
 
-        # Split into per-domain chunks so each LLM call is small enough
-        chunks = chunk_elements_by_domain(valid_elements)
         logger.info(
-            f"Split {len(valid_elements)} elements into {len(chunks)} domain chunk(s)"
+            f"Split {sum(len(c) for c in chunks)} elements into {len(chunks)} domain chunk(s)"
         )
 
-        all_standards: List[NormalizedStandard] = []
+        chunk_standards: List[List[NormalizedStandard]] = []
         chunk_errors: List[str] = []
 
         for chunk_idx, chunk in enumerate(chunks):
-            prompt = build_parsing_prompt(
-                chunk, country, state, version_year, age_band
-            )
-
-            parsed = False
-            for parse_attempt in range(MAX_PARSE_RETRIES + 1):
-                try:
-                    response_text = call_bedrock_llm(prompt)
-                    standards = parse_llm_response(
-                        response_text, country, state, version_year, age_band
-                    )
-                    all_standards.extend(standards)
-                    parsed = True
-                    logger.info(
-                        f"Chunk {chunk_idx + 1}/{len(chunks)}: "
-                        f"parsed {len(standards)} standards"
-                    )
-                    break
-                except (ValueError, json.JSONDecodeError) as e:
-                    if parse_attempt < MAX_PARSE_RETRIES:
-                        logger.warning(
-                            f"Chunk {chunk_idx + 1} JSON parse failed "
-                            f"(attempt {parse_attempt + 1}/{MAX_PARSE_RETRIES + 1}): {e}"
-                        )
-                        continue
-                    else:
-                        msg = (
-                            f"Chunk {chunk_idx + 1} failed after "
-                            f"{MAX_PARSE_RETRIES + 1} attempts: {e}"
-                        )
-                        logger.error(msg)
-                        chunk_errors.append(msg)
-
-        # Determine overall status
-        if not all_standards and chunk_errors:
-            return ParseResult(
-                standards=[],
-                indicators=[],
-                orphaned_elements=elements,
-                status=StatusEnum.ERROR.value,
-                error="; ".join(chunk_errors),
-            )
-
-        status = StatusEnum.SUCCESS.value
-        error = None
-        if chunk_errors:
-            status = StatusEnum.PARTIAL.value
-            error = "; ".join(chunk_errors)
-
-        return ParseResult(
-            standards=all_standards,
-            indicators=[s.model_dump() for s in all_standards],
-            orphaned_elements=[],
-            status=status,
-            error=error,
-        )
+            try:
+                chunk_standards.append(parse_element_chunk(
+                    chunk, country, state, version_year, age_band,
+                    chunk_idx=chunk_idx, total_chunks=len(chunks),
+                ))
+            except ValueError as e:
+                chunk_errors.append(str(e))
+
+        return merge_parse_results(chunk_standards, chunk_errors, elements)
 
     except Exception as e:
         logger.error(f"Unexpected error in parse_hierarchy: {e}")
@@ -5,18 +5,32 @@ to Aurora PostgreSQL using the db module.
 """
 
 import logging
-from typing import Dict, Any, List, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 
 from botocore.exceptions import ClientError
 
 from .config import Config
-from .db import DatabaseConnection, persist_standard
+from .db import (
+    DatabaseConnection,
+    HierarchyResolver,
+    persist_standard,
+    persist_standards,
+    refresh_indicator_hierarchy,
+    UPSERT_INSERTED,
+    UPSERT_UPDATED,
+    UPSERT_UNCHANGED,
+)
 from .models import NormalizedStandard
 from .s3_helpers import load_json_from_s3
 from .validator import deserialize_record
 
 logger = logging.getLogger(__name__)
 
+# Transaction granularity for persist_records (see its docstring)
+PERSIST_TRANSACTION_MODES = ("record", "batch", "document")
+
 
 def _load_validation_summary(validation_key: str) -> Dict[str, Any]:
     """
@@ -39,9 +53,9 @@ def _load_validation_summary(validation_key: str) -> Dict[str, Any]:
     return summary
 
 
-def _persist_single_record(record_key: str) -> None:
+def _load_record(record_key: str) -> Tuple[NormalizedStandard, Dict[str, Any]]:
     """
-    Load a canonical JSON record from S3 and persist it to the database.
+    Load a canonical JSON record from S3.
 
     The age_band is taken from the parsed indicator data (standard.age_band),
     not from document-level metadata.
@@ -49,11 +63,20 @@ def _persist_single_record(record_key: str) -> None:
     Args:
         record_key: S3 key for the canonical JSON record
 
+    Returns:
+        Tuple of (standard, document metadata for persist_standard)
+
     Raises:
         ClientError: If S3 load fails
-        Exception: If database persistence fails
     """
     canonical_json = load_json_from_s3(Config.S3_PROCESSED_BUCKET, record_key)
+    return _record_from_canonical(canonical_json)
+
+
+def _record_from_canonical(
+    canonical_json: Dict[str, Any]
+) -> Tuple[NormalizedStandard, Dict[str, Any]]:
+    """Split a canonical JSON record into (standard, document metadata)."""
     standard = deserialize_record(canonical_json)
 
     document_meta = {
@@ -61,8 +84,26 @@ def _persist_single_record(record_key: str) -> None:
         "source_url": canonical_json["document"].get("source_url"),
         "publishing_agency": canonical_json["document"]["publishing_agency"],
     }
+    return standard, document_meta
+
 
-    persist_standard(standard, document_meta)
+def _persist_single_record(record_key: str, resolver: HierarchyResolver) -> str:
+    """
+    Load a canonical JSON record from S3 and persist it to the database.
+
+    Args:
+        record_key: S3 key for the canonical JSON record
+        resolver: Hierarchy id cache shared across the run
+
+    Returns:
+        Outcome for the indicator row: "inserted", "updated" or "unchanged"
+
+    Raises:
+        ClientError: If S3 load fails
+        Exception: If database persistence fails
+    """
+    standard, document_meta = _load_record(record_key)
+    return persist_standard(standard, document_meta, resolver)
 
 
 def _record_pipeline_run(
@@ -110,56 +151,315 @@ def _record_pipeline_run(
         logger.error(f"Failed to record pipeline run: {str(e)}")
 
 
-def persist_records(event: Dict[str, Any]) -> Tuple[int, List[Dict[str, Any]]]:
+def _view_rows_changed(indicator_changes: Dict[str, int], hierarchy_changes: Dict[str, int]) -> bool:
+    """
+    Whether a run changed rows the indicator_hierarchy view is built from.
+
+    The view also carries document, domain, strand and sub-strand names and
+    descriptions, so a renamed domain needs a refresh even when none of its
+    indicators changed.
+    """
+    return any(
+        changes[UPSERT_INSERTED] or changes[UPSERT_UPDATED]
+        for changes in (indicator_changes, hierarchy_changes)
+    )
+
+
+def _refresh_hierarchy_view() -> None:
+    """Refresh the flattened hierarchy view; a failure leaves it stale but does not fail the run."""
+    try:
+        refresh_indicator_hierarchy()
+    except Exception as e:
+        logger.error(f"Failed to refresh indicator hierarchy view: {str(e)}")
+
+
+def _persist_record_outcome(
+    record_key: str, resolver: HierarchyResolver
+) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Persist one record, converting failures into an error dict.
+
+    Returns:
+        Tuple of (indicator outcome or None, error dict or None)
+    """
+    try:
+        return _persist_single_record(record_key, resolver), None
+    except ClientError as e:
+        error_msg = f"Failed to load record from S3: {record_key}"
+        logger.error(f"{error_msg} - {str(e)}")
+        return None, {"record_key": record_key, "error": error_msg}
+    except Exception as e:
+        logger.error(f"Failed to persist record {record_key}: {str(e)}")
+        return None, {"record_key": record_key, "error": str(e)}
+
+
+def _persist_concurrently(
+    validated_keys: List[str], max_workers: int
+) -> Tuple[List[Tuple[Optional[str], Optional[Dict[str, Any]]]], List[HierarchyResolver]]:
+    """
+    Persist records from a pool of worker threads.
+
+    Each worker loads its record from S3 and writes it on its own pooled
+    connection, so S3 reads overlap with database writes. Workers keep a
+    thread-local HierarchyResolver because a resolver's pending ids belong
+    to one transaction at a time.
+
+    Args:
+        validated_keys: S3 keys of the records to persist
+        max_workers: Number of worker threads
+
+    Returns:
+        Tuple of (per-record results in input order, resolvers used)
+    """
+    local = threading.local()
+    resolvers: List[HierarchyResolver] = []
+    resolvers_lock = threading.Lock()
+
+    def worker(record_key: str):
+        resolver = getattr(local, "resolver", None)
+        if resolver is None:
+            resolver = local.resolver = HierarchyResolver()
+            with resolvers_lock:
+                resolvers.append(resolver)
+        return _persist_record_outcome(record_key, resolver)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(worker, validated_keys))
+    return results, resolvers
+
+
+def _load_records(
+    record_keys: List[str], max_workers: int
+) -> List[Tuple[str, Any, Optional[Dict[str, Any]]]]:
+    """
+    Load records from S3, concurrently when max_workers > 1.
+
+    Returns:
+        One (record_key, (standard, document_meta) or None, error dict or
+        None) tuple per key, in order
+    """
+    def load(record_key: str):
+        try:
+            return record_key, _load_record(record_key), None
+        except ClientError as e:
+            error_msg = f"Failed to load record from S3: {record_key}"
+            logger.error(f"{error_msg} - {str(e)}")
+            return record_key, None, {"record_key": record_key, "error": error_msg}
+        except Exception as e:
+            logger.error(f"Failed to load record {record_key}: {str(e)}")
+            return record_key, None, {"record_key": record_key, "error": str(e)}
+
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(load, record_keys))
+    return [load(key) for key in record_keys]
+
+
+def _persist_chunk(
+    record_keys: List[str],
+    resolver: HierarchyResolver,
+    isolate_failures: bool,
+    max_workers: int,
+) -> List[Tuple[Optional[str], Optional[Dict[str, Any]]]]:
+    """
+    Persist a chunk of records in one database transaction.
+
+    With isolate_failures, records that fail to load or write are reported
+    and the rest commit. Otherwise the chunk is all-or-nothing: any failure
+    leaves every record in it unwritten.
+
+    Returns:
+        One (indicator outcome or None, error dict or None) tuple per key
+    """
+    loaded = _load_records(record_keys, max_workers)
+    load_failed = [error for _, _, error in loaded if error is not None]
+    writable = [(key, item) for key, item, error in loaded if error is None]
+
+    if load_failed and not isolate_failures:
+        reason = f"Not persisted: {len(load_failed)} record(s) of the document failed to load"
+        return [
+            (None, error or {"record_key": key, "error": reason})
+            for key, _, error in loaded
+        ]
+
+    results: Dict[str, Tuple[Optional[str], Optional[Dict[str, Any]]]] = {
+        key: (None, error) for key, _, error in loaded if error is not None
+    }
+    try:
+        outcomes = persist_standards(
+            [item for _, item in writable], resolver, isolate_failures
+        )
+        for (key, _), (outcome, error) in zip(writable, outcomes):
+            if error is None:
+                results[key] = (outcome, None)
+            else:
+                results[key] = (None, {"record_key": key, "error": str(error)})
+    except Exception as e:
+        logger.error(f"Rolled back {len(writable)} records: {str(e)}")
+        for key, _ in writable:
+            results[key] = (None, {"record_key": key, "error": f"Transaction rolled back: {str(e)}"})
+
+    return [results[key] for key in record_keys]
+
+
+def persist_records(
+    event: Dict[str, Any],
+    max_workers: Optional[int] = None,
+    transaction_mode: Optional[str] = None,
+) -> Tuple[int, List[Dict[str, Any]], Dict[str, int]]:
     """
     Load validated records from S3 and persist them to the database.
 
+    Transaction modes (see PERSIST_TRANSACTION_MODES):
+        "record": one transaction per record; records are written by up to
+            max_workers concurrent workers
+        "batch": one transaction per Config.PERSIST_TRANSACTION_BATCH_SIZE
+            records, with a savepoint per record so bad rows are isolated
+        "document": the whole run's document in one all-or-nothing
+            transaction
+    In "batch" and "document" modes max_workers threads load each chunk
+    from S3 and a single connection writes it.
+
     Args:
         event: Lambda event containing output_artifact, country, state,
                version_year, and run_id
+        max_workers: Concurrent persistence workers (defaults to
+                     Config.PERSIST_MAX_WORKERS; capped at the pool size)
+        transaction_mode: One of PERSIST_TRANSACTION_MODES (defaults to
+                          Config.PERSIST_TRANSACTION_MODE)
 
     Returns:
-        Tuple of (records_persisted count, list of error dicts)
+        Tuple of (records_persisted count, list of error dicts, indicator
+        change counts keyed by "inserted", "updated" and "unchanged")
 
     Raises:
         ClientError: If the validation summary cannot be loaded from S3
+        ValueError: If transaction_mode is unknown, or is "batch" with a
+            Config.PERSIST_TRANSACTION_BATCH_SIZE below 1
     """
+    mode = transaction_mode or Config.PERSIST_TRANSACTION_MODE
+    if mode not in PERSIST_TRANSACTION_MODES:
+        raise ValueError(
+            f"Unknown persistence transaction mode {mode!r}; "
+            f"expected one of {PERSIST_TRANSACTION_MODES}"
+        )
+    if mode == "batch" and Config.PERSIST_TRANSACTION_BATCH_SIZE < 1:
+        raise ValueError(
+            f"PERSIST_TRANSACTION_BATCH_SIZE must be at least 1, "
+            f"got {Config.PERSIST_TRANSACTION_BATCH_SIZE}"
+        )
+
     validation_key = event["output_artifact"]
     validation_summary = _load_validation_summary(validation_key)
     validated_keys = validation_summary["validated_records"]
 
+    change_counts = {UPSERT_INSERTED: 0, UPSERT_UPDATED: 0, UPSERT_UNCHANGED: 0}
+
     if not validated_keys:
         logger.warning("No validated records to persist")
-        return 0, []
-
-    DatabaseConnection.initialize_pool()
+        return 0, [], change_counts
 
+    # The pool is created lazily and kept open for warm invocations
+    workers = min(
+        max_workers or Config.PERSIST_MAX_WORKERS,
+        DatabaseConnection.max_connections(),
+        len(validated_keys),
+    )
     records_persisted = 0
     persist_errors: List[Dict[str, Any]] = []
 
-    try:
-        for record_key in validated_keys:
-            try:
-                _persist_single_record(record_key)
-                records_persisted += 1
-            except ClientError as e:
-                error_msg = f"Failed to load record from S3: {record_key}"
-                logger.error(f"{error_msg} - {str(e)}")
-                persist_errors.append({"record_key": record_key, "error": error_msg})
-            except Exception as e:
-                logger.error(f"Failed to persist record {record_key}: {str(e)}")
-                persist_errors.append({"record_key": record_key, "error": str(e)})
-
-        _record_pipeline_run(
-            event, validation_key, len(validated_keys),
-            records_persisted, bool(persist_errors),
+    if mode != "record":
+        chunk_size = (
+            len(validated_keys) if mode == "document"
+            else Config.PERSIST_TRANSACTION_BATCH_SIZE
         )
-    finally:
-        DatabaseConnection.close_pool()
+        resolver = HierarchyResolver()
+        results = []
+        for start in range(0, len(validated_keys), chunk_size):
+            results.extend(_persist_chunk(
+                validated_keys[start:start + chunk_size], resolver,
+                isolate_failures=(mode == "batch"), max_workers=workers,
+            ))
+        resolvers = [resolver]
+    elif workers > 1:
+        results, resolvers = _persist_concurrently(validated_keys, workers)
+    else:
+        resolver = HierarchyResolver()
+        results = [_persist_record_outcome(key, resolver) for key in validated_keys]
+        resolvers = [resolver]
+
+    for outcome, error in results:
+        if error is not None:
+            persist_errors.append(error)
+        else:
+            change_counts[outcome] += 1
+            records_persisted += 1
+
+    _record_pipeline_run(
+        event, validation_key, len(validated_keys),
+        records_persisted, bool(persist_errors),
+    )
+
+    hierarchy_changes = {outcome: 0 for outcome in change_counts}
+    for resolver in resolvers:
+        for outcome, count in resolver.changes.items():
+            hierarchy_changes[outcome] += count
+
+    if _view_rows_changed(change_counts, hierarchy_changes):
+        _refresh_hierarchy_view()
 
     logger.info(
         f"Data persistence completed: "
-        f"persisted={records_persisted}, errors={len(persist_errors)}"
+        f"persisted={records_persisted}, errors={len(persist_errors)}, "
+        f"mode={mode}, workers={workers}, indicators={change_counts}, "
+        f"hierarchy={hierarchy_changes}, hierarchy_upserts_skipped="
+        f"{sum(r.statements_saved for r in resolvers)}"
     )
 
-    return records_persisted, persist_errors
+    return records_persisted, persist_errors, change_counts
+
+
+def persist_canonical_records(
+    records: List[Dict[str, Any]],
+    isolate_failures: bool = True,
+) -> Tuple[int, List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Persist in-memory canonical JSON records in one database transaction.
+
+    The S3-free counterpart of persist_records for callers that already hold
+    the validated records, such as the local pipeline runner. No
+    pipeline_runs row is written.
+
+    Args:
+        records: Validated canonical JSON records
+        isolate_failures: Roll back only failing records (savepoint per
+            record) instead of the whole transaction
+
+    Returns:
+        Tuple of (records_persisted count, list of error dicts keyed by
+        standard_id, indicator change counts keyed by "inserted", "updated"
+        and "unchanged")
+    """
+    change_counts = {UPSERT_INSERTED: 0, UPSERT_UPDATED: 0, UPSERT_UNCHANGED: 0}
+    if not records:
+        return 0, [], change_counts
+
+    items = [_record_from_canonical(record) for record in records]
+    persist_errors: List[Dict[str, Any]] = []
+    resolver = HierarchyResolver()
+    try:
+        outcomes = persist_standards(items, resolver, isolate_failures)
+    except Exception as e:
+        logger.error(f"Rolled back {len(items)} records: {str(e)}")
+        outcomes = [(None, f"Transaction rolled back: {str(e)}")] * len(items)
+
+    for (standard, _), (outcome, error) in zip(items, outcomes):
+        if error is not None:
+            persist_errors.append({"standard_id": standard.standard_id, "error": str(error)})
+        else:
+            change_counts[outcome] += 1
+
+    if _view_rows_changed(change_counts, resolver.changes):
+        _refresh_hierarchy_view()
+
+    return len(items) - len(persist_errors), persist_errors, change_counts
@@ -0,0 +1,538 @@
+"""Recommendation generation module for ELS pipeline.
+
+Generates parent and teacher activity recommendations for indicators using
+Amazon Bedrock (Claude). Many indicators are packed into each LLM call, with
+both audiences returned in one response, and calls run concurrently under a
+rate limit. Activities are cached by (indicator content hash, audience,
+age_band, model) so unchanged indicators are never regenerated.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import boto3
+from botocore.config import Config as BotocoreConfig
+from botocore.exceptions import ClientError
+
+from .config import Config
+from .db import get_cached_recommendations, get_indicators_by_country_state
+from .models import (
+    AudienceEnum,
+    Recommendation,
+    RecommendationRequest,
+    RecommendationResult,
+    StatusEnum,
+)
+
+logger = logging.getLogger(__name__)
+
+# Constants
+MAX_PARSE_RETRIES = 2
+MAX_BEDROCK_RETRIES = 2
+LLM_TEMPERATURE = 0.4
+LLM_MAX_TOKENS = 16000
+
+
+def compute_content_hash(indicator: Dict[str, Any]) -> str:
+    """
+    Hash the indicator content that a recommendation depends on.
+
+    Identifiers (standard_id, state, version_year) are excluded so the same
+    indicator text carried into a new document version hits the cache.
+
+    Args:
+        indicator: Indicator record from get_indicators_by_country_state
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    content = {
+        "domain": indicator.get("domain_name"),
+        "strand": indicator.get("strand_name"),
+        "sub_strand": indicator.get("sub_strand_name"),
+        "title": indicator.get("indicator_title"),
+        "description": indicator.get("description"),
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def generate_recommendation_id(indicator_id: str, audience: AudienceEnum, model: str) -> str:
+    """
+    Generate a deterministic recommendation ID.
+
+    The ID is derived from the (indicator_id, audience, generation_model)
+    upsert key, so it stays stable across regenerations and fits the
+    VARCHAR(100) column regardless of indicator id length.
+
+    Returns:
+        Recommendation ID in format: REC-{24 hex chars}
+    """
+    key = f"{indicator_id}|{audience.value}|{model}"
+    return f"REC-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:24]}"
+
+
+def build_recommendation_prompt(indicators: List[Dict[str, Any]], age_band: str) -> str:
+    """
+    Serialize a batch of indicators into a prompt asking for one parent and
+    one teacher activity per indicator.
+
+    Args:
+        indicators: Indicator records to generate activities for
+        age_band: Age band the activities should target
+
+    Returns:
+        Prompt string ready to send to Bedrock
+    """
+    serialized = [
+        {
+            "standard_id": ind["standard_id"],
+            "domain": ind.get("domain_name"),
+            "strand": ind.get("strand_name"),
+            "sub_strand": ind.get("sub_strand_name"),
+            "title": ind.get("indicator_title"),
+            "description": ind.get("description"),
+        }
+        for ind in indicators
+    ]
+    indicators_json = json.dumps(serialized, indent=2)
+
+    return f"""You are an early childhood education specialist. For each early learning indicator below, write one practical activity for a parent at home and one for a teacher in the classroom that helps a child in the age band "{age_band}" make progress on that indicator.
+
+Here are the indicators:
+
+{indicators_json}
+
+Return a JSON array with one object per indicator, using this exact schema:
+
+{{
+  "standard_id": "string (copied exactly from the input)",
+  "parent": "string (2-4 sentences describing an activity using everyday materials and routines)",
+  "teacher": "string (2-4 sentences describing a classroom activity, including grouping and materials)"
+}}
+
+Rules:
+- Every indicator must appear exactly once in the output.
+- Activities must be developmentally appropriate for the age band "{age_band}".
+- Return ONLY the JSON array, no other text."""
+
+
+def _get_bedrock_client():
+    """Create a Bedrock runtime client shared by all worker threads."""
+    return boto3.client(
+        "bedrock-runtime",
+        region_name=Config.AWS_REGION,
+        config=BotocoreConfig(
+            read_timeout=300,
+            connect_timeout=10,
+            retries={"max_attempts": 0},
+            max_pool_connections=max(10, Config.RECOMMENDATION_MAX_CONCURRENCY),
+        ),
+    )
+
+
+def call_bedrock_llm(prompt: str, bedrock=None, max_retries: int = MAX_BEDROCK_RETRIES) -> str:
+    """
+    Call Amazon Bedrock LLM with the given prompt.
+
+    Mirrors the implementation in parser.py, but accepts a shared client so
+    concurrent calls reuse one connection pool.
+
+    Args:
+        prompt: The prompt to send to the LLM
+        bedrock: Optional bedrock-runtime client
+        max_retries: Maximum number of retry attempts
+
+    Returns:
+        LLM response text
+
+    Raises:
+        ClientError: If Bedrock API call fails after all retries
+        ValueError: If response format is unexpected
+    """
+    bedrock = bedrock or _get_bedrock_client()
+
+    request_body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": LLM_MAX_TOKENS,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": LLM_TEMPERATURE,
+    }
+
+    for attempt in range(max_retries + 1):
+        try:
+            response = bedrock.invoke_model(
+                modelId=Config.BEDROCK_RECOMMENDATION_LLM_MODEL_ID,
+                body=json.dumps(request_body),
+            )
+            response_body = json.loads(response["body"].read())
+
+            if "content" not in response_body or len(response_body["content"]) == 0:
+                raise ValueError("Unexpected response format from Bedrock: missing content")
+
+            response_text = response_body["content"][0]["text"]
+            logger.info(f"Bedrock response received: {len(response_text)} characters")
+            return response_text
+
+        except ClientError as e:
+            if attempt < max_retries:
+                logger.warning(
+                    f"Bedrock API call failed (attempt {attempt + 1}/{max_retries + 1}): {e}"
+                )
+                continue
+            else:
+                logger.error(
+                    f"Bedrock API call failed after {max_retries + 1} attempts: {e}"
+                )
+                raise
+
+    raise RuntimeError("Failed to get response from Bedrock after all retries")
+
+
+def parse_recommendation_response(
+    response_text: str,
+    indicators: List[Dict[str, Any]],
+    content_hashes: Dict[str, str],
+    country: str,
+    state: str,
+    age_band: str,
+) -> List[Recommendation]:
+    """
+    Parse the LLM JSON response into Recommendation objects.
+
+    Args:
+        response_text: Raw text response from the LLM
+        indicators: The indicators that were sent in the prompt
+        content_hashes: Mapping of standard_id to content hash
+        country: Two-letter country code
+        state: State abbreviation
+        age_band: Age band the activities were generated for
+
+    Returns:
+        List of Recommendation objects (two per indicator answered)
+
+    Raises:
+        ValueError: If no valid JSON array can be extracted
+    """
+    text = response_text.strip()
+
+    # Strip markdown code fences
+    if text.startswith("```"):
+        lines = text.splitlines()
+        text = "\n".join(
+            line for line in lines[1:] if not line.strip().startswith("```")
+        ).strip()
+
+    # Find JSON array boundaries
+    start_idx = text.find("[")
+    end_idx = text.rfind("]")
+    if start_idx == -1 or end_idx == -1 or start_idx >= end_idx:
+        raise ValueError("No valid JSON array found in LLM response")
+
+    data = json.loads(text[start_idx : end_idx + 1])
+
+    expected_ids = {ind["standard_id"] for ind in indicators}
+    created_at = datetime.now(timezone.utc).isoformat()
+    recommendations: List[Recommendation] = []
+
+    for obj in data:
+        if not isinstance(obj, dict) or obj.get("standard_id") not in expected_ids:
+            logger.warning(f"Skipping unexpected item in LLM response: {obj}")
+            continue
+
+        standard_id = obj["standard_id"]
+        for audience in AudienceEnum:
+            activity = obj.get(audience.value)
+            if not isinstance(activity, str) or not activity.strip():
+                logger.warning(f"Missing {audience.value} activity for {standard_id}")
+                continue
+            recommendations.append(
+                Recommendation(
+                    recommendation_id=generate_recommendation_id(
+                        standard_id, audience, Config.BEDROCK_RECOMMENDATION_LLM_MODEL_ID
+                    ),
+                    indicator_id=standard_id,
+                    country=country,
+                    state=state,
+                    audience=audience,
+                    activity_description=activity.strip(),
+                    age_band=age_band,
+                    generation_model=Config.BEDROCK_RECOMMENDATION_LLM_MODEL_ID,
+                    created_at=created_at,
+                    content_hash=content_hashes[standard_id],
+                )
+            )
+
+    return recommendations
+
+
+class _RateLimiter:
+    """Spaces call start times so at most calls_per_minute calls begin per minute."""
+
+    def __init__(self, calls_per_minute: int):
+        self._interval = 60.0 / calls_per_minute if calls_per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until the next call slot is available."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self._interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _process_batch(
+    batch: List[Dict[str, Any]],
+    batch_idx: int,
+    total_batches: int,
+    request: RecommendationRequest,
+    content_hashes: Dict[str, str],
+    bedrock,
+    rate_limiter: _RateLimiter,
+) -> Tuple[List[Recommendation], List[str]]:
+    """
+    Generate recommendations for one batch of indicators.
+
+    Implements retry logic for JSON parsing failures. The model may answer
+    only part of a batch (an indicator left out, or an audience's activity
+    empty), so the indicators still missing an audience are re-requested
+    in follow-up calls; both count towards the MAX_PARSE_RETRIES retries.
+    Only indicators with every audience answered are returned.
+
+    Returns:
+        Tuple of (recommendations for this batch, standard_ids still
+        unanswered after all retries)
+
+    Raises:
+        ValueError: If the response cannot be parsed after all retries
+        ClientError: If Bedrock fails after all retries
+    """
+    pending = batch
+    answered: List[Recommendation] = []
+
+    for parse_attempt in range(MAX_PARSE_RETRIES + 1):
+        prompt = build_recommendation_prompt(pending, request.age_band)
+        rate_limiter.acquire()
+        response_text = call_bedrock_llm(prompt, bedrock)
+        try:
+            recs = parse_recommendation_response(
+                response_text, pending, content_hashes,
+                request.country, request.state, request.age_band,
+            )
+        except (ValueError, json.JSONDecodeError) as e:
+            if parse_attempt < MAX_PARSE_RETRIES:
+                logger.warning(
+                    f"Batch {batch_idx + 1} JSON parse failed "
+                    f"(attempt {parse_attempt + 1}/{MAX_PARSE_RETRIES + 1}): {e}"
+                )
+                continue
+            raise
+
+        by_indicator: Dict[str, List[Recommendation]] = {}
+        for rec in recs:
+            by_indicator.setdefault(rec.indicator_id, []).append(rec)
+        complete = {
+            standard_id for standard_id, indicator_recs in by_indicator.items()
+            if len(indicator_recs) == len(AudienceEnum)
+        }
+        answered.extend(rec for rec in recs if rec.indicator_id in complete)
+        pending = [ind for ind in pending if ind["standard_id"] not in complete]
+        if not pending:
+            break
+        logger.warning(
+            f"Batch {batch_idx + 1}: response left {len(pending)} indicators unanswered "
+            f"(attempt {parse_attempt + 1}/{MAX_PARSE_RETRIES + 1})"
+        )
+
+    logger.info(
+        f"Batch {batch_idx + 1}/{total_batches}: "
+        f"generated {len(answered)} recommendations for {len(batch) - len(pending)}/{len(batch)} indicators"
+    )
+    return answered, [ind["standard_id"] for ind in pending]
+
+
+def _select_indicators(
+    request: RecommendationRequest, version_year: Optional[int]
+) -> List[Dict[str, Any]]:
+    """Load the indicators a request targets from the database."""
+    indicators = get_indicators_by_country_state(
+        request.country, request.state,
+        domain_code=request.domain_code, strand_code=request.strand_code,
+        from_view=True,
+    )
+    if version_year is not None:
+        indicators = [i for i in indicators if i.get("version_year") == version_year]
+    if request.indicator_ids:
+        wanted = set(request.indicator_ids)
+        indicators = [i for i in indicators if i["standard_id"] in wanted]
+    return indicators
+
+
+def _recommendations_from_cache(
+    indicators: List[Dict[str, Any]],
+    content_hashes: Dict[str, str],
+    request: RecommendationRequest,
+) -> Tuple[List[Recommendation], List[Dict[str, Any]]]:
+    """
+    Split indicators into cached recommendations and indicators still to generate.
+
+    Returns:
+        Tuple of (recommendations served from cache, indicators needing generation)
+    """
+    model = Config.BEDROCK_RECOMMENDATION_LLM_MODEL_ID
+    try:
+        cache = get_cached_recommendations(
+            sorted(set(content_hashes.values())), request.age_band, model
+        )
+    except Exception as e:
+        logger.warning(f"Recommendation cache lookup failed, regenerating all: {e}")
+        cache = {}
+
+    created_at = datetime.now(timezone.utc).isoformat()
+    cached: List[Recommendation] = []
+    pending: List[Dict[str, Any]] = []
+
+    for ind in indicators:
+        content_hash = content_hashes[ind["standard_id"]]
+        activities = {a: cache.get((content_hash, a.value)) for a in AudienceEnum}
+        if not all(activities.values()):
+            pending.append(ind)
+            continue
+        for audience, activity in activities.items():
+            cached.append(
+                Recommendation(
+                    recommendation_id=generate_recommendation_id(ind["standard_id"], audience, model),
+                    indicator_id=ind["standard_id"],
+                    country=request.country,
+                    state=request.state,
+                    audience=audience,
+                    activity_description=activity,
+                    age_band=request.age_band,
+                    generation_model=model,
+                    created_at=created_at,
+                    content_hash=content_hash,
+                )
+            )
+
+    return cached, pending
+
+
+def generate_recommendations(
+    request: RecommendationRequest,
+    version_year: Optional[int] = None,
+    indicators: Optional[List[Dict[str, Any]]] = None,
+) -> RecommendationResult:
+    """
+    Generate parent and teacher recommendations for a set of indicators.
+
+    Indicators whose content hash already has activities for this age band
+    and model are served from the cache. The rest are packed
+    Config.RECOMMENDATION_BATCH_SIZE per Bedrock call, and calls run on up to
+    Config.RECOMMENDATION_MAX_CONCURRENCY threads, rate limited to
+    Config.RECOMMENDATION_CALLS_PER_MINUTE.
+
+    Args:
+        request: Which country/state (and optionally indicators, domain,
+                 strand) to generate for, and the target age band
+        version_year: Optional document version year filter
+        indicators: Pre-loaded indicator records; loaded from the database
+                    when omitted
+
+    Returns:
+        RecommendationResult with cached and newly generated recommendations
+    """
+    try:
+        if indicators is None:
+            indicators = _select_indicators(request, version_year)
+
+        if not indicators:
+            return RecommendationResult(
+                recommendations=[],
+                status=StatusEnum.ERROR.value,
+                error="No indicators found for recommendation request",
+            )
+
+        content_hashes = {ind["standard_id"]: compute_content_hash(ind) for ind in indicators}
+        cached, pending = _recommendations_from_cache(indicators, content_hashes, request)
+        logger.info(
+            f"Recommendation cache: {len(indicators) - len(pending)} hits, "
+            f"{len(pending)} indicators to generate"
+        )
+
+        batch_size = max(1, Config.RECOMMENDATION_BATCH_SIZE)
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+        generated: List[Recommendation] = []
+        missing_ids: List[str] = []
+        batch_errors: List[str] = []
+
+        if batches:
+            bedrock = _get_bedrock_client()
+            rate_limiter = _RateLimiter(Config.RECOMMENDATION_CALLS_PER_MINUTE)
+            workers = max(1, min(Config.RECOMMENDATION_MAX_CONCURRENCY, len(batches)))
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(
+                        _process_batch, batch, idx, len(batches),
+                        request, content_hashes, bedrock, rate_limiter,
+                    ): idx
+                    for idx, batch in enumerate(batches)
+                }
+                for future in as_completed(futures):
+                    idx = futures[future]
+                    try:
+                        batch_recs, batch_missing = future.result()
+                        generated.extend(batch_recs)
+                        missing_ids.extend(batch_missing)
+                    except Exception as e:
+                        msg = f"Batch {idx + 1} failed: {e}"
+                        logger.error(msg)
+                        batch_errors.append(msg)
+
+        recommendations = cached + generated
+
+        if missing_ids:
+            batch_errors.append(
+                f"No complete recommendations for {len(missing_ids)} indicators: "
+                f"{', '.join(sorted(missing_ids))}"
+            )
+
+        if not recommendations and batch_errors:
+            return RecommendationResult(
+                recommendations=[],
+                status=StatusEnum.ERROR.value,
+                error="; ".join(batch_errors),
+                llm_batches=len(batches),
+            )
+
+        status = StatusEnum.SUCCESS.value
+        error = None
+        if batch_errors:
+            status = StatusEnum.PARTIAL.value
+            error = "; ".join(batch_errors)
+
+        return RecommendationResult(
+            recommendations=recommendations,
+            status=status,
+            error=error,
+            missing_indicator_ids=sorted(missing_ids),
+            cache_hits=len({rec.indicator_id for rec in cached}),
+            llm_batches=len(batches),
+        )
+
+    except Exception as e:
+        logger.error(f"Unexpected error in generate_recommendations: {e}")
+        return RecommendationResult(
+            recommendations=[],
+            status=StatusEnum.ERROR.value,
+            error=f"Recommendation generation failed: {str(e)}",
+        )
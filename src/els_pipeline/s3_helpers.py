@@ -2,17 +2,20 @@
 
 import json
 import logging
-from typing import Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
 import boto3
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 
+from . import stage_metrics
 from .config import Config
 
 logger = logging.getLogger(__name__)
 
 
-def save_json_to_s3(data: dict, bucket: str, key: str) -> None:
+def save_json_to_s3(data: dict, bucket: str, key: str, s3_client: Any = None) -> None:
     """
     Save JSON data to S3.
 
@@ -20,12 +23,14 @@ def save_json_to_s3(data: dict, bucket: str, key: str) -> None:
         data: Dictionary to serialize and save
         bucket: S3 bucket name
         key: S3 object key
+        s3_client: Optional S3 client to reuse (one is created if omitted)
 
     Raises:
         ClientError: If S3 operation fails
     """
     try:
-        s3_client = boto3.client('s3', region_name=Config.AWS_REGION)
+        if s3_client is None:
+            s3_client = boto3.client('s3', region_name=Config.AWS_REGION)
         json_data = json.dumps(data, indent=2)
         
         logger.info(f"Saving JSON to S3: bucket={bucket}, key={key}, size={len(json_data)} bytes")
@@ -36,6 +41,7 @@ def save_json_to_s3(data: dict, bucket: str, key: str) -> None:
             Body=json_data,
             ContentType='application/json'
         )
+        stage_metrics.add_output_bytes(len(json_data))
         
         logger.info(f"Successfully saved JSON to S3: s3://{bucket}/{key}")
         
@@ -62,13 +68,63 @@ def save_json_to_s3(data: dict, bucket: str, key: str) -> None:
         raise
 
 
-def load_json_from_s3(bucket: str, key: str) -> Dict[str, Any]:
+def save_json_objects_to_s3(
+    objects: List[Tuple[dict, str]],
+    bucket: str,
+    max_workers: Optional[int] = None
+) -> Dict[str, ClientError]:
+    """
+    Save many JSON objects to S3 concurrently.
+
+    Uploads run on a bounded thread pool sharing one S3 client (clients are
+    thread-safe; creating them concurrently is not), so the total time
+    approaches the slowest batch of PUTs rather than their sum.
+
+    Args:
+        objects: (data, key) pairs to save
+        bucket: S3 bucket name
+        max_workers: Concurrent uploads (defaults to Config.S3_UPLOAD_MAX_WORKERS)
+
+    Returns:
+        Failed uploads as {key: ClientError}; empty when all succeeded
+    """
+    if not objects:
+        return {}
+
+    workers = min(max_workers or Config.S3_UPLOAD_MAX_WORKERS, len(objects))
+    s3_client = boto3.client(
+        's3',
+        region_name=Config.AWS_REGION,
+        config=BotoConfig(max_pool_connections=workers),
+    )
+
+    def upload(item: Tuple[dict, str]) -> Optional[ClientError]:
+        data, key = item
+        try:
+            save_json_to_s3(data, bucket, key, s3_client=s3_client)
+            return None
+        except ClientError as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = list(executor.map(upload, objects))
+
+    failures = {key: error for (_, key), error in zip(objects, outcomes) if error is not None}
+    logger.info(
+        f"Saved {len(objects) - len(failures)}/{len(objects)} JSON objects to "
+        f"s3://{bucket} with {workers} workers"
+    )
+    return failures
+
+
+def load_json_from_s3(bucket: str, key: str, s3_client: Any = None) -> Dict[str, Any]:
     """
     Load JSON data from S3.
 
     Args:
         bucket: S3 bucket name
         key: S3 object key
+        s3_client: Optional S3 client to reuse (one is created if omitted)
 
     Returns:
         Deserialized JSON as dictionary
@@ -77,12 +133,14 @@ def load_json_from_s3(bucket: str, key: str) -> Dict[str, Any]:
         ClientError: If S3 operation fails
     """
     try:
-        s3_client = boto3.client('s3', region_name=Config.AWS_REGION)
+        if s3_client is None:
+            s3_client = boto3.client('s3', region_name=Config.AWS_REGION)
         
         logger.info(f"Loading JSON from S3: bucket={bucket}, key={key}")
         
         response = s3_client.get_object(Bucket=bucket, Key=key)
         json_data = response['Body'].read()
+        stage_metrics.add_input_bytes(len(json_data))
         data = json.loads(json_data)
         
         logger.info(f"Successfully loaded JSON from S3: s3://{bucket}/{key}, size={len(json_data)} bytes")
@@ -122,6 +180,80 @@ def load_json_from_s3(bucket: str, key: str) -> Dict[str, Any]:
         raise
 
 
+# Error codes S3 answers a GetObject on a missing key with. The roles that
+# probe for optional objects hold s3:ListBucket, so a missing key is never
+# reported as AccessDenied; an AccessDenied is a real permission fault.
+_MISSING_OBJECT_ERROR_CODES = ('NoSuchKey', '404', 'NotFound')
+
+
+def is_missing_object_error(error: ClientError) -> bool:
+    """
+    Whether a GetObject error means an optional object does not exist.
+
+    Only for probes of objects that may legitimately be absent (chunk
+    results, checkpoints, metrics files). AccessDenied does not count.
+
+    Args:
+        error: ClientError raised by GetObject
+
+    Returns:
+        True if the object should be treated as missing
+    """
+    return error.response.get('Error', {}).get('Code') in _MISSING_OBJECT_ERROR_CODES
+
+
+def load_json_objects_from_s3(
+    keys: List[str],
+    bucket: str,
+    max_workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Load many JSON objects from S3 concurrently.
+
+    The counterpart of save_json_objects_to_s3: downloads run on a bounded
+    thread pool sharing one S3 client.
+
+    Args:
+        keys: S3 object keys to load
+        bucket: S3 bucket name
+        max_workers: Concurrent downloads (defaults to Config.S3_DOWNLOAD_MAX_WORKERS)
+
+    Returns:
+        {key: data} for every key that exists; missing keys are omitted
+
+    Raises:
+        ClientError: If a download fails for any reason other than a missing
+            key (see is_missing_object_error)
+    """
+    if not keys:
+        return {}
+
+    workers = min(max_workers or Config.S3_DOWNLOAD_MAX_WORKERS, len(keys))
+    s3_client = boto3.client(
+        's3',
+        region_name=Config.AWS_REGION,
+        config=BotoConfig(max_pool_connections=workers),
+    )
+
+    def download(key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return load_json_from_s3(bucket, key, s3_client=s3_client)
+        except ClientError as e:
+            if is_missing_object_error(e):
+                return None
+            raise
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = list(executor.map(download, keys))
+
+    loaded = {key: data for key, data in zip(keys, outcomes) if data is not None}
+    logger.info(
+        f"Loaded {len(loaded)}/{len(keys)} JSON objects from "
+        f"s3://{bucket} with {workers} workers"
+    )
+    return loaded
+
+
 def construct_intermediate_key(
     country: str,
     state: str,
@@ -150,3 +282,52 @@ def construct_intermediate_key(
     )
     
     return key
+
+
+def construct_checkpoint_prefix(
+    country: str,
+    state: str,
+    year: int,
+    stage: str,
+    run_id: str
+) -> str:
+    """
+    Construct the S3 prefix for a stage's partial-progress checkpoints.
+
+    Checkpoints sit beside the stage's intermediate output, so the stage's
+    existing IAM grants on intermediate/{stage}/* cover them.
+
+    Args:
+        country: Country code
+        state: State code
+        year: Version year
+        stage: Pipeline stage (e.g. detection)
+        run_id: Pipeline run ID
+
+    Returns:
+        S3 prefix following pattern: {country}/{state}/{year}/intermediate/{stage}/checkpoints/{run_id}/
+    """
+    return f"{country}/{state}/{year}/intermediate/{stage}/checkpoints/{run_id}/"
+
+
+def construct_chunk_prefix(
+    country: str,
+    state: str,
+    year: int,
+    stage: str,
+    run_id: str
+) -> str:
+    """
+    Construct the S3 prefix for a stage's chunk inputs and chunk manifest.
+
+    Args:
+        country: Country code
+        state: State code
+        year: Version year
+        stage: Pipeline stage (detection or parsing)
+        run_id: Pipeline run ID
+
+    Returns:
+        S3 prefix following pattern: {country}/{state}/{year}/intermediate/{stage}/chunks/{run_id}/
+    """
+    return f"{country}/{state}/{year}/intermediate/{stage}/chunks/{run_id}/"
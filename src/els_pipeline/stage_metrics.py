@@ -0,0 +1,277 @@
+"""
+Resource accounting for pipeline stages.
+
+measure_stage() measures one stage invocation: wall time, CPU time, peak
+RSS, bytes read from and written to S3, record counts and Bedrock usage.
+The S3 helpers and the Bedrock callers report their transfers and calls
+to the active measurement, so callers only set their record counts.
+Stages fanned out over a Map are measured per invocation and combined
+with combine_stage_metrics.
+"""
+
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .models import LLMUsage, StageMetrics
+
+
+class StageMeter:
+    """Counters of the stage invocation being measured; see measure_stage."""
+
+    def __init__(self):
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.records_in = 0
+        self.records_out = 0
+        self.llm = LLMUsage()
+        self.included: List[StageMetrics] = []
+        self.metrics: Optional[StageMetrics] = None  # set when the measurement ends
+        self._lock = threading.Lock()
+
+    def add_bytes(self, input_bytes: int = 0, output_bytes: int = 0) -> None:
+        with self._lock:
+            self.input_bytes += input_bytes
+            self.output_bytes += output_bytes
+
+
+# The measurement in progress. Lambda and the local runner run one stage
+# per process at a time, and S3 transfers are reported from worker
+# threads, so this is process-wide rather than a context variable.
+_active: Optional[StageMeter] = None
+
+# LLM usage collectors opened by track_llm_usage, innermost last
+_llm_trackers: List[LLMUsage] = []
+_llm_lock = threading.Lock()
+
+
+def add_input_bytes(count: int) -> None:
+    """Count bytes read from S3 towards the active measurement, if any."""
+    meter = _active
+    if meter is not None:
+        meter.add_bytes(input_bytes=count)
+
+
+def add_output_bytes(count: int) -> None:
+    """Count bytes written to S3 towards the active measurement, if any."""
+    meter = _active
+    if meter is not None:
+        meter.add_bytes(output_bytes=count)
+
+
+def set_record_counts(records_in: Optional[int] = None, records_out: Optional[int] = None) -> None:
+    """Set the record counts of the active measurement, if any."""
+    meter = _active
+    if meter is None:
+        return
+    if records_in is not None:
+        meter.records_in = records_in
+    if records_out is not None:
+        meter.records_out = records_out
+
+
+def include_metrics(parts: Sequence[StageMetrics]) -> None:
+    """
+    Fold other invocations of the same stage into the active measurement.
+
+    Used by the reduce step of a fanned-out stage to report the plan and
+    chunk invocations along with its own. Parts are combined in the order
+    given, ahead of the active invocation.
+    """
+    meter = _active
+    if meter is not None:
+        meter.included.extend(parts)
+
+
+def _add_llm_call(
+    usage: LLMUsage,
+    model_id: str,
+    input_tokens: int,
+    output_tokens: int,
+    latency_ms: int,
+    retries: int
+) -> None:
+    usage.calls += 1
+    usage.input_tokens += input_tokens
+    usage.output_tokens += output_tokens
+    usage.latency_ms += latency_ms
+    usage.retries += retries
+    if model_id not in usage.model_ids:
+        usage.model_ids.append(model_id)
+
+
+def record_llm_call(
+    model_id: str,
+    input_tokens: int,
+    output_tokens: int,
+    latency_ms: int,
+    retries: int = 0
+) -> None:
+    """
+    Count one LLM call towards the active measurement and open trackers.
+
+    Args:
+        model_id: Bedrock model the call went to
+        input_tokens: Prompt tokens billed (0 if the call failed)
+        output_tokens: Completion tokens billed (0 if the call failed)
+        latency_ms: Time spent in the call, including retried attempts
+        retries: Attempts retried before the call succeeded or gave up
+    """
+    with _llm_lock:
+        meter = _active
+        for usage in ([meter.llm] if meter is not None else []) + _llm_trackers:
+            _add_llm_call(usage, model_id, input_tokens, output_tokens, latency_ms, retries)
+
+
+@contextmanager
+def track_llm_usage() -> Iterator[LLMUsage]:
+    """
+    Collect the LLM calls made within the block, e.g. for one chunk.
+
+    Calls still count towards the active stage measurement as well.
+
+    Yields:
+        LLMUsage updated as calls are recorded
+    """
+    usage = LLMUsage()
+    with _llm_lock:
+        _llm_trackers.append(usage)
+    try:
+        yield usage
+    finally:
+        with _llm_lock:
+            _llm_trackers.remove(usage)
+
+
+def bedrock_token_counts(response: Dict[str, Any], response_body: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    Input and output token counts of a Bedrock InvokeModel call.
+
+    Read from the model's "usage" block, falling back to the token-count
+    headers Bedrock adds to every InvokeModel response.
+
+    Args:
+        response: invoke_model response
+        response_body: Parsed response body
+
+    Returns:
+        Tuple of (input_tokens, output_tokens); 0 where neither reports one
+    """
+    usage = response_body.get("usage") or {}
+    headers = (response.get("ResponseMetadata") or {}).get("HTTPHeaders") or {}
+    return (
+        int(usage.get("input_tokens") or headers.get("x-amzn-bedrock-input-token-count") or 0),
+        int(usage.get("output_tokens") or headers.get("x-amzn-bedrock-output-token-count") or 0),
+    )
+
+
+def combine_llm_usage(parts: Sequence[LLMUsage]) -> LLMUsage:
+    """Sum the LLM usage of several invocations, stages or chunks."""
+    combined = LLMUsage()
+    for part in parts:
+        combined.calls += part.calls
+        combined.input_tokens += part.input_tokens
+        combined.output_tokens += part.output_tokens
+        combined.latency_ms += part.latency_ms
+        combined.retries += part.retries
+        combined.model_ids += [m for m in part.model_ids if m not in combined.model_ids]
+    return combined
+
+
+def _reset_peak_rss() -> None:
+    """
+    Reset the process's peak RSS (VmHWM) so it covers only this measurement.
+
+    Warm Lambda containers reuse the process, so without a reset the peak
+    would include earlier invocations. Not every kernel allows it; the
+    peak then falls back to the process lifetime.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_bytes() -> int:
+    """Peak resident set size of the process, in bytes."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def measure_stage() -> Iterator[StageMeter]:
+    """
+    Measure one stage invocation.
+
+    On exit the meter's metrics hold the invocation's usage, combined with
+    any metrics passed to include_metrics meanwhile. CPU time is the whole
+    process's, so it includes worker threads.
+
+    Yields:
+        StageMeter whose metrics are set when the block exits
+    """
+    global _active
+    meter = StageMeter()
+    previous, _active = _active, meter
+    _reset_peak_rss()
+    started_at = datetime.now(timezone.utc)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield meter
+    finally:
+        _active = previous
+        own = StageMetrics(
+            started_at=started_at.isoformat(),
+            wall_ms=int((time.perf_counter() - wall_start) * 1000),
+            cpu_ms=int((time.process_time() - cpu_start) * 1000),
+            peak_rss_bytes=_peak_rss_bytes(),
+            input_bytes=meter.input_bytes,
+            output_bytes=meter.output_bytes,
+            records_in=meter.records_in,
+            records_out=meter.records_out,
+            llm=meter.llm,
+        )
+        meter.metrics = combine_stage_metrics(meter.included + [own])
+
+
+def combine_stage_metrics(parts: Sequence[StageMetrics]) -> StageMetrics:
+    """
+    Combine the metrics of a stage's invocations, e.g. plan, chunks and reduce.
+
+    Wall time spans the earliest start to the latest end, so concurrent
+    chunks count once. CPU time, bytes, invocations and LLM usage are
+    summed and the peak RSS is the highest. Records in are the first part's and records
+    out the last part's: the plan's input and the reduce step's output.
+
+    Args:
+        parts: Metrics of each invocation, in stage order (at least one)
+
+    Returns:
+        StageMetrics for the whole stage
+    """
+    starts = [datetime.fromisoformat(part.started_at) for part in parts]
+    end = max(start + timedelta(milliseconds=part.wall_ms) for start, part in zip(starts, parts))
+    return StageMetrics(
+        started_at=min(starts).isoformat(),
+        wall_ms=int((end - min(starts)).total_seconds() * 1000),
+        cpu_ms=sum(part.cpu_ms for part in parts),
+        peak_rss_bytes=max(part.peak_rss_bytes for part in parts),
+        input_bytes=sum(part.input_bytes for part in parts),
+        output_bytes=sum(part.output_bytes for part in parts),
+        records_in=parts[0].records_in,
+        records_out=parts[-1].records_out,
+        invocations=sum(part.invocations for part in parts),
+        llm=combine_llm_usage([part.llm for part in parts]),
+    )
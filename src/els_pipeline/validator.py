@@ -1,8 +1,11 @@
 """Validator for canonical JSON records."""
 
+import hashlib
 import json
+import math
+import re
 import boto3
-from typing import Dict, Any, Set, Optional
+from typing import Any, Callable, Container, Dict, Iterator, List, NamedTuple, Optional, Sequence, Set
 from .models import (
     NormalizedStandard,
     HierarchyLevel,
@@ -74,8 +77,8 @@ CANONICAL_SCHEMA = {
                     "required": ["code", "description"],
                     "properties": {
                         "code": {"type": "string", "minLength": 1},
-                        "name": {"oneOf": [{"type": "null"}, {"type": "string"}]},
                         "description": {"type": "string", "minLength": 1},
+                        "name": {"oneOf": [{"type": "null"}, {"type": "string"}]},
                     },
                 },
             },
@@ -85,279 +88,278 @@ CANONICAL_SCHEMA = {
 }
 
 
+class SchemaError(NamedTuple):
+    """Compact schema violation reported by the compiled validator."""
+    field_path: str
+    error_type: str
+    message: str
+
+
+# Messages that cannot be derived from the schema keywords alone
+_MESSAGE_OVERRIDES = {
+    ("country", "invalid_type"): "country must be a two-letter ISO 3166-1 alpha-2 code",
+    ("country", "format"): "country must be uppercase letters only",
+}
+
+
+class _CheckerBuilder:
+    """Emits the source of a flat checker function for a record schema."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.constants: Dict[str, Any] = {}
+
+    def emit(self, depth: int, line: str) -> None:
+        self.lines.append("    " * depth + line)
+
+    def const(self, value: Any) -> str:
+        """Bind a prebuilt value (error tuple, regex) into the checker's globals."""
+        name = f"_c{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    def error(self, path: str, error_type: str, default: str) -> str:
+        message = _MESSAGE_OVERRIDES.get((path, error_type), default)
+        return self.const(SchemaError(path, error_type, message))
+
+    def node(self, schema: Dict[str, Any], path: str, var: str, depth: int) -> None:
+        """Emit the checks for the value held in ``var``."""
+        nullable = False
+        if "oneOf" in schema:
+            branches = [b for b in schema["oneOf"] if b.get("type") != "null"]
+            nullable = len(branches) < len(schema["oneOf"])
+            schema = branches[0]
+        or_null = " or null" if nullable else ""
+        if nullable:
+            self.emit(depth, f"if {var} is not None:")
+            depth += 1
+
+        node_type = schema.get("type")
+        if node_type == "object":
+            type_error = self.error(path, "invalid_type", f"{path} must be an object{or_null}")
+            self.emit(depth, f"if not isinstance({var}, dict):")
+            self.emit(depth + 1, f"append({type_error})")
+            properties = schema.get("properties", {})
+            if properties:
+                self.emit(depth, "else:")
+                self.properties(schema, path, var, depth + 1)
+        elif node_type == "string":
+            min_length = schema.get("minLength", 0)
+            max_length = schema.get("maxLength")
+            qualifier = "non-empty " if min_length else ""
+            type_error = self.error(path, "invalid_type", f"{path} must be a {qualifier}string{or_null}")
+            condition = f"not isinstance({var}, str)"
+            if min_length:
+                condition += f" or len({var}) < {min_length}"
+            if max_length is not None:
+                condition += f" or len({var}) > {max_length}"
+            self.emit(depth, f"if {condition}:")
+            self.emit(depth + 1, f"append({type_error})")
+            if "pattern" in schema:
+                pattern = self.const(re.compile(schema["pattern"]))
+                format_error = self.error(path, "format", f"{path} must match {schema['pattern']}")
+                self.emit(depth, f"elif not {pattern}.match({var}):")
+                self.emit(depth + 1, f"append({format_error})")
+        elif node_type == "integer":
+            type_error = self.error(path, "invalid_type", f"{path} must be an integer{or_null}")
+            self.emit(depth, f"if not isinstance({var}, int):")
+            self.emit(depth + 1, f"append({type_error})")
+        else:
+            raise ValueError(f"Unsupported schema node at {path or '<root>'}: {schema}")
+
+    def properties(self, schema: Dict[str, Any], path: str, var: str, depth: int) -> None:
+        """Emit per-property checks of an object already known to be a dict."""
+        required = set(schema.get("required", []))
+        for name, child in schema.get("properties", {}).items():
+            child_path = f"{path}.{name}" if path else name
+            child_var = f"v{len(self.lines)}"
+            self.emit(depth, f"if {name!r} in {var}:")
+            self.emit(depth + 1, f"{child_var} = {var}[{name!r}]")
+            self.node(child, child_path, child_var, depth + 1)
+            if path and name in required:
+                missing = self.const(SchemaError(child_path, "missing_field", f"Missing required field: {child_path}"))
+                self.emit(depth, "else:")
+                self.emit(depth + 1, f"append({missing})")
+
+
+def compile_schema(schema: Dict[str, Any]) -> Callable[[Any], List[SchemaError]]:
+    """
+    Compile a canonical record schema into a reusable checker.
+
+    The schema is translated once into the source of a single Python function
+    of straight-line isinstance/len tests, with every error tuple prebuilt, so
+    checking a record involves no per-field calls or schema lookups. Required
+    top-level fields must also be truthy, and error paths and messages match
+    those the validator has always reported.
+
+    Args:
+        schema: Object schema using the keywords found in CANONICAL_SCHEMA
+
+    Returns:
+        Function mapping a record to its list of SchemaErrors (empty if valid)
+
+    Raises:
+        ValueError: If the schema uses an unsupported construct
+    """
+    builder = _CheckerBuilder()
+    not_object = builder.const(SchemaError("", "invalid_type", "record must be an object"))
+    builder.emit(0, "def check(record):")
+    builder.emit(1, "if not isinstance(record, dict):")
+    builder.emit(2, f"return [{not_object}]")
+    builder.emit(1, "errors = []")
+    builder.emit(1, "append = errors.append")
+    for name in schema.get("required", []):
+        missing = builder.const(SchemaError(name, "missing_field", f"Missing required field: {name}"))
+        empty = builder.const(SchemaError(name, "invalid_type", f"Field cannot be empty: {name}"))
+        builder.emit(1, f"if {name!r} not in record:")
+        builder.emit(2, f"append({missing})")
+        builder.emit(1, f"elif not record[{name!r}]:")
+        builder.emit(2, f"append({empty})")
+    builder.properties(schema, "", "record", 1)
+    builder.emit(1, "return errors")
+
+    source = "\n".join(builder.lines)
+    namespace = dict(builder.constants)
+    exec(compile(source, "<compiled canonical schema>", "exec"), namespace)
+    check = namespace["check"]
+    check.source = source
+    return check
+
+
+_check_canonical = compile_schema(CANONICAL_SCHEMA)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter for membership tests over large key sets.
+
+    Uses a bit array sized for ``capacity`` keys at the target false-positive
+    rate, with positions derived from one blake2b digest by double hashing.
+    It can report a key it never saw (false positive) but never misses one it
+    did, so positives must be confirmed where a wrong answer matters.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+
+    def _positions(self, key: Any) -> Iterator[int]:
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: Any) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self._count += 1
+
+    def __contains__(self, key: Any) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def __len__(self) -> int:
+        return self._count
+
+
+def _duplicate_error(key: tuple) -> SchemaError:
+    country, state, version_year, standard_id = key
+    return SchemaError(
+        "standard.standard_id",
+        "uniqueness",
+        f"Duplicate standard_id: {standard_id} for country={country}, state={state}, year={version_year}",
+    )
+
+
+def _uniqueness_error(
+    record: Dict[str, Any],
+    existing_ids: Container[tuple[str, str, int, str]],
+) -> Optional[SchemaError]:
+    """Duplicate-key error for a record already present in existing_ids."""
+    doc = record.get("document")
+    std = record.get("standard")
+    if not isinstance(doc, dict) or not isinstance(std, dict):
+        return None
+    country = record.get("country")
+    state = record.get("state")
+    version_year = doc.get("version_year")
+    standard_id = std.get("standard_id")
+
+    if country and state and version_year and standard_id:
+        key = (country, state, version_year, standard_id)
+        if key in existing_ids:
+            return _duplicate_error(key)
+    return None
+
+
 def _validate_schema(record: Dict[str, Any]) -> list[ValidationError]:
     """Validate record against JSON schema and collect all errors."""
-    errors = []
-    
-    # Check top-level required fields
-    for field in ["country", "state", "document", "standard", "metadata"]:
-        if field not in record:
-            errors.append(
-                ValidationError(
-                    field_path=field,
-                    message=f"Missing required field: {field}",
-                    error_type="missing_field",
-                )
-            )
-        elif not record[field]:
-            errors.append(
-                ValidationError(
-                    field_path=field,
-                    message=f"Field cannot be empty: {field}",
-                    error_type="invalid_type",
-                )
-            )
-    
-    # Validate country
-    if "country" in record:
-        if not isinstance(record["country"], str) or len(record["country"]) != 2:
-            errors.append(
-                ValidationError(
-                    field_path="country",
-                    message="country must be a two-letter ISO 3166-1 alpha-2 code",
-                    error_type="invalid_type",
-                )
-            )
-        elif not record["country"].isupper() or not record["country"].isalpha():
-            errors.append(
-                ValidationError(
-                    field_path="country",
-                    message="country must be uppercase letters only",
-                    error_type="format",
-                )
-            )
-    
-    # Validate state
-    if "state" in record:
-        if not isinstance(record["state"], str) or len(record["state"]) == 0:
-            errors.append(
-                ValidationError(
-                    field_path="state",
-                    message="state must be a non-empty string",
-                    error_type="invalid_type",
-                )
-            )
-    
-    # Validate document fields
-    if "document" in record and isinstance(record["document"], dict):
-        doc = record["document"]
-        for field in ["title", "version_year", "source_url", "age_band", "publishing_agency"]:
-            if field not in doc:
-                errors.append(
-                    ValidationError(
-                        field_path=f"document.{field}",
-                        message=f"Missing required field: document.{field}",
-                        error_type="missing_field",
-                    )
-                )
-            elif field == "version_year":
-                if not isinstance(doc[field], int):
-                    errors.append(
-                        ValidationError(
-                            field_path=f"document.{field}",
-                            message=f"document.{field} must be an integer",
-                            error_type="invalid_type",
-                        )
-                    )
-            else:
-                if not isinstance(doc[field], str) or len(doc[field]) == 0:
-                    errors.append(
-                        ValidationError(
-                            field_path=f"document.{field}",
-                            message=f"document.{field} must be a non-empty string",
-                            error_type="invalid_type",
-                        )
-                    )
-    elif "document" in record:
-        errors.append(
-            ValidationError(
-                field_path="document",
-                message="document must be an object",
-                error_type="invalid_type",
-            )
-        )
-    
-    # Validate standard fields
-    if "standard" in record and isinstance(record["standard"], dict):
-        std = record["standard"]
-        
-        # Check standard_id
-        if "standard_id" not in std:
-            errors.append(
-                ValidationError(
-                    field_path="standard.standard_id",
-                    message="Missing required field: standard.standard_id",
-                    error_type="missing_field",
-                )
-            )
-        elif not isinstance(std["standard_id"], str) or len(std["standard_id"]) == 0:
-            errors.append(
-                ValidationError(
-                    field_path="standard.standard_id",
-                    message="standard.standard_id must be a non-empty string",
-                    error_type="invalid_type",
-                )
-            )
-        
-        # Check domain
-        if "domain" not in std:
-            errors.append(
-                ValidationError(
-                    field_path="standard.domain",
-                    message="Missing required field: standard.domain",
-                    error_type="missing_field",
-                )
-            )
-        elif isinstance(std["domain"], dict):
-            for field in ["code", "name"]:
-                if field not in std["domain"]:
-                    errors.append(
-                        ValidationError(
-                            field_path=f"standard.domain.{field}",
-                            message=f"Missing required field: standard.domain.{field}",
-                            error_type="missing_field",
-                        )
-                    )
-                elif not isinstance(std["domain"][field], str) or len(std["domain"][field]) == 0:
-                    errors.append(
-                        ValidationError(
-                            field_path=f"standard.domain.{field}",
-                            message=f"standard.domain.{field} must be a non-empty string",
-                            error_type="invalid_type",
-                        )
-                    )
-        else:
-            errors.append(
-                ValidationError(
-                    field_path="standard.domain",
-                    message="standard.domain must be an object",
-                    error_type="invalid_type",
-                )
-            )
-        
-        # Check strand (optional)
-        if "strand" in std and std["strand"] is not None:
-            if isinstance(std["strand"], dict):
-                for field in ["code", "name"]:
-                    if field not in std["strand"]:
-                        errors.append(
-                            ValidationError(
-                                field_path=f"standard.strand.{field}",
-                                message=f"Missing required field: standard.strand.{field}",
-                                error_type="missing_field",
-                            )
-                        )
-                    elif not isinstance(std["strand"][field], str) or len(std["strand"][field]) == 0:
-                        errors.append(
-                            ValidationError(
-                                field_path=f"standard.strand.{field}",
-                                message=f"standard.strand.{field} must be a non-empty string",
-                                error_type="invalid_type",
-                            )
-                        )
-            else:
-                errors.append(
-                    ValidationError(
-                        field_path="standard.strand",
-                        message="standard.strand must be an object or null",
-                        error_type="invalid_type",
-                    )
-                )
-        
-        # Check sub_strand (optional)
-        if "sub_strand" in std and std["sub_strand"] is not None:
-            if isinstance(std["sub_strand"], dict):
-                for field in ["code", "name"]:
-                    if field not in std["sub_strand"]:
-                        errors.append(
-                            ValidationError(
-                                field_path=f"standard.sub_strand.{field}",
-                                message=f"Missing required field: standard.sub_strand.{field}",
-                                error_type="missing_field",
-                            )
-                        )
-                    elif not isinstance(std["sub_strand"][field], str) or len(std["sub_strand"][field]) == 0:
-                        errors.append(
-                            ValidationError(
-                                field_path=f"standard.sub_strand.{field}",
-                                message=f"standard.sub_strand.{field} must be a non-empty string",
-                                error_type="invalid_type",
-                            )
-                        )
-            else:
-                errors.append(
-                    ValidationError(
-                        field_path="standard.sub_strand",
-                        message="standard.sub_strand must be an object or null",
-                        error_type="invalid_type",
-                    )
-                )
-        
-        # Check indicator
-        if "indicator" not in std:
-            errors.append(
-                ValidationError(
-                    field_path="standard.indicator",
-                    message="Missing required field: standard.indicator",
-                    error_type="missing_field",
-                )
-            )
-        elif isinstance(std["indicator"], dict):
-            for field in ["code", "description"]:
-                if field not in std["indicator"]:
-                    errors.append(
-                        ValidationError(
-                            field_path=f"standard.indicator.{field}",
-                            message=f"Missing required field: standard.indicator.{field}",
-                            error_type="missing_field",
-                        )
-                    )
-                elif not isinstance(std["indicator"][field], str) or len(std["indicator"][field]) == 0:
-                    errors.append(
-                        ValidationError(
-                            field_path=f"standard.indicator.{field}",
-                            message=f"standard.indicator.{field} must be a non-empty string",
-                            error_type="invalid_type",
-                        )
-                    )
-            # Validate optional name field (title) — must be a string or null if present
-            if "name" in std["indicator"] and std["indicator"]["name"] is not None:
-                if not isinstance(std["indicator"]["name"], str):
-                    errors.append(
-                        ValidationError(
-                            field_path="standard.indicator.name",
-                            message="standard.indicator.name must be a string or null",
-                            error_type="invalid_type",
-                        )
-                    )
-        else:
-            errors.append(
-                ValidationError(
-                    field_path="standard.indicator",
-                    message="standard.indicator must be an object",
-                    error_type="invalid_type",
-                )
-            )
-    elif "standard" in record:
-        errors.append(
-            ValidationError(
-                field_path="standard",
-                message="standard must be an object",
-                error_type="invalid_type",
-            )
-        )
-    
-    # Validate metadata
-    if "metadata" in record and not isinstance(record["metadata"], dict):
-        errors.append(
-            ValidationError(
-                field_path="metadata",
-                message="metadata must be an object",
-                error_type="invalid_type",
-            )
+    return [
+        ValidationError(field_path=e.field_path, message=e.message, error_type=e.error_type)
+        for e in _check_canonical(record)
+    ]
+
+
+def validate_records(
+    records: Sequence[Dict[str, Any]],
+    existing_ids: Optional[Container[tuple[str, str, int, str]]] = None,
+    confirm_existing: Optional[Callable[[List[tuple]], Set[tuple]]] = None,
+) -> List[List[SchemaError]]:
+    """
+    Validate a batch of Canonical JSON records with the compiled schema.
+
+    Unlike validate_record, no Pydantic objects are built: each record's
+    errors are plain SchemaError tuples, and valid records get an empty list.
+    Records that pass the schema are also checked for uniqueness of their
+    (country, state, version_year, standard_id) key. A key repeating an
+    earlier record in the batch is a duplicate (the first occurrence is
+    kept), as is a key found in existing_ids. Both checks are O(1) per record.
+
+    Args:
+        records: Records to validate
+        existing_ids: Existing (country, state, version_year, standard_id) keys,
+            as a set or a BloomFilter
+        confirm_existing: Called once with every key found in existing_ids and
+            returning those that really exist; pass it when existing_ids can
+            report false positives (a BloomFilter)
+
+    Returns:
+        One error list per record, aligned with the input
+    """
+    check = _check_canonical
+    results = [check(record) for record in records]
+
+    seen: Dict[tuple, int] = {}
+    candidates = []  # (index, key) for keys found in existing_ids
+    for index, (record, errors) in enumerate(zip(records, results)):
+        if errors:
+            continue
+        key = (
+            record["country"],
+            record["state"],
+            record["document"]["version_year"],
+            record["standard"]["standard_id"],
         )
-    
-    return errors
+        first = seen.setdefault(key, index)
+        if first != index:
+            errors.append(SchemaError(
+                "standard.standard_id",
+                "uniqueness",
+                f"Duplicate standard_id: {key[3]} repeats record {first} of this batch",
+            ))
+        elif existing_ids is not None and key in existing_ids:
+            candidates.append((index, key))
+
+    if candidates:
+        confirmed = None
+        if confirm_existing is not None:
+            confirmed = confirm_existing([key for _, key in candidates])
+        for index, key in candidates:
+            if confirmed is None or key in confirmed:
+                results[index].append(_duplicate_error(key))
+    return results
 
 
 def validate_record(
@@ -374,31 +376,19 @@ def validate_record(
     Returns:
         ValidationResult with is_valid flag and any errors
     """
-    errors = []
-    
-    # Schema validation
-    schema_errors = _validate_schema(record)
-    errors.extend(schema_errors)
+    errors = _validate_schema(record)
     
     # Uniqueness check
-    if existing_ids is not None and "standard" in record and "document" in record and "country" in record and "state" in record:
-        std = record.get("standard", {})
-        doc = record.get("document", {})
-        country = record.get("country")
-        state = record.get("state")
-        version_year = doc.get("version_year")
-        standard_id = std.get("standard_id")
-        
-        if country and state and version_year and standard_id:
-            record_key = (country, state, version_year, standard_id)
-            if record_key in existing_ids:
-                errors.append(
-                    ValidationError(
-                        field_path="standard.standard_id",
-                        message=f"Duplicate standard_id: {standard_id} for country={country}, state={state}, year={version_year}",
-                        error_type="uniqueness",
-                    )
+    if existing_ids is not None:
+        duplicate = _uniqueness_error(record, existing_ids)
+        if duplicate is not None:
+            errors.append(
+                ValidationError(
+                    field_path=duplicate.field_path,
+                    message=duplicate.message,
+                    error_type=duplicate.error_type,
                 )
+            )
     
     is_valid = len(errors) == 0
     
@@ -0,0 +1,485 @@
+"""In-process vector index for offline similarity workloads.
+
+Bulk-loads the ``embeddings`` table into a contiguous float32 NumPy matrix
+with pre-normalized rows so batch analytics (cross-state crosswalks,
+near-duplicate detection across versions) can run cosine top-k searches
+without a Postgres round trip per query.
+
+Requires the optional ``analytics`` extra (``pip install els-pipeline[analytics]``).
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Filter attributes carried alongside each vector; keys match the filters
+# accepted by db.query_similar_indicators.
+ATTRIBUTE_NAMES = ("country", "state", "age_band", "domain", "version_year")
+
+# Supported compressed representations for the in-memory matrix
+QUANTIZATION_MODES = ("float16", "int8")
+# Candidates fetched per requested result before full-precision rescoring
+DEFAULT_OVERSAMPLE = 4
+
+VECTORS_FILE = "vectors.npy"
+IDS_FILE = "ids.npy"
+CODES_FILE = "codes.npy"
+SCALES_FILE = "scales.npy"
+MANIFEST_FILE = "manifest.json"
+
+_SCORE_BLOCK_ROWS = 65536
+_FETCH_BATCH_SIZE = 5000
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize each row of a matrix in place.
+
+    Zero-norm rows are left as zeros so they score 0 against every query.
+
+    Args:
+        matrix: 2-D float32 array
+
+    Returns:
+        The same array, normalized
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric scalar quantization of each row to int8 with a per-row scale.
+
+    Args:
+        matrix: 2-D float32 array
+
+    Returns:
+        Tuple of (int8 codes, float32 per-row scales) such that
+        ``codes * scales[:, None]`` approximates ``matrix``
+    """
+    max_abs = np.abs(matrix).max(axis=1)
+    scales = (max_abs / 127.0).astype(np.float32)
+    safe = np.where(scales == 0, 1.0, scales)
+    codes = np.clip(np.rint(matrix / safe[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the k highest-scoring columns of each row, ordered descending.
+
+    Args:
+        scores: 2-D array of shape (q, n)
+        k: Number of columns to keep (k <= n)
+
+    Returns:
+        Tuple of (column indices, scores), each of shape (q, k)
+    """
+    if k < scores.shape[1]:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(scores.shape[1]), (scores.shape[0], k))
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def _split_nulls(name: str, values: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Split an attribute column into a concretely typed array and a null mask.
+
+    Columns mixing None with values (e.g. an unset age_band) are object
+    arrays, which np.save can only pickle. The Nones are replaced by the
+    zero value of the other values' dtype and recorded in the mask.
+
+    Args:
+        name: Attribute name, for the error message
+        values: 1-D attribute array
+
+    Returns:
+        Tuple of (array without object dtype, boolean null mask or None
+        when the column has no Nones)
+
+    Raises:
+        ValueError: If the non-null values are not all of one type
+    """
+    if values.dtype != object:
+        return values, None
+
+    nulls = np.array([value is None for value in values], dtype=bool)
+    present = [value for value in values if value is not None]
+    if len({type(value) for value in present}) > 1:
+        raise ValueError(f"attribute '{name}' mixes value types and cannot be saved")
+    present = np.asarray(present)
+    filled = np.zeros(len(values), dtype=present.dtype)
+    filled[~nulls] = present
+    return filled, nulls
+
+
+class VectorIndex:
+    """Cosine-similarity index over indicator embeddings held in memory."""
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        vectors: np.ndarray,
+        attributes: Dict[str, np.ndarray],
+        normalized: bool = False,
+    ):
+        """
+        Create an index from already-materialized arrays.
+
+        Args:
+            ids: 1-D array of indicator ids, one per row
+            vectors: 2-D array of shape (n, dim)
+            attributes: Mapping of attribute name to a 1-D array of length n
+            normalized: Whether the rows of ``vectors`` are already unit length
+        """
+        if vectors.ndim != 2:
+            raise ValueError(f"vectors must be 2-D, got shape {vectors.shape}")
+        if len(ids) != vectors.shape[0]:
+            raise ValueError(
+                f"ids ({len(ids)}) and vectors ({vectors.shape[0]}) must have the same length"
+            )
+        for name, values in attributes.items():
+            if len(values) != len(ids):
+                raise ValueError(f"attribute '{name}' has {len(values)} values, expected {len(ids)}")
+
+        if not normalized:
+            vectors = _normalize_rows(np.array(vectors, dtype=np.float32, order="C"))
+
+        self.ids = ids
+        self.vectors = vectors
+        self.attributes = attributes
+        self.quantization: Optional[str] = None
+        self.codes: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    @property
+    def dimension(self) -> int:
+        """Dimension of the indexed vectors."""
+        return self.vectors.shape[1]
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "VectorIndex":
+        """
+        Build an index from embedding records.
+
+        Args:
+            records: Dicts with ``indicator_id``, ``vector`` and any of the
+                     filter attributes in ATTRIBUTE_NAMES
+
+        Returns:
+            A populated VectorIndex
+        """
+        ids: List[str] = []
+        rows: List[List[float]] = []
+        attrs: Dict[str, List[Any]] = {name: [] for name in ATTRIBUTE_NAMES}
+
+        for record in records:
+            ids.append(record["indicator_id"])
+            rows.append(record["vector"])
+            for name in ATTRIBUTE_NAMES:
+                attrs[name].append(record.get(name))
+
+        if not rows:
+            raise ValueError("Cannot build a vector index from zero records")
+
+        vectors = np.asarray(rows, dtype=np.float32)
+        attributes = {
+            name: np.asarray(values) for name, values in attrs.items()
+            if any(v is not None for v in values)
+        }
+        return cls(np.asarray(ids), vectors, attributes)
+
+    @classmethod
+    def load_from_db(cls, filters: Optional[Dict[str, Any]] = None) -> "VectorIndex":
+        """
+        Bulk-load the ``embeddings`` table into a new index.
+
+        Args:
+            filters: Optional filters limiting which embeddings are loaded
+                     (country, state, age_band, domain, version_year)
+
+        Returns:
+            A populated VectorIndex
+        """
+        from .db import DatabaseConnection, _build_similarity_filters
+
+        where_clause, params = _build_similarity_filters(filters or {})
+        query = f"""
+            SELECT
+                e.indicator_id,
+                e.vector::real[] AS vector,
+                d.country,
+                d.state,
+                d.age_band,
+                dom.code AS domain,
+                d.version_year
+            FROM embeddings e
+            JOIN indicators i ON e.indicator_id = i.standard_id
+            JOIN domains dom ON i.domain_id = dom.id
+            JOIN documents d ON dom.document_id = d.id
+            WHERE TRUE{where_clause}
+            ORDER BY e.indicator_id
+        """
+
+        records: List[Dict[str, Any]] = []
+        with DatabaseConnection.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                columns = [desc[0] for desc in cur.description]
+                while True:
+                    rows = cur.fetchmany(_FETCH_BATCH_SIZE)
+                    if not rows:
+                        break
+                    records.extend(dict(zip(columns, row)) for row in rows)
+
+        logger.info(f"Loaded {len(records)} embeddings into vector index")
+        return cls.from_records(records)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the matrix that search scans (codes when quantized)."""
+        if self.codes is None:
+            return self.vectors.nbytes
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def quantize(self, mode: str) -> "VectorIndex":
+        """
+        Add a compressed copy of the matrix used for candidate scoring.
+
+        Searches then score every row against the compressed codes, over-fetch
+        candidates, and rescore them against the full-precision rows. Loading a
+        saved quantized index with ``mmap=True`` keeps only the codes resident;
+        full-precision rows are paged in for the candidates alone.
+
+        Args:
+            mode: One of QUANTIZATION_MODES ("float16" or "int8")
+
+        Returns:
+            self, for chaining
+        """
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(
+                f"Unknown quantization mode '{mode}'. Must be one of: {', '.join(QUANTIZATION_MODES)}"
+            )
+
+        if mode == "float16":
+            self.codes = self.vectors.astype(np.float16)
+            self.scales = None
+        else:
+            self.codes, self.scales = quantize_int8(np.asarray(self.vectors))
+        self.quantization = mode
+
+        logger.info(
+            f"Quantized vector index to {mode}: "
+            f"{self.vectors.nbytes} -> {self.nbytes} bytes"
+        )
+        return self
+
+    def _quantized_scores(self, queries: np.ndarray, candidates: np.ndarray, full: bool) -> np.ndarray:
+        """Approximate scores of queries against candidate rows using the codes."""
+        scores = np.empty((queries.shape[0], candidates.size), dtype=np.float32)
+        for start in range(0, candidates.size, _SCORE_BLOCK_ROWS):
+            rows = slice(start, start + _SCORE_BLOCK_ROWS)
+            block_ids = rows if full else candidates[rows]
+            block = self.codes[block_ids].astype(np.float32)
+            block_scores = queries @ block.T
+            if self.scales is not None:
+                block_scores *= self.scales[block_ids]
+            scores[:, rows] = block_scores
+        return scores
+
+    def _mask(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Build a boolean row mask for the given attribute filters."""
+        if not filters:
+            return None
+
+        mask = np.ones(len(self), dtype=bool)
+        for name, value in filters.items():
+            if name not in self.attributes:
+                raise ValueError(
+                    f"Unknown filter attribute '{name}'. "
+                    f"Available: {', '.join(sorted(self.attributes))}"
+                )
+            mask &= self.attributes[name] == value
+        return mask
+
+    def _prepare_queries(self, vectors: Any) -> np.ndarray:
+        """Convert query vectors to a normalized 2-D float32 array."""
+        queries = np.array(vectors, dtype=np.float32, ndmin=2)
+        if queries.shape[1] != self.dimension:
+            raise ValueError(
+                f"Query dimension {queries.shape[1]} does not match index dimension {self.dimension}"
+            )
+        return _normalize_rows(queries)
+
+    def _row_result(self, row: int, score: float) -> Dict[str, Any]:
+        """Build a result dict for one index row."""
+        result = {"indicator_id": str(self.ids[row]), "similarity": float(score)}
+        for name, values in self.attributes.items():
+            value = values[row]
+            result[name] = value.item() if isinstance(value, np.generic) else value
+        return result
+
+    def search_batch(
+        self,
+        vectors: Any,
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+        oversample: int = DEFAULT_OVERSAMPLE,
+        rescore: bool = True,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Cosine top-k search for many query vectors at once.
+
+        Args:
+            vectors: Query vectors, shape (q, dim)
+            top_k: Number of results per query
+            filters: Optional attribute filters applied to every query
+            oversample: Candidates fetched per result when quantized
+            rescore: Whether quantized candidates are rescored against
+                     full-precision rows (otherwise approximate scores are returned)
+
+        Returns:
+            One list of result dicts (ordered by decreasing similarity) per query
+        """
+        queries = self._prepare_queries(vectors)
+        mask = self._mask(filters)
+
+        candidates = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        if candidates.size == 0 or top_k <= 0:
+            return [[] for _ in range(queries.shape[0])]
+
+        k = min(top_k, candidates.size)
+
+        if self.quantization is None:
+            matrix = self.vectors if mask is None else self.vectors[candidates]
+            top, top_scores = _top_k(queries @ matrix.T, k)
+        else:
+            coarse = self._quantized_scores(queries, candidates, full=mask is None)
+            fetch = min(k * oversample, candidates.size)
+            top, top_scores = _top_k(coarse, fetch)
+            if rescore:
+                rows = self.vectors[candidates[top].ravel()].reshape(top.shape + (self.dimension,))
+                exact = np.einsum("qd,qkd->qk", queries, rows)
+                order = np.argsort(-exact, axis=1, kind="stable")
+                top = np.take_along_axis(top, order, axis=1)
+                top_scores = np.take_along_axis(exact, order, axis=1)
+            top, top_scores = top[:, :k], top_scores[:, :k]
+
+        return [
+            [self._row_result(candidates[col], score) for col, score in zip(cols, row_scores)]
+            for cols, row_scores in zip(top, top_scores)
+        ]
+
+    def search(
+        self,
+        vector: Any,
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+        oversample: int = DEFAULT_OVERSAMPLE,
+        rescore: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        Cosine top-k search for a single query vector.
+
+        Args:
+            vector: The query vector
+            top_k: Number of results to return
+            filters: Optional attribute filters
+            oversample: Candidates fetched per result when quantized
+            rescore: Whether quantized candidates are rescored at full precision
+
+        Returns:
+            List of result dicts ordered by decreasing similarity
+        """
+        return self.search_batch(
+            [vector], top_k=top_k, filters=filters, oversample=oversample, rescore=rescore
+        )[0]
+
+    def save(self, directory: str) -> None:
+        """
+        Save the index as ``.npy`` files that can be memory-mapped.
+
+        Args:
+            directory: Target directory (created if missing)
+        """
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, VECTORS_FILE), np.ascontiguousarray(self.vectors))
+        np.save(os.path.join(directory, IDS_FILE), self.ids.astype(str))
+        null_masked = []
+        for name, values in self.attributes.items():
+            values, nulls = _split_nulls(name, values)
+            np.save(os.path.join(directory, f"attr_{name}.npy"), values)
+            if nulls is not None:
+                np.save(os.path.join(directory, f"attr_{name}_null.npy"), nulls)
+                null_masked.append(name)
+        if self.codes is not None:
+            np.save(os.path.join(directory, CODES_FILE), self.codes)
+        if self.scales is not None:
+            np.save(os.path.join(directory, SCALES_FILE), self.scales)
+
+        manifest = {
+            "count": len(self),
+            "dimension": self.dimension,
+            "attributes": sorted(self.attributes),
+            "null_masked_attributes": sorted(null_masked),
+            "quantization": self.quantization,
+        }
+        with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        logger.info(f"Saved vector index ({len(self)} x {self.dimension}) to {directory}")
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "VectorIndex":
+        """
+        Load an index saved with :meth:`save`.
+
+        With ``mmap=True`` the vector matrix is memory-mapped read-only, so
+        many worker processes share one copy through the page cache. Quantized
+        codes, when present, are loaded into memory.
+
+        Args:
+            directory: Directory containing the saved index
+            mmap: Whether to memory-map the vector matrix
+
+        Returns:
+            The loaded VectorIndex
+        """
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+
+        vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r" if mmap else None)
+        ids = np.load(os.path.join(directory, IDS_FILE))
+        attributes = {
+            name: np.load(os.path.join(directory, f"attr_{name}.npy"))
+            for name in manifest["attributes"]
+        }
+        for name in manifest.get("null_masked_attributes", []):
+            nulls = np.load(os.path.join(directory, f"attr_{name}_null.npy"))
+            values = attributes[name].astype(object)
+            values[nulls] = None
+            attributes[name] = values
+        index = cls(ids, vectors, attributes, normalized=True)
+
+        quantization = manifest.get("quantization")
+        if quantization:
+            index.quantization = quantization
+            index.codes = np.load(os.path.join(directory, CODES_FILE))
+            if quantization == "int8":
+                index.scales = np.load(os.path.join(directory, SCALES_FILE))
+        return index
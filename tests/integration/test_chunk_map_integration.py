@@ -0,0 +1,298 @@
+"""Integration tests for the plan/map/reduce detection and parsing handlers.
+
+The distributed Map is simulated by calling the chunk handler once per
+manifest entry, with the item shape produced by the state machine's
+ItemSelector. S3 is mocked with moto and Bedrock is patched.
+"""
+
+import json
+from unittest.mock import patch
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from els_pipeline.config import Config
+from els_pipeline.handlers import (
+    detection_chunk_handler,
+    detection_handler,
+    detection_plan_handler,
+    detection_reduce_handler,
+    parsing_chunk_handler,
+    parsing_plan_handler,
+    parsing_reduce_handler,
+)
+from els_pipeline.models import DetectedElement, HierarchyLevelEnum
+from els_pipeline.s3_helpers import load_json_from_s3, save_json_to_s3
+
+
+RUN = {"run_id": "run-map-1", "country": "US", "state": "CA", "version_year": 2021}
+EXTRACTION_KEY = "US/CA/2021/intermediate/extraction/run-map-1.json"
+DETECTION_KEY = "US/CA/2021/intermediate/detection/run-map-1.json"
+
+
+@pytest.fixture
+def processed_bucket():
+    with mock_aws():
+        s3 = boto3.client("s3", region_name=Config.AWS_REGION)
+        s3.create_bucket(Bucket=Config.S3_PROCESSED_BUCKET)
+        yield s3
+
+
+def _run_map(chunk_handler, plan, extra=None):
+    """Invoke the chunk handler for every manifest entry, as the Map state does."""
+    manifest = load_json_from_s3(Config.S3_PROCESSED_BUCKET, plan["manifest_key"])
+    return [chunk_handler({**RUN, **(extra or {}), "chunk": item}, None) for item in manifest]
+
+
+def _element(level, code, page, confidence=0.9):
+    return {
+        "level": level, "code": code, "title": f"Title {code}", "description": "",
+        "confidence": confidence, "source_page": page, "source_text": f"Title {code}",
+    }
+
+
+def _save_extraction(pages):
+    blocks = [
+        {"text": f"Page {page} " + "word " * 1800, "page_number": page, "block_type": "LINE",
+         "confidence": 0.99, "geometry": {}}
+        for page in range(1, pages + 1)
+    ]
+    save_json_to_s3({"blocks": blocks}, Config.S3_PROCESSED_BUCKET, EXTRACTION_KEY)
+
+
+def _detection_response(prompt):
+    """One indicator per page in the prompt; the domain repeats in every chunk."""
+    pages = sorted({int(line.split("]")[0][len("[Page "):])
+                    for line in prompt.splitlines() if line.startswith("[Page ")})
+    elements = [_element("domain", "LLD", 1)]
+    elements += [_element("indicator", f"LLD.{page}", page) for page in pages]
+    return json.dumps(elements)
+
+
+class TestDetectionMap:
+    """Tests for detection_plan_handler, detection_chunk_handler and detection_reduce_handler."""
+
+    @patch("els_pipeline.detector.call_bedrock_llm", side_effect=_detection_response)
+    def test_plan_map_reduce_matches_single_invocation(self, mock_llm, processed_bucket):
+        """Test that the fanned-out detection saves the same elements as detection_handler."""
+        _save_extraction(pages=4)
+
+        plan = detection_plan_handler({**RUN, "output_artifact": EXTRACTION_KEY}, None)
+        assert plan["status"] == "success"
+        assert plan["total_chunks"] == 4
+
+        chunk_responses = _run_map(detection_chunk_handler, plan)
+        assert [r["status"] for r in chunk_responses] == ["success"] * 4
+        assert mock_llm.call_count == 4
+
+        reduced = detection_reduce_handler(
+            {**RUN, "manifest_key": plan["manifest_key"], "output_artifact": EXTRACTION_KEY}, None
+        )
+        assert reduced["status"] == "success"
+        assert reduced["stage_name"] == "structure_detection"
+        assert reduced["output_artifact"] == DETECTION_KEY
+        mapped = load_json_from_s3(Config.S3_PROCESSED_BUCKET, DETECTION_KEY)["elements"]
+        # The domain detected in every chunk is kept once
+        assert [e["code"] for e in mapped] == ["LLD", "LLD.1", "LLD.2", "LLD.3", "LLD.4"]
+
+        # The stage's metrics cover the plan, every chunk and the reduce step
+        reduced = detection_reduce_handler({
+            **RUN, "manifest_key": plan["manifest_key"], "output_artifact": EXTRACTION_KEY,
+            "plan_metrics": plan["metrics"],
+        }, None)
+        metrics = reduced["metrics"]
+        assert metrics["invocations"] == 1 + 4 + 1
+        assert metrics["started_at"] == plan["metrics"]["started_at"]
+        assert (metrics["records_in"], metrics["records_out"]) == (4, 5)
+        assert metrics["cpu_ms"] >= sum(r["metrics"]["cpu_ms"] for r in chunk_responses)
+        assert metrics["input_bytes"] > sum(r["metrics"]["input_bytes"] for r in chunk_responses) > 0
+
+        # The single-Lambda path reuses the chunk results as checkpoints
+        single = detection_handler({**RUN, "output_artifact": EXTRACTION_KEY}, None)
+        assert single["status"] == "success"
+        assert mock_llm.call_count == 4
+        assert load_json_from_s3(Config.S3_PROCESSED_BUCKET, DETECTION_KEY)["elements"] == mapped
+
+    @patch("els_pipeline.detector.call_bedrock_llm", side_effect=_detection_response)
+    def test_retried_item_reuses_its_result(self, mock_llm, processed_bucket):
+        """Test that a redriven chunk item does not call Bedrock again."""
+        _save_extraction(pages=2)
+        plan = detection_plan_handler({**RUN, "output_artifact": EXTRACTION_KEY}, None)
+
+        first = _run_map(detection_chunk_handler, plan)
+        second = _run_map(detection_chunk_handler, plan)
+
+        assert [r["restored"] for r in first] == [False, False]
+        assert [r["restored"] for r in second] == [True, True]
+        assert [r["element_count"] for r in second] == [r["element_count"] for r in first]
+        assert mock_llm.call_count == 2
+
+    @patch("els_pipeline.detector.call_bedrock_llm", return_value="not json")
+    def test_unparseable_chunk_is_partial_and_skipped(self, mock_llm, processed_bucket):
+        """Test that an unparseable chunk reports partial and contributes no elements."""
+        _save_extraction(pages=1)
+        plan = detection_plan_handler({**RUN, "output_artifact": EXTRACTION_KEY}, None)
+
+        [response] = _run_map(detection_chunk_handler, plan)
+        reduced = detection_reduce_handler(
+            {**RUN, "manifest_key": plan["manifest_key"], "output_artifact": EXTRACTION_KEY}, None
+        )
+
+        assert response["status"] == "partial"
+        assert reduced["status"] == "success"
+        assert load_json_from_s3(Config.S3_PROCESSED_BUCKET, DETECTION_KEY)["elements"] == []
+
+    @patch("els_pipeline.detector.call_bedrock_llm", side_effect=_detection_response)
+    def test_chunk_without_result_or_failure_fails_the_reduce(self, mock_llm, processed_bucket):
+        """Test that a successful item whose result is unreadable fails the stage."""
+        _save_extraction(pages=2)
+        plan = detection_plan_handler({**RUN, "output_artifact": EXTRACTION_KEY}, None)
+        _run_map(detection_chunk_handler, plan)
+        manifest = load_json_from_s3(Config.S3_PROCESSED_BUCKET, plan["manifest_key"])
+        processed_bucket.delete_object(Bucket=Config.S3_PROCESSED_BUCKET, Key=manifest[0]["result_key"])
+
+        reduced = detection_reduce_handler(
+            {**RUN, "manifest_key": plan["manifest_key"], "output_artifact": EXTRACTION_KEY}, None
+        )
+
+        assert reduced["status"] == "error"
+        assert "Chunk 1 has neither a result nor a recorded failure" in reduced["error"]
+
+    def test_plan_without_blocks_is_an_error(self, processed_bucket):
+        """Test that planning an empty extraction fails like detect_structure."""
+        save_json_to_s3({"blocks": []}, Config.S3_PROCESSED_BUCKET, EXTRACTION_KEY)
+
+        plan = detection_plan_handler({**RUN, "output_artifact": EXTRACTION_KEY}, None)
+
+        assert plan["status"] == "error"
+        assert "No text blocks provided" in plan["error"]
+
+
+def _detected(level, code, needs_review=False):
+    return DetectedElement(
+        level=level, code=code, title=f"Title {code}", description="",
+        confidence=0.5 if needs_review else 0.9, source_page=1,
+        source_text=f"Title {code}", needs_review=needs_review,
+    ).model_dump()
+
+
+def _parse_response(prompt):
+    """Resolve each indicator in the prompt under the prompt's domain."""
+    elements = json.loads(prompt[prompt.index("["):prompt.index("]\n") + 1])
+    domain = next(e for e in elements if e["level"] == "domain")
+    if domain["code"] == "BAD":
+        return "not json"
+    return json.dumps([
+        {"domain_code": domain["code"], "domain_name": domain["title"], "domain_description": None,
+         "strand_code": None, "strand_name": None, "strand_description": None,
+         "sub_strand_code": None, "sub_strand_name": None, "sub_strand_description": None,
+         "indicator_code": e["code"], "indicator_name": e["title"], "indicator_description": None,
+         "age_band": None, "source_page": 1, "source_text": e["title"]}
+        for e in elements if e["level"] == "indicator"
+    ])
+
+
+class TestParsingMap:
+    """Tests for parsing_plan_handler, parsing_chunk_handler and parsing_reduce_handler."""
+
+    def _plan(self, elements):
+        save_json_to_s3({"elements": elements}, Config.S3_PROCESSED_BUCKET, DETECTION_KEY)
+        return parsing_plan_handler({**RUN, "output_artifact": DETECTION_KEY, "age_band": "PK"}, None)
+
+    def _reduce(self, plan):
+        return parsing_reduce_handler(
+            {**RUN, "manifest_key": plan["manifest_key"], "output_artifact": DETECTION_KEY}, None
+        )
+
+    @patch("els_pipeline.parser.call_bedrock_llm", side_effect=_parse_response)
+    def test_one_item_per_domain(self, mock_llm, processed_bucket):
+        """Test that each domain is parsed by its own item and merged in order."""
+        plan = self._plan([
+            _detected(HierarchyLevelEnum.DOMAIN, "LLD"),
+            _detected(HierarchyLevelEnum.INDICATOR, "LLD.1"),
+            _detected(HierarchyLevelEnum.INDICATOR, "LLD.2", needs_review=True),
+            _detected(HierarchyLevelEnum.DOMAIN, "MATH"),
+            _detected(HierarchyLevelEnum.INDICATOR, "MATH.1"),
+        ])
+        assert plan["total_chunks"] == 2
+
+        responses = _run_map(parsing_chunk_handler, plan, {"age_band": "PK"})
+        reduced = self._reduce(plan)
+
+        assert [r["standard_count"] for r in responses] == [1, 1]
+        assert reduced["status"] == "success"
+        assert reduced["total_indicators"] == 2
+        indicators = load_json_from_s3(Config.S3_PROCESSED_BUCKET, reduced["output_artifact"])["indicators"]
+        assert [i["standard_id"] for i in indicators] == ["US-CA-2021-LLD-LLD.1", "US-CA-2021-MATH-MATH.1"]
+
+    @patch("els_pipeline.parser.call_bedrock_llm", side_effect=_parse_response)
+    def test_failed_chunk_makes_the_result_partial(self, mock_llm, processed_bucket):
+        """Test that a chunk whose response never parses is reported, not fatal."""
+        plan = self._plan([
+            _detected(HierarchyLevelEnum.DOMAIN, "LLD"),
+            _detected(HierarchyLevelEnum.INDICATOR, "LLD.1"),
+            _detected(HierarchyLevelEnum.DOMAIN, "BAD"),
+            _detected(HierarchyLevelEnum.INDICATOR, "BAD.1"),
+        ])
+
+        responses = _run_map(parsing_chunk_handler, plan, {"age_band": "PK"})
+        reduced = self._reduce(plan)
+
+        assert [r["status"] for r in responses] == ["success", "partial"]
+        assert reduced["status"] == "success"
+        assert reduced["total_indicators"] == 1
+
+    @patch("els_pipeline.parser.call_bedrock_llm", side_effect=_parse_response)
+    def test_result_probe_denied_fails_the_chunk(self, mock_llm, processed_bucket):
+        """Test that a 403 on the earlier-result probe is an error, not a missing result.
+
+        moto ignores IAM, so the AccessDenied is injected.
+        """
+        plan = self._plan([
+            _detected(HierarchyLevelEnum.DOMAIN, "LLD"),
+            _detected(HierarchyLevelEnum.INDICATOR, "LLD.1"),
+        ])
+        manifest = load_json_from_s3(Config.S3_PROCESSED_BUCKET, plan["manifest_key"])
+        real_get_object = boto3.client("s3", region_name=Config.AWS_REGION).get_object
+
+        def get_object(**kwargs):
+            if kwargs["Key"] == manifest[0]["result_key"]:
+                raise ClientError({"Error": {"Code": "AccessDenied", "Message": "Access Denied"},
+                                   "ResponseMetadata": {"HTTPStatusCode": 403}}, "GetObject")
+            return real_get_object(**kwargs)
+
+        s3 = boto3.client("s3", region_name=Config.AWS_REGION)
+        s3.get_object = get_object
+        with patch("els_pipeline.s3_helpers.boto3.client", return_value=s3):
+            [response] = _run_map(parsing_chunk_handler, plan, {"age_band": "PK"})
+
+        assert response["status"] == "error"
+        assert "Access denied" in response["error"]
+        mock_llm.assert_not_called()
+
+    @patch("els_pipeline.parser.call_bedrock_llm", side_effect=_parse_response)
+    def test_chunk_without_result_or_failure_fails_the_reduce(self, mock_llm, processed_bucket):
+        """Test that a chunk result lost after the Map fails the stage instead of being dropped."""
+        plan = self._plan([
+            _detected(HierarchyLevelEnum.DOMAIN, "LLD"),
+            _detected(HierarchyLevelEnum.INDICATOR, "LLD.1"),
+            _detected(HierarchyLevelEnum.DOMAIN, "MATH"),
+            _detected(HierarchyLevelEnum.INDICATOR, "MATH.1"),
+        ])
+        _run_map(parsing_chunk_handler, plan, {"age_band": "PK"})
+        manifest = load_json_from_s3(Config.S3_PROCESSED_BUCKET, plan["manifest_key"])
+        processed_bucket.delete_object(Bucket=Config.S3_PROCESSED_BUCKET, Key=manifest[1]["result_key"])
+
+        reduced = self._reduce(plan)
+
+        assert reduced["status"] == "error"
+        assert "Chunk 2 has neither a result nor a recorded failure" in reduced["error"]
+
+    def test_plan_with_only_review_elements_is_an_error(self, processed_bucket):
+        """Test that planning fails when every element needs review."""
+        plan = self._plan([_detected(HierarchyLevelEnum.DOMAIN, "LLD", needs_review=True)])
+
+        assert plan["status"] == "error"
+        assert "No valid elements to parse" in plan["error"]
@@ -25,6 +25,12 @@ from els_pipeline.models import (
 )
 
 
+@pytest.fixture(autouse=True)
+def plain_statements():
+    """Send statement text directly so tests can assert on the SQL."""
+    with patch('els_pipeline.db.Config.DB_PREPARED_STATEMENTS', False):
+        yield
+
 @pytest.fixture
 def mock_db_connection():
     """Create a mock database connection for integration tests."""
@@ -75,7 +81,7 @@ class TestDatabaseConnectionPooling:
     
     def test_connection_pool_initialization(self):
         """Test that connection pool initializes correctly."""
-        with patch('els_pipeline.db.SimpleConnectionPool') as mock_pool:
+        with patch('els_pipeline.db.ThreadedConnectionPool') as mock_pool:
             DatabaseConnection._pool = None
             DatabaseConnection.initialize_pool(
                 host='testhost',
@@ -95,7 +101,7 @@ class TestDatabaseConnectionPooling:
     
     def test_connection_pool_reuse(self):
         """Test that connection pool is reused if already initialized."""
-        with patch('els_pipeline.db.SimpleConnectionPool') as mock_pool:
+        with patch('els_pipeline.db.ThreadedConnectionPool') as mock_pool:
             DatabaseConnection._pool = MagicMock()
             DatabaseConnection.initialize_pool()
             
@@ -109,7 +115,7 @@ class TestStandardPersistence:
     def test_persist_multiple_standards(self, mock_db_connection, sample_standards):
         """Test persisting multiple standards in sequence."""
         conn, cursor = mock_db_connection
-        cursor.fetchone.side_effect = [(1,), (2,), (3,), (4,), (5,), (6,)]
+        cursor.fetchone.side_effect = [(i, True) for i in range(1, 11)]
         
         with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
             mock_get_conn.return_value.__enter__.return_value = conn
@@ -131,7 +137,7 @@ class TestStandardPersistence:
     def test_persist_standard_with_full_hierarchy(self, mock_db_connection):
         """Test persisting a standard with all four hierarchy levels."""
         conn, cursor = mock_db_connection
-        cursor.fetchone.side_effect = [(1,), (2,), (3,), (4,)]
+        cursor.fetchone.side_effect = [(1, True), (2, True), (3, True), (4, True), (5, True)]
         
         standard = NormalizedStandard(
             standard_id="US-CA-2021-LLD-1.2.3.a",
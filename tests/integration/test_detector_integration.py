@@ -1,13 +1,18 @@
 """Integration tests for structure detector with mocked Bedrock."""
 
 import json
+import boto3
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from botocore.exceptions import ClientError
+from moto import mock_aws
 
+from els_pipeline import stage_metrics
+from els_pipeline.config import Config
 from els_pipeline.detector import (
     detect_structure,
     chunk_text_blocks,
+    chunk_checkpoint_hash,
     build_detection_prompt,
     parse_llm_response,
     call_bedrock_llm,
@@ -336,6 +341,58 @@ def test_call_bedrock_llm_max_retries_exceeded(mock_boto_client):
         call_bedrock_llm("Test prompt", max_retries=2)
 
 
+@patch('els_pipeline.detector.boto3.client')
+def test_call_bedrock_llm_records_token_usage(mock_boto_client):
+    """Test that tokens, retries and model reach the stage measurement and chunk tracker."""
+    mock_client = Mock()
+    mock_client.invoke_model.side_effect = [
+        ClientError({'Error': {'Code': 'ThrottlingException'}}, 'InvokeModel'),
+        {
+            'body': MagicMock(read=lambda: json.dumps({
+                'content': [{'text': 'Success'}],
+                'usage': {'input_tokens': 1200, 'output_tokens': 80}
+            }).encode())
+        },
+        # Token counts only in the InvokeModel response headers
+        {
+            'body': MagicMock(read=lambda: json.dumps({'content': [{'text': 'Again'}]}).encode()),
+            'ResponseMetadata': {'HTTPHeaders': {
+                'x-amzn-bedrock-input-token-count': '300',
+                'x-amzn-bedrock-output-token-count': '20',
+            }}
+        },
+    ]
+    mock_boto_client.return_value = mock_client
+    
+    with stage_metrics.measure_stage() as meter:
+        with stage_metrics.track_llm_usage() as chunk_usage:
+            call_bedrock_llm("Test prompt", max_retries=2)
+        call_bedrock_llm("Test prompt", max_retries=2)
+    
+    assert (chunk_usage.calls, chunk_usage.input_tokens, chunk_usage.output_tokens) == (1, 1200, 80)
+    assert chunk_usage.retries == 1
+    llm = meter.metrics.llm
+    assert (llm.calls, llm.input_tokens, llm.output_tokens, llm.retries) == (2, 1500, 100, 1)
+    assert llm.model_ids == [Config.BEDROCK_DETECTOR_LLM_MODEL_ID]
+
+
+@patch('els_pipeline.detector.boto3.client')
+def test_call_bedrock_llm_records_failed_call(mock_boto_client):
+    """Test that a call failing every attempt is counted with its retries and no tokens."""
+    mock_client = Mock()
+    mock_client.invoke_model.side_effect = ClientError(
+        {'Error': {'Code': 'ThrottlingException'}}, 'InvokeModel'
+    )
+    mock_boto_client.return_value = mock_client
+    
+    with stage_metrics.measure_stage() as meter:
+        with pytest.raises(ClientError):
+            call_bedrock_llm("Test prompt", max_retries=2)
+    
+    llm = meter.metrics.llm
+    assert (llm.calls, llm.input_tokens, llm.output_tokens, llm.retries) == (1, 0, 0, 2)
+
+
 @patch('els_pipeline.detector.call_bedrock_llm')
 def test_detect_structure_success(mock_call_bedrock, sample_text_blocks):
     """Test successful structure detection."""
@@ -426,3 +483,91 @@ def test_detect_structure_bedrock_exception(mock_call_bedrock, sample_text_block
     
     assert result.status == "error"
     assert "Bedrock error" in result.error
+
+
+def _element_response(code):
+    return json.dumps([{
+        "level": "indicator",
+        "code": code,
+        "title": f"Indicator {code}",
+        "description": "",
+        "confidence": 0.9,
+        "source_page": 1,
+        "source_text": f"Indicator {code}",
+    }])
+
+
+@pytest.fixture
+def long_text_blocks():
+    """Text blocks that split into several chunks without overlap."""
+    return [
+        TextBlock(
+            text=f"Block {i} " + "word " * 1800,
+            page_number=i + 1,
+            block_type="LINE",
+            confidence=0.99,
+            geometry={},
+        )
+        for i in range(5)
+    ]
+
+
+@pytest.fixture
+def checkpoint_bucket():
+    """Mocked processed bucket for detection checkpoints."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name=Config.AWS_REGION)
+        s3.create_bucket(Bucket=Config.S3_PROCESSED_BUCKET)
+        yield s3
+
+
+PREFIX = "US/CA/2021/intermediate/detection/checkpoints/run-1/"
+
+
+@patch('els_pipeline.detector.call_bedrock_llm')
+def test_detect_structure_resumes_from_chunk_checkpoints(mock_call_bedrock, long_text_blocks, checkpoint_bucket):
+    """Test that a re-invocation only sends unfinished chunks to Bedrock."""
+    assert len(chunk_text_blocks(long_text_blocks)) == 5
+    mock_call_bedrock.side_effect = [_element_response("C0"), _element_response("C1"),
+                                     Exception("Task timed out")]
+
+    first = detect_structure(long_text_blocks, "doc.pdf", checkpoint_prefix=PREFIX)
+
+    assert first.status == "error"
+    listed = checkpoint_bucket.list_objects_v2(Bucket=Config.S3_PROCESSED_BUCKET, Prefix=PREFIX)
+    assert listed["KeyCount"] == 2
+
+    mock_call_bedrock.reset_mock()
+    mock_call_bedrock.side_effect = [_element_response("C2"), _element_response("C3"),
+                                     _element_response("C4")]
+
+    second = detect_structure(long_text_blocks, "doc.pdf", checkpoint_prefix=PREFIX)
+
+    assert second.status == "success"
+    assert mock_call_bedrock.call_count == 3
+    assert [e.code for e in second.elements] == ["C0", "C1", "C2", "C3", "C4"]
+
+
+@patch('els_pipeline.detector.call_bedrock_llm')
+def test_detect_structure_does_not_checkpoint_unparseable_chunks(mock_call_bedrock, sample_text_blocks, checkpoint_bucket):
+    """Test that a chunk whose response never parsed is retried on re-invocation."""
+    mock_call_bedrock.return_value = "Invalid JSON"
+    result = detect_structure(sample_text_blocks, "doc.pdf", checkpoint_prefix=PREFIX)
+    assert result.status == "success"
+    assert result.elements == []
+
+    mock_call_bedrock.reset_mock()
+    mock_call_bedrock.return_value = _element_response("LLD.A.1")
+    result = detect_structure(sample_text_blocks, "doc.pdf", checkpoint_prefix=PREFIX)
+
+    assert mock_call_bedrock.call_count == 1
+    assert [e.code for e in result.elements] == ["LLD.A.1"]
+
+
+def test_chunk_checkpoint_hash_depends_on_content_and_model(sample_text_blocks):
+    """Test that the checkpoint hash changes with the chunk text and the model."""
+    base = chunk_checkpoint_hash(sample_text_blocks)
+    assert chunk_checkpoint_hash(list(sample_text_blocks)) == base
+    assert chunk_checkpoint_hash(sample_text_blocks[:2]) != base
+    with patch.object(Config, "BEDROCK_DETECTOR_LLM_MODEL_ID", "other-model"):
+        assert chunk_checkpoint_hash(sample_text_blocks) != base
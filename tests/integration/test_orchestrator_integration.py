@@ -10,9 +10,18 @@ from moto import mock_aws
 import boto3
 import json
 from botocore.exceptions import ClientError
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch, MagicMock
 
-from els_pipeline.orchestrator import start_pipeline, get_pipeline_status, rerun_stage
+from els_pipeline import orchestrator
+from els_pipeline.orchestrator import (
+    start_pipeline,
+    get_pipeline_status,
+    rerun_stage,
+    run_pipeline_batch,
+    quota_concurrency_limit,
+)
 from els_pipeline.config import Config
 from els_pipeline.models import PipelineStageResult
 
@@ -156,7 +165,8 @@ def test_get_pipeline_status_includes_country():
     # Test with a valid run_id format
     run_id = "pipeline-US-CA-2021-abc123de"
     
-    result = get_pipeline_status(run_id)
+    with _status_backend(_execution("RUNNING"), [[]]):
+        result = get_pipeline_status(run_id)
     
     # Verify country is included in result
     assert result.country == "US"
@@ -536,13 +546,13 @@ def test_rerun_stage_missing_run_id():
         )
 
 
-@mock_aws
 def test_pipeline_status_tracking():
     """Test pipeline status tracking through stages."""
     # Test with a valid run_id format
     run_id = "pipeline-US-CA-2021-abc123de"
     
-    result = get_pipeline_status(run_id)
+    with _status_backend(_execution("RUNNING"), [_stage_events("Ingestion", "ingestion_result", 0, 2)]):
+        result = get_pipeline_status(run_id)
     
     # Verify all required fields are present
     assert result.run_id == run_id
@@ -595,3 +605,385 @@ def test_start_pipeline_validation():
             state="CA",
             version_year=2101
         )
+
+
+class _FakeBatchBackend:
+    """start_pipeline and Step Functions stand-ins for batch tests.
+
+    Each run reports RUNNING on its first poll and then the next outcome
+    queued for its document (SUCCEEDED by default).
+    """
+
+    def __init__(self, outcomes=None):
+        self.outcomes = outcomes or {}
+        self.started = []
+        self.running = set()
+        self.peak = 0
+        self.polled = set()
+        self.run_keys = {}
+        self.allow_existing = []
+
+    def start_pipeline(self, s3_key, country, state, version_year, state_machine_arn=None,
+                       allow_existing=False):
+        run_id = f"pipeline-{country}-{state}-{version_year}-{len(self.started):08d}"
+        self.started.append(s3_key)
+        if allow_existing:
+            self.allow_existing.append(s3_key)
+        self.running.add(run_id)
+        self.peak = max(self.peak, len(self.running))
+        self.run_keys[run_id] = s3_key
+        return run_id
+
+    def describe_execution(self, executionArn):
+        run_id = executionArn.rsplit(":", 1)[-1]
+        if run_id not in self.polled:
+            self.polled.add(run_id)
+            return {"status": "RUNNING"}
+        self.running.discard(run_id)
+        outcomes = self.outcomes.get(self.run_keys[run_id], [])
+        return outcomes.pop(0) if outcomes else {"status": "SUCCEEDED"}
+
+
+def _run_batch(manifest, backend, **kwargs):
+    sfn = MagicMock()
+    sfn.describe_execution.side_effect = backend.describe_execution
+    with patch("els_pipeline.orchestrator.start_pipeline", side_effect=backend.start_pipeline), \
+         patch("els_pipeline.orchestrator._get_stepfunctions_client", return_value=sfn), \
+         patch("els_pipeline.orchestrator.time.sleep"):
+        return run_pipeline_batch(
+            manifest, state_machine_arn="arn:aws:states:us-east-1:123456789012:stateMachine:els-pipeline",
+            **kwargs
+        )
+
+
+def test_batch_runs_largest_first_within_concurrency_cap():
+    """Test that documents start largest first and never exceed the cap."""
+    manifest = [
+        {"s3_key": f"US/S{i}/2021/doc.pdf", "country": "US", "state": f"S{i}",
+         "version_year": 2021, "size_bytes": size}
+        for i, size in enumerate([10, 500, 30, 2000, 70, 1])
+    ]
+    backend = _FakeBatchBackend()
+    snapshots = []
+
+    progress = _run_batch(manifest, backend, max_concurrent=2, on_progress=snapshots.append)
+
+    assert backend.started == [
+        "US/S3/2021/doc.pdf", "US/S1/2021/doc.pdf", "US/S4/2021/doc.pdf",
+        "US/S2/2021/doc.pdf", "US/S0/2021/doc.pdf", "US/S5/2021/doc.pdf",
+    ]
+    assert backend.peak == 2
+    assert progress.completed == 6 and progress.failed == 0 and progress.pending == 0
+    assert snapshots[0].running == 2 and snapshots[0].pending == 4
+    assert snapshots[-1].completed == 6
+
+
+def test_batch_backs_off_and_retries_throttled_runs():
+    """Test that a throttled run is requeued and halves the concurrency limit."""
+    manifest = [
+        {"s3_key": f"US/S{i}/2021/doc.pdf", "country": "US", "state": f"S{i}",
+         "version_year": 2021, "size_bytes": 100 - i}
+        for i in range(4)
+    ]
+    throttled = {"status": "FAILED", "error": "ThrottlingException", "cause": "Rate exceeded"}
+    backend = _FakeBatchBackend({
+        "US/S0/2021/doc.pdf": [throttled],
+        "US/S1/2021/doc.pdf": [{"status": "FAILED", "error": "States.TaskFailed", "cause": "bad PDF"}],
+    })
+
+    progress = _run_batch(manifest, backend, max_concurrent=4)
+
+    s0 = next(d for d in progress.documents if d.s3_key == "US/S0/2021/doc.pdf")
+    s1 = next(d for d in progress.documents if d.s3_key == "US/S1/2021/doc.pdf")
+    assert s0.status == "completed" and s0.attempts == 2
+    assert s1.status == "failed" and "bad PDF" in s1.error and s1.attempts == 1
+    assert progress.concurrency_limit == 2
+    assert progress.completed == 3 and progress.failed == 1
+
+
+def test_batch_passes_allow_existing_per_document():
+    """Test that re-ingested manifest entries start with allow_existing."""
+    manifest = [
+        {"s3_key": "US/CA/2021/a.pdf", "country": "US", "state": "CA", "version_year": 2021,
+         "size_bytes": 2, "allow_existing": True},
+        {"s3_key": "US/TX/2021/b.pdf", "country": "US", "state": "TX", "version_year": 2021, "size_bytes": 1},
+    ]
+    backend = _FakeBatchBackend()
+
+    _run_batch(manifest, backend)
+
+    assert backend.allow_existing == ["US/CA/2021/a.pdf"]
+
+
+def test_batch_start_failure_marks_document_failed():
+    """Test that a non-throttle start error fails only that document."""
+    backend = _FakeBatchBackend()
+    manifest = [
+        {"s3_key": "US/CA/2021/a.pdf", "country": "US", "state": "CA", "version_year": 2021, "size_bytes": 2},
+        {"s3_key": "US/TX/2021/b.pdf", "country": "US", "state": "TX", "version_year": 2021, "size_bytes": 1},
+    ]
+    start = backend.start_pipeline
+
+    def start_pipeline(s3_key, *args, **kwargs):
+        if s3_key == "US/CA/2021/a.pdf":
+            raise ClientError({"Error": {"Code": "StateMachineDoesNotExist", "Message": "gone"}}, "StartExecution")
+        return start(s3_key, *args, **kwargs)
+
+    backend.start_pipeline = start_pipeline
+    progress = _run_batch(manifest, backend)
+
+    assert [d.status for d in progress.documents] == ["failed", "completed"]
+    assert "StateMachineDoesNotExist" in progress.documents[0].error
+
+
+@pytest.mark.parametrize("field, value", [("state", ""), ("version_year", 1999), ("version_year", 2101)])
+def test_batch_rejects_entries_start_pipeline_would_reject(field, value):
+    """Test that an invalid manifest entry fails the batch before any run starts."""
+    entry = {"s3_key": "US/CA/2021/a.pdf", "country": "US", "state": "CA", "version_year": 2021,
+             "size_bytes": 1, field: value}
+    backend = _FakeBatchBackend()
+
+    with pytest.raises(ValueError, match=field):
+        _run_batch([entry], backend)
+    assert backend.started == []
+
+
+def test_batch_rejected_start_marks_document_failed():
+    """Test that a start_pipeline ValueError fails only that document, without retries."""
+    backend = _FakeBatchBackend()
+    manifest = [
+        {"s3_key": "US/CA/2021/a.pdf", "country": "US", "state": "CA", "version_year": 2021, "size_bytes": 2},
+        {"s3_key": "US/TX/2021/b.pdf", "country": "US", "state": "TX", "version_year": 2021, "size_bytes": 1},
+    ]
+    start = backend.start_pipeline
+
+    def start_pipeline(s3_key, *args, **kwargs):
+        if s3_key == "US/CA/2021/a.pdf":
+            raise ValueError("Invalid version_year: 2021")
+        return start(s3_key, *args, **kwargs)
+
+    backend.start_pipeline = start_pipeline
+    progress = _run_batch(manifest, backend)
+
+    assert [(d.status, d.attempts) for d in progress.documents] == [("failed", 1), ("completed", 1)]
+    assert progress.documents[0].error == "Invalid version_year: 2021"
+
+
+def test_quota_concurrency_limit_respects_account_quotas():
+    """Test that the concurrency limit is the tightest of the cap and quotas."""
+    with patch.object(Config, "TEXTRACT_MAX_CONCURRENT_JOBS", 100), \
+         patch.object(Config, "BEDROCK_REQUESTS_PER_MINUTE", 60), \
+         patch.object(Config, "BEDROCK_REQUESTS_PER_MINUTE_PER_RUN", 4):
+        assert quota_concurrency_limit(50) == 15
+        assert quota_concurrency_limit(5) == 5
+    with patch.object(Config, "TEXTRACT_MAX_CONCURRENT_JOBS", 3):
+        assert quota_concurrency_limit(50) == 3
+    with patch.object(Config, "BEDROCK_REQUESTS_PER_MINUTE", 1):
+        assert quota_concurrency_limit(50) == 1
+
+
+STATUS_SM_ARN = "arn:aws:states:us-east-1:123456789012:stateMachine:els-pipeline"
+STATUS_RUN_ID = "pipeline-US-CA-2021-abc123de"
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _execution(status, **fields):
+    return {
+        "status": status,
+        "startDate": T0,
+        "input": json.dumps({"file_path": "US/CA/2021/ca.pdf", "country": "US",
+                             "state": "CA", "version_year": 2021}),
+        **fields,
+    }
+
+
+def _stage_events(state_name, result_key, start_s, end_s, payload=None, exited=True, error_info=None):
+    """StateEntered/StateExited events of one state, with its Lambda payload."""
+    events = [{"type": "TaskStateEntered", "timestamp": T0 + timedelta(seconds=start_s),
+               "stateEnteredEventDetails": {"name": state_name}}]
+    if exited:
+        output = {result_key: {"Payload": payload or {"status": "success"}}}
+        if error_info:
+            output["error_info"] = error_info
+        events.append({
+            "type": "TaskStateExited", "timestamp": T0 + timedelta(seconds=end_s),
+            "stateExitedEventDetails": {"name": state_name, "output": json.dumps(output)},
+        })
+    return events
+
+
+@contextmanager
+def _status_backend(execution, pages, pipeline_run=None):
+    """Stub Step Functions (history split into the given pages) and pipeline_runs."""
+    sfn = MagicMock()
+    sfn.describe_execution.return_value = execution
+    sfn.get_paginator.return_value.paginate.side_effect = lambda **kwargs: iter(
+        [{"events": events} for events in pages]
+    )
+    orchestrator._terminal_status_cache.clear()
+    with patch("els_pipeline.orchestrator._get_stepfunctions_client", return_value=sfn), \
+         patch("els_pipeline.db.get_pipeline_run", return_value=pipeline_run) as db_row:
+        sfn.db_row = db_row
+        yield sfn
+    orchestrator._terminal_status_cache.clear()
+
+
+def test_pipeline_status_reads_every_history_page():
+    """Test that stages spanning several history pages are all reported."""
+    pages = [
+        _stage_events("Ingestion", "ingestion_result", 0, 1)
+        + _stage_events("TextExtraction", "extraction_result", 1, 30),
+        _stage_events("StructureDetectionPlan", "detection_result", 30, 31)
+        + _stage_events("StructureDetectionChunks", "detection_result", 31, 90),
+        _stage_events("StructureDetection", "detection_result", 90, 92,
+                      {"status": "success", "output_artifact": "US/CA/2021/intermediate/detection/x.json",
+                       "metrics": {"started_at": "2026-01-01T00:00:30+00:00", "wall_ms": 61500, "cpu_ms": 9000,
+                                   "peak_rss_bytes": 1 << 28, "input_bytes": 5000, "output_bytes": 700,
+                                   "records_in": 120, "records_out": 33, "invocations": 6,
+                                   "llm": {"calls": 4, "input_tokens": 48000, "output_tokens": 3100,
+                                           "latency_ms": 52000, "retries": 1, "model_ids": ["detector"]}}})
+        + _stage_events("HierarchyParsingPlan", "parsing_result", 92, 93, exited=False),
+    ]
+
+    with _status_backend(_execution("RUNNING"), pages) as sfn:
+        result = get_pipeline_status(STATUS_RUN_ID, state_machine_arn=STATUS_SM_ARN)
+
+    sfn.describe_execution.assert_called_once_with(
+        executionArn=f"arn:aws:states:us-east-1:123456789012:execution:els-pipeline:{STATUS_RUN_ID}"
+    )
+    sfn.list_executions.assert_not_called()
+    assert [(s.stage_name, s.status) for s in result.stages] == [
+        ("ingestion", "success"), ("text_extraction", "success"),
+        ("structure_detection", "success"), ("hierarchy_parsing", "running"),
+    ]
+    # Detection spans its plan, Map and reduce states
+    assert result.stages[2].duration_ms == 62000
+    assert result.stages[2].output_artifact == "US/CA/2021/intermediate/detection/x.json"
+    assert result.stages[2].metrics.invocations == 6
+    assert result.stages[0].metrics is None
+    # LLM usage so far is the detection stage's
+    assert (result.llm.calls, result.llm.input_tokens, result.llm.output_tokens) == (4, 48000, 3100)
+    assert result.document_s3_key == "US/CA/2021/ca.pdf"
+    assert result.status == "running"
+
+
+def test_pipeline_status_merges_pipeline_run_totals_and_caches_terminal_runs():
+    """Test that pipeline_runs totals win and a finished run is not fetched again."""
+    pages = [
+        _stage_events("Validation", "validation_result", 0, 5, {"status": "success", "total_indicators": 40})
+        + _stage_events("DataPersistence", "persistence_result", 5, 9,
+                        {"status": "success", "records_persisted": 38}),
+    ]
+    row = {"status": "partial", "total_indicators": 41, "total_validated": 39,
+           "total_embedded": None, "total_recommendations": None}
+
+    with _status_backend(_execution("SUCCEEDED", stopDate=T0 + timedelta(seconds=9)), pages, row) as sfn:
+        first = get_pipeline_status(STATUS_RUN_ID, state_machine_arn=STATUS_SM_ARN)
+        first.status = "mutated"
+        second = get_pipeline_status(STATUS_RUN_ID, state_machine_arn=STATUS_SM_ARN)
+
+        assert sfn.describe_execution.call_count == 1
+        assert sfn.db_row.call_count == 1
+
+    assert second.status == "partial"
+    assert (second.total_indicators, second.total_validated, second.total_embedded) == (41, 39, 0)
+
+
+def test_pipeline_status_of_running_or_unreadable_runs_is_not_cached():
+    """Test that only finished runs with readable totals are cached."""
+    with _status_backend(_execution("RUNNING"), [[]]) as sfn:
+        get_pipeline_status(STATUS_RUN_ID, state_machine_arn=STATUS_SM_ARN)
+        get_pipeline_status(STATUS_RUN_ID, state_machine_arn=STATUS_SM_ARN)
+        assert sfn.describe_execution.call_count == 2
+
+    with _status_backend(_execution("FAILED", cause="Lambda timed out"),
+                         [_stage_events("TextExtraction", "extraction_result", 0, 0, exited=False)]) as sfn:
+        sfn.db_row.side_effect = Exception("connection refused")
+        result = get_pipeline_status(STATUS_RUN_ID, state_machine_arn=STATUS_SM_ARN)
+        get_pipeline_status(STATUS_RUN_ID, state_machine_arn=STATUS_SM_ARN)
+
+        assert sfn.describe_execution.call_count == 2
+    assert result.status == "failed"
+    assert result.stages[0].status == "error"
+    assert result.stages[0].error == "Lambda timed out"
+
+
+def test_pipeline_status_of_a_map_failure_after_a_successful_plan():
+    """Test that a Map exiting through its Catch fails the stage despite the plan's payload."""
+    plan = {"status": "success", "stage_name": "structure_detection_plan", "total_chunks": 3}
+    pages = [
+        _stage_events("StructureDetectionPlan", "detection_result", 0, 1, plan)
+        + _stage_events("StructureDetectionChunks", "detection_result", 1, 40, plan,
+                        error_info={"Error": "States.ExceedToleratedFailureThreshold",
+                                    "Cause": "chunk 2 failed"}),
+    ]
+
+    with _status_backend(_execution("FAILED"), pages):
+        result = get_pipeline_status(STATUS_RUN_ID, state_machine_arn=STATUS_SM_ARN)
+
+    [stage] = result.stages
+    assert (stage.stage_name, stage.status, stage.error) == ("structure_detection", "error", "chunk 2 failed")
+    assert stage.duration_ms == 40000
+    assert result.status == "failed"
+
+
+def test_pipeline_status_of_a_running_map_after_its_plan():
+    """Test that a stage whose Map has not exited yet is running, not done with the plan."""
+    plan = {"status": "success", "stage_name": "hierarchy_parsing_plan", "total_chunks": 3}
+    pages = [
+        _stage_events("HierarchyParsingPlan", "parsing_result", 0, 1, plan)
+        + _stage_events("HierarchyParsingChunks", "parsing_result", 1, 1, exited=False),
+    ]
+
+    with _status_backend(_execution("RUNNING"), pages):
+        result = get_pipeline_status(STATUS_RUN_ID, state_machine_arn=STATUS_SM_ARN)
+
+    assert [(s.stage_name, s.status) for s in result.stages] == [("hierarchy_parsing", "running")]
+
+
+def test_pipeline_status_of_failed_runs_is_not_cached():
+    """Test that a failed run is fetched again, so a redrive that resumes it is seen."""
+    with _status_backend(_execution("FAILED", cause="Lambda timed out"), [[]], {"status": "failed"}) as sfn:
+        first = get_pipeline_status(STATUS_RUN_ID, state_machine_arn=STATUS_SM_ARN)
+        sfn.describe_execution.return_value = _execution("RUNNING")
+        second = get_pipeline_status(STATUS_RUN_ID, state_machine_arn=STATUS_SM_ARN)
+
+        assert sfn.describe_execution.call_count == 2
+    assert (first.status, second.status) == ("failed", "running")
+
+
+def test_pipeline_status_falls_back_to_pipeline_run_for_expired_executions():
+    """Test that a run Step Functions no longer has is reported from pipeline_runs."""
+    missing = ClientError({"Error": {"Code": "ExecutionDoesNotExist", "Message": "gone"}}, "DescribeExecution")
+    row = {"document_s3_key": "US/CA/2021/validated/x.json", "country": "US", "state": "CA",
+           "version_year": 2021, "status": "completed", "total_indicators": 12,
+           "total_validated": 12, "total_embedded": None, "total_recommendations": None,
+           "llm_calls": 6, "llm_input_tokens": 52000, "llm_output_tokens": 4000,
+           "llm_latency_ms": 61000, "llm_retries": None}
+
+    with _status_backend(_execution("SUCCEEDED"), [], row) as sfn:
+        sfn.describe_execution.side_effect = missing
+        result = get_pipeline_status(STATUS_RUN_ID, state_machine_arn=STATUS_SM_ARN)
+
+        sfn.db_row.return_value = None
+        orchestrator._terminal_status_cache.clear()
+        with pytest.raises(ValueError, match="No pipeline execution found"):
+            get_pipeline_status(STATUS_RUN_ID, state_machine_arn=STATUS_SM_ARN)
+
+    assert result.status == "completed"
+    assert result.stages == []
+    assert result.total_validated == 12
+    assert (result.llm.calls, result.llm.input_tokens, result.llm.retries) == (6, 52000, 0)
+
+
+def test_pipeline_status_of_expired_failed_run():
+    """Test that a pipeline_runs row recorded by the failure branch reports a failed run."""
+    missing = ClientError({"Error": {"Code": "ExecutionDoesNotExist", "Message": "gone"}}, "DescribeExecution")
+    row = {"document_s3_key": "US/CA/2021/ca.pdf", "country": "US", "state": "CA",
+           "version_year": 2021, "status": "failed", "total_indicators": 0}
+
+    with _status_backend(_execution("FAILED"), [], row) as sfn:
+        sfn.describe_execution.side_effect = missing
+        result = get_pipeline_status(STATUS_RUN_ID, state_machine_arn=STATUS_SM_ARN)
+
+    assert result.status == "failed"
@@ -242,9 +242,8 @@ def test_complete_core_pipeline_with_mocked_services():
             "version_year": parsing_result["version_year"]
         }
 
-        with patch('els_pipeline.handlers.validate_record') as mock_validate, \
+        with patch('els_pipeline.handlers.validate_records') as mock_validate, \
              patch('els_pipeline.handlers.serialize_record') as mock_serialize:
-            from els_pipeline.models import ValidationResult
 
             mock_serialize.return_value = {
                 "country": "US",
@@ -276,11 +275,7 @@ def test_complete_core_pipeline_with_mocked_services():
                 }
             }
 
-            mock_validate.return_value = ValidationResult(
-                is_valid=True,
-                errors=[],
-                record=mock_serialize.return_value
-            )
+            mock_validate.side_effect = lambda records: [[] for _ in records]
 
             validation_result = validation_handler(validation_event, None)
 
@@ -302,7 +297,7 @@ def test_complete_core_pipeline_with_mocked_services():
         }
 
         with patch('els_pipeline.persister.persist_records') as mock_persist:
-            mock_persist.return_value = (1, [])  # (records_persisted, errors)
+            mock_persist.return_value = (1, [], {"inserted": 1, "updated": 0, "unchanged": 0})
             
             persistence_result = persistence_handler(persistence_event, None)
 
@@ -1,17 +1,24 @@
 """Integration tests for validator module with mocked S3."""
 
+import ast
 import pytest
 import json
+from unittest.mock import patch
 from moto import mock_aws
 import boto3
 from els_pipeline.validator import (
+    BloomFilter,
+    compile_schema,
     validate_record,
+    validate_records,
     serialize_record,
     deserialize_record,
     store_validated_record,
 )
+from els_pipeline.handlers import validation_handler
 from els_pipeline.models import NormalizedStandard, HierarchyLevel
 from els_pipeline.config import Config
+from els_pipeline.s3_helpers import save_json_to_s3
 
 
 @pytest.fixture
@@ -300,3 +307,199 @@ def test_validation_error_messages_are_descriptive(sample_standard, sample_docum
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
+
+
+def test_validate_records_aligns_errors_with_input(sample_standard, sample_document_meta):
+    """Batch validation returns one error list per record, empty when valid."""
+    valid = serialize_record(sample_standard, sample_document_meta)
+    bad_country = serialize_record(sample_standard, sample_document_meta)
+    bad_country["country"] = "us"
+    bad_strand = serialize_record(sample_standard, sample_document_meta)
+    bad_strand["standard"]["strand"] = "LLD.A"
+
+    results = validate_records([valid, bad_country, bad_strand])
+
+    assert len(results) == 3
+    assert results[0] == []
+    assert [(e.field_path, e.error_type) for e in results[1]] == [("country", "format")]
+    assert results[2][0].field_path == "standard.strand"
+    assert results[2][0].message == "standard.strand must be an object or null"
+
+
+def test_validate_records_matches_validate_record(sample_standard, sample_document_meta):
+    """The batch API reports exactly the errors validate_record does."""
+    records = []
+    for mutate in (
+        lambda r: r.pop("metadata"),
+        lambda r: r.update(document=None),
+        lambda r: r["document"].update(version_year="2021"),
+        lambda r: r["standard"].update(domain={"code": ""}),
+        lambda r: r["standard"]["indicator"].update(name=5, description=""),
+        lambda r: r.update(country="USA", state=""),
+    ):
+        record = serialize_record(sample_standard, sample_document_meta)
+        mutate(record)
+        records.append(record)
+
+    for record, batch_errors in zip(records, validate_records(records)):
+        expected = [
+            (e.field_path, e.error_type, e.message)
+            for e in validate_record(record).errors
+        ]
+        assert batch_errors
+        assert [tuple(e) for e in batch_errors] == expected
+
+
+def test_validate_records_uniqueness(sample_standard, sample_document_meta):
+    """existing_ids flags duplicates in batch mode too."""
+    record = serialize_record(sample_standard, sample_document_meta)
+    existing_ids = {("US", "CA", 2021, "US-CA-2021-LLD-1.2")}
+
+    [errors] = validate_records([record], existing_ids=existing_ids)
+
+    assert [(e.field_path, e.error_type) for e in errors] == [("standard.standard_id", "uniqueness")]
+
+
+def test_compile_schema_rejects_unsupported_nodes():
+    """Schemas the compiler does not understand fail at compile time."""
+    with pytest.raises(ValueError):
+        compile_schema({"type": "object", "properties": {"tags": {"type": "array"}}})
+
+
+def test_compile_schema_nested_source():
+    """A nested schema compiles to one flat function of isinstance/len/match tests."""
+    schema = {
+        "type": "object",
+        "required": ["doc"],
+        "properties": {"doc": {
+            "type": "object",
+            "required": ["meta"],
+            "properties": {"meta": {"oneOf": [
+                {"type": "null"},
+                {"type": "object", "required": ["code"],
+                 "properties": {"code": {"type": "string", "minLength": 1, "pattern": "^[a-z]+$"}}},
+            ]}},
+        }},
+    }
+
+    check = compile_schema(schema)
+
+    tree = ast.parse(check.source)
+    assert [type(node) for node in tree.body] == [ast.FunctionDef]
+    assert sum(isinstance(node, ast.FunctionDef) for node in ast.walk(tree)) == 1
+    called = {
+        node.func.id if isinstance(node.func, ast.Name) else node.func.attr
+        for node in ast.walk(tree) if isinstance(node, ast.Call)
+    }
+    assert called == {"isinstance", "len", "match", "append"}
+    assert "is not None" in check.source  # the nullable "meta" branch
+
+    def paths(record):
+        return [(e.field_path, e.error_type) for e in check(record)]
+
+    assert paths({"doc": {"meta": None}}) == []
+    assert paths({"doc": {"meta": {"code": "abc"}}}) == []
+    assert paths({"doc": {"meta": {"code": "ABC"}}}) == [("doc.meta.code", "format")]
+    assert paths({"doc": {"meta": {}}}) == [("doc.meta.code", "missing_field")]
+    assert paths({"doc": {"meta": 5}}) == [("doc.meta", "invalid_type")]
+    assert paths({"doc": {}}) == [("doc", "invalid_type"), ("doc.meta", "missing_field")]
+
+
+def test_country_must_be_ascii_uppercase(sample_standard, sample_document_meta):
+    """Non-ASCII uppercase country codes are rejected, as NormalizedStandard rejects them."""
+    record = serialize_record(sample_standard, sample_document_meta)
+    record["country"] = "ÄÖ"
+
+    [errors] = validate_records([record])
+
+    assert [(e.field_path, e.error_type) for e in errors] == [("country", "format")]
+    assert [(e.field_path, e.error_type) for e in validate_record(record).errors] == [("country", "format")]
+
+
+def _records_with_ids(sample_standard, sample_document_meta, standard_ids):
+    records = []
+    for standard_id in standard_ids:
+        record = serialize_record(sample_standard, sample_document_meta)
+        record["standard"]["standard_id"] = standard_id
+        records.append(record)
+    return records
+
+
+def test_validate_records_rejects_repeats_within_batch(sample_standard, sample_document_meta):
+    """A key repeated in the same batch is a duplicate; the first record is kept."""
+    records = _records_with_ids(sample_standard, sample_document_meta, ["A", "B", "A", "A"])
+
+    results = validate_records(records)
+
+    assert results[0] == [] and results[1] == []
+    for errors in results[2:]:
+        assert [(e.field_path, e.error_type) for e in errors] == [("standard.standard_id", "uniqueness")]
+        assert "repeats record 0" in errors[0].message
+
+
+def test_validate_records_confirms_bloom_filter_hits(sample_standard, sample_document_meta):
+    """Keys found in a BloomFilter are only rejected once confirmed."""
+    records = _records_with_ids(sample_standard, sample_document_meta, ["A", "B", "C"])
+    existing = BloomFilter(capacity=10)
+    existing.add(("US", "CA", 2021, "A"))
+    existing.add(("US", "CA", 2021, "B"))
+    confirm_calls = []
+
+    def confirm(keys):
+        confirm_calls.append(keys)
+        return {("US", "CA", 2021, "A")}  # B was a false positive
+
+    results = validate_records(records, existing_ids=existing, confirm_existing=confirm)
+
+    assert confirm_calls == [[("US", "CA", 2021, "A"), ("US", "CA", 2021, "B")]]
+    assert [e.error_type for e in results[0]] == ["uniqueness"]
+    assert results[1] == [] and results[2] == []
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """Every added key is reported present, and the false-positive rate stays near target."""
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    for i in range(5000):
+        bloom.add(("US", "CA", 2021, f"ID-{i}"))
+
+    assert len(bloom) == 5000
+    assert all(("US", "CA", 2021, f"ID-{i}") in bloom for i in range(5000))
+    false_positives = sum(("US", "CA", 2021, f"OTHER-{i}") in bloom for i in range(5000))
+    assert false_positives < 5000 * 0.03
+
+
+def _validate_with_stored_keys(sample_standard, stored_ids, **event):
+    """Run validation_handler on two indicators with the given standard_ids already stored."""
+    parsing_key = "US/CA/2021/intermediate/parsing/run-1.json"
+    second = sample_standard.model_copy(update={"standard_id": "US-CA-2021-LLD-1.3"})
+    save_json_to_s3(
+        {"indicators": [sample_standard.model_dump(), second.model_dump()]},
+        Config.S3_PROCESSED_BUCKET, parsing_key,
+    )
+    stored = {("US", "CA", 2021, standard_id) for standard_id in stored_ids}
+    with patch.object(Config, "VALIDATION_CHECK_EXISTING", True), \
+         patch("els_pipeline.db.load_existing_standard_keys", return_value=stored):
+        return validation_handler({
+            "run_id": "run-1", "output_artifact": parsing_key,
+            "country": "US", "state": "CA", "version_year": 2021,
+            "source_url": "https://example.com/ca.pdf", "publishing_agency": "CDE", **event,
+        }, None)
+
+
+def test_validation_handler_reports_stored_duplicates(s3_client, sample_standard):
+    """Records rejected as already stored make the stage partial, or an error if none remain."""
+    some = _validate_with_stored_keys(sample_standard, ["US-CA-2021-LLD-1.2"])
+    everything = _validate_with_stored_keys(sample_standard, ["US-CA-2021-LLD-1.2", "US-CA-2021-LLD-1.3"])
+
+    assert (some["status"], some["total_validated"]) == ("partial", 1)
+    assert everything["status"] == "error"
+    assert "allow_existing" in everything["error"]
+
+
+def test_validation_handler_allow_existing_reingests(s3_client, sample_standard):
+    """allow_existing skips the stored-key check, so a re-ingested document validates."""
+    result = _validate_with_stored_keys(
+        sample_standard, ["US-CA-2021-LLD-1.2", "US-CA-2021-LLD-1.3"], allow_existing=True
+    )
+
+    assert (result["status"], result["total_validated"]) == ("success", 2)
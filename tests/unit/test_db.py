@@ -1,25 +1,57 @@
 """Unit tests for database access layer."""
 
+import json
+import time
+
+import psycopg2
+import psycopg2.errors
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime
 
 from els_pipeline.db import (
+    QUANTIZED_OVERSAMPLE,
     DatabaseConnection,
+    HierarchyResolver,
     persist_standard,
+    persist_standards,
     persist_embedding,
     persist_recommendation,
+    persist_recommendations,
+    get_cached_recommendations,
     query_similar_indicators,
-    get_indicators_by_country_state
+    query_similar_indicators_batch,
+    get_indicators_by_country_state,
+    iter_indicators_by_country_state,
+    load_existing_standard_keys,
+    filter_existing_standard_keys,
+    refresh_indicator_hierarchy,
+    get_pipeline_run,
+    persist_pipeline_stages,
+    record_failed_pipeline_run,
+    get_indicators_page,
+    encode_page_cursor,
+    decode_page_cursor,
+    INDICATOR_COLUMNS
 )
 from els_pipeline.models import (
     NormalizedStandard,
+    PipelineStageResult,
+    StageMetrics,
+    LLMUsage,
     HierarchyLevel,
     EmbeddingRecord,
     Recommendation,
     AudienceEnum
 )
+from els_pipeline.validator import BloomFilter
+
 
+@pytest.fixture(autouse=True)
+def plain_statements():
+    """Send statement text directly so tests can assert on the SQL."""
+    with patch('els_pipeline.db.Config.DB_PREPARED_STATEMENTS', False):
+        yield
 
 @pytest.fixture
 def mock_connection():
@@ -88,7 +120,7 @@ class TestDatabaseConnection:
     
     def test_initialize_pool(self):
         """Test connection pool initialization."""
-        with patch('els_pipeline.db.SimpleConnectionPool') as mock_pool:
+        with patch('els_pipeline.db.ThreadedConnectionPool') as mock_pool:
             DatabaseConnection._pool = None
             DatabaseConnection.initialize_pool(
                 host='testhost',
@@ -103,7 +135,7 @@ class TestDatabaseConnection:
     
     def test_initialize_pool_with_env_vars(self):
         """Test connection pool initialization with environment variables."""
-        with patch('els_pipeline.db.SimpleConnectionPool') as mock_pool, \
+        with patch('els_pipeline.db.ThreadedConnectionPool') as mock_pool, \
              patch.dict('os.environ', {
                  'DB_HOST': 'envhost',
                  'DB_PORT': '5433',
@@ -120,6 +152,80 @@ class TestDatabaseConnection:
             assert call_kwargs['port'] == 5433
             assert call_kwargs['database'] == 'envdb'
 
+    def test_get_connection_discards_stale_connection(self):
+        """Test that a dead idle connection is replaced before use."""
+        stale, fresh = MagicMock(closed=0), MagicMock(closed=0)
+        stale.cursor.return_value.__enter__.return_value.execute.side_effect = \
+            psycopg2.OperationalError('server closed the connection unexpectedly')
+        pool = MagicMock()
+        pool.getconn.side_effect = [stale, fresh]
+        DatabaseConnection._pool = pool
+        DatabaseConnection._last_used = {}
+        
+        try:
+            with DatabaseConnection.get_connection() as conn:
+                assert conn is fresh
+            
+            pool.putconn.assert_any_call(stale, close=True)
+            pool.putconn.assert_called_with(fresh)
+            assert id(fresh) in DatabaseConnection._last_used
+        finally:
+            DatabaseConnection._pool = None
+    
+    def test_get_connection_skips_ping_for_recently_used(self):
+        """Test that connections used within the idle window are not pinged."""
+        conn = MagicMock(closed=0)
+        pool = MagicMock()
+        pool.getconn.return_value = conn
+        DatabaseConnection._pool = pool
+        DatabaseConnection._last_used = {id(conn): time.monotonic()}
+        
+        try:
+            with DatabaseConnection.get_connection():
+                pass
+            conn.cursor.assert_not_called()
+        finally:
+            DatabaseConnection._pool = None
+
+    def test_secret_is_cached_until_ttl_expires(self):
+        """Test that warm invocations reuse the Secrets Manager lookup."""
+        client = MagicMock()
+        client.get_secret_value.return_value = {'SecretString': '{"host": "aurora"}'}
+        DatabaseConnection._secret_cache = {}
+        
+        with patch.object(DatabaseConnection, '_secrets_client', client), \
+             patch('els_pipeline.db.Config.DB_SECRET_CACHE_TTL_SECONDS', 60):
+            assert DatabaseConnection._get_secret('arn:secret')['host'] == 'aurora'
+            assert DatabaseConnection._get_secret('arn:secret')['host'] == 'aurora'
+            assert client.get_secret_value.call_count == 1
+            
+            fetched_at, secret = DatabaseConnection._secret_cache['arn:secret']
+            DatabaseConnection._secret_cache['arn:secret'] = (fetched_at - 61, secret)
+            DatabaseConnection._get_secret('arn:secret')
+            assert client.get_secret_value.call_count == 2
+        DatabaseConnection._secret_cache = {}
+    
+    def test_initialize_pool_refreshes_rotated_secret(self):
+        """Test that a failed connect with cached credentials refetches the secret."""
+        DatabaseConnection._pool = None
+        DatabaseConnection._secret_cache = {
+            'arn:secret': (time.monotonic(), {'host': 'aurora', 'password': 'old'})
+        }
+        fresh = {'host': 'aurora', 'password': 'new'}
+        
+        with patch('els_pipeline.db.ThreadedConnectionPool') as mock_pool, \
+             patch.object(DatabaseConnection, '_secrets_client') as client, \
+             patch.dict('os.environ', {'DB_SECRET_ARN': 'arn:secret'}):
+            client.get_secret_value.return_value = {'SecretString': json.dumps(fresh)}
+            mock_pool.side_effect = [psycopg2.OperationalError('password authentication failed'), MagicMock()]
+            
+            DatabaseConnection.initialize_pool()
+            
+            assert mock_pool.call_count == 2
+            assert mock_pool.call_args[1]['password'] == 'new'
+        DatabaseConnection._pool = None
+        DatabaseConnection._secret_cache = {}
+
 
 class TestPersistStandard:
     """Tests for persist_standard function."""
@@ -127,7 +233,7 @@ class TestPersistStandard:
     def test_persist_standard_with_all_levels(self, mock_connection, sample_standard):
         """Test persisting a standard with all hierarchy levels."""
         conn, cursor = mock_connection
-        cursor.fetchone.side_effect = [(1,), (2,), (3,), (4,)]  # document_id, domain_id, strand_id, sub_strand_id
+        cursor.fetchone.side_effect = [(1, True), (2, True), (3, True), (4, True), (5, True)]  # document, domain, strand, sub_strand, indicator
         
         with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
             mock_get_conn.return_value.__enter__.return_value = conn
@@ -153,7 +259,7 @@ class TestPersistStandard:
     def test_persist_standard_without_strand_sub_strand(self, mock_connection):
         """Test persisting a standard without strand and sub_strand."""
         conn, cursor = mock_connection
-        cursor.fetchone.side_effect = [(1,), (2,)]  # document_id, domain_id
+        cursor.fetchone.side_effect = [(1, True), (2, True), (3, True)]  # document, domain, indicator
         
         standard = NormalizedStandard(
             standard_id="US-TX-2022-MTH-1",
@@ -183,6 +289,243 @@ class TestPersistStandard:
             # Should only insert document, domain, and indicator (no strand/sub_strand)
             conn.commit.assert_called_once()
 
+    def test_persist_standard_reports_change_outcome(self, mock_connection, sample_standard):
+        """Test that the indicator outcome follows the (id, inserted) row."""
+        conn, cursor = mock_connection
+        # Hierarchy rows unchanged, indicator updated, then everything unchanged
+        cursor.fetchone.side_effect = [
+            (1, None), (2, None), (3, None), (4, False),
+            (1, None), (2, None), (3, None), (4, None),
+        ]
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            document_meta = {'title': 'T', 'source_url': None, 'publishing_agency': 'A'}
+            assert persist_standard(sample_standard, document_meta) == 'updated'
+            assert persist_standard(sample_standard, document_meta) == 'unchanged'
+            
+            indicator_sql, indicator_params = cursor.execute.call_args[0]
+            assert 'IS DISTINCT FROM EXCLUDED.content_hash' in indicator_sql
+            # Same content hashes to the same value on every run
+            first_params = cursor.execute.call_args_list[3][0][1]
+            assert indicator_params == first_params
+
+
+class TestHierarchyResolver:
+    """Tests for hierarchy id caching across persist_standard calls."""
+    
+    document_meta = {
+        'title': 'California Preschool Learning Foundations',
+        'source_url': 'https://example.com',
+        'publishing_agency': 'California Department of Education'
+    }
+    
+    def test_shared_resolver_writes_only_indicator_rows(self, mock_connection, sample_standard):
+        """Test that hierarchy rows are upserted once per run."""
+        conn, cursor = mock_connection
+        cursor.fetchone.side_effect = [(1, True), (2, True), (3, True), (4, True), (5, True)]  # document, domain, strand, 2 indicators
+        second = sample_standard.model_copy(update={'standard_id': 'US-CA-2021-LLD-1.3'})
+        resolver = HierarchyResolver()
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            persist_standard(sample_standard, self.document_meta, resolver)
+            assert cursor.execute.call_count == 4
+            
+            persist_standard(second, self.document_meta, resolver)
+            assert cursor.execute.call_count == 5
+            last_sql, last_params = cursor.execute.call_args[0]
+            assert 'INSERT INTO indicators' in last_sql
+            assert last_params[:3] == ('US-CA-2021-LLD-1.3', 2, 3)
+            assert resolver.statements_saved == 3
+    
+    def test_commit_tallies_hierarchy_changes(self, mock_connection, sample_standard):
+        """Test that committed hierarchy outcomes are counted per kind."""
+        conn, cursor = mock_connection
+        cursor.fetchone.side_effect = [(1, None), (2, False), (3, True), (4, True)]
+        resolver = HierarchyResolver()
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            persist_standard(sample_standard, self.document_meta, resolver)
+            
+            assert resolver.changes == {'inserted': 1, 'updated': 1, 'unchanged': 1}
+    
+    def test_concurrently_inserted_row_is_read_back(self, mock_connection, sample_standard):
+        """Test that a row another worker inserted first is re-selected, not a TypeError."""
+        conn, cursor = mock_connection
+        # The document upsert returns no row: its fallback SELECT ran on the
+        # snapshot taken before the other worker committed
+        cursor.fetchone.side_effect = [None, (7,), (2, True), (3, True), (4, True)]  # then domain, strand, indicator
+        resolver = HierarchyResolver()
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            persist_standard(sample_standard, self.document_meta, resolver)
+            
+            reselect_sql, reselect_params = cursor.execute.call_args_list[1][0]
+            assert reselect_sql.startswith('SELECT id FROM documents WHERE')
+            assert reselect_params == ('US', 'CA', 2021, self.document_meta['title'])
+            assert cursor.execute.call_args_list[2][0][1][0] == 7  # domain under the document
+            assert resolver.changes == {'inserted': 2, 'updated': 0, 'unchanged': 1}
+    
+    def test_rollback_discards_pending_ids(self, mock_connection, sample_standard):
+        """Test that ids resolved in a rolled-back transaction are not reused."""
+        conn, cursor = mock_connection
+        cursor.fetchone.side_effect = [(1, True), (2, True), (3, True), (10, True), (20, True), (30, True), (40, True)]
+        resolver = HierarchyResolver()
+        
+        def fail_on_indicator(sql, params=None):
+            if 'INSERT INTO indicators' in sql and cursor.execute.call_count == 4:
+                raise Exception('indicator insert failed')
+        
+        cursor.execute.side_effect = fail_on_indicator
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            with pytest.raises(Exception, match='indicator insert failed'):
+                persist_standard(sample_standard, self.document_meta, resolver)
+            
+            persist_standard(sample_standard, self.document_meta, resolver)
+            
+            # Hierarchy re-upserted after rollback, using the new ids
+            assert cursor.execute.call_count == 8
+            assert cursor.execute.call_args[0][1][1:3] == (20, 30)
+
+
+class TestPersistStandards:
+    """Tests for single-transaction persistence of many standards."""
+    
+    document_meta = {'title': 'T', 'source_url': None, 'publishing_agency': 'A'}
+    
+    def _fail_indicator(self, cursor, standard_id):
+        def execute(sql, params=None):
+            if 'INSERT INTO indicators' in sql and params[0] == standard_id:
+                raise Exception('value too long for type character varying(50)')
+        cursor.execute.side_effect = execute
+    
+    def test_savepoints_isolate_failing_standard(self, mock_connection, sample_standard):
+        """Test that one bad standard is rolled back and the rest commit once."""
+        conn, cursor = mock_connection
+        cursor.fetchone.side_effect = [(i, True) for i in range(1, 20)]
+        bad = sample_standard.model_copy(update={'standard_id': 'US-CA-2021-LLD-BAD'})
+        good = sample_standard.model_copy(update={'standard_id': 'US-CA-2021-LLD-1.3'})
+        self._fail_indicator(cursor, 'US-CA-2021-LLD-BAD')
+        resolver = HierarchyResolver()
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            results = persist_standards(
+                [(sample_standard, self.document_meta), (bad, self.document_meta),
+                 (good, self.document_meta)],
+                resolver
+            )
+        
+        assert [outcome for outcome, _ in results] == ['inserted', None, 'inserted']
+        assert 'too long' in str(results[1][1])
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert statements.count('ROLLBACK TO SAVEPOINT persist_standard') == 1
+        assert statements.count('RELEASE SAVEPOINT persist_standard') == 2
+        conn.commit.assert_called_once()
+        conn.rollback.assert_not_called()
+        # Hierarchy rows from the first standard survive the savepoint rollback
+        assert resolver.changes['inserted'] == 3 and resolver.statements_saved == 6
+    
+    def test_all_or_nothing_rolls_back_everything(self, mock_connection, sample_standard):
+        """Test that without isolation the first failure aborts the batch."""
+        conn, cursor = mock_connection
+        cursor.fetchone.side_effect = [(i, True) for i in range(1, 20)]
+        bad = sample_standard.model_copy(update={'standard_id': 'US-CA-2021-LLD-BAD'})
+        self._fail_indicator(cursor, 'US-CA-2021-LLD-BAD')
+        resolver = HierarchyResolver()
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            with pytest.raises(Exception, match='too long'):
+                persist_standards(
+                    [(sample_standard, self.document_meta), (bad, self.document_meta)],
+                    resolver, isolate_failures=False
+                )
+        
+        conn.commit.assert_not_called()
+        conn.rollback.assert_called_once()
+        assert 'SAVEPOINT' not in ' '.join(c[0][0] for c in cursor.execute.call_args_list)
+        assert resolver.changes['inserted'] == 0
+        # Ids from the rolled-back transaction are not reused
+        saved = resolver.statements_saved
+        resolver.document_id(cursor, sample_standard, self.document_meta)
+        assert resolver.statements_saved == saved
+
+class TestPreparedStatements:
+    """Tests for per-connection prepared statement execution."""
+    
+    @pytest.fixture(autouse=True)
+    def prepared_statements(self):
+        with patch('els_pipeline.db.Config.DB_PREPARED_STATEMENTS', True):
+            DatabaseConnection._prepared = {}
+            yield
+            DatabaseConnection._prepared = {}
+    
+    def test_prepares_once_per_session(self, mock_connection, sample_embedding):
+        """Test PREPARE on first use, EXECUTE only afterwards."""
+        conn, cursor = mock_connection
+        cursor.connection.get_backend_pid.return_value = 4242
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            persist_embedding(sample_embedding)
+            persist_embedding(sample_embedding)
+            
+            statements = [c[0][0] for c in cursor.execute.call_args_list]
+            assert len(statements) == 3
+            assert statements[0].startswith('PREPARE els_')
+            assert '$4::vector' in statements[0] and '%s' not in statements[0]
+            name = statements[0].split()[1]
+            assert statements[1] == statements[2] == f'EXECUTE {name} ({", ".join(["%s"] * 8)})'
+            assert cursor.execute.call_args[0][1][0] == sample_embedding.indicator_id
+    
+    def test_reprepares_after_reconnect(self, mock_connection, sample_embedding):
+        """Test that a new backend session re-prepares the statement."""
+        conn, cursor = mock_connection
+        cursor.connection.get_backend_pid.side_effect = [100, 200]
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            persist_embedding(sample_embedding)
+            persist_embedding(sample_embedding)
+            
+            statements = [c[0][0] for c in cursor.execute.call_args_list]
+            assert [s.split()[0] for s in statements] == ['PREPARE', 'EXECUTE', 'PREPARE', 'EXECUTE']
+    
+    def test_missing_statement_is_forgotten(self, mock_connection, sample_embedding):
+        """Test that a statement dropped server-side is re-prepared next time."""
+        conn, cursor = mock_connection
+        cursor.connection.get_backend_pid.return_value = 7
+        
+        def fail_execute(sql, params=None):
+            if sql.startswith('EXECUTE') and cursor.execute.call_count == 2:
+                raise psycopg2.errors.InvalidSqlStatementName('prepared statement does not exist')
+        
+        cursor.execute.side_effect = fail_execute
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            with pytest.raises(psycopg2.errors.InvalidSqlStatementName):
+                persist_embedding(sample_embedding)
+            persist_embedding(sample_embedding)
+            
+            statements = [c[0][0] for c in cursor.execute.call_args_list]
+            assert [s.split()[0] for s in statements] == ['PREPARE', 'EXECUTE', 'PREPARE', 'EXECUTE']
 
 class TestPersistEmbedding:
     """Tests for persist_embedding function."""
@@ -230,6 +573,91 @@ class TestPersistRecommendation:
             conn.commit.assert_called_once()
 
 
+class TestPersistRecommendations:
+    """Tests for persist_recommendations function."""
+    
+    def test_persist_recommendations_batches_and_upserts(self, mock_connection, sample_recommendation):
+        """Test one multi-row upsert and one commit per batch."""
+        conn, cursor = mock_connection
+        recs = [
+            sample_recommendation.model_copy(
+                update={'recommendation_id': f'rec-{i}', 'indicator_id': f'US-CA-2021-LLD-{i}'}
+            )
+            for i in range(5)
+        ]
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn, \
+             patch('els_pipeline.db.execute_values') as mock_execute_values:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            result = persist_recommendations(recs, batch_size=2)
+            
+            assert result.rows_written == 5
+            assert result.batches == 3
+            assert result.rows_per_second > 0
+            assert mock_execute_values.call_count == 3
+            sql = mock_execute_values.call_args_list[0][0][1]
+            assert 'INSERT INTO recommendations' in sql
+            assert 'ON CONFLICT (indicator_id, audience, generation_model)' in sql
+            assert [len(c[0][2]) for c in mock_execute_values.call_args_list] == [2, 2, 1]
+            assert conn.commit.call_count == 3
+    
+    def test_duplicate_keys_collapsed(self, mock_connection, sample_recommendation):
+        """Test that repeated (indicator, audience, model) keys keep the last row."""
+        conn, cursor = mock_connection
+        newer = sample_recommendation.model_copy(update={'activity_description': 'Newer activity'})
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn, \
+             patch('els_pipeline.db.execute_values') as mock_execute_values:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            result = persist_recommendations([sample_recommendation, newer])
+            
+            assert result.rows_written == 1
+            rows = mock_execute_values.call_args[0][2]
+            assert rows[0][5] == 'Newer activity'
+    
+    def test_failed_batch_rolls_back(self, mock_connection, sample_recommendation):
+        """Test that a failing batch is rolled back and the error propagates."""
+        conn, cursor = mock_connection
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn, \
+             patch('els_pipeline.db.execute_values', side_effect=Exception('boom')):
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            with pytest.raises(Exception, match='boom'):
+                persist_recommendations([sample_recommendation])
+            
+            conn.rollback.assert_called_once()
+            conn.commit.assert_not_called()
+    
+    def test_persist_recommendations_empty(self):
+        """Test that an empty list makes no database call."""
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            result = persist_recommendations([])
+            assert result.rows_written == 0
+            mock_get_conn.assert_not_called()
+
+
+class TestGetCachedRecommendations:
+    """Tests for get_cached_recommendations function."""
+    
+    def test_returns_activities_keyed_by_hash_and_audience(self, mock_connection):
+        """Test that cached activities are keyed by (content_hash, audience)."""
+        conn, cursor = mock_connection
+        cursor.fetchall.return_value = [('abc', 'parent', 'Read together')]
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            cache = get_cached_recommendations(['abc'], '3-5', 'model-x')
+            
+            assert cache == {('abc', 'parent'): 'Read together'}
+            sql, params = cursor.execute.call_args[0]
+            assert 'content_hash = ANY(%s)' in sql
+            assert params == (['abc'], '3-5', 'model-x')
+
+
 class TestQuerySimilarIndicators:
     """Tests for query_similar_indicators function."""
     
@@ -280,6 +708,102 @@ class TestQuerySimilarIndicators:
             assert 'e.state = %s' in call_args[0]
             assert 'US' in call_args[1]
             assert 'CA' in call_args[1]
+    
+    def test_filtered_query_binds_params_in_placeholder_order(self, mock_connection):
+        """Test that filter values bind between the two vector placeholders."""
+        conn, cursor = mock_connection
+        cursor.fetchall.return_value = []
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            filters = {'country': 'US', 'state': 'CA'}
+            query_similar_indicators([0.1] * 4, top_k=5, filters=filters)
+            
+            sql, params = cursor.execute.call_args[0]
+            vector_str = '[0.1,0.1,0.1,0.1]'
+            assert sql.index('1 - (e.vector <=> %s::vector)') < sql.index('e.country = %s')
+            assert sql.index('e.state = %s') < sql.index('ORDER BY e.vector <=> %s::vector')
+            assert list(params) == [vector_str, 'US', 'CA', vector_str, 5]
+
+
+class TestQuerySimilarIndicatorsQuantized:
+    """Tests for the halfvec over-fetch and rescore query path."""
+    
+    def test_quantized_query_overfetches_and_rescores(self, mock_connection):
+        """Test that the halfvec index is searched and results rescored."""
+        conn, cursor = mock_connection
+        cursor.fetchall.return_value = []
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            query_similar_indicators([0.1] * 4, top_k=5, filters={'state': 'CA'}, quantized=True)
+            
+            sql, params = cursor.execute.call_args[0]
+            # Matches the expression index of migration 006
+            assert 'ORDER BY e.vector::halfvec(1536) <=> %s::halfvec(1536)' in sql
+            assert 'ORDER BY c.vector <=> %s::vector' in sql
+            assert 'e.state = %s' in sql
+            assert params[1] == 'CA'
+            assert params[3] == 5 * QUANTIZED_OVERSAMPLE
+            assert params[-1] == 5
+
+
+class TestQuerySimilarIndicatorsBatch:
+    """Tests for query_similar_indicators_batch function."""
+    
+    def test_results_grouped_per_query(self, mock_connection):
+        """Test that rows are grouped by query index in input order."""
+        conn, cursor = mock_connection
+        cursor.fetchall.return_value = [
+            {'query_index': 0, 'standard_id': 'US-CA-2021-LLD-1', 'similarity': 0.9},
+            {'query_index': 0, 'standard_id': 'US-CA-2021-LLD-2', 'similarity': 0.8},
+            {'query_index': 2, 'standard_id': 'US-TX-2022-MTH-1', 'similarity': 0.7},
+        ]
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            vectors = [[0.1] * 4, [0.2] * 4, [0.3] * 4]
+            results = query_similar_indicators_batch(vectors, top_k=2)
+            
+            assert len(results) == 3
+            assert [r['standard_id'] for r in results[0]] == ['US-CA-2021-LLD-1', 'US-CA-2021-LLD-2']
+            assert results[1] == []
+            assert results[2][0]['standard_id'] == 'US-TX-2022-MTH-1'
+            assert 'query_index' not in results[0][0]
+            
+            # One round trip for all query vectors
+            cursor.execute.assert_called_once()
+            sql, params = cursor.execute.call_args[0]
+            assert 'LATERAL' in sql
+            assert 'WITH ORDINALITY' in sql
+            assert len(params[0]) == 3
+            assert params[-1] == 2
+    
+    def test_filters_applied_inside_lateral(self, mock_connection):
+        """Test that filters are applied to every query."""
+        conn, cursor = mock_connection
+        cursor.fetchall.return_value = []
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            query_similar_indicators_batch(
+                [[0.1] * 4], top_k=5, filters={'country': 'US', 'state': 'TX'}
+            )
+            
+            sql, params = cursor.execute.call_args[0]
+            assert 'e.country = %s' in sql
+            assert 'e.state = %s' in sql
+            assert params[1:] == ['US', 'TX', 5]
+    
+    def test_empty_vectors_skips_database(self):
+        """Test that an empty batch makes no database call."""
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            assert query_similar_indicators_batch([]) == []
+            mock_get_conn.assert_not_called()
 
 
 class TestGetIndicatorsByCountryState:
@@ -328,3 +852,296 @@ class TestGetIndicatorsByCountryState:
             call_args = cursor.execute.call_args[0]
             assert 'dom.code = %s' in call_args[0]
             assert 'LLD' in call_args[1]
+
+    def test_get_indicators_from_view(self, mock_connection):
+        """Test that from_view reads the flattened view without joins."""
+        conn, cursor = mock_connection
+        cursor.fetchall.return_value = []
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            get_indicators_by_country_state(
+                'US', 'CA', domain_code='LLD', strand_code='LLD.A', from_view=True
+            )
+            
+            sql, params = cursor.execute.call_args[0]
+            assert 'FROM indicator_hierarchy' in sql
+            assert 'JOIN' not in sql
+            assert 'domain_code = %s' in sql and 'strand_code = %s' in sql
+            assert params == ['US', 'CA', 'LLD', 'LLD.A']
+
+
+class TestGetIndicatorsPage:
+    """Tests for keyset-paginated indicator queries."""
+    
+    def test_first_page_has_next_cursor(self, mock_connection):
+        """Test that a full page returns a cursor at its last standard_id."""
+        conn, cursor = mock_connection
+        cursor.fetchall.return_value = [{'standard_id': f'US-CA-2021-LLD-{i}'} for i in range(3)]
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            page = get_indicators_page('US', 'CA', page_size=2, columns=['domain_code'])
+            
+            assert [r['standard_id'] for r in page.items] == ['US-CA-2021-LLD-0', 'US-CA-2021-LLD-1']
+            assert decode_page_cursor(page.next_cursor) == 'US-CA-2021-LLD-1'
+            sql, params = cursor.execute.call_args[0]
+            assert 'i.standard_id AS standard_id' in sql
+            assert 'dom.code AS domain_code' in sql
+            assert 'dom.name' not in sql
+            assert 'OFFSET' not in sql
+            assert params == ['US', 'CA', 3]
+    
+    def test_next_page_seeks_past_cursor(self, mock_connection):
+        """Test that the cursor becomes a standard_id seek predicate."""
+        conn, cursor = mock_connection
+        cursor.fetchall.return_value = [{'standard_id': 'US-CA-2021-LLD-2'}]
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            page = get_indicators_page(
+                'US', 'CA', page_size=2, from_view=True,
+                cursor=encode_page_cursor('US-CA-2021-LLD-1')
+            )
+            
+            assert page.next_cursor is None
+            sql, params = cursor.execute.call_args[0]
+            assert 'standard_id > %s' in sql
+            assert params == ['US', 'CA', 'US-CA-2021-LLD-1', 3]
+    
+    @pytest.mark.parametrize('kwargs', [
+        {'page_size': 0},
+        {'cursor': 'not-a-cursor'},
+        {'columns': ['password']},
+    ])
+    def test_invalid_arguments(self, kwargs):
+        """Test that bad page sizes, cursors and columns are rejected."""
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            with pytest.raises(ValueError):
+                get_indicators_page('US', 'CA', **kwargs)
+            mock_get_conn.assert_not_called()
+
+class TestGetPipelineRun:
+    """Tests for get_pipeline_run function."""
+    
+    def test_returns_row_or_none(self, mock_connection):
+        """Test that the run's row is returned as a dict, or None if missing."""
+        conn, cursor = mock_connection
+        cursor.fetchone.side_effect = [{'run_id': 'run-1', 'status': 'partial', 'total_validated': 7}, None]
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            assert get_pipeline_run('run-1') == {'run_id': 'run-1', 'status': 'partial', 'total_validated': 7}
+            assert get_pipeline_run('run-2') is None
+            sql, params = cursor.execute.call_args[0]
+            assert 'FROM pipeline_runs' in sql and 'WHERE run_id = %s' in sql
+            assert params == ('run-2',)
+
+
+class TestPersistPipelineStages:
+    """Tests for persist_pipeline_stages function."""
+    
+    def test_upserts_all_stages_in_one_statement(self, mock_connection):
+        """Test that every stage row is written by one upsert and committed once."""
+        conn, cursor = mock_connection
+        metrics = StageMetrics(
+            started_at='2026-01-01T00:00:00+00:00', wall_ms=1500, cpu_ms=900,
+            peak_rss_bytes=2048, input_bytes=10, output_bytes=20, records_in=3, records_out=4,
+        )
+        stages = [
+            PipelineStageResult(stage_name='ingestion', status='success', duration_ms=1500,
+                                output_artifact='a.pdf', metrics=metrics),
+            PipelineStageResult(stage_name='validation', status='success', duration_ms=0,
+                                output_artifact='v.json'),
+        ]
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn, \
+             patch('els_pipeline.db.execute_values') as mock_execute_values:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            assert persist_pipeline_stages('run-1', stages) == 2
+            
+            _, sql, rows = mock_execute_values.call_args[0]
+            assert 'ON CONFLICT (run_id, stage_name) DO UPDATE' in sql
+            assert rows[0][:6] == ('run-1', 'ingestion', 'success', 1500, 'a.pdf', None)
+            assert (rows[0][7] - rows[0][6]).total_seconds() == 1.5
+            assert rows[0][8:15] == (900, 2048, 10, 20, 3, 4, 1)
+            assert rows[0][15:] == (0, 0, 0, 0, 0, [])
+            assert rows[1][6] is None and rows[1][8:] == (None,) * 13
+            conn.commit.assert_called_once()
+    
+    def test_sums_llm_usage_onto_the_run(self, mock_connection):
+        """Test that stage LLM usage is written per stage and summed onto pipeline_runs."""
+        conn, cursor = mock_connection
+
+        def stage(name, **llm):
+            metrics = StageMetrics(
+                started_at='2026-01-01T00:00:00+00:00', wall_ms=10, cpu_ms=1, peak_rss_bytes=1,
+                input_bytes=0, output_bytes=0, records_in=0, records_out=0, llm=LLMUsage(**llm),
+            )
+            return PipelineStageResult(stage_name=name, status='success', duration_ms=10,
+                                       output_artifact=f'{name}.json', metrics=metrics)
+
+        stages = [
+            stage('structure_detection', calls=4, input_tokens=8000, output_tokens=900,
+                  latency_ms=12000, retries=1, model_ids=['detector-model']),
+            stage('hierarchy_parsing', calls=2, input_tokens=1500, output_tokens=700,
+                  latency_ms=5000, retries=0, model_ids=['parser-model']),
+            stage('validation'),
+        ]
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn, \
+             patch('els_pipeline.db.execute_values') as mock_execute_values:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            persist_pipeline_stages('run-1', stages)
+            
+            rows = mock_execute_values.call_args[0][2]
+            assert rows[0][15:] == (4, 8000, 900, 12000, 1, ['detector-model'])
+            sql, params = cursor.execute.call_args[0]
+            assert 'UPDATE pipeline_runs' in sql
+            assert params == (6, 9500, 1600, 17000, 1, 'run-1')
+            conn.commit.assert_called_once()
+    
+    def test_no_stages_writes_nothing(self):
+        """Test that an empty stage list skips the database."""
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            assert persist_pipeline_stages('run-1', []) == 0
+            mock_get_conn.assert_not_called()
+
+
+class TestRecordFailedPipelineRun:
+    """Tests for record_failed_pipeline_run function."""
+    
+    def test_creates_or_fails_the_run_row(self, mock_connection):
+        """Test that the run row is inserted, or marked failed when it exists."""
+        conn, cursor = mock_connection
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            record_failed_pipeline_run('run-1', 'US/CA/2021/ca.pdf', 'US', 'CA', 2021)
+            
+            sql, params = cursor.execute.call_args[0]
+            assert 'INSERT INTO pipeline_runs' in sql
+            assert "ON CONFLICT (run_id) DO UPDATE" in sql and "SET status = 'failed'" in sql
+            assert params == ('run-1', 'US/CA/2021/ca.pdf', 'US', 'CA', 2021)
+            conn.commit.assert_called_once()
+
+
+class TestRefreshIndicatorHierarchy:
+    """Tests for refresh_indicator_hierarchy function."""
+    
+    def test_refresh_is_concurrent(self, mock_connection):
+        """Test that the view is refreshed without blocking readers."""
+        conn, cursor = mock_connection
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            refresh_indicator_hierarchy()
+            
+            sql = cursor.execute.call_args[0][0]
+            assert sql == 'REFRESH MATERIALIZED VIEW CONCURRENTLY indicator_hierarchy'
+            conn.commit.assert_called_once()
+
+
+class TestIterIndicatorsByCountryState:
+    """Tests for iter_indicators_by_country_state function."""
+    
+    def _row(self, standard_id):
+        return tuple(standard_id if col == 'standard_id' else None for col in INDICATOR_COLUMNS)
+    
+    def test_streams_through_named_cursor(self, mock_connection):
+        """Test that rows come from a named cursor with the requested itersize."""
+        conn, cursor = mock_connection
+        cursor.__iter__.return_value = iter([self._row('US-CA-2021-LLD-1'), self._row('US-CA-2021-LLD-2')])
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            rows = iter_indicators_by_country_state('US', 'CA', strand_code='LLD.A', itersize=500)
+            mock_get_conn.assert_not_called()  # lazy until iterated
+            results = list(rows)
+            
+            assert [r['standard_id'] for r in results] == ['US-CA-2021-LLD-1', 'US-CA-2021-LLD-2']
+            assert set(results[0]) == set(INDICATOR_COLUMNS)
+            assert conn.cursor.call_args[1]['name'].startswith('indicators_')
+            assert cursor.itersize == 500
+            sql, params = cursor.execute.call_args[0]
+            assert 'str.code = %s' in sql
+            assert params == ['US', 'CA', 'LLD.A']
+            conn.rollback.assert_called_once()
+    
+    def test_tuples_and_early_close(self, mock_connection):
+        """Test tuple output and that abandoning the stream releases the transaction."""
+        conn, cursor = mock_connection
+        cursor.__iter__.return_value = iter([self._row('A'), self._row('B')])
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            
+            rows = iter_indicators_by_country_state('US', 'CA', as_tuples=True)
+            first = next(rows)
+            assert first[INDICATOR_COLUMNS.index('standard_id')] == 'A'
+            rows.close()
+            
+            conn.rollback.assert_called_once()
+
+
+class TestExistingStandardKeys:
+    """Tests for load_existing_standard_keys and filter_existing_standard_keys."""
+    
+    def test_small_documents_load_into_a_set(self, mock_connection):
+        """Test that keys stream from a named cursor into a set of key tuples."""
+        conn, cursor = mock_connection
+        cursor.__iter__.return_value = iter([('US-CA-2021-LLD-1', 2), ('US-CA-2021-LLD-2', 2)])
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            keys = load_existing_standard_keys('US', 'CA', 2021, bloom_threshold=10)
+        
+        assert keys == {('US', 'CA', 2021, 'US-CA-2021-LLD-1'), ('US', 'CA', 2021, 'US-CA-2021-LLD-2')}
+        assert conn.cursor.call_args[1]['name'].startswith('standard_keys_')
+        assert cursor.execute.call_args[0][1] == ('US', 'CA', 2021)
+        conn.rollback.assert_called_once()
+    
+    def test_large_documents_load_into_a_bloom_filter(self, mock_connection):
+        """Test that a key count above the threshold switches to a BloomFilter."""
+        conn, cursor = mock_connection
+        ids = [f'US-CA-2021-LLD-{i}' for i in range(50)]
+        cursor.__iter__.return_value = iter([(standard_id, 50) for standard_id in ids])
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            keys = load_existing_standard_keys('US', 'CA', 2021, bloom_threshold=10)
+        
+        assert isinstance(keys, BloomFilter)
+        assert len(keys) == 50
+        assert all(('US', 'CA', 2021, standard_id) in keys for standard_id in ids)
+    
+    def test_no_stored_keys(self, mock_connection):
+        """Test that a document with no indicators yields an empty set."""
+        conn, cursor = mock_connection
+        cursor.__iter__.return_value = iter([])
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            assert load_existing_standard_keys('US', 'CA', 2021) == set()
+    
+    def test_filter_existing_keys(self, mock_connection):
+        """Test that only keys stored under the same document are confirmed."""
+        conn, cursor = mock_connection
+        cursor.fetchall.return_value = [('US', 'CA', 2021, 'A'), ('US', 'TX', 2021, 'B')]
+        
+        with patch.object(DatabaseConnection, 'get_connection') as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+            stored = filter_existing_standard_keys([('US', 'CA', 2021, 'A'), ('US', 'CA', 2021, 'B')])
+        
+        assert stored == {('US', 'CA', 2021, 'A')}
+        assert sorted(cursor.execute.call_args[0][1][0]) == ['A', 'B']
+        assert filter_existing_standard_keys([]) == set()
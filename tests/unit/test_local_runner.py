@@ -0,0 +1,141 @@
+"""Unit tests for the in-process pipeline runner."""
+
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from els_pipeline.local_runner import run_pipeline_locally
+from els_pipeline.models import (
+    DetectionResult,
+    ExtractionResult,
+    IngestionRequest,
+    IngestionResult,
+    ParseResult,
+    TextBlock,
+)
+
+
+REQUEST = IngestionRequest(
+    file_path="/tmp/ca_standards.pdf",
+    country="US",
+    state="CA",
+    version_year=2021,
+    source_url="https://example.com/ca_standards.pdf",
+    publishing_agency="California Department of Education",
+    filename="ca_standards.pdf",
+)
+
+
+def _indicator(standard_id):
+    return {
+        "standard_id": standard_id,
+        "country": "US",
+        "state": "CA",
+        "version_year": 2021,
+        "domain": {"code": "LLD", "name": "Language and Literacy", "description": None},
+        "strand": None,
+        "sub_strand": None,
+        "indicator": {"code": standard_id.rsplit("-", 1)[-1], "name": None,
+                      "description": "Child demonstrates understanding"},
+        "age_band": "3-5",
+        "source_page": 1,
+        "source_text": "Child demonstrates understanding",
+    }
+
+
+@pytest.fixture
+def stages():
+    """Patch every stage function with a canned successful result."""
+    block = TextBlock(text="Language and Literacy", page_number=1, block_type="LINE",
+                      confidence=0.99, geometry={})
+    with patch("els_pipeline.local_runner.ingest_document") as ingest, \
+         patch("els_pipeline.local_runner.extract_text") as extract, \
+         patch("els_pipeline.local_runner.detect_structure") as detect, \
+         patch("els_pipeline.local_runner.parse_hierarchy") as parse, \
+         patch("els_pipeline.persister.persist_canonical_records") as persist:
+        ingest.return_value = IngestionResult(
+            s3_key="US/CA/2021/ca_standards.pdf", s3_version_id="v1",
+            metadata={}, status="success",
+        )
+        extract.return_value = ExtractionResult(
+            document_s3_key="US/CA/2021/ca_standards.pdf", blocks=[block],
+            total_pages=1, status="success",
+        )
+        detect.return_value = DetectionResult(
+            document_s3_key="US/CA/2021/ca_standards.pdf", elements=[],
+            review_count=0, status="success",
+        )
+        # The duplicate standard_id fails validation
+        parse.return_value = ParseResult(
+            standards=[],
+            indicators=[_indicator("US-CA-2021-LLD-1"), _indicator("US-CA-2021-LLD-2"),
+                        _indicator("US-CA-2021-LLD-1")],
+            orphaned_elements=[], status="success",
+        )
+        persist.return_value = (2, [], {"inserted": 2, "updated": 0, "unchanged": 0})
+        yield MagicMock(ingest=ingest, extract=extract, detect=detect, parse=parse, persist=persist)
+
+
+class TestRunPipelineLocally:
+    """Tests for run_pipeline_locally."""
+
+    def test_chains_stages_in_memory(self, stages):
+        """Test that each stage receives the previous stage's result object."""
+        result = run_pipeline_locally(REQUEST, age_band="3-5")
+
+        stages.extract.assert_called_once_with("US/CA/2021/ca_standards.pdf", "v1")
+        assert stages.detect.call_args[0][0] == stages.extract.return_value.blocks
+        assert stages.parse.call_args[1]["age_band"] == "3-5"
+        persisted = stages.persist.call_args[0][0]
+        assert [r["standard"]["standard_id"] for r in persisted] == ["US-CA-2021-LLD-1", "US-CA-2021-LLD-2"]
+
+        assert [s.stage_name for s in result.stages] == [
+            "ingestion", "text_extraction", "structure_detection",
+            "hierarchy_parsing", "validation", "data_persistence",
+        ]
+        assert all(s.output_artifact == "" for s in result.stages)
+        assert result.total_indicators == 3
+        assert result.total_validated == 2
+        assert result.status == "partial"
+
+    def test_checkpoints_are_written_and_resumed(self, stages, tmp_path):
+        """Test that a rerun with the same run_id restores finished stages."""
+        first = run_pipeline_locally(REQUEST, run_id="run-1", checkpoint_dir=str(tmp_path), persist=False)
+
+        run_dir = tmp_path / "run-1"
+        assert sorted(os.listdir(run_dir)) == [
+            "hierarchy_parsing.json", "ingestion.json", "structure_detection.json",
+            "text_extraction.json", "validation.json",
+        ]
+        with open(run_dir / "validation.json") as f:
+            assert len(json.load(f)["validated_records"]) == 2
+
+        # Re-parse only: drop the parsing and validation checkpoints
+        os.remove(run_dir / "hierarchy_parsing.json")
+        os.remove(run_dir / "validation.json")
+        second = run_pipeline_locally(REQUEST, run_id="run-1", checkpoint_dir=str(tmp_path), persist=False)
+
+        assert stages.ingest.call_count == 1
+        assert stages.extract.call_count == 1
+        assert stages.detect.call_count == 1
+        assert stages.parse.call_count == 2
+        stages.persist.assert_not_called()
+        assert second.stages[1].output_artifact == str(run_dir / "text_extraction.json")
+        assert second.total_validated == first.total_validated == 2
+
+    def test_failed_stage_stops_the_run(self, stages, tmp_path):
+        """Test that an error result stops the run and is not checkpointed."""
+        stages.detect.return_value = DetectionResult(
+            document_s3_key="US/CA/2021/ca_standards.pdf", elements=[],
+            review_count=0, status="error", error="Bedrock throttled",
+        )
+
+        result = run_pipeline_locally(REQUEST, run_id="run-2", checkpoint_dir=str(tmp_path))
+
+        assert result.status == "failed"
+        assert result.stages[-1].stage_name == "structure_detection"
+        assert result.stages[-1].error == "Bedrock throttled"
+        stages.parse.assert_not_called()
+        assert not (tmp_path / "run-2" / "structure_detection.json").exists()
@@ -0,0 +1,257 @@
+"""Unit tests for the persistence stage."""
+
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import ClientError
+
+from els_pipeline.db import HierarchyResolver
+from els_pipeline.persister import persist_canonical_records, persist_records
+
+
+EVENT = {
+    "output_artifact": "US/CA/2021/validation/run-1.json",
+    "country": "US",
+    "state": "CA",
+    "version_year": 2021,
+    "run_id": "run-1",
+}
+
+
+def _run(keys, max_workers, persist_side_effect, refresh=None):
+    with patch("els_pipeline.persister._load_validation_summary",
+               return_value={"validated_records": keys}), \
+         patch("els_pipeline.persister.DatabaseConnection") as mock_db, \
+         patch("els_pipeline.persister._persist_single_record",
+               side_effect=persist_side_effect), \
+         patch("els_pipeline.persister._record_pipeline_run") as mock_record, \
+         patch("els_pipeline.persister.refresh_indicator_hierarchy",
+               new=refresh or MagicMock()):
+        mock_db.max_connections.return_value = 3
+        result = persist_records(EVENT, max_workers=max_workers)
+        # The pool is kept for the next warm invocation
+        mock_db.close_pool.assert_not_called()
+    return result, mock_record
+
+
+class TestPersistRecords:
+    """Tests for persist_records."""
+
+    def test_sequential_mode_shares_one_resolver(self):
+        """Test that the default mode persists in order with one resolver."""
+        seen = []
+
+        def persist(key, resolver):
+            seen.append((key, resolver))
+            return "inserted"
+
+        (persisted, errors, counts), _ = _run(["a", "b", "c"], 1, persist)
+
+        assert [key for key, _ in seen] == ["a", "b", "c"]
+        assert len({id(resolver) for _, resolver in seen}) == 1
+        assert persisted == 3
+        assert errors == []
+        assert counts == {"inserted": 3, "updated": 0, "unchanged": 0}
+
+    def test_worker_mode_is_capped_at_pool_size(self):
+        """Test that concurrent workers never exceed the connection pool."""
+        lock = threading.Lock()
+        active = {"now": 0, "peak": 0}
+        release = threading.Event()
+        keys = [f"key-{i}" for i in range(12)]
+
+        def persist(key, resolver):
+            assert isinstance(resolver, HierarchyResolver)
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+                if active["peak"] == 3:
+                    release.set()
+            release.wait(timeout=2)
+            with lock:
+                active["now"] -= 1
+            if key == "key-5":
+                raise RuntimeError("constraint violation")
+            return "unchanged"
+
+        (persisted, errors, counts), mock_record = _run(keys, 8, persist)
+
+        assert active["peak"] == 3
+        assert persisted == 11
+        assert errors == [{"record_key": "key-5", "error": "constraint violation"}]
+        assert counts["unchanged"] == 11
+        mock_record.assert_called_once()
+
+    def test_hierarchy_view_refreshed_only_when_rows_changed(self):
+        """Test that the materialized view is refreshed after changes only."""
+        refresh = MagicMock()
+        _run(["a", "b"], 1, lambda key, resolver: "unchanged", refresh)
+        refresh.assert_not_called()
+
+        _run(["a", "b"], 1, lambda key, resolver: "updated" if key == "b" else "unchanged", refresh)
+        refresh.assert_called_once()
+
+    def test_hierarchy_view_refreshed_when_only_hierarchy_rows_changed(self):
+        """Test that a renamed domain refreshes the view though no indicator changed."""
+        refresh = MagicMock()
+
+        def persist(key, resolver):
+            resolver.changes["updated"] += 1  # the domain row was rewritten
+            return "unchanged"
+
+        _run(["a"], 1, persist, refresh)
+        refresh.assert_called_once()
+
+    def test_hierarchy_view_refresh_failure_does_not_fail_run(self):
+        """Test that a failed refresh is logged and the run still succeeds."""
+        refresh = MagicMock(side_effect=Exception("could not obtain lock"))
+        (persisted, errors, _), _ = _run(["a"], 1, lambda key, resolver: "inserted", refresh)
+
+        refresh.assert_called_once()
+        assert persisted == 1
+        assert errors == []
+
+
+class TestTransactionModes:
+    """Tests for batch and document transaction modes."""
+
+    def _run(self, keys, mode, persist_side_effect, load_side_effect=None, batch_size=200):
+        calls = []
+
+        def persist(items, resolver, isolate_failures):
+            calls.append((len(items), isolate_failures))
+            return persist_side_effect(items, isolate_failures)
+
+        def load(key):
+            if load_side_effect:
+                load_side_effect(key)
+            return key, {"title": "T"}
+
+        with patch("els_pipeline.persister._load_validation_summary",
+                   return_value={"validated_records": keys}), \
+             patch("els_pipeline.persister.DatabaseConnection") as mock_db, \
+             patch("els_pipeline.persister._load_record", side_effect=load), \
+             patch("els_pipeline.persister.persist_standards", side_effect=persist), \
+             patch("els_pipeline.persister._record_pipeline_run"), \
+             patch("els_pipeline.persister.refresh_indicator_hierarchy"), \
+             patch("els_pipeline.persister.Config.PERSIST_TRANSACTION_BATCH_SIZE", batch_size):
+            mock_db.max_connections.return_value = 3
+            result = persist_records(EVENT, max_workers=1, transaction_mode=mode)
+        return result, calls
+
+    def test_batch_mode_commits_per_chunk_and_isolates_failures(self):
+        """Test one transaction per chunk with failing records reported."""
+        def persist(items, isolate):
+            return [(None, Exception("bad row")) if key == "k3" else ("inserted", None)
+                    for key, _ in items]
+
+        (persisted, errors, counts), calls = self._run(
+            [f"k{i}" for i in range(5)], "batch", persist, batch_size=2
+        )
+
+        assert calls == [(2, True), (2, True), (1, True)]
+        assert persisted == 4
+        assert errors == [{"record_key": "k3", "error": "bad row"}]
+        assert counts["inserted"] == 4
+
+    def test_document_mode_is_all_or_nothing(self):
+        """Test that a failed document transaction fails every record."""
+        def persist(items, isolate):
+            raise Exception("deadlock detected")
+
+        (persisted, errors, _), calls = self._run(["a", "b", "c"], "document", persist)
+
+        assert calls == [(3, False)]
+        assert persisted == 0
+        assert [e["record_key"] for e in errors] == ["a", "b", "c"]
+        assert all("Transaction rolled back: deadlock detected" == e["error"] for e in errors)
+
+    def test_document_mode_skips_write_when_a_record_fails_to_load(self):
+        """Test that a partially loaded document is not written at all."""
+        def load(key):
+            if key == "b":
+                raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "missing"}}, "GetObject")
+
+        (persisted, errors, _), calls = self._run(
+            ["a", "b", "c"], "document", lambda items, isolate: [], load
+        )
+
+        assert calls == []
+        assert persisted == 0
+        assert errors[1]["error"] == "Failed to load record from S3: b"
+        assert errors[0]["error"].startswith("Not persisted")
+
+    def test_unknown_mode_rejected(self):
+        """Test that an unknown transaction mode raises ValueError."""
+        with pytest.raises(ValueError, match="transaction mode"):
+            persist_records(EVENT, transaction_mode="statement")
+
+    @pytest.mark.parametrize("batch_size", [0, -5])
+    def test_non_positive_batch_size_rejected(self, batch_size):
+        """Test that batch mode rejects a batch size below 1 before loading anything."""
+        with patch("els_pipeline.persister.Config.PERSIST_TRANSACTION_BATCH_SIZE", batch_size), \
+             patch("els_pipeline.persister._load_validation_summary") as mock_load, \
+             pytest.raises(ValueError, match="PERSIST_TRANSACTION_BATCH_SIZE"):
+            persist_records(EVENT, transaction_mode="batch")
+        mock_load.assert_not_called()
+
+
+def _canonical(standard_id):
+    return {
+        "country": "US",
+        "state": "CA",
+        "document": {
+            "title": "California Preschool Learning Foundations",
+            "version_year": 2021,
+            "source_url": "https://example.com/ca.pdf",
+            "age_band": "3-5",
+            "publishing_agency": "California Department of Education",
+        },
+        "standard": {
+            "standard_id": standard_id,
+            "domain": {"code": "LLD", "name": "Language and Literacy"},
+            "strand": None,
+            "sub_strand": None,
+            "indicator": {"code": standard_id, "description": "Child listens"},
+        },
+        "metadata": {"page_number": 1, "source_text_chunk": "Child listens"},
+    }
+
+
+class TestPersistCanonicalRecords:
+    """Tests for persist_canonical_records."""
+
+    def test_records_written_in_one_call(self):
+        """Test that in-memory records are persisted without touching S3."""
+        with patch("els_pipeline.persister.persist_standards") as mock_persist, \
+             patch("els_pipeline.persister.load_json_from_s3") as mock_load, \
+             patch("els_pipeline.persister.refresh_indicator_hierarchy") as mock_refresh:
+            mock_persist.return_value = [("inserted", None), (None, Exception("bad row"))]
+
+            persisted, errors, counts = persist_canonical_records(
+                [_canonical("US-CA-2021-LLD-1"), _canonical("US-CA-2021-LLD-2")],
+                isolate_failures=True,
+            )
+
+        items, _, isolate = mock_persist.call_args[0]
+        assert [standard.standard_id for standard, _ in items] == ["US-CA-2021-LLD-1", "US-CA-2021-LLD-2"]
+        assert items[0][1]["publishing_agency"] == "California Department of Education"
+        assert isolate is True
+        mock_load.assert_not_called()
+        mock_refresh.assert_called_once()
+        assert persisted == 1
+        assert errors == [{"standard_id": "US-CA-2021-LLD-2", "error": "bad row"}]
+        assert counts == {"inserted": 1, "updated": 0, "unchanged": 0}
+
+    def test_rolled_back_transaction_fails_every_record(self):
+        """Test that a failed all-or-nothing transaction reports every record."""
+        with patch("els_pipeline.persister.persist_standards", side_effect=Exception("deadlock detected")), \
+             patch("els_pipeline.persister.refresh_indicator_hierarchy") as mock_refresh:
+            persisted, errors, _ = persist_canonical_records(
+                [_canonical("A"), _canonical("B")], isolate_failures=False
+            )
+
+        assert persisted == 0
+        assert [e["standard_id"] for e in errors] == ["A", "B"]
+        mock_refresh.assert_not_called()
@@ -0,0 +1,268 @@
+"""Unit tests for recommendation generation."""
+
+import json
+import pytest
+from unittest.mock import patch
+
+from els_pipeline.config import Config
+from els_pipeline.models import AudienceEnum, RecommendationRequest
+from els_pipeline.recommender import (
+    _RateLimiter,
+    build_recommendation_prompt,
+    compute_content_hash,
+    generate_recommendation_id,
+    generate_recommendations,
+    parse_recommendation_response,
+)
+
+
+def _indicator(standard_id, title="Curiosity and Interest", description="Child shows curiosity."):
+    return {
+        "standard_id": standard_id,
+        "indicator_title": title,
+        "description": description,
+        "domain_name": "Approaches to Learning",
+        "strand_name": "Initiative",
+        "sub_strand_name": None,
+        "version_year": 2021,
+    }
+
+
+def _llm_response(indicators):
+    return json.dumps([
+        {"standard_id": ind["standard_id"], "parent": f"Parent {ind['standard_id']}",
+         "teacher": f"Teacher {ind['standard_id']}"}
+        for ind in indicators
+    ])
+
+
+@pytest.fixture
+def request_ca():
+    return RecommendationRequest(country="US", state="CA", age_band="3-5")
+
+
+class TestContentHash:
+    """Tests for compute_content_hash."""
+
+    def test_hash_ignores_identifiers(self):
+        """Test that the same text under a new standard_id/year hashes identically."""
+        a = _indicator("US-CA-2021-ATL-1")
+        b = dict(_indicator("US-CA-2024-ATL-1"), version_year=2024)
+        assert compute_content_hash(a) == compute_content_hash(b)
+
+    def test_hash_changes_with_content(self):
+        """Test that editing the indicator text changes the hash."""
+        a = _indicator("US-CA-2021-ATL-1")
+        b = _indicator("US-CA-2021-ATL-1", description="Child asks questions.")
+        assert compute_content_hash(a) != compute_content_hash(b)
+
+
+class TestRecommendationId:
+    """Tests for generate_recommendation_id."""
+
+    def test_id_is_deterministic_and_bounded(self):
+        """Test that ids are stable per key, distinct across keys, and fit the column."""
+        long_id = "US-CA-2021-" + "X" * 90
+        a = generate_recommendation_id(long_id, AudienceEnum.PARENT, "model-a")
+
+        assert a == generate_recommendation_id(long_id, AudienceEnum.PARENT, "model-a")
+        assert a != generate_recommendation_id(long_id, AudienceEnum.TEACHER, "model-a")
+        assert a != generate_recommendation_id(long_id, AudienceEnum.PARENT, "model-b")
+        assert len(a) <= 100
+
+
+class TestParseRecommendationResponse:
+    """Tests for parse_recommendation_response."""
+
+    def test_parses_both_audiences(self):
+        """Test that each indicator yields a parent and a teacher recommendation."""
+        indicators = [_indicator("US-CA-2021-ATL-1"), _indicator("US-CA-2021-ATL-2")]
+        hashes = {i["standard_id"]: "h" + i["standard_id"][-1] for i in indicators}
+
+        recs = parse_recommendation_response(
+            "```json\n" + _llm_response(indicators) + "\n```",
+            indicators, hashes, "US", "CA", "3-5",
+        )
+
+        assert len(recs) == 4
+        assert {(r.indicator_id, r.audience) for r in recs} == {
+            (i["standard_id"], a) for i in indicators for a in AudienceEnum
+        }
+        assert recs[0].recommendation_id == generate_recommendation_id(
+            "US-CA-2021-ATL-1", AudienceEnum.PARENT, Config.BEDROCK_RECOMMENDATION_LLM_MODEL_ID
+        )
+        assert recs[0].content_hash == "h1"
+        assert recs[0].generation_model == Config.BEDROCK_RECOMMENDATION_LLM_MODEL_ID
+
+    def test_skips_unknown_ids_and_empty_activities(self):
+        """Test that unexpected ids and blank activities are dropped."""
+        indicators = [_indicator("US-CA-2021-ATL-1")]
+        response = json.dumps([
+            {"standard_id": "US-CA-2021-ATL-1", "parent": "Play", "teacher": ""},
+            {"standard_id": "UNKNOWN", "parent": "x", "teacher": "y"},
+        ])
+
+        recs = parse_recommendation_response(
+            response, indicators, {"US-CA-2021-ATL-1": "h"}, "US", "CA", "3-5"
+        )
+
+        assert [(r.indicator_id, r.audience) for r in recs] == [("US-CA-2021-ATL-1", AudienceEnum.PARENT)]
+
+    def test_no_json_array_raises(self):
+        """Test that a response without a JSON array is rejected."""
+        with pytest.raises(ValueError):
+            parse_recommendation_response("no json here", [], {}, "US", "CA", "3-5")
+
+
+class TestGenerateRecommendations:
+    """Tests for generate_recommendations."""
+
+    def test_packs_indicators_into_batches(self, request_ca):
+        """Test that indicators are batched so each LLM call covers many indicators."""
+        indicators = [_indicator(f"US-CA-2021-ATL-{i}", description=f"d{i}") for i in range(5)]
+        prompts = []
+
+        def fake_llm(prompt, bedrock=None):
+            prompts.append(prompt)
+            batch = [i for i in indicators if f'"{i["standard_id"]}"' in prompt]
+            return _llm_response(batch)
+
+        with patch("els_pipeline.recommender.get_cached_recommendations", return_value={}), \
+             patch("els_pipeline.recommender._get_bedrock_client"), \
+             patch("els_pipeline.recommender.call_bedrock_llm", side_effect=fake_llm), \
+             patch.object(Config, "RECOMMENDATION_BATCH_SIZE", 2), \
+             patch.object(Config, "RECOMMENDATION_CALLS_PER_MINUTE", 0):
+            result = generate_recommendations(request_ca, indicators=indicators)
+
+        assert result.status == "success"
+        assert len(prompts) == 3
+        assert result.llm_batches == 3
+        assert len(result.recommendations) == 10
+        assert result.cache_hits == 0
+
+    def test_cached_indicators_are_not_regenerated(self, request_ca):
+        """Test that indicators with cached activities for both audiences skip the LLM."""
+        cached_ind = _indicator("US-CA-2021-ATL-1", description="cached")
+        new_ind = _indicator("US-CA-2021-ATL-2", description="new")
+        cached_hash = compute_content_hash(cached_ind)
+        cache = {
+            (cached_hash, "parent"): "Cached parent activity",
+            (cached_hash, "teacher"): "Cached teacher activity",
+        }
+
+        with patch("els_pipeline.recommender.get_cached_recommendations", return_value=cache) as mock_cache, \
+             patch("els_pipeline.recommender._get_bedrock_client"), \
+             patch("els_pipeline.recommender.call_bedrock_llm",
+                   return_value=_llm_response([new_ind])) as mock_llm, \
+             patch.object(Config, "RECOMMENDATION_CALLS_PER_MINUTE", 0):
+            result = generate_recommendations(request_ca, indicators=[cached_ind, new_ind])
+
+        mock_cache.assert_called_once()
+        assert mock_cache.call_args[0][1] == "3-5"
+        mock_llm.assert_called_once()
+        assert "US-CA-2021-ATL-1" not in mock_llm.call_args[0][0]
+        assert result.cache_hits == 1  # one indicator, both audiences
+        cached_recs = [r for r in result.recommendations if r.indicator_id == "US-CA-2021-ATL-1"]
+        assert {r.activity_description for r in cached_recs} == {
+            "Cached parent activity", "Cached teacher activity"
+        }
+
+    def test_all_cached_makes_no_llm_calls(self, request_ca):
+        """Test that a fully cached run never calls Bedrock."""
+        ind = _indicator("US-CA-2021-ATL-1")
+        h = compute_content_hash(ind)
+        cache = {(h, "parent"): "p", (h, "teacher"): "t"}
+
+        with patch("els_pipeline.recommender.get_cached_recommendations", return_value=cache), \
+             patch("els_pipeline.recommender._get_bedrock_client") as mock_client, \
+             patch("els_pipeline.recommender.call_bedrock_llm") as mock_llm:
+            result = generate_recommendations(request_ca, indicators=[ind])
+
+        mock_llm.assert_not_called()
+        mock_client.assert_not_called()
+        assert result.llm_batches == 0
+        assert len(result.recommendations) == 2
+
+    def test_failed_batch_yields_partial(self, request_ca):
+        """Test that one failing batch does not discard the others."""
+        indicators = [_indicator(f"US-CA-2021-ATL-{i}", description=f"d{i}") for i in range(2)]
+
+        def fake_llm(prompt, bedrock=None):
+            if "US-CA-2021-ATL-1" in prompt:
+                raise RuntimeError("throttled")
+            return _llm_response([indicators[0]])
+
+        with patch("els_pipeline.recommender.get_cached_recommendations", return_value={}), \
+             patch("els_pipeline.recommender._get_bedrock_client"), \
+             patch("els_pipeline.recommender.call_bedrock_llm", side_effect=fake_llm), \
+             patch.object(Config, "RECOMMENDATION_BATCH_SIZE", 1), \
+             patch.object(Config, "RECOMMENDATION_CALLS_PER_MINUTE", 0):
+            result = generate_recommendations(request_ca, indicators=indicators)
+
+        assert result.status == "partial"
+        assert "throttled" in result.error
+        assert len(result.recommendations) == 2
+
+    def test_unanswered_indicators_are_re_requested(self, request_ca):
+        """Test that indicators left out of a response are asked for again in a follow-up call."""
+        indicators = [_indicator(f"US-CA-2021-ATL-{i}", description=f"d{i}") for i in range(3)]
+        prompts = []
+
+        def fake_llm(prompt, bedrock=None):
+            prompts.append(prompt)
+            if len(prompts) == 1:
+                answers = json.loads(_llm_response(indicators[:2]))
+                answers[1]["teacher"] = ""  # ATL-1 loses an audience
+                return json.dumps(answers)
+            return _llm_response([ind for ind in indicators if ind["standard_id"] in prompt])
+
+        with patch("els_pipeline.recommender.get_cached_recommendations", return_value={}), \
+             patch("els_pipeline.recommender._get_bedrock_client"), \
+             patch("els_pipeline.recommender.call_bedrock_llm", side_effect=fake_llm), \
+             patch.object(Config, "RECOMMENDATION_CALLS_PER_MINUTE", 0):
+            result = generate_recommendations(request_ca, indicators=indicators)
+
+        assert len(prompts) == 2
+        assert "US-CA-2021-ATL-0" not in prompts[1]
+        assert "US-CA-2021-ATL-1" in prompts[1] and "US-CA-2021-ATL-2" in prompts[1]
+        assert result.status == "success"
+        assert result.missing_indicator_ids == []
+        assert len(result.recommendations) == 6
+        assert len({r.recommendation_id for r in result.recommendations}) == 6
+
+    def test_indicators_never_answered_make_the_result_partial(self, request_ca):
+        """Test that indicators still unanswered after the retries are listed, not dropped silently."""
+        indicators = [_indicator(f"US-CA-2021-ATL-{i}", description=f"d{i}") for i in range(2)]
+
+        with patch("els_pipeline.recommender.get_cached_recommendations", return_value={}), \
+             patch("els_pipeline.recommender._get_bedrock_client"), \
+             patch("els_pipeline.recommender.call_bedrock_llm",
+                   return_value=_llm_response(indicators[:1])) as mock_llm, \
+             patch.object(Config, "RECOMMENDATION_CALLS_PER_MINUTE", 0):
+            result = generate_recommendations(request_ca, indicators=indicators)
+
+        assert mock_llm.call_count == 1 + 2  # MAX_PARSE_RETRIES follow-ups
+        assert result.status == "partial"
+        assert result.missing_indicator_ids == ["US-CA-2021-ATL-1"]
+        assert "US-CA-2021-ATL-1" in result.error
+        assert {r.indicator_id for r in result.recommendations} == {"US-CA-2021-ATL-0"}
+
+    def test_no_indicators_is_error(self, request_ca):
+        """Test that an empty indicator set is reported as an error."""
+        result = generate_recommendations(request_ca, indicators=[])
+        assert result.status == "error"
+
+
+class TestRateLimiter:
+    """Tests for _RateLimiter."""
+
+    def test_spaces_call_starts(self):
+        """Test that consecutive acquisitions are spaced by the interval."""
+        limiter = _RateLimiter(calls_per_minute=60)
+        with patch("els_pipeline.recommender.time.sleep") as mock_sleep, \
+             patch("els_pipeline.recommender.time.monotonic", return_value=100.0):
+            limiter.acquire()
+            limiter.acquire()
+            limiter.acquire()
+
+        assert [c[0][0] for c in mock_sleep.call_args_list] == [pytest.approx(1.0), pytest.approx(2.0)]
@@ -7,7 +7,9 @@ from botocore.exceptions import ClientError
 
 from els_pipeline.s3_helpers import (
     save_json_to_s3,
+    save_json_objects_to_s3,
     load_json_from_s3,
+    load_json_objects_from_s3,
     construct_intermediate_key
 )
 
@@ -112,6 +114,87 @@ class TestSaveJsonToS3:
         assert exc_info.value.response['Error']['Code'] == 'InternalError'
 
 
+class TestSaveJsonObjectsToS3:
+    """Tests for save_json_objects_to_s3 function."""
+
+    def test_uploads_all_objects_with_one_client(self):
+        """Every object is uploaded through a single shared client."""
+        objects = [({"n": i}, f"records/{i}.json") for i in range(10)]
+        with patch('els_pipeline.s3_helpers.boto3.client') as mock_client:
+            client = MagicMock()
+            mock_client.return_value = client
+            failures = save_json_objects_to_s3(objects, "bucket", max_workers=4)
+
+        assert failures == {}
+        mock_client.assert_called_once()
+        assert mock_client.call_args[1]['config'].max_pool_connections == 4
+        keys = sorted(call[1]['Key'] for call in client.put_object.call_args_list)
+        assert keys == sorted(key for _, key in objects)
+
+    def test_failed_uploads_are_returned_by_key(self, mock_s3_client):
+        """A failing PUT is reported without stopping the others."""
+        error = ClientError(
+            {'Error': {'Code': 'InternalError', 'Message': 'Internal Server Error'}},
+            'PutObject'
+        )
+
+        def put_object(**kwargs):
+            if kwargs['Key'] == 'b.json':
+                raise error
+
+        mock_s3_client.put_object.side_effect = put_object
+        failures = save_json_objects_to_s3(
+            [({"a": 1}, 'a.json'), ({"b": 2}, 'b.json'), ({"c": 3}, 'c.json')],
+            "bucket"
+        )
+
+        assert list(failures) == ['b.json']
+        assert failures['b.json'].response['Error']['Code'] == 'InternalError'
+        assert mock_s3_client.put_object.call_count == 3
+
+    def test_empty_input_creates_no_client(self):
+        """Nothing to upload returns no failures and makes no client."""
+        with patch('els_pipeline.s3_helpers.boto3.client') as mock_client:
+            assert save_json_objects_to_s3([], "bucket") == {}
+        mock_client.assert_not_called()
+
+
+class TestLoadJsonObjectsFromS3:
+    """Tests for load_json_objects_from_s3 function."""
+
+    def test_missing_keys_are_omitted(self, mock_s3_client):
+        """Objects that do not exist are left out of the result."""
+        def get_object(**kwargs):
+            if kwargs['Key'] == 'b.json':
+                raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': 'gone'}}, 'GetObject')
+            return {'Body': MagicMock(read=lambda: json.dumps({"key": kwargs['Key']}).encode())}
+
+        mock_s3_client.get_object.side_effect = get_object
+        loaded = load_json_objects_from_s3(['a.json', 'b.json', 'c.json'], "bucket", max_workers=2)
+
+        assert loaded == {'a.json': {"key": 'a.json'}, 'c.json': {"key": 'c.json'}}
+
+    def test_access_denied_raises(self, mock_s3_client):
+        """An AccessDenied (403) is a permission fault, not a missing key."""
+        def get_object(**kwargs):
+            if kwargs['Key'] == 'a.metrics.json':
+                raise ClientError({'Error': {'Code': 'AccessDenied', 'Message': 'Access Denied'},
+                                   'ResponseMetadata': {'HTTPStatusCode': 403}}, 'GetObject')
+            return {'Body': MagicMock(read=lambda: b'{}')}
+
+        mock_s3_client.get_object.side_effect = get_object
+        with pytest.raises(ClientError, match="Access denied"):
+            load_json_objects_from_s3(['a.metrics.json', 'b.metrics.json'], "bucket")
+
+    def test_other_errors_raise(self, mock_s3_client):
+        """Any failure other than a missing key is raised."""
+        mock_s3_client.get_object.side_effect = ClientError(
+            {'Error': {'Code': 'InternalError', 'Message': 'try again'}}, 'GetObject'
+        )
+        with pytest.raises(ClientError):
+            load_json_objects_from_s3(['a.json'], "bucket")
+
+
 class TestLoadJsonFromS3:
     """Tests for load_json_from_s3 function."""
     
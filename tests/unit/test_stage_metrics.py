@@ -0,0 +1,213 @@
+"""Unit tests for per-stage resource metrics."""
+
+from unittest.mock import patch
+
+from els_pipeline import stage_metrics
+from els_pipeline.handlers import failed_run_handler, persistence_handler
+from els_pipeline.models import LLMUsage, StageMetrics
+from els_pipeline.stage_metrics import combine_stage_metrics, measure_stage
+
+
+def _metrics(started_at, wall_ms, **fields):
+    return StageMetrics(**{
+        "started_at": started_at, "wall_ms": wall_ms, "cpu_ms": 10, "peak_rss_bytes": 100,
+        "input_bytes": 1, "output_bytes": 2, "records_in": 0, "records_out": 0, **fields,
+    })
+
+
+class TestMeasureStage:
+    """Tests for measure_stage."""
+
+    def test_counts_reported_bytes_and_records(self):
+        """Test that transfers and record counts reach the active measurement only."""
+        stage_metrics.add_input_bytes(999)  # no measurement active: ignored
+
+        with measure_stage() as meter:
+            stage_metrics.add_input_bytes(300)
+            stage_metrics.add_output_bytes(40)
+            stage_metrics.add_input_bytes(200)
+            stage_metrics.set_record_counts(records_in=7)
+            stage_metrics.set_record_counts(records_out=5)
+        stage_metrics.add_output_bytes(999)
+
+        metrics = meter.metrics
+        assert (metrics.input_bytes, metrics.output_bytes) == (500, 40)
+        assert (metrics.records_in, metrics.records_out) == (7, 5)
+        assert metrics.invocations == 1
+        assert metrics.peak_rss_bytes > 0
+
+    def test_included_parts_come_first(self):
+        """Test that included invocations are combined ahead of the measured one."""
+        plan = _metrics("2026-01-01T00:00:00+00:00", 1000, records_in=40)
+
+        with measure_stage() as meter:
+            stage_metrics.include_metrics([plan])
+            stage_metrics.set_record_counts(records_in=3, records_out=12)
+
+        assert meter.metrics.invocations == 2
+        assert meter.metrics.started_at == plan.started_at
+        assert (meter.metrics.records_in, meter.metrics.records_out) == (40, 12)
+
+
+class TestCombineStageMetrics:
+    """Tests for combine_stage_metrics."""
+
+    def test_concurrent_chunks_count_once_in_wall_time(self):
+        """Test that wall time spans the invocations while CPU and bytes add up."""
+        combined = combine_stage_metrics([
+            _metrics("2026-01-01T00:00:00+00:00", 1000, records_in=40, records_out=2),
+            _metrics("2026-01-01T00:00:01+00:00", 5000, peak_rss_bytes=900),
+            _metrics("2026-01-01T00:00:01+00:00", 4000),
+            _metrics("2026-01-01T00:00:06+00:00", 500, records_in=2, records_out=31),
+        ])
+
+        assert combined.started_at == "2026-01-01T00:00:00+00:00"
+        assert combined.wall_ms == 6500
+        assert combined.cpu_ms == 40
+        assert combined.peak_rss_bytes == 900
+        assert (combined.input_bytes, combined.output_bytes) == (4, 8)
+        assert (combined.records_in, combined.records_out) == (40, 31)
+        assert combined.invocations == 4
+
+    def test_llm_usage_is_summed(self):
+        """Test that chunk LLM usage adds up and models are listed once."""
+        combined = combine_stage_metrics([
+            _metrics("2026-01-01T00:00:00+00:00", 100),
+            _metrics("2026-01-01T00:00:01+00:00", 100, llm=LLMUsage(
+                calls=2, input_tokens=900, output_tokens=50, latency_ms=700, retries=1, model_ids=["m1"])),
+            _metrics("2026-01-01T00:00:01+00:00", 100, llm=LLMUsage(
+                calls=1, input_tokens=400, output_tokens=30, latency_ms=300, model_ids=["m1", "m2"])),
+        ])
+
+        assert combined.llm == LLMUsage(
+            calls=3, input_tokens=1300, output_tokens=80, latency_ms=1000, retries=1, model_ids=["m1", "m2"])
+
+
+class TestRecordLLMCall:
+    """Tests for record_llm_call and track_llm_usage."""
+
+    def test_calls_reach_the_stage_and_every_open_tracker(self):
+        """Test that a call counts towards the measurement and each enclosing tracker."""
+        stage_metrics.record_llm_call("m1", 10, 1, 5)  # nothing open: ignored
+
+        with measure_stage() as meter:
+            with stage_metrics.track_llm_usage() as chunk:
+                stage_metrics.record_llm_call("m1", 100, 20, 300, retries=2)
+                with stage_metrics.track_llm_usage() as inner:
+                    stage_metrics.record_llm_call("m2", 50, 5, 100)
+            stage_metrics.record_llm_call("m1", 7, 3, 40)
+
+        assert (inner.calls, inner.input_tokens, inner.model_ids) == (1, 50, ["m2"])
+        assert chunk == LLMUsage(
+            calls=2, input_tokens=150, output_tokens=25, latency_ms=400, retries=2, model_ids=["m1", "m2"])
+        assert (meter.metrics.llm.calls, meter.metrics.llm.input_tokens) == (3, 157)
+
+
+class TestPersistenceStageRecording:
+    """Tests for the pipeline_stages write of persistence_handler."""
+
+    EVENT = {
+        "run_id": "run-1", "output_artifact": "US/CA/2021/intermediate/validation/run-1.json",
+        "country": "US", "state": "CA", "version_year": 2021,
+        "stage_results": {
+            "ingestion": {"status": "success", "output_artifact": "US/CA/2021/ca.pdf",
+                          "metrics": _metrics("2026-01-01T00:00:00+00:00", 800).model_dump()},
+            "validation": {"status": "success", "output_artifact": "v.json"},
+        },
+    }
+
+    def test_writes_every_stage_with_its_metrics(self):
+        """Test that earlier stages and the persistence stage are written together."""
+        with patch("els_pipeline.persister.persist_records", return_value=(9, [{}], {
+                "inserted": 9, "updated": 0, "unchanged": 0})), \
+             patch("els_pipeline.db.persist_pipeline_stages") as mock_write:
+            response = persistence_handler(self.EVENT, None)
+
+        run_id, stages = mock_write.call_args[0]
+        assert run_id == "run-1"
+        assert [s.stage_name for s in stages] == ["ingestion", "validation", "data_persistence"]
+        assert stages[0].duration_ms == 800 and stages[0].metrics.wall_ms == 800
+        assert stages[1].metrics is None
+        assert (stages[2].metrics.records_in, stages[2].metrics.records_out) == (10, 9)
+        assert response["metrics"] == stages[2].metrics.model_dump()
+
+    def test_write_failure_does_not_fail_the_stage(self):
+        """Test that a failed pipeline_stages write is only logged."""
+        with patch("els_pipeline.persister.persist_records", return_value=(1, [], {
+                "inserted": 1, "updated": 0, "unchanged": 0})), \
+             patch("els_pipeline.db.persist_pipeline_stages", side_effect=Exception("FK violation")):
+            response = persistence_handler(self.EVENT, None)
+
+        assert response["status"] == "success"
+        assert response["metrics"]["records_out"] == 1
+
+
+class TestFailedRunRecording:
+    """Tests for failed_run_handler."""
+
+    RUN = {"run_id": "run-2", "file_path": "US/CA/2021/ca.pdf", "country": "US",
+           "state": "CA", "version_year": 2021}
+
+    def _record(self, event, **write):
+        with patch("els_pipeline.db.record_failed_pipeline_run") as mock_run, \
+             patch("els_pipeline.db.persist_pipeline_stages", **write) as mock_write:
+            response = failed_run_handler(event, None)
+        return response, mock_run, mock_write
+
+    def test_records_finished_stages_and_the_failed_state(self):
+        """Test that a state failing outright gets an error row after the finished stages."""
+        event = {**self.RUN,
+                 "ingestion_result": {"Payload": {"status": "success", "output_artifact": "ca.pdf"}},
+                 "extraction_result": {"Payload": {
+                     "status": "success", "output_artifact": "ca.json",
+                     "metrics": _metrics("2026-01-01T00:00:00+00:00", 300).model_dump()}},
+                 "error_info": {"Error": "States.TaskFailed", "Cause": "chunk 3 timed out"}}
+
+        response, mock_run, mock_write = self._record(event)
+
+        mock_run.assert_called_once_with("run-2", "US/CA/2021/ca.pdf", "US", "CA", 2021)
+        run_id, stages = mock_write.call_args[0]
+        assert run_id == "run-2"
+        assert [(s.stage_name, s.status) for s in stages] == [
+            ("ingestion", "success"), ("text_extraction", "success"), ("structure_detection", "error")]
+        assert stages[1].duration_ms == 300
+        assert stages[2].error == "chunk 3 timed out"
+        assert response == {"status": "success", "run_id": "run-2", "stages_recorded": 3}
+
+    def test_failure_inside_the_map_blames_the_planned_stage(self):
+        """Test that a Map failure after a successful plan is recorded against that stage."""
+        plan = {"status": "success", "stage_name": "structure_detection_plan", "total_chunks": 4,
+                "metrics": _metrics("2026-01-01T00:00:00+00:00", 200).model_dump()}
+        event = {**self.RUN,
+                 "ingestion_result": {"Payload": {"status": "success", "output_artifact": "ca.pdf"}},
+                 "extraction_result": {"Payload": {"status": "success", "output_artifact": "ca.json"}},
+                 "detection_result": {"Payload": plan},
+                 "error_info": {"Error": "States.ExceedToleratedFailureThreshold",
+                                "Cause": "chunk 2 failed"}}
+
+        _, _, mock_write = self._record(event)
+
+        stages = mock_write.call_args[0][1]
+        assert [(s.stage_name, s.status) for s in stages] == [
+            ("ingestion", "success"), ("text_extraction", "success"), ("structure_detection", "error")]
+        assert stages[2].error == "chunk 2 failed"
+        assert stages[2].duration_ms == 200
+
+    def test_stops_at_a_stage_that_returned_an_error(self):
+        """Test that a stage's error payload is its row and no later stage is added."""
+        event = {**self.RUN,
+                 "ingestion_result": {"Payload": {"status": "error", "error": "not a PDF",
+                                                  "error_type": "ValueError"}},
+                 "error_info": {"stage": "ingestion", "error": "not a PDF", "error_type": "ValueError"}}
+
+        _, _, mock_write = self._record(event)
+
+        stages = mock_write.call_args[0][1]
+        assert [(s.stage_name, s.status, s.error) for s in stages] == [("ingestion", "error", "not a PDF")]
+
+    def test_write_failure_is_only_logged(self):
+        """Test that a failed write still lets the failure notification go out."""
+        response, _, _ = self._record({**self.RUN, "error_info": {}},
+                                      side_effect=Exception("connection refused"))
+
+        assert response == {"status": "error", "run_id": "run-2", "stages_recorded": 0}
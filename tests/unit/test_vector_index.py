@@ -0,0 +1,202 @@
+"""Unit tests for the in-process vector index."""
+
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+
+from els_pipeline.db import DatabaseConnection
+from els_pipeline.vector_index import VectorIndex, quantize_int8
+
+
+@pytest.fixture
+def sample_records():
+    """Create a small set of embedding records with filter attributes."""
+    return [
+        {"indicator_id": "US-CA-2021-LLD-1", "vector": [1.0, 0.0, 0.0],
+         "country": "US", "state": "CA", "age_band": "3-5", "domain": "LLD", "version_year": 2021},
+        {"indicator_id": "US-CA-2021-LLD-2", "vector": [0.9, 0.1, 0.0],
+         "country": "US", "state": "CA", "age_band": "3-5", "domain": "LLD", "version_year": 2021},
+        {"indicator_id": "US-TX-2022-MTH-1", "vector": [0.0, 1.0, 0.0],
+         "country": "US", "state": "TX", "age_band": "3-5", "domain": "MTH", "version_year": 2022},
+        {"indicator_id": "US-TX-2022-LLD-1", "vector": [0.0, 0.0, 2.0],
+         "country": "US", "state": "TX", "age_band": "0-3", "domain": "LLD", "version_year": 2022},
+    ]
+
+
+@pytest.fixture
+def index(sample_records):
+    """Build an index from the sample records."""
+    return VectorIndex.from_records(sample_records)
+
+
+class TestVectorIndex:
+    """Tests for VectorIndex."""
+
+    def test_rows_are_normalized_float32(self, index):
+        """Test that the matrix is contiguous float32 with unit-length rows."""
+        assert index.vectors.dtype == np.float32
+        assert index.vectors.flags["C_CONTIGUOUS"]
+        np.testing.assert_allclose(np.linalg.norm(index.vectors, axis=1), 1.0, rtol=1e-6)
+
+    def test_search_orders_by_decreasing_similarity(self, index):
+        """Test single-query cosine top-k."""
+        results = index.search([2.0, 0.0, 0.0], top_k=2)
+
+        assert [r["indicator_id"] for r in results] == ["US-CA-2021-LLD-1", "US-CA-2021-LLD-2"]
+        assert results[0]["similarity"] == pytest.approx(1.0)
+        assert results[0]["similarity"] >= results[1]["similarity"]
+        assert results[0]["state"] == "CA"
+        assert results[0]["version_year"] == 2021
+
+    def test_search_batch_matches_single_queries(self, index):
+        """Test that batched search returns the same results as per-query search."""
+        queries = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.1], [0.0, 0.0, 1.0]]
+        batch = index.search_batch(queries, top_k=3)
+
+        assert len(batch) == 3
+        for query, results in zip(queries, batch):
+            assert results == index.search(query, top_k=3)
+
+    def test_filters_mask_rows(self, index):
+        """Test that attribute filters restrict candidates."""
+        results = index.search([1.0, 0.0, 0.0], top_k=10, filters={"state": "TX"})
+
+        assert {r["indicator_id"] for r in results} == {"US-TX-2022-MTH-1", "US-TX-2022-LLD-1"}
+
+        results = index.search([1.0, 0.0, 0.0], top_k=10, filters={"state": "TX", "domain": "LLD"})
+        assert [r["indicator_id"] for r in results] == ["US-TX-2022-LLD-1"]
+
+    def test_filter_with_no_matches_returns_empty(self, index):
+        """Test that a filter matching nothing returns empty result lists."""
+        assert index.search_batch([[1.0, 0.0, 0.0]] * 2, filters={"state": "NY"}) == [[], []]
+
+    def test_unknown_filter_raises(self, index):
+        """Test that filtering on an attribute the index lacks is rejected."""
+        with pytest.raises(ValueError, match="Unknown filter attribute"):
+            index.search([1.0, 0.0, 0.0], filters={"strand": "A"})
+
+    def test_dimension_mismatch_raises(self, index):
+        """Test that queries of the wrong dimension are rejected."""
+        with pytest.raises(ValueError, match="does not match index dimension"):
+            index.search([1.0, 0.0])
+
+    def test_save_and_load_memory_mapped(self, index, tmp_path):
+        """Test that a saved index reloads memory-mapped with identical results."""
+        index.save(str(tmp_path))
+        loaded = VectorIndex.load(str(tmp_path))
+
+        assert isinstance(loaded.vectors, np.memmap)
+        assert len(loaded) == len(index)
+        query = [0.3, 0.7, 0.1]
+        assert loaded.search(query, top_k=4) == index.search(query, top_k=4)
+
+    def test_save_and_load_with_none_attributes(self, sample_records, tmp_path):
+        """Test that attributes mixing None with values round-trip without pickling."""
+        sample_records[0]["age_band"] = None
+        sample_records[2]["version_year"] = None
+        index = VectorIndex.from_records(sample_records)
+
+        index.save(str(tmp_path))
+        loaded = VectorIndex.load(str(tmp_path))
+
+        for name in ("age_band", "version_year"):
+            assert np.load(tmp_path / f"attr_{name}.npy").dtype != object
+        results = loaded.search([1.0, 1.0, 1.0], top_k=4)
+        assert results == index.search([1.0, 1.0, 1.0], top_k=4)
+        by_id = {r["indicator_id"]: r for r in results}
+        assert by_id["US-CA-2021-LLD-1"]["age_band"] is None
+        assert by_id["US-TX-2022-MTH-1"]["version_year"] is None
+        assert by_id["US-TX-2022-LLD-1"]["version_year"] == 2022
+        assert [r["indicator_id"] for r in loaded.search([1.0, 0.0, 0.0], filters={"age_band": "3-5"})] \
+            == ["US-CA-2021-LLD-2", "US-TX-2022-MTH-1"]
+
+    def test_save_rejects_mixed_attribute_types(self, index, tmp_path):
+        """Test that an attribute with mixed value types is rejected rather than pickled."""
+        index.attributes["domain"] = np.array(["LLD", 1, None, "LLD"], dtype=object)
+
+        with pytest.raises(ValueError, match="domain"):
+            index.save(str(tmp_path))
+
+    def test_load_from_db(self, sample_records):
+        """Test bulk-loading embeddings from the database."""
+        conn = MagicMock()
+        cursor = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        columns = ["indicator_id", "vector", "country", "state", "age_band", "domain", "version_year"]
+        cursor.description = [(c,) for c in columns]
+        cursor.fetchmany.side_effect = [
+            [tuple(r[c] for c in columns) for r in sample_records],
+            [],
+        ]
+
+        with patch.object(DatabaseConnection, "get_connection") as mock_get_conn:
+            mock_get_conn.return_value.__enter__.return_value = conn
+
+            index = VectorIndex.load_from_db(filters={"country": "US"})
+
+        assert len(index) == 4
+        sql, params = cursor.execute.call_args[0]
+        assert "e.vector::real[]" in sql
+        assert "e.country = %s" in sql
+        assert params == ["US"]
+
+
+class TestQuantization:
+    """Tests for quantized storage and rescoring."""
+
+    @pytest.fixture
+    def random_index(self):
+        """Build an index over random vectors."""
+        rng = np.random.default_rng(7)
+        vectors = rng.standard_normal((500, 32)).astype(np.float32)
+        ids = np.asarray([f"ID-{i}" for i in range(500)])
+        return VectorIndex(ids, vectors, {"state": np.asarray(["CA", "TX"] * 250)})
+
+    def test_quantize_int8_round_trip(self):
+        """Test that int8 codes with per-row scales approximate the input."""
+        matrix = np.asarray([[0.5, -1.0, 0.25], [0.0, 0.0, 0.0]], dtype=np.float32)
+        codes, scales = quantize_int8(matrix)
+
+        assert codes.dtype == np.int8
+        assert scales.dtype == np.float32
+        np.testing.assert_allclose(codes * scales[:, None], matrix, atol=1.0 / 127)
+
+    @pytest.mark.parametrize("mode,ratio", [("float16", 0.5), ("int8", 0.25)])
+    def test_quantize_reduces_memory(self, random_index, mode, ratio):
+        """Test that the scanned matrix shrinks by the expected factor."""
+        full = random_index.nbytes
+        random_index.quantize(mode)
+
+        assert random_index.quantization == mode
+        assert random_index.codes.nbytes == pytest.approx(full * ratio)
+
+    @pytest.mark.parametrize("mode", ["float16", "int8"])
+    def test_rescored_results_match_exact(self, random_index, mode):
+        """Test that rescoring returns exact similarities for the recovered rows."""
+        rng = np.random.default_rng(11)
+        queries = rng.standard_normal((5, 32))
+        exact = random_index.search_batch(queries, top_k=5, filters={"state": "TX"})
+
+        random_index.quantize(mode)
+        approx = random_index.search_batch(queries, top_k=5, filters={"state": "TX"}, oversample=8)
+
+        for exp, act in zip(exact, approx):
+            assert [r["indicator_id"] for r in act] == [r["indicator_id"] for r in exp]
+            for e, a in zip(exp, act):
+                assert a["similarity"] == pytest.approx(e["similarity"], abs=1e-5)
+
+    def test_unknown_mode_raises(self, random_index):
+        """Test that unsupported quantization modes are rejected."""
+        with pytest.raises(ValueError, match="Unknown quantization mode"):
+            random_index.quantize("int4")
+
+    def test_save_and_load_quantized(self, random_index, tmp_path):
+        """Test that quantization survives a save/load round trip."""
+        random_index.quantize("int8")
+        random_index.save(str(tmp_path))
+        loaded = VectorIndex.load(str(tmp_path))
+
+        assert loaded.quantization == "int8"
+        np.testing.assert_array_equal(loaded.codes, random_index.codes)
+        query = np.ones(32)
+        assert loaded.search(query, top_k=3) == random_index.search(query, top_k=3)